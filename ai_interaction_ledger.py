@@ -7,7 +7,7 @@ import json
 import os
 import time
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -90,11 +90,16 @@ def log_score(score: Dict[str, Any]) -> None:
     _append_jsonl(SCORES_FILE, score)
 
 
-def create_ai_transfer_from_ledger_entry(entry: Dict[str, Any]) -> None:
+def create_ai_transfer_from_ledger_entry(
+    entry: Dict[str, Any],
+    append_chain: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+) -> None:
     """Create a sanitized AI transfer visible in the viewer.
 
     The transfer is written into the main ``phantom_tx_chain.json`` file so it
     appears in the Transfers tab without leaking raw prompts or responses.
+    When the host keeps that chain in its own store it passes
+    ``append_chain`` and the transfer is appended through it instead.
     """
 
     try:
@@ -138,6 +143,9 @@ def create_ai_transfer_from_ledger_entry(entry: Dict[str, Any]) -> None:
             "timestamp": timestamp,
         }
 
+        if append_chain is not None:
+            append_chain([tx])
+            return
         chain = _safe_load_chain(VIEWER_CHAIN_FILE)
         chain.append(tx)
         _save_json(VIEWER_CHAIN_FILE, chain)
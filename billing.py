@@ -35,21 +35,36 @@ AI_CREDITS_FILE = None
 BILLING_TELEMETRY_FILE = None
 AI_WALLET_ADDRESS = None
 
+# Storage hooks (will be set by server.py so ledger and chain writes go
+# through its stores instead of the JSON mirrors)
+_LOAD_JSON = None
+_SAVE_JSON = None
+_APPEND_CHAIN = None
+_CHAIN_LENGTH = None
 
-def init_billing(data_dir: str, ledger_file: str, chain_file: str, ai_credits_file: str, ai_wallet: str):
-    """Initialize billing module with file paths from server.py"""
+
+def init_billing(data_dir: str, ledger_file: str, chain_file: str, ai_credits_file: str, ai_wallet: str,
+                 load_json=None, save_json=None, append_chain=None, chain_length=None):
+    """Initialize billing module with file paths (and optional storage hooks) from server.py"""
     global DATA_DIR, LEDGER_FILE, CHAIN_FILE, AI_CREDITS_FILE, BILLING_TELEMETRY_FILE, AI_WALLET_ADDRESS
+    global _LOAD_JSON, _SAVE_JSON, _APPEND_CHAIN, _CHAIN_LENGTH
     DATA_DIR = data_dir
     LEDGER_FILE = ledger_file
     CHAIN_FILE = chain_file
     AI_CREDITS_FILE = ai_credits_file
     AI_WALLET_ADDRESS = ai_wallet
     BILLING_TELEMETRY_FILE = os.path.join(data_dir, "billing_telemetry.jsonl")
+    _LOAD_JSON = load_json
+    _SAVE_JSON = save_json
+    _APPEND_CHAIN = append_chain
+    _CHAIN_LENGTH = chain_length
     logger.info(f"Billing module initialized: CHAT={CHAT_BILLING_MODE}, ARCHITECT={ARCHITECT_BILLING_MODE}")
 
 
 def _load_json(filepath: str, default):
     """Load JSON file with fallback"""
+    if _LOAD_JSON is not None:
+        return _LOAD_JSON(filepath, default)
     try:
         if os.path.exists(filepath):
             with open(filepath, "r", encoding="utf-8") as f:
@@ -62,6 +77,9 @@ def _load_json(filepath: str, default):
 def _save_json(filepath: str, data):
     """Save JSON file"""
     try:
+        if _SAVE_JSON is not None:
+            _SAVE_JSON(filepath, data)
+            return
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         with open(filepath, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
@@ -69,6 +87,26 @@ def _save_json(filepath: str, data):
         logger.error(f"Failed to save {filepath}: {e}")
 
 
+def _chain_length() -> int:
+    """Number of chain entries (used to number billing txs)"""
+    if _CHAIN_LENGTH is not None:
+        return _CHAIN_LENGTH()
+    return len(_load_json(CHAIN_FILE, []))
+
+
+def _append_chain_tx(tx: Dict[str, Any]):
+    """Append one tx to the chain without rewriting the entries before it"""
+    if _APPEND_CHAIN is None:
+        chain = _load_json(CHAIN_FILE, [])
+        chain.append(tx)
+        _save_json(CHAIN_FILE, chain)
+        return
+    try:
+        _APPEND_CHAIN([tx])
+    except Exception as e:
+        logger.error(f"Failed to append {tx.get('tx_id')} to chain: {e}")
+
+
 def _record_telemetry(entry: Dict[str, Any]):
     """Append billing telemetry (JSONL)"""
     try:
@@ -141,7 +179,6 @@ def consume_credits(wallet: str, amount: int, product: str = "chat") -> Tuple[bo
     _record_telemetry(telemetry)
 
     try:
-        chain = _load_json(CHAIN_FILE, [])
         tx = {
             "type": "CREDITS_CONSUME",
             "from": wallet,
@@ -150,11 +187,10 @@ def consume_credits(wallet: str, amount: int, product: str = "chat") -> Tuple[bo
             "symbol": "CREDITS",
             "status": "confirmed",
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime()),
-            "tx_id": f"CREDITS-{int(time.time())}-{len(chain)}",
+            "tx_id": f"CREDITS-{int(time.time())}-{_chain_length()}",
             "metadata": {"billing_unit": "credits", "session_type": "chat", "product": product},
         }
-        chain.append(tx)
-        _save_json(CHAIN_FILE, chain)
+        _append_chain_tx(tx)
     except Exception as e:
         logger.error(f"Failed to append credits tx: {e}")
 
@@ -218,7 +254,6 @@ def charge_thr(wallet: str, amount: Decimal, reason: str, product: str = "archit
     _save_json(LEDGER_FILE, ledger)
 
     # Create chain transaction
-    chain = _load_json(CHAIN_FILE, [])
     tx_meta = {"billing_unit": "thr", "session_type": "architect", "product": product}
     if metadata:
         tx_meta.update(metadata)
@@ -230,11 +265,10 @@ def charge_thr(wallet: str, amount: Decimal, reason: str, product: str = "archit
         "to": AI_WALLET_ADDRESS,
         "amount": float(amount),
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime()),
-        "tx_id": f"ARCH-{int(time.time())}-{len(chain)}",
+        "tx_id": f"ARCH-{int(time.time())}-{_chain_length()}",
         "metadata": tx_meta,
     }
-    chain.append(tx)
-    _save_json(CHAIN_FILE, chain)
+    _append_chain_tx(tx)
 
     telemetry = {
         "event": "thr_charged",
@@ -0,0 +1,342 @@
+"""
+ThronosChain Block Intake — validating, deduplicating peer block acceptance
+
+``api_v1_receive_block`` used to check for duplicates against the whole
+chain and then append whatever it was given.  Peer blocks now go through
+``BlockIntake``:
+
+  1. in-flight dedupe: a hash already being processed (the same block pushed
+     by several peers at once) is answered ``in_flight`` without work
+  2. duplicate check against a hash -> height index (``lookup``)
+  3. PoW: the block hash is recomputed from the block's fields (see
+     ``chain_sync.pow_hash``) and must match ``block_hash``; it must be at or
+     below the block's target, and that target no easier than ``max_target``
+     (a fixed cap, or the node's target for the block's height)
+  4. reward: with ``reward_for`` set, the block's self-declared ``reward``
+     must equal the schedule's reward for its height (synced history at or
+     below ``checkpoint`` keeps its stored reward, e.g. pre-upgrade 1.0 THR
+     blocks)
+  5. linkage: the block must extend the current tip (prev_hash and height);
+     a block whose parent is unknown waits in a bounded orphan pool, and a
+     block whose parent is known but is not the tip is rejected as stale
+  6. commit: the block and every orphan it connects go to ``commit`` as one
+     batch, so the caller applies their ledger deltas in one transaction
+
+``submit_batch`` runs a run of consecutive blocks from chain sync through
+the same checks and commits them with one ``commit`` call.  Synced blocks at
+or below ``checkpoint`` (see ``chain_sync.Checkpoint``) are trusted history:
+no target cap, no reward schedule, and legacy stratum blocks keep their
+stored hash.  Relayed
+blocks never get that leniency.
+
+``BlockHashIndex`` is the in-memory hash -> height index (plus tip) for nodes
+without the chain store, kept current by ``note`` on every append and
+rebuilt only when the chain changes some other way.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from chain_sync import checkpoint_reason, is_legacy_stratum, pow_hash, target_limit
+
+logger = logging.getLogger(__name__)
+
+ADDED = "added"
+DUPLICATE = "duplicate"
+IN_FLIGHT = "in_flight"
+ORPHAN = "orphan"
+INVALID = "invalid"
+
+
+def _as_int(value) -> Optional[int]:
+    try:
+        if isinstance(value, str) and value.lower().startswith("0x"):
+            return int(value, 16)
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class BlockHashIndex:
+    """block_hash -> height for every block in the chain, plus the tip."""
+
+    def __init__(self, load_blocks: Callable[[], Iterable[dict]], version: Callable[[], object]):
+        self._load_blocks = load_blocks
+        self._version = version
+        self._lock = threading.Lock()
+        self._heights: dict = {}
+        self._tip: Optional[Tuple[str, Optional[int]]] = None
+        self._seen_version = object()
+
+    def _fresh(self) -> None:
+        version = self._version()
+        if version == self._seen_version:
+            return
+        heights, tip = {}, None
+        for block in self._load_blocks():
+            if isinstance(block, dict) and block.get("reward") is not None and block.get("block_hash"):
+                heights[block["block_hash"]] = _as_int(block.get("height"))
+                tip = (block["block_hash"], _as_int(block.get("height")))
+        self._heights, self._tip, self._seen_version = heights, tip, version
+        logger.info("block_intake: indexed %d block hashes", len(heights))
+
+    def note(self, entries: Iterable, before, after) -> None:
+        """Record blocks just appended.  ``before`` / ``after`` are the chain
+        versions around the append; an index that was not current at
+        ``before`` is left to rebuild on the next read."""
+        with self._lock:
+            if before != self._seen_version:
+                return
+            for entry in entries:
+                if isinstance(entry, dict) and entry.get("reward") is not None and entry.get("block_hash"):
+                    self._heights[entry["block_hash"]] = _as_int(entry.get("height"))
+                    self._tip = (entry["block_hash"], _as_int(entry.get("height")))
+            self._seen_version = after
+
+    def height_of(self, block_hash: str) -> Optional[int]:
+        """Height of a known block, -1 for a known block without one, None if unknown."""
+        with self._lock:
+            self._fresh()
+            if block_hash not in self._heights:
+                return None
+            height = self._heights[block_hash]
+            return -1 if height is None else height
+
+    def tip(self) -> Optional[Tuple[str, Optional[int]]]:
+        with self._lock:
+            self._fresh()
+            return self._tip
+
+
+class BlockIntake:
+    """Validate peer blocks, pool orphans and commit connected batches."""
+
+    def __init__(
+        self,
+        lookup: Callable[[str], Optional[int]],
+        tip: Callable[[], Optional[Tuple[str, Optional[int]]]],
+        commit: Callable[[List[Tuple[dict, list]]], None],
+        max_target=None,
+        reward_for: Optional[Callable[[int], float]] = None,
+        orphan_limit: int = 256,
+        orphan_ttl: float = 600.0,
+        checkpoint=None,
+    ):
+        self._lookup = lookup
+        self._tip = tip
+        self._commit = commit
+        # None, an int, or height -> int (see chain_sync.target_limit)
+        self.max_target = max_target
+        self.reward_for = reward_for
+        # chain_sync.Checkpoint bounding the trusted history for synced batches
+        self.checkpoint = checkpoint
+        self.orphan_limit = max(1, int(orphan_limit))
+        self.orphan_ttl = float(orphan_ttl)
+        self._lock = threading.Lock()
+        self._in_flight_lock = threading.Lock()
+        self._in_flight: set = set()
+        # block_hash -> (block, txs, received_at), oldest first
+        self._orphans: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters_lock = threading.Lock()
+        self.counters = {ADDED: 0, DUPLICATE: 0, IN_FLIGHT: 0, ORPHAN: 0, INVALID: 0}
+
+    # ─── validation ─────────────────────────────────────────────────────
+
+    def _trusted(self, block: dict, synced: bool) -> Tuple[bool, Optional[str]]:
+        if not synced:
+            return False, None
+        return checkpoint_reason(block, self.checkpoint)
+
+    def check_pow(self, block: dict, synced: bool = False) -> Optional[str]:
+        """None when the block's PoW is acceptable, else the reason."""
+        trusted, reason = self._trusted(block, synced)
+        if reason:
+            return reason
+        block_hash = str(block.get("block_hash") or "").lower()
+        try:
+            value = int(block_hash, 16)
+        except ValueError:
+            return "bad_hash"
+        computed = pow_hash(block)
+        if computed is None:
+            if not (trusted and is_legacy_stratum(block)):
+                return "unverifiable_hash"
+        elif computed != block_hash:
+            return "hash_mismatch"
+        height = _as_int(block.get("height"))
+        if callable(self.max_target) and height is None:
+            return "missing_height"
+        limit = None if trusted else target_limit(self.max_target, height)
+        target = _as_int(block.get("target"))
+        if target is None:
+            target = limit
+        if target is None:
+            return None
+        if limit is not None and target > limit:
+            return "target_too_easy"
+        if value > target:
+            return "insufficient_work"
+        return None
+
+    def check_reward(self, block: dict, synced: bool = False) -> Optional[str]:
+        """None when the block claims the scheduled reward (or no schedule is set).
+
+        Synced blocks in the trusted history only need a non-negative stored
+        reward: the chain holds blocks minted under older schedules.
+        """
+        if self.reward_for is None:
+            return None
+        height = _as_int(block.get("height"))
+        if height is None:
+            return "missing_height"
+        try:
+            claimed = float(block.get("reward"))
+        except (TypeError, ValueError):
+            return "bad_reward"
+        if self._trusted(block, synced)[0]:
+            return None if 0 <= claimed < float("inf") else "bad_reward"
+        if round(claimed, 6) != round(float(self.reward_for(height)), 6):
+            return "bad_reward"
+        return None
+
+    def check_block(self, block: dict, synced: bool = False) -> Optional[str]:
+        """PoW then reward; None when both hold.  ``synced`` marks a block
+        from ``submit_batch``, which may fall in the trusted history."""
+        return self.check_pow(block, synced) or self.check_reward(block, synced)
+
+    def _check_link(self, block: dict, tip) -> Optional[str]:
+        """None when ``block`` extends ``tip``; ORPHAN when its parent is unknown."""
+        prev_hash = block.get("prev_hash")
+        if tip is None:
+            return None
+        tip_hash, tip_height = tip
+        if prev_hash != tip_hash:
+            return "stale" if prev_hash and self._lookup(prev_hash) is not None else ORPHAN
+        height = _as_int(block.get("height"))
+        if height is not None and tip_height is not None and height != tip_height + 1:
+            return "bad_height"
+        return None
+
+    # ─── intake ─────────────────────────────────────────────────────────
+
+    def submit(self, block: dict, txs: Optional[list] = None) -> Tuple[str, dict]:
+        """Process one peer block; returns (status, details)."""
+        block_hash = block.get("block_hash") if isinstance(block, dict) else None
+        if not block_hash or block.get("reward") is None:
+            return self._count(INVALID), {"reason": "invalid_block"}
+        with self._in_flight_lock:
+            if block_hash in self._in_flight:
+                return self._count(IN_FLIGHT), {}
+            self._in_flight.add(block_hash)
+        try:
+            return self._submit(block, list(txs or []))
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.discard(block_hash)
+
+    def _submit(self, block: dict, txs: list) -> Tuple[str, dict]:
+        block_hash = block["block_hash"]
+        if self._lookup(block_hash) is not None:
+            return self._count(DUPLICATE), {}
+        reason = self.check_block(block)
+        if reason:
+            return self._count(INVALID), {"reason": reason}
+        with self._lock:
+            if self._lookup(block_hash) is not None:
+                return self._count(DUPLICATE), {}
+            tip = self._tip()
+            reason = self._check_link(block, tip)
+            if reason == ORPHAN:
+                self._add_orphan(block, txs)
+                return self._count(ORPHAN), {"missing_parent": block.get("prev_hash")}
+            if reason:
+                return self._count(INVALID), {"reason": reason}
+            batch = [(block, txs)] + self._connect_orphans(block_hash, _as_int(block.get("height")))
+            self._commit(batch)
+            self._count(ADDED, len(batch))
+        return ADDED, {"connected": len(batch) - 1, "height": batch[-1][0].get("height")}
+
+    def submit_batch(self, groups: List[Tuple[dict, list]]) -> Tuple[str, dict]:
+        """Validate consecutive ``(block, txs)`` groups and commit them together.
+
+        Each block gets the PoW, reward and linkage checks of ``submit`` against the
+        block before it (the tip for the first), relaxed at or below
+        ``checkpoint``.  Blocks already in the chain
+        at the front of the run are skipped; any other failure commits nothing
+        and returns ``(INVALID, {"reason", "height"})``.
+        """
+        with self._lock:
+            tip = self._tip()
+            batch = []
+            for block, txs in groups:
+                block_hash = block.get("block_hash") if isinstance(block, dict) else None
+                if not block_hash or block.get("reward") is None:
+                    reason = "invalid_block"
+                elif not batch and self._lookup(block_hash) is not None:
+                    continue
+                else:
+                    reason = self.check_block(block, synced=True) or self._check_link(block, tip)
+                if reason:
+                    self._count(INVALID)
+                    height = block.get("height") if isinstance(block, dict) else None
+                    return INVALID, {"reason": reason, "height": height}
+                batch.append((block, list(txs or [])))
+                tip = (block_hash, _as_int(block.get("height")))
+            if batch:
+                self._commit(batch)
+                self._count(ADDED, len(batch))
+        return ADDED, {"added": len(batch)}
+
+    def _count(self, status: str, n: int = 1) -> str:
+        with self._counters_lock:
+            self.counters[status] += n
+        return status
+
+    # ─── orphans ────────────────────────────────────────────────────────
+
+    def _add_orphan(self, block: dict, txs: list) -> None:
+        now = time.time()
+        self._expire(now)
+        self._orphans[block["block_hash"]] = (block, txs, now)
+        self._orphans.move_to_end(block["block_hash"])
+        while len(self._orphans) > self.orphan_limit:
+            self._orphans.popitem(last=False)
+
+    def _expire(self, now: float) -> None:
+        while self._orphans:
+            _, (_, _, received_at) = next(iter(self._orphans.items()))
+            if now - received_at <= self.orphan_ttl:
+                break
+            self._orphans.popitem(last=False)
+
+    def _connect_orphans(self, parent_hash: str, parent_height: Optional[int]) -> List[Tuple[dict, list]]:
+        """Pop the chain of pooled orphans that descends from ``parent_hash``."""
+        connected = []
+        while True:
+            child = next(
+                (h for h, (b, _, _) in self._orphans.items() if b.get("prev_hash") == parent_hash), None
+            )
+            if child is None:
+                return connected
+            block, txs, _ = self._orphans.pop(child)
+            height = _as_int(block.get("height"))
+            if height is not None and parent_height is not None and height != parent_height + 1:
+                continue
+            connected.append((block, txs))
+            parent_hash, parent_height = child, height
+
+    def orphan_count(self) -> int:
+        with self._lock:
+            return len(self._orphans)
+
+    def stats(self) -> dict:
+        with self._lock:
+            orphans = len(self._orphans)
+        with self._in_flight_lock:
+            in_flight = len(self._in_flight)
+        with self._counters_lock:
+            counts = dict(self.counters)
+        return {"orphans": orphans, "processing": in_flight, "counts": counts}
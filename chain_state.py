@@ -0,0 +1,235 @@
+"""
+ThronosChain Chain State — incrementally maintained chain aggregates
+
+Block counts, per-type entry counts, THR minted/burned totals and the tip
+used to be recomputed by loading and scanning the whole chain on every block
+commit (``update_last_block``), stats request and telemetry tick.  A
+``ChainState`` folds each committed entry into running totals instead:
+
+  - ``apply`` / ``apply_many`` advance the totals by the new entries only
+  - ``supply_totals`` returns the raw minted/burned sums that
+    ``compute_thr_supply_metrics`` used to rebuild from the full chain
+  - ``reward_blocks`` is the mined-block sequence; with a ``ChainStore`` it
+    is a lazy view (``StoreBlockView``) rather than an in-memory copy
+  - ``to_checkpoint`` / ``restore`` persist the totals with the entry count,
+    tip key and store generation, so a cold start replays only the entries
+    committed after the checkpoint and rebuilds after a store rewrite
+
+The per-entry rules are exactly those of the original full scans (a block is
+any dict with ``reward`` set), and entries are folded in chain order so the
+float sums match the old ``sum(...)`` results.
+"""
+
+import json
+import logging
+import os
+from collections import Counter
+from typing import Iterable, Optional
+
+from chain_store import _entry_key
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+_TOTAL_FIELDS = (
+    "minted_from_blocks",
+    "minted_from_admin",
+    "burned_from_fees",
+    "burned_from_events",
+    "burned_from_blocks",
+)
+
+
+def _num(value) -> float:
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class StoreBlockView:
+    """Read-only sequence of the mined blocks in a ``ChainStore``."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self) -> int:
+        return self._store.block_count
+
+    def __bool__(self) -> bool:
+        return self._store.block_count > 0
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            blocks = list(self._store.iter_blocks(start, stop)) if start < stop else []
+            return blocks if step == 1 else blocks[::step]
+        block = self._store.get_block(item)
+        if block is None:
+            raise IndexError("block index out of range")
+        return block
+
+    def __iter__(self):
+        return self._store.iter_blocks(0)
+
+
+class ChainState:
+    """Running aggregates over the chain entries applied so far."""
+
+    def __init__(self, reward_blocks=None):
+        self.entry_count = 0
+        self.block_count = 0
+        self.type_counts: Counter = Counter()
+        self.minted_from_blocks = 0.0
+        self.minted_from_admin = 0.0
+        self.burned_from_fees = 0.0
+        self.burned_from_events = 0.0
+        self.burned_from_blocks = 0.0
+        self.tip: Optional[dict] = None
+        self.tip_key = ""
+        self.generation = 0
+        self._own_blocks = reward_blocks is None
+        self.reward_blocks = [] if reward_blocks is None else reward_blocks
+
+    @classmethod
+    def from_entries(cls, entries: Iterable) -> "ChainState":
+        state = cls()
+        state.apply_many(entries)
+        return state
+
+    # ─── folding ────────────────────────────────────────────────────────
+
+    def apply(self, entry) -> None:
+        self.entry_count += 1
+        self.tip_key = _entry_key(entry)
+        if not isinstance(entry, dict):
+            return
+        entry_type = entry.get("type")
+        if isinstance(entry_type, str):
+            self.type_counts[entry_type] += 1
+
+        if entry.get("reward") is not None:
+            self.block_count += 1
+            self.minted_from_blocks += _num(entry.get("reward"))
+            split = entry.get("reward_split")
+            if isinstance(split, dict) and "burn" in split:
+                self.burned_from_blocks += _num(split.get("burn"))
+            else:
+                self.burned_from_blocks += _num(entry.get("pool_fee"))
+            self.tip = {
+                "height": entry.get("height"),
+                "block_hash": entry.get("block_hash"),
+                "timestamp": entry.get("timestamp"),
+                "thr_address": entry.get("thr_address"),
+            }
+            if self._own_blocks:
+                self.reward_blocks.append(entry)
+            return
+
+        tx_type = (entry_type or "").lower() if isinstance(entry_type, str) else ""
+        if tx_type in {"mint", "coinbase", "reward"}:
+            self.minted_from_admin += _num(entry.get("amount"))
+        self.burned_from_fees += _num(entry.get("fee_burned") or entry.get("fee"))
+        if tx_type in {"burn", "thr_burn"}:
+            self.burned_from_events += _num(entry.get("amount"))
+        self.burned_from_events += _num(entry.get("burn_amount") or entry.get("burned_thr"))
+
+    def apply_many(self, entries: Iterable) -> int:
+        applied = 0
+        for entry in entries:
+            self.apply(entry)
+            applied += 1
+        return applied
+
+    # ─── reads ──────────────────────────────────────────────────────────
+
+    def count_types(self, types: Iterable[str]) -> int:
+        """Number of chain entries whose ``type`` is one of ``types``."""
+        return sum(self.type_counts.get(t, 0) for t in set(types))
+
+    def supply_totals(self) -> dict:
+        return {field: getattr(self, field) for field in _TOTAL_FIELDS}
+
+    # ─── checkpoint ─────────────────────────────────────────────────────
+
+    def to_checkpoint(self) -> dict:
+        return {
+            "version": CHECKPOINT_VERSION,
+            "entry_count": self.entry_count,
+            "block_count": self.block_count,
+            "type_counts": dict(self.type_counts),
+            "tip": self.tip,
+            "tip_key": self.tip_key,
+            "generation": self.generation,
+            **self.supply_totals(),
+        }
+
+    @classmethod
+    def from_checkpoint(cls, data: dict, reward_blocks=None) -> "ChainState":
+        if not isinstance(data, dict) or data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError("unsupported chain state checkpoint")
+        state = cls(reward_blocks=reward_blocks)
+        state.entry_count = int(data["entry_count"])
+        state.block_count = int(data["block_count"])
+        state.type_counts = Counter({str(k): int(v) for k, v in (data.get("type_counts") or {}).items()})
+        state.tip = data.get("tip")
+        state.tip_key = str(data.get("tip_key") or "")
+        state.generation = int(data.get("generation") or 0)
+        for field in _TOTAL_FIELDS:
+            setattr(state, field, float(data[field]))
+        return state
+
+    def save_checkpoint(self, path: str) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.to_checkpoint(), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    # ─── store sync ─────────────────────────────────────────────────────
+
+    def is_current(self, store) -> bool:
+        return self.generation == store.generation and self.entry_count == len(store)
+
+    def catch_up(self, store) -> int:
+        """Fold entries appended to ``store`` since the last sync; returns count applied."""
+        if self.entry_count >= len(store):
+            return 0
+        return self.apply_many(store.iter_range(self.entry_count))
+
+    @classmethod
+    def rebuild(cls, store) -> "ChainState":
+        state = cls(reward_blocks=StoreBlockView(store))
+        state.generation = store.generation
+        state.apply_many(store.iter_range(0))
+        return state
+
+    @classmethod
+    def restore(cls, store, checkpoint_path: Optional[str]) -> "ChainState":
+        """Resume from ``checkpoint_path`` when it still describes ``store``, else rebuild."""
+        state = None
+        if checkpoint_path:
+            try:
+                with open(checkpoint_path, "r", encoding="utf-8") as f:
+                    state = cls.from_checkpoint(json.load(f), reward_blocks=StoreBlockView(store))
+            except FileNotFoundError:
+                state = None
+            except (ValueError, KeyError, TypeError) as exc:
+                logger.warning("chain_state: ignoring unreadable checkpoint %s: %s", checkpoint_path, exc)
+                state = None
+        if state is not None:
+            valid = (
+                state.generation == store.generation
+                and state.entry_count <= len(store)
+                and (state.entry_count == 0 or store.entry_key(state.entry_count - 1) == state.tip_key)
+            )
+            if valid:
+                replayed = state.catch_up(store)
+                logger.info("chain_state: resumed checkpoint at %d entries (+%d replayed)", state.entry_count - replayed, replayed)
+                return state
+            logger.warning("chain_state: checkpoint does not match the chain store, rebuilding")
+        return cls.rebuild(store)
@@ -0,0 +1,550 @@
+"""
+ThronosChain Chain Store — append-only segmented storage for phantom_tx_chain.json
+
+The canonical chain used to live in a single indented JSON array that was
+re-parsed, re-serialized and rewritten for every accepted block.  This module
+keeps the same entries (blocks *and* chain transactions, in the same order)
+in append-only JSON-lines segment files with an offset index, so committing a
+block costs one line write instead of a full-file rewrite.
+
+Layout under ``root``:
+  segment-000000.jsonl ...  one compact JSON entry per line
+  index.tsv                 seq, segment, offset, length, height, key, is_block
+  meta.json                 migration marker + JSON mirror bookkeeping
+
+Invariants:
+  - Segment lines are written (and fsynced) before their index row; on open
+    any segment tail that is missing from the index is re-indexed and a torn
+    final line is truncated.
+  - ``seq`` is the position in the legacy JSON array, so ``iter_range`` and
+    ``load_all`` reproduce the old list exactly.
+  - A block is any dict entry with ``reward`` set (same rule the server uses);
+    ``get_by_height`` only resolves blocks, ``get_by_hash`` resolves
+    ``block_hash`` for blocks and ``tx_id`` for transactions.
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+INDEX_FILE = "index.tsv"
+META_FILE = "meta.json"
+DEFAULT_SEGMENT_MAX_ENTRIES = 50_000
+
+
+def _is_block(entry) -> bool:
+    return isinstance(entry, dict) and entry.get("reward") is not None
+
+
+def _entry_key(entry) -> str:
+    if not isinstance(entry, dict):
+        return ""
+    key = entry.get("block_hash") if _is_block(entry) else entry.get("tx_id")
+    key = str(key or "")
+    return key.replace("\t", " ").replace("\n", " ").replace("\r", " ")
+
+
+def _entry_height(entry) -> Optional[int]:
+    if not isinstance(entry, dict):
+        return None
+    try:
+        return int(entry.get("height"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _encode(entry) -> bytes:
+    return (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class ChainStore:
+    """Append-only segmented chain storage with a height/hash offset index."""
+
+    def __init__(self, root: str, segment_max_entries: int = DEFAULT_SEGMENT_MAX_ENTRIES, fsync: bool = True):
+        self.root = root
+        self.segment_max_entries = max(1, int(segment_max_entries))
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._locs: List[Tuple[int, int, int]] = []
+        self._by_key: dict = {}
+        self._by_height: dict = {}
+        self._block_seqs: List[int] = []
+        self._digest = None
+        self._meta: dict = {}
+        self._open()
+
+    # ─── open / recovery ───────────────────────────────────────────────
+
+    def _segment_path(self, seg: int) -> str:
+        return os.path.join(self.root, f"{SEGMENT_PREFIX}{seg:06d}{SEGMENT_SUFFIX}")
+
+    def _index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.root, META_FILE)
+
+    def _open(self) -> None:
+        # A crash during rewrite() can leave the previous generation aside.
+        old_root = self.root + ".old"
+        if not os.path.isdir(self.root) and os.path.isdir(old_root):
+            os.replace(old_root, self.root)
+        os.makedirs(self.root, exist_ok=True)
+        self._reset_index()
+        self._meta = self._read_meta()
+        self._load_index()
+        self._recover_tail()
+
+    def _reset_index(self) -> None:
+        self._locs = []
+        self._by_key = {}
+        self._by_height = {}
+        self._block_seqs = []
+        self._digest = None
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self._meta_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_meta(self) -> None:
+        path = self._meta_path()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._meta, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _track(self, seq: int, seg: int, off: int, length: int, height: Optional[int], key: str, is_block: bool) -> None:
+        self._locs.append((seg, off, length))
+        if key:
+            self._by_key[key] = seq
+        if is_block:
+            self._block_seqs.append(seq)
+            if height is not None:
+                self._by_height[height] = seq
+
+    def _load_index(self) -> None:
+        try:
+            f = open(self._index_path(), "rb")
+        except FileNotFoundError:
+            return
+        row_ends = []
+        with f:
+            data = f.read()
+        pos = 0
+        for raw in data.splitlines(keepends=True):
+            if not raw.endswith(b"\n"):
+                break
+            parts = raw.decode("utf-8").rstrip("\n").split("\t")
+            if len(parts) != 7:
+                break
+            seq, seg, off, length = (int(p) for p in parts[:4])
+            if seq != len(self._locs):
+                break
+            height = int(parts[4]) if parts[4] else None
+            self._track(seq, seg, off, length, height, parts[5], parts[6] == "1")
+            pos += len(raw)
+            row_ends.append(pos)
+        # Drop index rows whose segment bytes never made it to disk.
+        while self._locs:
+            seg, off, length = self._locs[-1]
+            try:
+                size = os.path.getsize(self._segment_path(seg))
+            except OSError:
+                size = -1
+            if off + length <= size:
+                break
+            self._pop_last()
+            row_ends.pop()
+        keep = row_ends[-1] if row_ends else 0
+        if keep < len(data):
+            logger.warning("chain_store: truncating index to %d rows", len(row_ends))
+            with open(self._index_path(), "r+b") as idx:
+                idx.truncate(keep)
+
+    def _pop_last(self) -> None:
+        seq = len(self._locs) - 1
+        self._locs.pop()
+        self._digest = None
+        if self._block_seqs and self._block_seqs[-1] == seq:
+            self._block_seqs.pop()
+        self._by_key = {k: v for k, v in self._by_key.items() if v != seq}
+        self._by_height = {k: v for k, v in self._by_height.items() if v != seq}
+
+    def _index_row(self, seq: int, seg: int, off: int, length: int, entry) -> str:
+        height = _entry_height(entry) if _is_block(entry) else None
+        return "\t".join((
+            str(seq), str(seg), str(off), str(length),
+            "" if height is None else str(height),
+            _entry_key(entry),
+            "1" if _is_block(entry) else "0",
+        )) + "\n"
+
+    def _recover_tail(self) -> None:
+        """Index complete lines written after the last index row; truncate a torn line."""
+        if self._locs:
+            seg, off, length = self._locs[-1]
+            start = off + length
+        else:
+            seg, start = 0, 0
+        while True:
+            path = self._segment_path(seg)
+            if not os.path.exists(path):
+                break
+            with open(path, "rb") as f:
+                f.seek(start)
+                tail = f.read()
+            pos = start
+            recovered = []
+            for raw in tail.splitlines(keepends=True):
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(raw)
+                except json.JSONDecodeError:
+                    break
+                recovered.append((pos, len(raw), entry))
+                pos += len(raw)
+            if pos < start + len(tail):
+                logger.warning("chain_store: truncating torn tail of %s at offset %d", path, pos)
+                with open(path, "r+b") as f:
+                    f.truncate(pos)
+            if recovered:
+                with open(self._index_path(), "a", encoding="utf-8") as idx:
+                    for off, length, entry in recovered:
+                        seq = len(self._locs)
+                        idx.write(self._index_row(seq, seg, off, length, entry))
+                        self._track(seq, seg, off, length, _entry_height(entry) if _is_block(entry) else None,
+                                    _entry_key(entry), _is_block(entry))
+                logger.info("chain_store: recovered %d unindexed entries from %s", len(recovered), path)
+            seg += 1
+            start = 0
+
+    # ─── reads ──────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._locs)
+
+    @property
+    def block_count(self) -> int:
+        return len(self._block_seqs)
+
+    def _read_raw(self, seq: int):
+        seg, off, length = self._locs[seq]
+        with open(self._segment_path(seg), "rb") as f:
+            f.seek(off)
+            return json.loads(f.read(length))
+
+    def get(self, seq: int):
+        with self._lock:
+            if seq < 0:
+                seq += len(self._locs)
+            if not 0 <= seq < len(self._locs):
+                return None
+            return self._read_raw(seq)
+
+    def get_by_height(self, height: int) -> Optional[dict]:
+        with self._lock:
+            seq = self._by_height.get(int(height))
+            return None if seq is None else self._read_raw(seq)
+
+    def get_by_hash(self, key: str) -> Optional[dict]:
+        with self._lock:
+            seq = self._by_key.get(str(key or ""))
+            return None if seq is None else self._read_raw(seq)
+
+    def has_hash(self, key: str) -> bool:
+        return str(key or "") in self._by_key
+
+    def entry_key(self, seq: int) -> Optional[str]:
+        """block_hash / tx_id of the entry at ``seq`` (None past either end)."""
+        with self._lock:
+            if not 0 <= seq < len(self._locs):
+                return None
+            return _entry_key(self._read_raw(seq))
+
+    def get_block(self, n: int) -> Optional[dict]:
+        """The ``n``-th block (negative counts from the tip), skipping transactions."""
+        with self._lock:
+            try:
+                seq = self._block_seqs[n]
+            except IndexError:
+                return None
+            return self._read_raw(seq)
+
+    def iter_blocks(self, start: int = 0, stop: Optional[int] = None) -> Iterator:
+        """Yield blocks ``start <= n < stop`` (block ordinals, not entry seqs)."""
+        with self._lock:
+            seqs = self._block_seqs[start:stop]
+        if not seqs:
+            return
+        for entry in self.iter_range(seqs[0], seqs[-1] + 1):
+            if _is_block(entry):
+                yield entry
+
+    def iter_heights(self, start: int, stop: int) -> Iterator[Tuple[dict, list]]:
+        """Yield ``(block, txs)`` for block heights ``start..stop`` inclusive.
+
+        ``txs`` are the entries between the block and the next block.  Stops
+        at the first height without a block.
+        """
+        spans = []
+        with self._lock:
+            for height in range(int(start), int(stop) + 1):
+                seq = self._by_height.get(height)
+                if seq is None:
+                    break
+                nxt = bisect.bisect_right(self._block_seqs, seq)
+                end = self._block_seqs[nxt] if nxt < len(self._block_seqs) else len(self._locs)
+                spans.append((seq, end))
+        if not spans:
+            return
+        first = min(seq for seq, _ in spans)
+        wanted = {seq: end for seq, end in spans}
+        groups = {}
+        current, current_end = None, 0
+        for seq, entry in enumerate(self.iter_range(first, max(end for _, end in spans)), first):
+            if seq in wanted:
+                current, current_end = (entry, []), wanted[seq]
+                groups[seq] = current
+            elif current is not None and seq < current_end:
+                current[1].append(entry)
+            else:
+                current = None
+        for seq, _ in spans:
+            yield groups[seq]
+
+    @property
+    def generation(self) -> int:
+        """Bumped by every ``rewrite``; cached derived state keyed on it must be rebuilt."""
+        return int(self._meta.get("generation", 0))
+
+    def last_block(self) -> Optional[dict]:
+        with self._lock:
+            if not self._block_seqs:
+                return None
+            return self._read_raw(self._block_seqs[-1])
+
+    def iter_range(self, start: int = 0, stop: Optional[int] = None) -> Iterator:
+        """Yield entries with ``start <= seq < stop`` in chain order, one segment read at a time."""
+        for raw in self._iter_raw(start, stop):
+            yield json.loads(raw)
+
+    def _iter_raw(self, start: int = 0, stop: Optional[int] = None) -> Iterator[bytes]:
+        with self._lock:
+            total = len(self._locs)
+            stop = total if stop is None else min(int(stop), total)
+            start = max(int(start), 0)
+            locs = self._locs[start:stop]
+        by_seg: dict = {}
+        for seg, off, length in locs:
+            by_seg.setdefault(seg, []).append((off, length))
+        for seg in sorted(by_seg):
+            spans = by_seg[seg]
+            first = spans[0][0]
+            last_off, last_len = spans[-1]
+            with open(self._segment_path(seg), "rb") as f:
+                f.seek(first)
+                buf = f.read(last_off + last_len - first)
+            for off, length in spans:
+                yield buf[off - first:off - first + length]
+
+    def load_all(self) -> list:
+        return list(self.iter_range(0))
+
+    # ─── writes ─────────────────────────────────────────────────────────
+
+    def append_block(self, entry) -> int:
+        """Append one chain entry (block or tx) and return its sequence number."""
+        return self.append_many([entry])[0]
+
+    def append_many(self, entries) -> List[int]:
+        entries = list(entries)
+        if not entries:
+            return []
+        with self._lock:
+            seqs = []
+            rows = []
+            by_seg: dict = {}
+            for entry in entries:
+                seq = len(self._locs) + len(seqs)
+                seg = seq // self.segment_max_entries
+                by_seg.setdefault(seg, []).append((seq, entry, _encode(entry)))
+                seqs.append(seq)
+            for seg, items in by_seg.items():
+                path = self._segment_path(seg)
+                with open(path, "ab") as f:
+                    off = f.tell()
+                    f.write(b"".join(raw for _, _, raw in items))
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                for seq, entry, raw in items:
+                    rows.append((seq, seg, off, len(raw), entry))
+                    off += len(raw)
+                    if self._digest is not None:
+                        self._digest.update(raw)
+            with open(self._index_path(), "a", encoding="utf-8") as idx:
+                for seq, seg, off, length, entry in rows:
+                    idx.write(self._index_row(seq, seg, off, length, entry))
+            for seq, seg, off, length, entry in rows:
+                self._track(seq, seg, off, length,
+                            _entry_height(entry) if _is_block(entry) else None,
+                            _entry_key(entry), _is_block(entry))
+            return seqs
+
+    def rewrite(self, entries) -> None:
+        """Replace the whole store (reorgs, address migrations, external edits)."""
+        with self._lock:
+            staging = self.root + ".rewrite"
+            old_root = self.root + ".old"
+            shutil.rmtree(staging, ignore_errors=True)
+            fresh = ChainStore(staging, self.segment_max_entries, self.fsync)
+            fresh._meta = dict(self._meta, generation=self.generation + 1)
+            fresh._write_meta()
+            fresh.append_many(entries)
+            shutil.rmtree(old_root, ignore_errors=True)
+            os.replace(self.root, old_root)
+            os.replace(staging, self.root)
+            shutil.rmtree(old_root, ignore_errors=True)
+            self._open()
+
+    def sync_list(self, entries: list) -> int:
+        """
+        Persist a full chain list handed to ``save_json(CHAIN_FILE, ...)``.
+
+        When ``entries`` repeats or extends the stored chain (every stored
+        entry unchanged, checked against a running digest of the segment
+        bytes) only the new tail, if any, is appended; any other shape is a
+        rewrite.  Returns the number of entries appended (0 when nothing
+        changed), or -1 for a rewrite.
+        """
+        with self._lock:
+            stored = len(self._locs)
+            if len(entries) >= stored:
+                prefix = hashlib.sha256()
+                for entry in entries[:stored]:
+                    prefix.update(_encode(entry))
+                if prefix.digest() == self._stored_digest().digest():
+                    if len(entries) > stored:
+                        self.append_many(entries[stored:])
+                    return len(entries) - stored
+            self.rewrite(entries)
+            return -1
+
+    def absorb(self, entries: list) -> list:
+        """
+        Append the entries of an externally written chain list that the
+        store does not hold yet, matched on ``block_hash``/``tx_id`` (or the
+        encoded line for keyless entries).
+
+        Unlike ``sync_list`` this never rewrites: a file written from a stale
+        copy of the chain only contributes its new entries.  Returns the
+        entries appended.
+        """
+        with self._lock:
+            seen_keys = set()
+            seen_raw = None
+            fresh = []
+            for entry in entries:
+                key = _entry_key(entry)
+                if key:
+                    if key in self._by_key or key in seen_keys:
+                        continue
+                    seen_keys.add(key)
+                else:
+                    if seen_raw is None:
+                        seen_raw = {raw for raw in self._iter_raw(0) if not _entry_key(json.loads(raw))}
+                    raw = _encode(entry)
+                    if raw in seen_raw:
+                        continue
+                    seen_raw.add(raw)
+                fresh.append(entry)
+            self.append_many(fresh)
+            return fresh
+
+    def _stored_digest(self):
+        """sha256 over every stored line; computed once, then extended by appends."""
+        if self._digest is None:
+            digest = hashlib.sha256()
+            for raw in self._iter_raw(0):
+                digest.update(raw)
+            self._digest = digest
+        return self._digest
+
+    # ─── migration / mirror ─────────────────────────────────────────────
+
+    def get_meta(self, key: str, default=None):
+        return self._meta.get(key, default)
+
+    def set_meta(self, **values) -> None:
+        with self._lock:
+            self._meta.update(values)
+            self._write_meta()
+
+    def mtime_ns(self) -> int:
+        try:
+            return os.stat(self._index_path()).st_mtime_ns
+        except OSError:
+            return 0
+
+    def migrate_from_json(self, path: str) -> int:
+        """One-shot import of a legacy JSON chain file; returns entries imported."""
+        with self._lock:
+            if self._meta.get("migrated_at") or self._locs:
+                return 0
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    chain = json.load(f)
+            except FileNotFoundError:
+                chain = []
+            if not isinstance(chain, list):
+                raise ValueError(f"{path} does not contain a JSON list")
+            self.append_many(chain)
+            self.set_meta(migrated_at=int(time.time()), migrated_from=os.path.basename(path), migrated_entries=len(chain))
+            logger.info("chain_store: migrated %d entries from %s", len(chain), path)
+            return len(chain)
+
+    def write_json_snapshot(self, path: str, publish: Optional[Callable[[str, str], bool]] = None) -> Optional[os.stat_result]:
+        """
+        Write a compact JSON array mirror of the store for legacy file readers.
+
+        ``publish(tmp_path, path)``, when given, moves the finished snapshot
+        into place instead of a plain ``os.replace``; if it returns False the
+        snapshot is discarded and None is returned.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with self._lock:
+            total = len(self._locs)
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(b"[")
+                for seq, entry in enumerate(self.iter_range(0, total)):
+                    if seq:
+                        f.write(b",")
+                    f.write(_encode(entry)[:-1])
+                f.write(b"]")
+                f.flush()
+                os.fsync(f.fileno())
+            if publish is None:
+                os.replace(tmp_path, path)
+            elif not publish(tmp_path, path):
+                return None
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return os.stat(path)
@@ -0,0 +1,337 @@
+"""
+ThronosChain Chain Sync — headers-first ranged catch-up between nodes
+
+Replicas and new peers used to catch up by proxying reads to the leader or
+by receiving pushed blocks one at a time.  This module implements a
+headers-first protocol over two read-only endpoints:
+
+  GET /api/v1/headers?from=H&count=N   {"headers": [...], "tip_height": T}
+  GET /api/v1/blocks?range=A-B         NDJSON, one {"block", "txs"} per line
+
+``ChainSyncClient`` downloads headers from the local tip, validates the
+header chain (consecutive heights, prev_hash linkage, and PoW: the block
+hash recomputed from the header fields, at or below a target that is present
+and no easier than ``max_target``, a fixed cap or a function of the height)
+before any body is requested, then
+fetches bodies in batches with several requests in flight.  Batches are
+applied in height order, each through one ``apply_batch`` call, so the
+caller can validate and commit a whole batch with one ledger transaction and
+one chain append.
+
+Stratum blocks mined before their header fields were recorded (``is_stratum``
+without ``stratum_header``) cannot have their hash recomputed.  Up to a
+trusted ``Checkpoint`` height such history is accepted on linkage and
+``block_hash <= target`` alone (with no target cap, since old targets follow
+an older schedule), and the block at the checkpoint height must carry the
+checkpoint hash when one is given.  Above it every block is fully checked.
+
+A chain is a flat list where a block entry (``reward`` set) is followed by
+the txs included in it; ``group_blocks`` turns such a list into
+``(block, txs)`` pairs.
+"""
+
+import hashlib
+import json
+import logging
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HEADER_FIELDS = (
+    "height", "block_hash", "prev_hash", "target", "timestamp",
+    # inputs of the PoW hash (see ``pow_hash``)
+    "thr_address", "nonce", "is_stratum", "stratum_header",
+)
+MAX_HEADERS = 2000
+MAX_RANGE_BLOCKS = 500
+# a 256-bit hash can never exceed this; used when no tighter cap is given
+POW_LIMIT = (1 << 256) - 1
+
+
+class HeaderValidationError(ValueError):
+    """The peer's header chain does not link up or fails its PoW target."""
+
+
+class Checkpoint(NamedTuple):
+    """Trusted history: blocks at or below ``height`` get the legacy rules."""
+
+    height: int
+    block_hash: Optional[str] = None
+
+
+def is_block(entry) -> bool:
+    return isinstance(entry, dict) and entry.get("reward") is not None
+
+
+def block_header(block: dict) -> dict:
+    return {field: block.get(field) for field in HEADER_FIELDS}
+
+
+def group_blocks(entries: Iterable) -> Iterator[Tuple[dict, list]]:
+    """``(block, txs)`` pairs; entries before the first block are skipped."""
+    current = None
+    for entry in entries:
+        if is_block(entry):
+            if current is not None:
+                yield current
+            current = (entry, [])
+        elif current is not None and isinstance(entry, dict):
+            current[1].append(entry)
+    if current is not None:
+        yield current
+
+
+def parse_range(value: str) -> Optional[Tuple[int, int]]:
+    """``"A-B"`` (inclusive) or ``"A"`` → (A, B); None when malformed."""
+    try:
+        start, _, stop = str(value or "").partition("-")
+        start = int(start)
+        stop = int(stop) if stop else start
+    except ValueError:
+        return None
+    if start < 0 or stop < start:
+        return None
+    return start, stop
+
+
+def _as_int(value) -> Optional[int]:
+    try:
+        if isinstance(value, str) and value.lower().startswith("0x"):
+            return int(value, 16)
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_checkpoint(value: str) -> Optional[Checkpoint]:
+    """``"H"`` or ``"H:block_hash"`` → Checkpoint; None when empty or malformed."""
+    height, _, block_hash = str(value or "").strip().partition(":")
+    height = _as_int(height) if height else None
+    if height is None or height < 0:
+        return None
+    return Checkpoint(height, block_hash.strip().lower() or None)
+
+
+def is_legacy_stratum(header: dict) -> bool:
+    """A stratum block from before its header inputs were stored."""
+    return bool(header.get("is_stratum")) and not isinstance(header.get("stratum_header"), dict)
+
+
+def checkpoint_reason(header: dict, checkpoint: Optional[Checkpoint]) -> Tuple[bool, Optional[str]]:
+    """``(trusted, reason)``: whether ``header`` is at or below ``checkpoint``,
+    and ``"checkpoint_mismatch"`` when it sits at the checkpoint height with
+    another hash."""
+    height = _as_int(header.get("height"))
+    if checkpoint is None or height is None or height > checkpoint.height:
+        return False, None
+    block_hash = str(header.get("block_hash") or "").lower()
+    if height == checkpoint.height and checkpoint.block_hash and block_hash != checkpoint.block_hash:
+        return True, "checkpoint_mismatch"
+    return True, None
+
+
+def pow_hash(header: dict) -> Optional[str]:
+    """Recompute a block's PoW hash from its fields; None when it cannot be.
+
+    Stratum blocks hash the 80-byte header rebuilt from ``stratum_header``
+    (sha256d, byte-reversed, as ``_process_mining_submission`` does); legacy
+    blocks hash ``prev_hash + thr_address + str(nonce)``.
+    """
+    prev_hash = header.get("prev_hash")
+    nonce = header.get("nonce")
+    if not isinstance(prev_hash, str) or nonce is None:
+        return None
+    stratum = header.get("stratum_header")
+    try:
+        if isinstance(stratum, dict):
+            raw = struct.pack("<I", int(stratum.get("version", 1)))
+            raw += bytes.fromhex(prev_hash)[::-1]
+            raw += bytes.fromhex(stratum["merkle_root"])[::-1]
+            raw += struct.pack("<I", int(stratum["time"]))
+            raw += struct.pack("<I", int(stratum["nbits"]))
+            raw += struct.pack("<I", int(nonce))
+            return hashlib.sha256(hashlib.sha256(raw).digest()).digest()[::-1].hex()
+        if header.get("is_stratum"):
+            return None
+        thr_address = header.get("thr_address")
+        if not isinstance(thr_address, str):
+            return None
+        return hashlib.sha256((prev_hash + thr_address).encode() + str(nonce).encode()).hexdigest()
+    except (KeyError, TypeError, ValueError, struct.error):
+        return None
+
+
+def target_limit(max_target, height: Optional[int]) -> Optional[int]:
+    """Resolve ``max_target`` (None, an int, or ``height -> int``) for ``height``."""
+    if callable(max_target):
+        return max_target(height) if height is not None else None
+    return max_target
+
+
+def check_pow(header: dict, max_target=None, checkpoint: Optional[Checkpoint] = None) -> Optional[str]:
+    """None when the header's PoW holds, else the reason.
+
+    The header must carry a target no easier than ``max_target`` (see
+    ``target_limit``), its ``block_hash`` must be what ``pow_hash``
+    recomputes, and that hash must be at or below the target.  At or below
+    ``checkpoint`` the target is not capped and a legacy stratum block's
+    hash is taken as stored.
+    """
+    target = _as_int(header.get("target"))
+    if target is None:
+        return "missing_target"
+    trusted, reason = checkpoint_reason(header, checkpoint)
+    if reason:
+        return reason
+    if not trusted:
+        if callable(max_target) and _as_int(header.get("height")) is None:
+            return "missing_height"
+        limit = target_limit(max_target, _as_int(header.get("height")))
+        if target > (POW_LIMIT if limit is None else limit):
+            return "target_too_easy"
+    block_hash = str(header.get("block_hash") or "").lower()
+    try:
+        value = int(block_hash, 16)
+    except ValueError:
+        return "bad_hash"
+    computed = pow_hash(header)
+    if computed is None:
+        if not (trusted and is_legacy_stratum(header)):
+            return "unverifiable_hash"
+    elif computed != block_hash:
+        return "hash_mismatch"
+    if value > target:
+        return "insufficient_work"
+    return None
+
+
+def validate_headers(
+    headers: List[dict], anchor: Optional[dict] = None, max_target=None, checkpoint: Optional[Checkpoint] = None
+) -> None:
+    """Raise ``HeaderValidationError`` unless ``headers`` extend ``anchor``.
+
+    ``anchor`` is the local tip header (None when the local chain is empty);
+    ``max_target`` is the easiest target the local node accepts, or a
+    function giving it for a height; ``checkpoint`` is the trusted history
+    (see ``check_pow``).
+    """
+    prev = anchor
+    for header in headers:
+        height = _as_int(header.get("height"))
+        if height is None or not header.get("block_hash"):
+            raise HeaderValidationError(f"malformed header {header!r}")
+        if prev is not None:
+            if height != _as_int(prev.get("height")) + 1:
+                raise HeaderValidationError(f"height {height} does not follow {prev.get('height')}")
+            if header.get("prev_hash") != prev.get("block_hash"):
+                raise HeaderValidationError(f"block {height} does not link to {prev.get('block_hash')}")
+        reason = check_pow(header, max_target, checkpoint)
+        if reason == "insufficient_work":
+            raise HeaderValidationError(f"block {height} is above its target")
+        if reason:
+            raise HeaderValidationError(f"block {height} fails PoW: {reason}")
+        prev = header
+
+
+class HttpSyncTransport:
+    """``/api/v1/headers`` and ``/api/v1/blocks`` of one peer over a keep-alive session."""
+
+    def __init__(self, base_url: str, timeout: float = 30.0, session=None):
+        if session is None:
+            import requests
+
+            session = requests.Session()
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = session
+
+    def headers(self, start: int, count: int) -> List[dict]:
+        resp = self.session.get(
+            f"{self.base_url}/api/v1/headers", params={"from": start, "count": count}, timeout=self.timeout
+        )
+        resp.raise_for_status()
+        return list((resp.json() or {}).get("headers") or [])
+
+    def blocks(self, start: int, stop: int) -> List[Tuple[dict, list]]:
+        resp = self.session.get(
+            f"{self.base_url}/api/v1/blocks", params={"range": f"{start}-{stop}"}, timeout=self.timeout, stream=True
+        )
+        resp.raise_for_status()
+        groups = []
+        with resp:
+            for line in resp.iter_lines():
+                if line:
+                    item = json.loads(line)
+                    groups.append((item.get("block") or {}, list(item.get("txs") or [])))
+        return groups
+
+
+class ChainSyncClient:
+    """Headers-first, pipelined catch-up from one peer."""
+
+    def __init__(
+        self,
+        transport,
+        apply_batch: Callable[[List[Tuple[dict, list]]], None],
+        header_count: int = MAX_HEADERS,
+        batch_blocks: int = 100,
+        pipeline_depth: int = 4,
+        max_target=None,
+        checkpoint: Optional[Checkpoint] = None,
+    ):
+        self.transport = transport
+        self.apply_batch = apply_batch
+        self.max_target = max_target
+        self.checkpoint = checkpoint
+        self.header_count = max(1, min(int(header_count), MAX_HEADERS))
+        self.batch_blocks = max(1, min(int(batch_blocks), MAX_RANGE_BLOCKS))
+        self.pipeline_depth = max(1, int(pipeline_depth))
+
+    def sync(self, local_tip: Optional[dict], start_height: int = 0, max_blocks: Optional[int] = None) -> dict:
+        """Catch up from ``local_tip`` (or ``start_height`` on an empty chain).
+
+        Returns stats: blocks and txs applied, elapsed seconds and blocks/s.
+        """
+        started = time.time()
+        anchor = block_header(local_tip) if local_tip else None
+        next_height = _as_int(anchor["height"]) + 1 if anchor else int(start_height)
+        stats = {"from_height": next_height, "blocks": 0, "txs": 0, "batches": 0}
+        with ThreadPoolExecutor(max_workers=self.pipeline_depth, thread_name_prefix="chain-sync") as pool:
+            while max_blocks is None or stats["blocks"] < max_blocks:
+                count = self.header_count
+                if max_blocks is not None:
+                    count = min(count, max_blocks - stats["blocks"])
+                headers = self.transport.headers(next_height, count)
+                if not headers:
+                    break
+                validate_headers(headers, anchor, self.max_target, self.checkpoint)
+                self._download(pool, headers, stats)
+                anchor = headers[-1]
+                next_height = _as_int(anchor["height"]) + 1
+                if len(headers) < count:
+                    break
+        elapsed = time.time() - started
+        stats["to_height"] = next_height - 1
+        stats["seconds"] = round(elapsed, 3)
+        stats["blocks_per_second"] = round(stats["blocks"] / elapsed, 1) if elapsed > 0 else 0.0
+        logger.info("chain_sync: %s", stats)
+        return stats
+
+    def _download(self, pool: ThreadPoolExecutor, headers: List[dict], stats: dict) -> None:
+        batches = [headers[i:i + self.batch_blocks] for i in range(0, len(headers), self.batch_blocks)]
+        futures = []
+        for batch in batches:
+            futures.append(pool.submit(self.transport.blocks, batch[0]["height"], batch[-1]["height"]))
+        for batch, future in zip(batches, futures):
+            groups = future.result()
+            if [block_header(g[0]) for g in groups] != [block_header(h) for h in batch]:
+                raise HeaderValidationError(
+                    f"bodies for {batch[0]['height']}-{batch[-1]['height']} do not match their headers"
+                )
+            self.apply_batch(groups)
+            stats["blocks"] += len(groups)
+            stats["txs"] += sum(len(txs) for _, txs in groups)
+            stats["batches"] += 1
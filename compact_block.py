@@ -0,0 +1,123 @@
+"""
+ThronosChain Compact Blocks — header + short tx ids for block relay
+
+A block's txs were almost all relayed to peers earlier through
+``/api/v1/receive_tx`` and sit in their mempools, so sending the full txs
+again with the block is mostly wasted.  A compact block carries:
+
+  header     the block entry itself
+  confirm    the fields the miner stamps on every included tx at block time
+             (height, status, timestamp); applied again on reconstruction
+  short_ids  one id per included tx, in block order: the first
+             ``SHORT_ID_HEX`` hex digits of sha256(block_hash ":" tx_id)
+  prefilled  {index: tx} for txs sent in full — txs whose stamped fields
+             differ from ``confirm`` or that have no tx_id, plus whatever the
+             receiver reported missing
+
+The receiver rebuilds the tx list from its mempool (``reconstruct``).  Short
+ids are salted with the block hash, so a collision in one block does not
+repeat in the next; an ambiguous short id is treated as missing.  If any
+index is missing the receiver answers with the list and the sender resends
+the compact block with those txs prefilled, so neither side keeps state
+between the two round trips.
+"""
+
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPACT_VERSION = 1
+SHORT_ID_HEX = 12
+CONFIRM_FIELDS = ("height", "status", "timestamp")
+
+_AMBIGUOUS = object()
+
+
+def short_id(block_hash: str, tx_id: str) -> str:
+    return hashlib.sha256(f"{block_hash}:{tx_id}".encode("utf-8")).hexdigest()[:SHORT_ID_HEX]
+
+
+class CompactBlock:
+    """Sender side: a block plus its included txs, encodable as a compact message."""
+
+    def __init__(self, block: dict, txs: Iterable[dict]):
+        self.block = block
+        self.txs = [tx for tx in txs if isinstance(tx, dict)]
+        self.block_hash = str(block.get("block_hash") or "")
+        first = self.txs[0] if self.txs else {}
+        self.confirm = {field: first.get(field) for field in CONFIRM_FIELDS if field in first}
+        self.short_ids: List[Optional[str]] = []
+        self._always_prefill = set()
+        for index, tx in enumerate(self.txs):
+            tx_id = tx.get("tx_id")
+            stamped = {field: tx.get(field) for field in CONFIRM_FIELDS if field in tx}
+            if not tx_id or stamped != self.confirm:
+                self._always_prefill.add(index)
+            self.short_ids.append(short_id(self.block_hash, str(tx_id)) if tx_id else None)
+
+    def message(self, prefill: Iterable[int] = ()) -> dict:
+        indexes = set(self._always_prefill)
+        for index in prefill:
+            try:
+                index = int(index)
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < len(self.txs):
+                indexes.add(index)
+        return {
+            "version": COMPACT_VERSION,
+            "header": self.block,
+            "confirm": self.confirm,
+            "short_ids": self.short_ids,
+            "prefilled": {str(i): self.txs[i] for i in sorted(indexes)},
+        }
+
+
+def _mempool_index(block_hash: str, mempool: Iterable[dict]) -> Dict[str, object]:
+    index: Dict[str, object] = {}
+    for tx in mempool:
+        if not isinstance(tx, dict) or not tx.get("tx_id"):
+            continue
+        sid = short_id(block_hash, str(tx["tx_id"]))
+        prev = index.get(sid)
+        if prev is None:
+            index[sid] = tx
+        elif prev is not _AMBIGUOUS and prev.get("tx_id") != tx.get("tx_id"):
+            index[sid] = _AMBIGUOUS
+    return index
+
+
+def reconstruct(message: dict, mempool: Iterable[dict]) -> Tuple[List[Optional[dict]], List[int]]:
+    """Rebuild the block's txs from ``mempool``; returns (txs, missing indexes).
+
+    ``txs`` holds None at every missing index.  Raises ValueError on a
+    malformed message.
+    """
+    if not isinstance(message, dict) or message.get("version") != COMPACT_VERSION:
+        raise ValueError("unsupported compact block")
+    header = message.get("header")
+    short_ids = message.get("short_ids")
+    prefilled = message.get("prefilled") or {}
+    confirm = message.get("confirm") or {}
+    if not isinstance(header, dict) or not isinstance(short_ids, list) or not isinstance(prefilled, dict):
+        raise ValueError("malformed compact block")
+    if not isinstance(confirm, dict):
+        raise ValueError("malformed compact block")
+    block_hash = str(header.get("block_hash") or "")
+    index = _mempool_index(block_hash, mempool) if short_ids else {}
+    txs: List[Optional[dict]] = []
+    missing: List[int] = []
+    for i, sid in enumerate(short_ids):
+        tx = prefilled.get(str(i))
+        if isinstance(tx, dict):
+            txs.append(tx)
+            continue
+        found = index.get(sid) if isinstance(sid, str) else None
+        if found is None or found is _AMBIGUOUS:
+            txs.append(None)
+            missing.append(i)
+            continue
+        txs.append({**found, **confirm})
+    return txs, missing
@@ -197,6 +197,8 @@ def anchor_contract_proof(
     persist_normalized_tx_fn,
     update_last_block_fn,
     is_master_node: bool,
+    chain_length_fn=None,
+    append_chain_fn=None,
 ) -> Tuple[dict, bool]:
     """
     Anchor a contract proof to the canonical ThronosChain ledger.
@@ -205,6 +207,9 @@ def anchor_contract_proof(
       - created=True: new chain tx written
       - created=False: idempotent hit, existing record returned
 
+    When chain_length_fn/append_chain_fn are given (segmented chain store)
+    the tx is appended without loading and rewriting the whole chain.
+
     Raises:
       PermissionError — replica node
       ValueError — validation failure or idempotency conflict (409)
@@ -231,8 +236,12 @@ def anchor_contract_proof(
                 )
             return (existing, False)
 
-        chain = load_json_fn(chain_file, [])
-        chain_height = len(chain)
+        if chain_length_fn and append_chain_fn:
+            chain = None
+            chain_height = chain_length_fn()
+        else:
+            chain = load_json_fn(chain_file, [])
+            chain_height = len(chain)
         ts = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
 
         tx_id = f"CONTRACT-ANCHOR-{int(time.time())}-{os.urandom(4).hex()}"
@@ -254,8 +263,11 @@ def anchor_contract_proof(
             "signing_method_class": validated["signing_method_class"],
         }
 
-        chain.append(chain_tx)
-        save_json_fn(chain_file, chain)
+        if chain is None:
+            append_chain_fn([chain_tx])
+        else:
+            chain.append(chain_tx)
+            save_json_fn(chain_file, chain)
 
         if persist_normalized_tx_fn:
             persist_normalized_tx_fn(chain_tx)
@@ -293,6 +305,8 @@ def register_contract_proof_routes(
     persist_normalized_tx_fn,
     update_last_block_fn,
     contract_proof_api_key: str,
+    chain_length_fn=None,
+    append_chain_fn=None,
 ):
     from flask import request, jsonify
 
@@ -335,6 +349,8 @@ def register_contract_proof_routes(
                 persist_normalized_tx_fn=persist_normalized_tx_fn,
                 update_last_block_fn=update_last_block_fn,
                 is_master_node=True,
+                chain_length_fn=chain_length_fn,
+                append_chain_fn=append_chain_fn,
             )
             projection = _safe_public_projection(record)
             projection["created"] = created
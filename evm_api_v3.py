@@ -8,10 +8,22 @@ import hashlib
 from flask import request, jsonify
 from typing import Dict, Any
 
-from evm_core_v3 import ThronosEVM, estimate_gas, compile_solidity_stub
+from evm_core_v3 import (
+    ThronosEVM,
+    estimate_gas,
+    EVM_CALL_GAS_CAP,
+    EVM_MULTICALL_MAX_CALLS,
+    EVM_STATIC_CALL_DEFAULT_GAS,
+    EVM_STATIC_CALL_GAS_CAP,
+    EVM_STATIC_CALL_RATE_PER_MIN,
+)
+from rate_limit import RateLimiter
+from evm_solidity_compiler import SolidityCompiler, CompileService, CompileQueueFull, BUILTIN_COMPILER_VERSION
 
 
-def register_evm_routes(app, data_dir: str, ledger_file: str, chain_file: str, pledge_chain: str):
+def register_evm_routes(app, data_dir: str, ledger_file: str, chain_file: str, pledge_chain: str,
+                        static_call_limiter: RateLimiter = None, load_json=None, save_json=None,
+                        append_chain=None):
     """
     Register EVM-related routes to the Flask app.
     
@@ -21,21 +33,44 @@ def register_evm_routes(app, data_dir: str, ledger_file: str, chain_file: str, p
         ledger_file: Path to ledger.json
         chain_file: Path to chain.json
         pledge_chain: Path to pledge_chain.json
+        static_call_limiter: RateLimiter for the unauthenticated dry-run
+            routes (/api/evm/static_call and /api/evm/estimate_gas), keyed
+            by client IP (default: EVM_STATIC_CALL_RATE_PER_MIN per minute)
+        load_json / save_json: the host's ``(path, default)`` / ``(path, data)``
+            file accessors, so ledger writes reach its authoritative store
+            (default: plain JSON files)
+        append_chain: callable taking a list of chain entries; deploy/call
+            txs go through it instead of rewriting ``chain_file`` (default:
+            load, extend and save ``chain_file``)
+    
+    Returns:
+        The ThronosEVM instance backing the routes
     """
     
     # Initialize EVM
     evm = ThronosEVM(data_dir)
+    compile_service = CompileService(SolidityCompiler(data_dir))
+    if static_call_limiter is None:
+        static_call_limiter = RateLimiter.per_window("evm_static_call", EVM_STATIC_CALL_RATE_PER_MIN, 60)
     
-    def load_json(path, default):
-        try:
-            with open(path, 'r') as f:
-                return json.load(f)
-        except:
-            return default
+    if load_json is None:
+        def load_json(path, default):
+            try:
+                with open(path, 'r') as f:
+                    return json.load(f)
+            except:
+                return default
+    
+    if save_json is None:
+        def save_json(path, data):
+            with open(path, 'w') as f:
+                json.dump(data, f, indent=2)
     
-    def save_json(path, data):
-        with open(path, 'w') as f:
-            json.dump(data, f, indent=2)
+    if append_chain is None:
+        def append_chain(entries):
+            chain = load_json(chain_file, [])
+            chain.extend(entries)
+            save_json(chain_file, chain)
     
     def verify_auth(thr_address: str, auth_secret: str, passphrase: str = "") -> bool:
         """Verify authentication for a THR address."""
@@ -56,6 +91,20 @@ def register_evm_routes(app, data_dir: str, ledger_file: str, chain_file: str, p
         computed_hash = hashlib.sha256(auth_string.encode()).hexdigest()
         return computed_hash == stored_hash
     
+    def parse_hex(value: str) -> bytes:
+        """Decode a 0x-prefixed (or bare) hex string; raises ValueError."""
+        value = (value or "").strip()
+        if value.startswith("0x"):
+            value = value[2:]
+        return bytes.fromhex(value) if value else b""
+    
+    def gas_cap_from(data: Dict[str, Any], default: int = EVM_CALL_GAS_CAP, cap: int = EVM_CALL_GAS_CAP) -> int:
+        try:
+            requested = int(data.get("gas_limit") or default)
+        except (TypeError, ValueError):
+            requested = default
+        return max(1, min(requested, cap))
+    
     # ─── EVM CONTRACT DEPLOYMENT ────────────────────────────────────────
     
     @app.route("/api/evm/deploy", methods=["POST"])
@@ -131,7 +180,6 @@ def register_evm_routes(app, data_dir: str, ledger_file: str, chain_file: str, p
         save_json(ledger_file, ledger)
         
         # Record transaction
-        chain = load_json(chain_file, [])
         tx_id = f"DEPLOY-{int(time.time())}-{contract_addr[:8]}"
         tx = {
             "type": "contract_deploy",
@@ -145,8 +193,7 @@ def register_evm_routes(app, data_dir: str, ledger_file: str, chain_file: str, p
             "tx_id": tx_id,
             "status": "confirmed"
         }
-        chain.append(tx)
-        save_json(chain_file, chain)
+        append_chain([tx])
         
         return jsonify(
             status="success",
@@ -234,7 +281,6 @@ def register_evm_routes(app, data_dir: str, ledger_file: str, chain_file: str, p
         save_json(ledger_file, ledger)
         
         # Record transaction
-        chain = load_json(chain_file, [])
         tx_id = f"CALL-{int(time.time())}-{contract_address[:8]}"
         tx = {
             "type": "contract_call",
@@ -249,8 +295,7 @@ def register_evm_routes(app, data_dir: str, ledger_file: str, chain_file: str, p
             "tx_id": tx_id,
             "status": "confirmed"
         }
-        chain.append(tx)
-        save_json(chain_file, chain)
+        append_chain([tx])
         
         # Format response
         if success:
@@ -334,44 +379,242 @@ def register_evm_routes(app, data_dir: str, ledger_file: str, chain_file: str, p
     @app.route("/api/evm/estimate_gas", methods=["POST"])
     def api_evm_estimate_gas():
         """
-        Estimate gas cost for a transaction.
+        Estimate gas by executing against current state (nothing is written).
         
         Request body:
         {
-            "bytecode": "0x...",  // For deployment
-            "data": "0x..."       // For call
+            "bytecode": "0x...",          // For deployment
+            "contract_address": "...",    // For a call, with "data"
+            "data": "0x...",
+            "caller": "THR address",      // optional
+            "gas_limit": 1000000          // optional search cap, at most EVM_STATIC_CALL_GAS_CAP
+        }
+        
+        Response:
+        {
+            "estimated_gas": 12345,       // smallest gas_limit that succeeds
+            "gas_used": 12345,
+            "success": true,
+            "revert_reason": null,
+            "method": "execution"
         }
+        
+        With only "data" and no contract there is nothing to execute, and the
+        static size-based estimate is returned ("method": "static").
+        
+        Needs no auth, so it shares the static_call limiter (one token per
+        request plus one per extra run of the search) and searches at most
+        EVM_STATIC_CALL_GAS_CAP gas.
         """
+        client = request.remote_addr or "unknown"
+        if not static_call_limiter.hit(client):
+            return jsonify(error="rate_limited", limiter=static_call_limiter.name), 429
         data = request.get_json() or {}
         bytecode = (data.get("bytecode") or "").strip()
-        call_data = (data.get("data") or "").strip()
-        
-        if bytecode:
-            if bytecode.startswith("0x"):
-                bytecode = bytecode[2:]
-            estimated = estimate_gas(bytecode)
-        elif call_data:
-            if call_data.startswith("0x"):
-                call_data = call_data[2:]
-            estimated = estimate_gas("", bytes.fromhex(call_data))
-        else:
-            estimated = 21000  # Base transaction cost
+        contract_address = (data.get("contract_address") or "").strip()
+        caller = (data.get("caller") or "").strip()
+        
+        try:
+            call_data = parse_hex(data.get("data") or "")
+            if bytecode:
+                parse_hex(bytecode)
+        except ValueError:
+            return jsonify(error="Invalid hex in bytecode or data"), 400
+        
+        if not bytecode and not contract_address:
+            estimated = estimate_gas("", call_data) if call_data else 21000  # Base transaction cost
+            return jsonify(estimated_gas=estimated, method="static"), 200
+        
+        if contract_address and not bytecode and not evm.get_contract_meta(contract_address):
+            return jsonify(error="Contract not found"), 404
         
-        return jsonify(estimated_gas=estimated), 200
+        result = evm.estimate_call_gas(
+            contract_address=contract_address or None,
+            caller=caller,
+            data=call_data,
+            bytecode=bytecode or None,
+            gas_cap=gas_cap_from(data, EVM_STATIC_CALL_GAS_CAP, EVM_STATIC_CALL_GAS_CAP),
+        )
+        # the extra runs drain whatever the client has left
+        for _ in range(result["runs"] - 1):
+            if not static_call_limiter.hit(client):
+                break
+        status = 200 if result["success"] else 400
+        return jsonify(
+            estimated_gas=result["estimated_gas"],
+            gas_used=result["gas_used"],
+            success=result["success"],
+            return_data=result["return_data"],
+            revert_reason=result["revert_reason"],
+            error=result["error"],
+            out_of_gas=result["out_of_gas"],
+            runs=result["runs"],
+            method="execution"
+        ), status
+    
+    @app.route("/api/evm/static_call", methods=["POST"])
+    def api_evm_static_call():
+        """
+        Read-only contract call (eth_call): executes against a snapshot of
+        committed state, writes nothing and charges nothing.
+        
+        Needs no auth, so each client IP gets EVM_STATIC_CALL_RATE_PER_MIN
+        calls per minute (429 beyond that) and at most
+        EVM_STATIC_CALL_GAS_CAP gas per call.
+        
+        Request body:
+        {
+            "contract_address": "CONTRACT_...",
+            "data": "0x...",
+            "caller": "THR address",      // optional
+            "gas_limit": 100000           // optional, capped at EVM_STATIC_CALL_GAS_CAP
+        }
+        """
+        client = request.remote_addr or "unknown"
+        if not static_call_limiter.hit(client):
+            return jsonify(error="rate_limited", limiter=static_call_limiter.name), 429
+        data = request.get_json() or {}
+        contract_address = (data.get("contract_address") or "").strip()
+        caller = (data.get("caller") or "").strip()
+        if not contract_address:
+            return jsonify(error="Missing contract_address"), 400
+        try:
+            call_data = parse_hex(data.get("data") or "")
+        except ValueError:
+            return jsonify(error="Invalid hex in data"), 400
+        if not evm.get_contract_meta(contract_address):
+            return jsonify(error="Contract not found"), 404
+        
+        result = evm.dry_run(
+            contract_address=contract_address,
+            caller=caller,
+            data=call_data,
+            gas_limit=gas_cap_from(data, EVM_STATIC_CALL_DEFAULT_GAS, EVM_STATIC_CALL_GAS_CAP),
+        )
+        return jsonify(
+            status="success" if result["success"] else "error",
+            return_data=result["return_data"],
+            gas_used=result["gas_used"],
+            revert_reason=result["revert_reason"],
+            error=result["error"],
+            out_of_gas=result["out_of_gas"]
+        ), 200 if result["success"] else 400
+    
+    @app.route("/api/evm/multicall", methods=["POST"])
+    def api_evm_multicall():
+        """
+        Batch of read-only contract calls in one request.
+        
+        Authenticates once, pins one snapshot of committed state for the
+        whole batch, and runs the calls concurrently. Nothing is written or
+        charged; results come back in request order.
+        
+        Request body:
+        {
+            "caller": "THR address",
+            "auth_secret": "authentication secret",
+            "passphrase": "optional passphrase",
+            "calls": [
+                {"contract_address": "CONTRACT_...", "data": "0x...", "gas_limit": 100000},
+                ...
+            ]
+        }
+        
+        Response:
+        {
+            "status": "success",
+            "results": [
+                {"success": true, "return_data": "0x...", "gas_used": 123,
+                 "revert_reason": null, "error": null},
+                ...
+            ],
+            "gas_used": 1234
+        }
+        """
+        data = request.get_json() or {}
+        
+        caller = (data.get("caller") or "").strip()
+        auth_secret = (data.get("auth_secret") or "").strip()
+        passphrase = (data.get("passphrase") or "").strip()
+        calls = data.get("calls")
+        
+        if not caller or not auth_secret or not isinstance(calls, list) or not calls:
+            return jsonify(error="Missing required fields"), 400
+        if len(calls) > EVM_MULTICALL_MAX_CALLS:
+            return jsonify(error=f"Too many calls (max {EVM_MULTICALL_MAX_CALLS})"), 400
+        
+        if not verify_auth(caller, auth_secret, passphrase):
+            return jsonify(error="Invalid authentication"), 403
+        
+        batch = []
+        for index, call in enumerate(calls):
+            if not isinstance(call, dict):
+                return jsonify(error=f"calls[{index}] must be an object"), 400
+            contract_address = (call.get("contract_address") or "").strip()
+            if not evm.get_contract_meta(contract_address):
+                return jsonify(error=f"calls[{index}]: contract not found"), 404
+            try:
+                call_data = parse_hex(call.get("data") or "")
+            except ValueError:
+                return jsonify(error=f"calls[{index}]: invalid hex in data"), 400
+            batch.append((contract_address, call_data, gas_cap_from(call, 100000)))
+        
+        results = evm.multicall(batch, caller=caller)
+        return jsonify(
+            status="success",
+            results=[
+                {
+                    "success": r["success"],
+                    "return_data": r["return_data"],
+                    "gas_used": r["gas_used"],
+                    "revert_reason": r["revert_reason"],
+                    "error": r["error"],
+                }
+                for r in results
+            ],
+            gas_used=sum(r["gas_used"] for r in results)
+        ), 200
+    
+    def compile_response(job):
+        body = job.to_dict()
+        body["status_url"] = f"/api/evm/compile/{job.key}"
+        if not job.finished:
+            return jsonify(body), 202
+        result = body.pop("result") or {}
+        bytecode = result.get("bytecode") or ""
+        if bytecode and not bytecode.startswith("0x"):
+            bytecode = "0x" + bytecode
+        body.update(
+            status="success" if result.get("success") else "error",
+            job_status=job.status,
+            bytecode=bytecode,
+            abi=result.get("abi") or [],
+            compiler_version=result.get("compiler_version"),
+            warnings=result.get("warnings") or [],
+            errors=result.get("errors") or [],
+        )
+        if result.get("compiler_version") == BUILTIN_COMPILER_VERSION:
+            body["note"] = "Compiled with the built-in fallback compiler; install solc for real bytecode."
+        return jsonify(body), 200 if result.get("success") else 400
     
     @app.route("/api/evm/compile", methods=["POST"])
     def api_evm_compile():
         """
         Compile Solidity source code to bytecode.
         
-        This is a stub endpoint. In production, this would:
-        - Use py-solc-x to compile Solidity
-        - Or integrate with Remix API
-        - Or use a separate compiler service
+        Results are cached by sha256(source, contract name, compiler version,
+        settings); identical concurrent requests share one compile. The
+        request waits up to EVM_COMPILE_SYNC_WAIT seconds (0 with
+        "async": true) and otherwise answers 202 with a job to poll at
+        GET /api/evm/compile/<job_id>. A new compile is refused with 429
+        while EVM_COMPILE_MAX_PENDING compiles are queued or running.
         
         Request body:
         {
-            "source": "contract MyContract { ... }"
+            "source": "contract MyContract { ... }",
+            "contract_name": "MyContract",          // optional
+            "settings": {"optimize": true, "runs": 200},  // optional
+            "async": false                          // optional
         }
         """
         data = request.get_json() or {}
@@ -380,13 +623,29 @@ def register_evm_routes(app, data_dir: str, ledger_file: str, chain_file: str, p
         if not source:
             return jsonify(error="No source code provided"), 400
         
-        # Stub compilation
-        bytecode = compile_solidity_stub(source)
-        
-        return jsonify(
-            status="success",
-            bytecode=bytecode,
-            note="This is a stub compiler. Integrate real Solidity compiler for production."
-        ), 200
+        settings = data.get("settings") or {}
+        if not isinstance(settings, dict):
+            return jsonify(error="settings must be an object"), 400
+        try:
+            job = compile_service.compile(
+                source,
+                contract_name=(data.get("contract_name") or "Contract").strip() or "Contract",
+                settings=settings,
+                wait=0 if data.get("async") else None,
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify(error=f"Invalid settings: {e}"), 400
+        except CompileQueueFull:
+            return jsonify(error="Compile queue is full, retry later"), 429
+        return compile_response(job)
+    
+    @app.route("/api/evm/compile/<job_id>", methods=["GET"])
+    def api_evm_compile_status(job_id: str):
+        """Status (and, once finished, the artifact) of a compile job."""
+        job = compile_service.get_job(job_id)
+        if job is None:
+            return jsonify(error="Unknown compile job"), 404
+        return compile_response(job)
     
-    print("[EVM] Routes registered successfully")
\ No newline at end of file
+    print("[EVM] Routes registered successfully")
+    return evm
@@ -3,12 +3,16 @@
 # Based on the design document: "Σχεδιασμός Αυτόνομης EVM για το Δίκτυο Thronos"
 
 import os
-import json
 import time
 import hashlib
 import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional, Tuple
 
+from evm_storage import EVMStorage, StorageJournal
+
 # ─── EVM CONFIGURATION ──────────────────────────────────────────────────
 
 # Gas costs for opcodes (simplified, based on Ethereum)
@@ -28,6 +32,9 @@ GAS_COSTS = {
     # Memory operations
     "MLOAD": 3, "MSTORE": 3, "MSTORE8": 3,
     
+    # Hashing (plus SHA3_WORD per 32-byte word hashed)
+    "SHA3": 30,
+    
     # Storage operations (expensive)
     "SLOAD": 200, "SSTORE": 5000,
     
@@ -63,6 +70,89 @@ MAX_STACK_DEPTH = 1024
 # Maximum memory size (in bytes)
 MAX_MEMORY_SIZE = 2 ** 20  # 1 MB
 
+SHA3_WORD_GAS = 6
+UINT256_MASK = (1 << 256) - 1
+
+# Decoded code objects kept in memory (see CodeCache)
+CODE_CACHE_SIZE = int(os.getenv("EVM_CODE_CACHE_SIZE", "512") or 512)
+
+# Upper bound for dry runs (static calls, gas estimation)
+EVM_CALL_GAS_CAP = int(os.getenv("EVM_CALL_GAS_CAP", "10000000") or 10000000)
+
+# Unauthenticated /api/evm/static_call: default and maximum gas per call, and
+# requests per minute per client
+EVM_STATIC_CALL_DEFAULT_GAS = int(os.getenv("EVM_STATIC_CALL_DEFAULT_GAS", "100000") or 100000)
+EVM_STATIC_CALL_GAS_CAP = int(os.getenv("EVM_STATIC_CALL_GAS_CAP", "1000000") or 1000000)
+EVM_STATIC_CALL_RATE_PER_MIN = int(os.getenv("EVM_STATIC_CALL_RATE_PER_MIN", "60") or 0)
+
+# Worker threads for read-only batches (multicall) and the batch size cap
+EVM_READ_WORKERS = int(os.getenv("EVM_READ_WORKERS", "8") or 8)
+EVM_MULTICALL_MAX_CALLS = int(os.getenv("EVM_MULTICALL_MAX_CALLS", "100") or 100)
+
+# Solidity's Error(string) selector, used to decode revert reasons
+ERROR_SELECTOR = bytes.fromhex("08c379a0")
+
+
+# ─── KECCAK-256 ─────────────────────────────────────────────────────────
+
+_KECCAK_RC = (
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+)
+_KECCAK_ROT = ((0, 36, 3, 41, 18), (1, 44, 10, 45, 2), (62, 6, 43, 15, 61), (28, 55, 25, 21, 56), (27, 20, 39, 8, 14))
+_LANE = (1 << 64) - 1
+
+
+def _keccak_f(a: List[int]) -> List[int]:
+    for rc in _KECCAK_RC:
+        c = [a[x] ^ a[x + 5] ^ a[x + 10] ^ a[x + 15] ^ a[x + 20] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ (((c[(x + 1) % 5] << 1) | (c[(x + 1) % 5] >> 63)) & _LANE) for x in range(5)]
+        b = [0] * 25
+        for x in range(5):
+            for y in range(5):
+                lane, rot = a[x + 5 * y] ^ d[x], _KECCAK_ROT[x][y]
+                b[y + 5 * ((2 * x + 3 * y) % 5)] = ((lane << rot) | (lane >> (64 - rot))) & _LANE if rot else lane
+        a = [b[i] ^ (~b[(i + 1) % 5 + i - i % 5] & b[(i + 2) % 5 + i - i % 5]) for i in range(25)]
+        a[0] ^= rc
+    return a
+
+
+def _keccak256_py(data: bytes) -> bytes:
+    """Pure-Python Keccak-256 (Ethereum's pre-NIST padding)."""
+    rate = 136
+    padded = bytearray(data) + b"\x01" + b"\x00" * ((-len(data) - 1) % rate)
+    padded[-1] |= 0x80
+    state = [0] * 25
+    for start in range(0, len(padded), rate):
+        for i in range(rate // 8):
+            state[i] ^= int.from_bytes(padded[start + 8 * i:start + 8 * i + 8], "little")
+        state = _keccak_f(state)
+    return b"".join(lane.to_bytes(8, "little") for lane in state[:4])
+
+
+def _keccak_provider():
+    try:
+        from Cryptodome.Hash import keccak as _k  # pycryptodomex
+    except ImportError:
+        try:
+            from Crypto.Hash import keccak as _k  # pycryptodome
+        except ImportError:
+            _k = None
+    if _k is not None:
+        return lambda data: _k.new(digest_bits=256, data=data).digest()
+    try:
+        import sha3  # pysha3
+        return lambda data: sha3.keccak_256(data).digest()
+    except ImportError:
+        return _keccak256_py
+
+
+keccak256 = _keccak_provider()
+
 
 # ─── EVM STATE ──────────────────────────────────────────────────────────
 
@@ -83,6 +173,7 @@ class EVMState:
         self.reverted: bool = False
         self.return_data: bytes = b""
         self.logs: List[Dict] = []
+        self.steps: int = 0  # instructions executed
         
     def consume_gas(self, amount: int) -> bool:
         """Consume gas. Returns False if out of gas."""
@@ -134,12 +225,358 @@ class EVMState:
     
     def memory_read(self, offset: int, size: int) -> bytes:
         """Read data from memory."""
+        if size == 0:
+            return b""
+        if offset + size > MAX_MEMORY_SIZE:
+            raise Exception("Memory limit exceeded")
         if offset + size > len(self.memory):
             # Expand memory with zeros
             self.memory.extend(b'\x00' * (offset + size - len(self.memory)))
         return bytes(self.memory[offset:offset + size])
 
 
+# ─── CODE ANALYSIS ──────────────────────────────────────────────────────
+#
+# Contract code is decoded once into a CodeObject and cached by code hash:
+#   * ``jumpdests`` — bitmap of valid JUMPDEST offsets (not inside PUSH data)
+#   * ``blocks``    — basic blocks keyed by start pc; each block carries its
+#     static gas, the stack depth it needs / may grow by, and its
+#     instructions as (handler, arg) pairs with PUSH immediates already
+#     decoded, so the interpreter charges gas and checks the stack once per
+#     block and dispatches each instruction through a 256-entry table.
+
+OP_STOP, OP_SHA3, OP_JUMP, OP_JUMPI, OP_PC, OP_JUMPDEST = 0x00, 0x20, 0x56, 0x57, 0x58, 0x5b
+OP_RETURN, OP_REVERT = 0xf3, 0xfd
+
+_OPCODE_NAMES = {
+    0x00: "STOP", 0x01: "ADD", 0x02: "MUL", 0x03: "SUB", 0x04: "DIV",
+    0x10: "LT", 0x11: "GT", 0x14: "EQ", 0x15: "ISZERO", 0x20: "SHA3",
+    0x50: "POP", 0x51: "MLOAD", 0x52: "MSTORE", 0x54: "SLOAD", 0x55: "SSTORE",
+    0x56: "JUMP", 0x57: "JUMPI", 0x58: "PC", 0x5b: "JUMPDEST",
+    0xf3: "RETURN", 0xfd: "REVERT",
+}
+for _op in range(0x60, 0x80):
+    _OPCODE_NAMES[_op] = "PUSH"
+for _op in range(0x80, 0x90):
+    _OPCODE_NAMES[_op] = "DUP"
+for _op in range(0x90, 0xa0):
+    _OPCODE_NAMES[_op] = "SWAP"
+
+# (items popped, items pushed) per supported opcode
+_STACK_EFFECT = {
+    0x00: (0, 0), 0x01: (2, 1), 0x02: (2, 1), 0x03: (2, 1), 0x04: (2, 1),
+    0x10: (2, 1), 0x11: (2, 1), 0x14: (2, 1), 0x15: (1, 1), 0x20: (2, 1),
+    0x50: (1, 0), 0x51: (1, 1), 0x52: (2, 0), 0x54: (1, 1), 0x55: (2, 0),
+    0x56: (1, 0), 0x57: (2, 0), 0x58: (0, 1), 0x5b: (0, 0),
+    0xf3: (2, 0), 0xfd: (2, 0),
+}
+for _op in range(0x60, 0x80):
+    _STACK_EFFECT[_op] = (0, 1)
+for _op in range(0x80, 0x90):
+    _STACK_EFFECT[_op] = (_op - 0x7f, _op - 0x7e)
+for _op in range(0x90, 0xa0):
+    _STACK_EFFECT[_op] = (_op - 0x8e, _op - 0x8e)
+
+_TERMINATORS = frozenset((OP_STOP, OP_JUMP, OP_JUMPI, OP_RETURN, OP_REVERT))
+
+
+def _op_stop(state, stack, arg):
+    state.stopped = True
+
+
+def _op_add(state, stack, arg):
+    stack.append((stack.pop() + stack.pop()) & UINT256_MASK)
+
+
+def _op_mul(state, stack, arg):
+    stack.append((stack.pop() * stack.pop()) & UINT256_MASK)
+
+
+def _op_sub(state, stack, arg):
+    a = stack.pop()
+    stack.append((a - stack.pop()) & UINT256_MASK)
+
+
+def _op_div(state, stack, arg):
+    a = stack.pop()
+    b = stack.pop()
+    stack.append(a // b if b else 0)
+
+
+def _op_lt(state, stack, arg):
+    a = stack.pop()
+    stack.append(1 if a < stack.pop() else 0)
+
+
+def _op_gt(state, stack, arg):
+    a = stack.pop()
+    stack.append(1 if a > stack.pop() else 0)
+
+
+def _op_eq(state, stack, arg):
+    stack.append(1 if stack.pop() == stack.pop() else 0)
+
+
+def _op_iszero(state, stack, arg):
+    stack[-1] = 0 if stack[-1] else 1
+
+
+def _op_sha3(state, stack, arg):
+    offset = stack.pop()
+    size = stack.pop()
+    if not state.consume_gas(SHA3_WORD_GAS * ((size + 31) // 32)):
+        raise Exception("Out of gas")
+    stack.append(int.from_bytes(keccak256(state.memory_read(offset, size)), "big"))
+
+
+def _op_pop(state, stack, arg):
+    stack.pop()
+
+
+def _op_mload(state, stack, arg):
+    stack.append(int.from_bytes(state.memory_read(stack.pop(), 32), "big"))
+
+
+def _op_mstore(state, stack, arg):
+    offset = stack.pop()
+    state.memory_write(offset, stack.pop().to_bytes(32, "big"))
+
+
+def _op_sload(state, stack, arg):
+    stack.append(state.storage.get(stack.pop(), 0))
+
+
+def _op_sstore(state, stack, arg):
+    key = stack.pop()
+    state.storage[key] = stack.pop()
+
+
+def _op_jump(state, stack, jumpdests):
+    dest = stack.pop()
+    if dest >= len(jumpdests) or not jumpdests[dest]:
+        raise Exception(f"Invalid jump destination: {dest}")
+    state.pc = dest
+
+
+def _op_jumpi(state, stack, jumpdests):
+    dest = stack.pop()
+    if stack.pop():
+        if dest >= len(jumpdests) or not jumpdests[dest]:
+            raise Exception(f"Invalid jump destination: {dest}")
+        state.pc = dest
+
+
+def _op_push(state, stack, value):
+    stack.append(value)
+
+
+def _op_dup(state, stack, depth):
+    stack.append(stack[-depth])
+
+
+def _op_swap(state, stack, depth):
+    i = -1 - depth
+    stack[-1], stack[i] = stack[i], stack[-1]
+
+
+def _op_return(state, stack, arg):
+    offset = stack.pop()
+    state.return_data = state.memory_read(offset, stack.pop())
+    state.stopped = True
+
+
+def _op_revert(state, stack, arg):
+    offset = stack.pop()
+    state.return_data = state.memory_read(offset, stack.pop())
+    state.reverted = True
+    state.stopped = True
+
+
+def _op_truncated_push(state, stack, arg):
+    raise Exception("Invalid PUSH: not enough bytes")
+
+
+def _op_unsupported(state, stack, opcode):
+    raise Exception(f"Unsupported opcode: 0x{opcode:02x}")
+
+
+OPCODE_HANDLERS = [_op_unsupported] * 256
+OPCODE_HANDLERS[0x00] = _op_stop
+OPCODE_HANDLERS[0x01] = _op_add
+OPCODE_HANDLERS[0x02] = _op_mul
+OPCODE_HANDLERS[0x03] = _op_sub
+OPCODE_HANDLERS[0x04] = _op_div
+OPCODE_HANDLERS[0x10] = _op_lt
+OPCODE_HANDLERS[0x11] = _op_gt
+OPCODE_HANDLERS[0x14] = _op_eq
+OPCODE_HANDLERS[0x15] = _op_iszero
+OPCODE_HANDLERS[0x20] = _op_sha3
+OPCODE_HANDLERS[0x50] = _op_pop
+OPCODE_HANDLERS[0x51] = _op_mload
+OPCODE_HANDLERS[0x52] = _op_mstore
+OPCODE_HANDLERS[0x54] = _op_sload
+OPCODE_HANDLERS[0x55] = _op_sstore
+OPCODE_HANDLERS[0x56] = _op_jump
+OPCODE_HANDLERS[0x57] = _op_jumpi
+OPCODE_HANDLERS[0xf3] = _op_return
+OPCODE_HANDLERS[0xfd] = _op_revert
+for _op in range(0x60, 0x80):
+    OPCODE_HANDLERS[_op] = _op_push
+for _op in range(0x80, 0x90):
+    OPCODE_HANDLERS[_op] = _op_dup
+for _op in range(0x90, 0xa0):
+    OPCODE_HANDLERS[_op] = _op_swap
+# PC is decoded to a PUSH of its own offset; JUMPDEST only costs gas
+OPCODE_HANDLERS[OP_PC] = _op_push
+OPCODE_HANDLERS[OP_JUMPDEST] = None
+
+OPCODE_GAS = [GAS_COSTS.get(_OPCODE_NAMES.get(_op, "STOP"), 0) for _op in range(256)]
+
+
+class CodeObject:
+    """Decoded contract code: raw bytes, JUMPDEST bitmap and basic blocks."""
+
+    __slots__ = ("code_hash", "code", "jumpdests", "blocks")
+
+    def __init__(self, code: bytes, code_hash: Optional[str] = None):
+        self.code = code
+        self.code_hash = code_hash or hashlib.sha256(code).hexdigest()
+        self.jumpdests = bytearray(len(code))
+        # start pc -> (gas, stack needed, stack growth, instrs, next pc, op count)
+        self.blocks: Dict[int, tuple] = {}
+        self._decode()
+
+    def _decode(self):
+        code = self.code
+        size = len(code)
+        jumpdests = self.jumpdests
+
+        # pass 1: instructions with immediates; JUMPDESTs outside PUSH data
+        ops = []
+        pc = 0
+        while pc < size:
+            op = code[pc]
+            if 0x60 <= op <= 0x7f:
+                width = op - 0x5f
+                if pc + 1 + width > size:
+                    ops.append((pc, op, _op_truncated_push, None, True))
+                    break
+                ops.append((pc, op, _op_push, int.from_bytes(code[pc + 1:pc + 1 + width], "big"), False))
+                pc += 1 + width
+                continue
+            if op == OP_JUMPDEST:
+                jumpdests[pc] = 1
+            handler = OPCODE_HANDLERS[op]
+            if op in (OP_JUMP, OP_JUMPI):
+                arg = jumpdests  # filled in full before any block runs
+            elif op == OP_PC:
+                arg = pc
+            elif 0x80 <= op <= 0x8f:
+                arg = op - 0x7f
+            elif 0x90 <= op <= 0x9f:
+                arg = op - 0x8f
+            elif handler is _op_unsupported:
+                arg = op
+            else:
+                arg = None
+            ops.append((pc, op, handler, arg, op in _TERMINATORS or handler is _op_unsupported))
+            pc += 1
+
+        # pass 2: split at JUMPDESTs and after terminators
+        block_start = None
+        first = 0
+        for index, (pc, op, handler, arg, terminal) in enumerate(ops):
+            if block_start is None or op == OP_JUMPDEST:
+                if block_start is not None:
+                    self._close_block(block_start, pc, ops[first:index])
+                block_start, first = pc, index
+            if terminal:
+                end = ops[index + 1][0] if index + 1 < len(ops) else size
+                self._close_block(block_start, end, ops[first:index + 1])
+                block_start = None
+        if block_start is not None:
+            self._close_block(block_start, size, ops[first:])
+
+    def _close_block(self, start: int, next_pc: int, ops: list):
+        gas = depth = lowest = highest = 0
+        instrs = []
+        for _pc, op, handler, arg, _terminal in ops:
+            gas += OPCODE_GAS[op]
+            pops, pushes = _STACK_EFFECT.get(op, (0, 0))
+            depth -= pops
+            lowest = min(lowest, depth)
+            depth += pushes
+            highest = max(highest, depth)
+            if handler is not None:
+                instrs.append((handler, arg))
+        self.blocks[start] = (gas, -lowest, highest, tuple(instrs), next_pc, len(ops))
+
+
+class CodeCache:
+    """Thread-safe LRU of CodeObjects keyed by code hash.
+
+    Lookups go through the bytecode hex string first, so a repeat call on
+    the same contract skips ``bytes.fromhex`` and hashing entirely.
+    """
+
+    def __init__(self, max_entries: int = CODE_CACHE_SIZE):
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._objects: "OrderedDict[str, CodeObject]" = OrderedDict()
+        self._aliases: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, bytecode: str) -> CodeObject:
+        with self._lock:
+            code_hash = self._aliases.get(bytecode)
+            obj = self._objects.get(code_hash) if code_hash is not None else None
+            if obj is not None:
+                self._objects.move_to_end(code_hash)
+                self.hits += 1
+                return obj
+
+        hex_code = bytecode[2:] if bytecode.startswith("0x") else bytecode
+        code = bytes.fromhex(hex_code)
+        code_hash = hashlib.sha256(code).hexdigest()
+        with self._lock:
+            obj = self._objects.get(code_hash)
+        if obj is None:
+            obj = CodeObject(code, code_hash)
+
+        with self._lock:
+            if code_hash in self._objects:
+                obj = self._objects[code_hash]
+                self._objects.move_to_end(code_hash)
+                self.hits += 1
+            else:
+                self._objects[code_hash] = obj
+                self.misses += 1
+                while len(self._objects) > self.max_entries:
+                    self._objects.popitem(last=False)
+            self._aliases[bytecode] = code_hash
+            while len(self._aliases) > 4 * self.max_entries:
+                self._aliases.popitem(last=False)
+        return obj
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+            self._aliases.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._objects),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+CODE_CACHE = CodeCache()
+
+
 # ─── EVM EXECUTOR ───────────────────────────────────────────────────────
 
 class ThronosEVM:
@@ -151,26 +588,23 @@ class ThronosEVM:
     def __init__(self, data_dir: str):
         self.data_dir = data_dir
         self.contracts_file = os.path.join(data_dir, "evm_contracts.json")
+        self.storage = EVMStorage(data_dir)
         self.contracts: Dict[str, Dict] = self._load_contracts()
+        self.code_cache = CODE_CACHE
+        # state-changing executions run one at a time so journals commit in order
+        self._write_lock = threading.Lock()
+        self._read_pool: Optional[ThreadPoolExecutor] = None
+        self._read_pool_lock = threading.Lock()
     
     def _load_contracts(self) -> Dict[str, Dict]:
-        """Load deployed contracts from storage."""
+        """Load contract metadata (storage slots are read lazily per call)."""
         try:
-            if os.path.exists(self.contracts_file):
-                with open(self.contracts_file, 'r') as f:
-                    return json.load(f)
+            self.storage.migrate_json(self.contracts_file)
+            return self.storage.load_contracts()
         except Exception as e:
             print(f"[EVM] Error loading contracts: {e}")
         return {}
     
-    def _save_contracts(self):
-        """Save contracts to storage."""
-        try:
-            with open(self.contracts_file, 'w') as f:
-                json.dump(self.contracts, f, indent=2)
-        except Exception as e:
-            print(f"[EVM] Error saving contracts: {e}")
-    
     def deploy_contract(
         self,
         bytecode: str,
@@ -191,37 +625,39 @@ class ThronosEVM:
             (success, contract_address, message)
         """
         try:
-            # Generate contract address (simplified)
-            nonce = len(self.contracts)
-            contract_addr = f"CONTRACT_{hashlib.sha256(f'{deployer}{nonce}'.encode()).hexdigest()[:40]}"
-            
-            # Create execution context
-            state = EVMState(gas_limit)
-            context = {
-                "contract_address": contract_addr,
-                "sender": deployer,
-                "value": value,
-                "data": b"",
-                "block_number": 0,
-                "timestamp": int(time.time()),
-            }
-            
-            # Execute constructor (bytecode is constructor + runtime code)
-            success, result = self._execute_bytecode(bytecode, state, context)
-            
-            if not success:
-                return False, None, f"Deployment failed: {result}"
-            
-            # Store deployed contract
-            self.contracts[contract_addr] = {
-                "address": contract_addr,
-                "bytecode": bytecode,
-                "deployer": deployer,
-                "storage": {},
-                "balance": value,
-                "created_at": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime()),
-            }
-            self._save_contracts()
+            with self._write_lock:
+                # Generate contract address (simplified)
+                nonce = len(self.contracts)
+                contract_addr = f"CONTRACT_{hashlib.sha256(f'{deployer}{nonce}'.encode()).hexdigest()[:40]}"
+                
+                # Create execution context
+                state = EVMState(gas_limit)
+                state.storage = StorageJournal(self.storage, contract_addr)
+                context = {
+                    "contract_address": contract_addr,
+                    "sender": deployer,
+                    "value": value,
+                    "data": b"",
+                    "block_number": 0,
+                    "timestamp": int(time.time()),
+                }
+                
+                # Execute constructor (bytecode is constructor + runtime code)
+                success, result = self._execute_bytecode(bytecode, state, context)
+                
+                if not success:
+                    return False, None, f"Deployment failed: {result}"
+                
+                # Store deployed contract with the constructor's storage writes
+                contract = {
+                    "address": contract_addr,
+                    "bytecode": bytecode,
+                    "deployer": deployer,
+                    "balance": value,
+                    "created_at": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime()),
+                }
+                self.storage.insert_contract(contract, state.storage.dirty)
+                self.contracts[contract_addr] = contract
             
             return True, contract_addr, f"Contract deployed at {contract_addr}"
             
@@ -239,6 +675,9 @@ class ThronosEVM:
         """
         Call a deployed contract.
         
+        Storage writes are journaled and committed only if the call
+        succeeds; a reverted call leaves storage untouched.
+        
         Args:
             contract_address: Address of contract to call
             caller: THR address of caller
@@ -250,17 +689,78 @@ class ThronosEVM:
             (success, return_data, gas_used)
         """
         try:
-            # Check if contract exists
-            if contract_address not in self.contracts:
-                return False, "Contract not found", 0
+            with self._write_lock:
+                success, result, state = self._run_call(contract_address, caller, data, value, gas_limit)
+                if state is None:
+                    return success, result, 0
+                
+                if success:
+                    state.storage.commit()
+                else:
+                    state.storage.discard()
             
-            contract = self.contracts[contract_address]
+            return success, result, state.gas_used
             
-            # Create execution context
+        except Exception as e:
+            return False, f"Execution error: {str(e)}", 0
+    
+    def static_call(
+        self,
+        contract_address: str,
+        caller: str,
+        data: bytes,
+        gas_limit: int = 1000000
+    ) -> Tuple[bool, Any, int]:
+        """
+        Execute a contract call without persisting anything (eth_call).
+        
+        Returns:
+            (success, return_data, gas_used)
+        """
+        if contract_address not in self.contracts:
+            return False, "Contract not found", 0
+        result = self.dry_run(contract_address=contract_address, caller=caller, data=data, gas_limit=gas_limit)
+        if result["success"]:
+            return True, result["raw_return_data"], result["gas_used"]
+        return False, result["error"] or result["raw_return_data"], result["gas_used"]
+    
+    def snapshot(self):
+        """Pin the committed storage for a batch of dry runs (see StateSnapshot)."""
+        return self.storage.snapshot()
+    
+    def dry_run(
+        self,
+        contract_address: Optional[str] = None,
+        caller: str = "",
+        data: bytes = b"",
+        gas_limit: int = EVM_CALL_GAS_CAP,
+        bytecode: Optional[str] = None,
+        value: float = 0.0,
+        snapshot=None
+    ) -> Dict[str, Any]:
+        """
+        Execute a call (or, with ``bytecode``, a deployment) against a
+        copy-on-write view of committed state and discard the result.
+        
+        Never takes the write lock. Without ``snapshot`` a private one is
+        taken for this run.
+        
+        Returns:
+            dict with success, gas_used, return_data (hex), raw_return_data,
+            error, revert_reason and out_of_gas
+        """
+        if bytecode is None:
+            contract = self.contracts.get(contract_address or "")
+            if contract is None:
+                return self._dry_run_result(False, "Contract not found", None)
+            bytecode = contract["bytecode"]
+        
+        owned = snapshot is None
+        if owned:
+            snapshot = self.storage.snapshot()
+        try:
             state = EVMState(gas_limit)
-            # Load contract storage
-            state.storage = contract.get("storage", {})
-            
+            state.storage = StorageJournal(snapshot, contract_address or "CONTRACT_dry_run")
             context = {
                 "contract_address": contract_address,
                 "sender": caller,
@@ -269,22 +769,127 @@ class ThronosEVM:
                 "block_number": 0,
                 "timestamp": int(time.time()),
             }
+            success, result = self._execute_bytecode(bytecode, state, context)
+            state.storage.discard()
+        finally:
+            if owned:
+                snapshot.close()
+        return self._dry_run_result(success, result, state)
+    
+    @staticmethod
+    def _dry_run_result(success: bool, result: Any, state: Optional[EVMState]) -> Dict[str, Any]:
+        raw = result if isinstance(result, bytes) else b""
+        error = None if isinstance(result, bytes) else str(result)
+        return {
+            "success": success,
+            "gas_used": state.gas_used if state is not None else 0,
+            "return_data": "0x" + raw.hex(),
+            "raw_return_data": raw,
+            "error": error,
+            "revert_reason": decode_revert_reason(raw) if not success and error is None else None,
+            "out_of_gas": bool(error and error.endswith("Out of gas")),
+        }
+    
+    def multicall(
+        self,
+        calls: List[Tuple[str, bytes, int]],
+        caller: str = ""
+    ) -> List[Dict[str, Any]]:
+        """
+        Run many read-only calls against one pinned snapshot.
+        
+        ``calls`` is a list of (contract_address, data, gas_limit). The calls
+        run concurrently on a shared worker pool (EVM_READ_WORKERS), reuse
+        the decoded-code cache and see exactly the same committed state.
+        Results come back in request order, each a dry_run dict.
+        """
+        if not calls:
+            return []
+        with self.storage.snapshot() as snapshot:
+            def run(call: Tuple[str, bytes, int]) -> Dict[str, Any]:
+                contract_address, data, gas_limit = call
+                return self.dry_run(contract_address, caller, data, gas_limit, snapshot=snapshot)
             
-            # Execute contract bytecode
-            success, result = self._execute_bytecode(
-                contract["bytecode"],
-                state,
-                context
-            )
-            
-            # Save updated storage
-            contract["storage"] = state.storage
-            self._save_contracts()
-            
-            return success, result, state.gas_used
+            if len(calls) == 1:
+                return [run(calls[0])]
+            return list(self._get_read_pool().map(run, calls))
+    
+    def _get_read_pool(self) -> ThreadPoolExecutor:
+        with self._read_pool_lock:
+            if self._read_pool is None:
+                self._read_pool = ThreadPoolExecutor(
+                    max_workers=max(1, EVM_READ_WORKERS), thread_name_prefix="evm-read"
+                )
+            return self._read_pool
+    
+    def estimate_call_gas(
+        self,
+        contract_address: Optional[str] = None,
+        caller: str = "",
+        data: bytes = b"",
+        bytecode: Optional[str] = None,
+        gas_cap: int = EVM_CALL_GAS_CAP
+    ) -> Dict[str, Any]:
+        """
+        Smallest gas limit with which the call (or deployment) succeeds.
+        
+        Runs once at ``gas_cap``, then confirms the gas actually used is
+        enough; if not, binary-searches between it and the cap. All runs
+        share one snapshot, so concurrent commits cannot skew the result.
+        
+        Returns:
+            the dry_run dict for the run at the cap, plus estimated_gas
+            (None when the call fails even at the cap) and runs
+        """
+        with self.storage.snapshot() as snapshot:
+            def attempt(limit: int) -> Dict[str, Any]:
+                return self.dry_run(contract_address, caller, data, limit, bytecode, snapshot=snapshot)
             
-        except Exception as e:
-            return False, f"Execution error: {str(e)}", 0
+            first = attempt(gas_cap)
+            runs = 1
+            estimate = None
+            if first["success"]:
+                lo, hi = first["gas_used"] - 1, gas_cap
+                if attempt(first["gas_used"])["success"]:
+                    hi = first["gas_used"]
+                else:
+                    lo = first["gas_used"]
+                    while lo + 1 < hi:
+                        mid = (lo + hi) // 2
+                        runs += 1
+                        if attempt(mid)["success"]:
+                            hi = mid
+                        else:
+                            lo = mid
+                runs += 1
+                estimate = hi
+        return dict(first, estimated_gas=estimate, runs=runs)
+    
+    def _run_call(
+        self,
+        contract_address: str,
+        caller: str,
+        data: bytes,
+        value: float,
+        gas_limit: int
+    ) -> Tuple[bool, Any, Optional[EVMState]]:
+        """Execute a call against a fresh storage journal; commits nothing."""
+        contract = self.contracts.get(contract_address)
+        if contract is None:
+            return False, "Contract not found", None
+        
+        state = EVMState(gas_limit)
+        state.storage = StorageJournal(self.storage, contract_address)
+        context = {
+            "contract_address": contract_address,
+            "sender": caller,
+            "value": value,
+            "data": data,
+            "block_number": 0,
+            "timestamp": int(time.time()),
+        }
+        success, result = self._execute_bytecode(contract["bytecode"], state, context)
+        return success, result, state
     
     def _execute_bytecode(
         self,
@@ -295,8 +900,9 @@ class ThronosEVM:
         """
         Execute EVM bytecode.
         
-        This is a simplified interpreter that executes basic opcodes.
-        For production, this would need full EVM opcode support.
+        The code is decoded once per code hash (see CodeObject); each basic
+        block charges its static gas and checks stack bounds on entry, then
+        runs its pre-decoded instructions.
         
         Args:
             bytecode: Hex string of bytecode
@@ -306,6 +912,54 @@ class ThronosEVM:
         Returns:
             (success, result_or_error)
         """
+        try:
+            code_obj = self.code_cache.get(bytecode)
+        except Exception as e:
+            return False, f"Bytecode execution error: {str(e)}"
+        
+        blocks = code_obj.blocks
+        stack = state.stack
+        try:
+            while not state.stopped:
+                block = blocks.get(state.pc)
+                if block is None:
+                    # fell off the end of the code: implicit STOP
+                    break
+                gas, needed, growth, instrs, next_pc, count = block
+                if state.gas_remaining < gas:
+                    state.reverted = True
+                    return False, "Out of gas"
+                state.gas_remaining -= gas
+                state.gas_used += gas
+                depth = len(stack)
+                if depth < needed:
+                    raise Exception("Stack underflow")
+                if depth + growth > MAX_STACK_DEPTH:
+                    raise Exception("Stack overflow")
+                state.steps += count
+                state.pc = next_pc
+                for handler, arg in instrs:
+                    handler(state, stack, arg)
+        except Exception as e:
+            state.reverted = True
+            return False, f"Execution error: {str(e)}"
+        
+        # Check if reverted
+        if state.reverted:
+            return False, state.return_data
+        
+        return True, state.return_data
+    
+    def _execute_bytecode_stepwise(
+        self,
+        bytecode: str,
+        state: EVMState,
+        context: Dict
+    ) -> Tuple[bool, Any]:
+        """
+        Opcode-at-a-time reference interpreter (the original loop over
+        _execute_opcode). Kept to cross-check and benchmark _execute_bytecode.
+        """
         try:
             # Convert hex bytecode to bytes
             if bytecode.startswith("0x"):
@@ -322,6 +976,7 @@ class ThronosEVM:
                 # Fetch opcode
                 opcode = code[state.pc]
                 state.pc += 1
+                state.steps += 1
                 
                 # Execute opcode
                 try:
@@ -425,6 +1080,16 @@ class ThronosEVM:
             a = state.pop()
             state.push(1 if a == 0 else 0)
         
+        # SHA3 (Keccak-256 of memory)
+        elif opcode == 0x20:
+            if not state.consume_gas(GAS_COSTS.get("SHA3", 30)):
+                raise Exception("Out of gas")
+            offset = state.pop()
+            size = state.pop()
+            if not state.consume_gas(SHA3_WORD_GAS * ((size + 31) // 32)):
+                raise Exception("Out of gas")
+            state.push(int.from_bytes(keccak256(state.memory_read(offset, size)), 'big'))
+        
         # POP
         elif opcode == 0x50:
             if not state.consume_gas(GAS_COSTS.get("POP", 2)):
@@ -540,16 +1205,23 @@ class ThronosEVM:
             # Unsupported opcode
             raise Exception(f"Unsupported opcode: 0x{opcode:02x}")
     
-    def get_contract(self, address: str) -> Optional[Dict]:
-        """Get contract details by address."""
+    def get_contract_meta(self, address: str) -> Optional[Dict]:
+        """Contract metadata without loading its storage."""
         return self.contracts.get(address)
     
-    def get_storage(self, address: str, key: int) -> int:
-        """Get storage value for a contract."""
+    def get_contract(self, address: str) -> Optional[Dict]:
+        """Get contract details (including current storage) by address."""
         contract = self.contracts.get(address)
         if not contract:
+            return None
+        storage = self.storage.load_all(address)
+        return dict(contract, storage={str(k): v for k, v in sorted(storage.items())})
+    
+    def get_storage(self, address: str, key: int) -> int:
+        """Get storage value for a contract."""
+        if address not in self.contracts:
             return 0
-        return contract.get("storage", {}).get(key, 0)
+        return self.storage.load_slot(address, key)
     
     def list_contracts(self) -> List[Dict]:
         """List all deployed contracts."""
@@ -558,6 +1230,21 @@ class ThronosEVM:
 
 # ─── HELPER FUNCTIONS ───────────────────────────────────────────────────
 
+def decode_revert_reason(data: bytes) -> Optional[str]:
+    """Decode Solidity ``Error(string)`` revert data; None if it is not one."""
+    if len(data) < 4 + 64 or data[:4] != ERROR_SELECTOR:
+        return None
+    try:
+        offset = int.from_bytes(data[4:36], "big")
+        length = int.from_bytes(data[4 + offset:36 + offset], "big")
+        start = 36 + offset
+        if start + length > len(data):
+            return None
+        return data[start:start + length].decode("utf-8", errors="replace")
+    except Exception:
+        return None
+
+
 def compile_solidity_stub(source_code: str) -> str:
     """
     Stub function for Solidity compilation.
@@ -577,7 +1264,8 @@ def estimate_gas(bytecode: str, data: bytes = b"") -> int:
     """
     Estimate gas cost for contract deployment or call.
     
-    This is a simplified estimation.
+    This is a static approximation from code and data size; use
+    ThronosEVM.estimate_call_gas to execute against current state.
     """
     base_cost = 21000  # Base transaction cost
     code_cost = len(bytecode) // 2 * 200  # Per byte of code
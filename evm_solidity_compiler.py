@@ -11,6 +11,8 @@ Features:
 - Security analysis and vulnerability detection
 - Gas optimization suggestions
 - Contract upgradeability patterns
+- Content-addressed compile cache with single-flight background jobs
+  (CompileService)
 
 Version: 3.7
 Phase 4 Enhancement
@@ -22,6 +24,10 @@ import hashlib
 import re
 import subprocess
 import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 from dataclasses import dataclass, asdict
@@ -30,6 +36,26 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+BUILTIN_COMPILER_VERSION = "builtin-0.1.0"
+SOLC_TIMEOUT = int(os.getenv("SOLC_TIMEOUT", "30") or 30)
+
+# Compile service: background workers, how long a request waits before
+# answering 202 with a job id, how many finished jobs stay queryable, and how
+# many compiles may be queued or running before new ones are refused
+COMPILE_WORKERS = int(os.getenv("EVM_COMPILE_WORKERS", "2") or 2)
+COMPILE_SYNC_WAIT = float(os.getenv("EVM_COMPILE_SYNC_WAIT", "5") or 5)
+COMPILE_JOB_HISTORY = int(os.getenv("EVM_COMPILE_JOB_HISTORY", "1000") or 1000)
+COMPILE_MAX_PENDING = int(os.getenv("EVM_COMPILE_MAX_PENDING", "32") or 32)
+
+
+def normalize_settings(settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compiler settings that affect output, with defaults filled in"""
+    settings = settings or {}
+    return {
+        "optimize": bool(settings.get("optimize", True)),
+        "runs": int(settings.get("runs", 200)),
+    }
+
 
 @dataclass
 class CompilationResult:
@@ -84,6 +110,7 @@ class SolidityCompiler:
         self.verified_contracts = self._load_verified_contracts()
 
         # Detect solc installation
+        self._compiler_version: Optional[str] = None
         self.solc_available = self._check_solc()
         if not self.solc_available:
             logger.warning("solc not found - using built-in compiler fallback")
@@ -124,22 +151,43 @@ class SolidityCompiler:
         except Exception as e:
             logger.error(f"Error saving verified contracts: {e}")
 
-    def compile_solidity(self, source_code: str, contract_name: str = "Contract") -> CompilationResult:
+    @property
+    def compiler_version(self) -> str:
+        """Version string that identifies compiler output (part of cache keys)"""
+        if self._compiler_version is None:
+            self._compiler_version = self._get_solc_version() if self.solc_available else BUILTIN_COMPILER_VERSION
+        return self._compiler_version
+
+    def compile_solidity(
+        self,
+        source_code: str,
+        contract_name: str = "Contract",
+        settings: Optional[Dict[str, Any]] = None
+    ) -> CompilationResult:
         """
         Compile Solidity source code to EVM bytecode
         """
         logger.info(f"Compiling contract: {contract_name}")
+        settings = normalize_settings(settings)
 
         # Calculate source hash
         source_hash = hashlib.sha256(source_code.encode()).hexdigest()
 
         if self.solc_available:
-            return self._compile_with_solc(source_code, contract_name, source_hash)
+            return self._compile_with_solc(source_code, contract_name, source_hash, settings)
         else:
             return self._compile_builtin(source_code, contract_name, source_hash)
 
-    def _compile_with_solc(self, source_code: str, contract_name: str, source_hash: str) -> CompilationResult:
+    def _compile_with_solc(
+        self,
+        source_code: str,
+        contract_name: str,
+        source_hash: str,
+        settings: Optional[Dict[str, Any]] = None
+    ) -> CompilationResult:
         """Compile using external solc compiler"""
+        settings = normalize_settings(settings)
+        temp_path = None
         try:
             # Create temporary file
             with tempfile.NamedTemporaryFile(mode='w', suffix='.sol', delete=False) as f:
@@ -147,16 +195,16 @@ class SolidityCompiler:
                 temp_path = f.name
 
             # Compile with solc
+            args = ['solc', '--bin', '--abi', '--opcodes']
+            if settings["optimize"]:
+                args += ['--optimize', '--optimize-runs', str(settings["runs"])]
             result = subprocess.run(
-                ['solc', '--bin', '--abi', '--opcodes', '--optimize', temp_path],
+                args + [temp_path],
                 capture_output=True,
                 text=True,
-                timeout=30
+                timeout=SOLC_TIMEOUT
             )
 
-            # Clean up temp file
-            os.unlink(temp_path)
-
             if result.returncode != 0:
                 errors = result.stderr.split('\n')
                 return CompilationResult(
@@ -185,7 +233,7 @@ class SolidityCompiler:
                 abi=abi,
                 opcodes=opcodes,
                 source_hash=source_hash,
-                compiler_version=self._get_solc_version()
+                compiler_version=self.compiler_version
             )
 
         except subprocess.TimeoutExpired:
@@ -200,6 +248,10 @@ class SolidityCompiler:
                 source_hash=source_hash,
                 errors=[str(e)]
             )
+        finally:
+            # Clean up temp file (after the ABI pass, which reads it too)
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
 
     def _compile_builtin(self, source_code: str, contract_name: str, source_hash: str) -> CompilationResult:
         """
@@ -232,7 +284,7 @@ class SolidityCompiler:
             bytecode=bytecode,
             abi=abi,
             source_hash=source_hash,
-            compiler_version="builtin-0.1.0",
+            compiler_version=BUILTIN_COMPILER_VERSION,
             warnings=warnings
         )
 
@@ -508,6 +560,229 @@ class SolidityCompiler:
         return suggestions
 
 
+class CompileJob:
+    """One compilation, identified by its content-addressed cache key"""
+
+    def __init__(self, key: str, contract_name: str):
+        self.key = key
+        self.contract_name = contract_name
+        self.status = "queued"  # queued -> running -> done | failed
+        self.result: Optional[Dict[str, Any]] = None
+        self.cached = False
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _finish(self, result: Dict[str, Any]) -> None:
+        self.result = result
+        self.status = "done" if result.get("success") else "failed"
+        self.finished_at = time.time()
+        self._done.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.key,
+            "contract_name": self.contract_name,
+            "status": self.status,
+            "cached": self.cached,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+        }
+
+
+class CompileQueueFull(Exception):
+    """Raised by CompileService.submit when max_pending compiles are unfinished"""
+
+
+class CompileService:
+    """
+    Content-addressed compile cache in front of SolidityCompiler
+
+    - the cache key is sha256 over source, contract name, compiler version
+      and output-affecting settings; successful artifacts (bytecode, ABI,
+      opcodes, warnings) are stored as <data_dir>/compile_cache/<key>.json
+    - identical compiles in flight share one job (single-flight)
+    - compiles run on a small worker pool; callers wait up to ``sync_wait``
+      seconds and otherwise get the job id to poll, so a large contract
+      never pins a request thread for the whole compile
+    - at most ``max_pending`` compiles are queued or running; past that a
+      new (uncached) compile raises CompileQueueFull, while cache hits and
+      joins of in-flight jobs still succeed
+    """
+
+    def __init__(
+        self,
+        compiler: SolidityCompiler,
+        cache_dir: Optional[str] = None,
+        workers: int = COMPILE_WORKERS,
+        sync_wait: float = COMPILE_SYNC_WAIT,
+        history: int = COMPILE_JOB_HISTORY,
+        max_pending: int = COMPILE_MAX_PENDING
+    ):
+        self.compiler = compiler
+        self.cache_dir = Path(cache_dir) if cache_dir else compiler.data_dir / "compile_cache"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.sync_wait = sync_wait
+        self.history = max(1, history)
+        self.max_pending = max(1, max_pending)
+        self._pending = 0
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="solc")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, CompileJob]" = OrderedDict()
+        self.stats = {"cache_hits": 0, "compiles": 0, "joined_in_flight": 0, "rejected": 0}
+
+    def cache_key(self, source_code: str, contract_name: str = "Contract", settings: Optional[Dict[str, Any]] = None) -> str:
+        material = json.dumps(
+            {
+                "source": source_code,
+                "contract_name": contract_name,
+                "compiler_version": self.compiler.compiler_version,
+                "settings": normalize_settings(settings),
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _artifact_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _load_artifact(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._artifact_path(key)
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Unreadable compile artifact {path}: {e}")
+            return None
+
+    def _store_artifact(self, key: str, artifact: Dict[str, Any]) -> None:
+        path = self._artifact_path(key)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(artifact, f)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.error(f"Error saving compile artifact {path}: {e}")
+
+    def _remember(self, job: CompileJob) -> None:
+        # caller holds self._lock
+        self._jobs[job.key] = job
+        self._jobs.move_to_end(job.key)
+        excess = len(self._jobs) - self.history
+        if excess > 0:
+            # drop the oldest finished jobs; unfinished ones (at most
+            # max_pending) stay until they finish, wherever they sit
+            stale = [key for key, old in self._jobs.items() if old.finished][:excess]
+            for key in stale:
+                del self._jobs[key]
+
+    def _reuse(self, key: str) -> Optional[CompileJob]:
+        # caller holds self._lock; failed jobs are retried, not reused
+        job = self._jobs.get(key)
+        if job is None or job.status == "failed":
+            return None
+        self.stats["joined_in_flight" if not job.finished else "cache_hits"] += 1
+        return job
+
+    def submit(
+        self,
+        source_code: str,
+        contract_name: str = "Contract",
+        settings: Optional[Dict[str, Any]] = None
+    ) -> CompileJob:
+        """Return the job for this source: cached, already running, or new
+
+        Raises CompileQueueFull when a new compile would exceed max_pending.
+        """
+        key = self.cache_key(source_code, contract_name, settings)
+        with self._lock:
+            job = self._reuse(key)
+            if job is not None:
+                return job
+
+        # disk lookup outside the lock; re-check in case a job started meanwhile
+        artifact = self._load_artifact(key)
+        with self._lock:
+            job = self._reuse(key)
+            if job is not None:
+                return job
+            job = CompileJob(key, contract_name)
+            if artifact is not None:
+                job.cached = True
+                job._finish(artifact)
+                self.stats["cache_hits"] += 1
+                self._remember(job)
+                return job
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise CompileQueueFull(f"{self._pending} compiles pending")
+            self._pending += 1
+            self.stats["compiles"] += 1
+            self._remember(job)
+        self._pool.submit(self._run, job, source_code, settings)
+        return job
+
+    def compile(
+        self,
+        source_code: str,
+        contract_name: str = "Contract",
+        settings: Optional[Dict[str, Any]] = None,
+        wait: Optional[float] = None
+    ) -> CompileJob:
+        """Submit and wait up to ``wait`` (default ``sync_wait``) seconds"""
+        job = self.submit(source_code, contract_name, settings)
+        job.wait(self.sync_wait if wait is None else wait)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[CompileJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        if not re.fullmatch(r"[0-9a-f]{64}", job_id or ""):
+            return None
+        artifact = self._load_artifact(job_id)
+        if artifact is None:
+            return None
+        job = CompileJob(job_id, artifact.get("contract_name", "Contract"))
+        job.cached = True
+        job._finish(artifact)
+        return job
+
+    def _run(self, job: CompileJob, source_code: str, settings: Optional[Dict[str, Any]]) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            result = self.compiler.compile_solidity(source_code, job.contract_name, settings)
+            artifact = dict(asdict(result), contract_name=job.contract_name, cache_key=job.key)
+        except Exception as e:
+            logger.error(f"Compile job {job.key[:12]} crashed: {e}")
+            artifact = asdict(CompilationResult(success=False, errors=[str(e)]))
+            artifact.update(contract_name=job.contract_name, cache_key=job.key)
+        # failures may be transient (timeouts, missing imports); only cache successes
+        if artifact.get("success"):
+            self._store_artifact(job.key, artifact)
+        with self._lock:
+            self._pending -= 1
+        job._finish(artifact)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
 def main():
     """Test the compiler"""
     print("🔨 Thronos Solidity Compiler v3.7\n")
@@ -561,5 +836,4 @@ def main():
 
 
 if __name__ == "__main__":
-    import time
     main()
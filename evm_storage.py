@@ -0,0 +1,281 @@
+"""
+ThronosChain EVM Storage — SQLite-backed contract state with per-call journals
+
+``ThronosEVM`` used to keep every contract and all of its storage in
+``evm_contracts.json``: the whole file was loaded at start-up, the live
+storage dict was handed to each call (so a reverted call still wrote), and
+the entire file was re-dumped after every deploy and call.  This module
+replaces that with ``evm_state.sqlite3``:
+
+  * ``evm_contracts`` holds contract metadata (one row per deploy)
+  * ``evm_storage`` holds one row per non-zero (contract, slot)
+  * ``StorageJournal`` is what a call's ``EVMState.storage`` becomes: reads
+    load slots lazily, writes stay in the journal, and ``commit()`` writes
+    only the dirty slots in one transaction — a reverted or read-only call
+    simply never commits
+  * ``StateSnapshot`` pins the committed state at one instant (a read
+    transaction on its own connection) for dry runs; journals on top of it
+    give each simulated call a private copy-on-write view, and one snapshot
+    can be shared by several threads
+
+Slots and values are 256-bit, so both are stored as hex text.  A slot
+written back to zero is deleted, as in the EVM.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ledger_db import LedgerDB
+
+logger = logging.getLogger(__name__)
+
+EVM_STATE_DB_NAME = "evm_state.sqlite3"
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS evm_contracts (
+        address TEXT PRIMARY KEY,
+        bytecode TEXT NOT NULL,
+        deployer TEXT,
+        balance REAL NOT NULL DEFAULT 0,
+        created_at TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS evm_storage (
+        contract TEXT NOT NULL,
+        slot TEXT NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (contract, slot)
+    ) WITHOUT ROWID
+    """,
+)
+
+
+def _hex(value: int) -> str:
+    return format(value, "x")
+
+
+class EVMStorage:
+    """Contract metadata and slot storage in one SQLite file."""
+
+    def __init__(self, data_dir: str, db: Optional[LedgerDB] = None):
+        self.path = os.path.join(data_dir, EVM_STATE_DB_NAME)
+        self.db = db or LedgerDB()
+        self.slot_reads = 0
+        self.slot_writes = 0
+        self._stats_lock = threading.Lock()
+        with self.db.connection(self.path) as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def _conn(self):
+        return self.db.connection(self.path)
+
+    # ─── contracts ──────────────────────────────────────────────────────
+
+    def load_contracts(self) -> Dict[str, Dict]:
+        """Contract metadata in deploy order (no storage)."""
+        rows = self._conn().execute(
+            "SELECT address, bytecode, deployer, balance, created_at FROM evm_contracts ORDER BY rowid"
+        ).fetchall()
+        return {row["address"]: dict(row) for row in rows}
+
+    def insert_contract(self, contract: Dict, storage: Optional[Dict[int, int]] = None) -> None:
+        """Record a deployed contract and its constructor storage in one commit."""
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO evm_contracts (address, bytecode, deployer, balance, created_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    contract["address"],
+                    contract["bytecode"],
+                    contract.get("deployer"),
+                    float(contract.get("balance") or 0.0),
+                    contract.get("created_at"),
+                ),
+            )
+            if storage:
+                self._write_slots(conn, contract["address"], storage.items())
+
+    def migrate_json(self, contracts_file: str) -> int:
+        """Import a legacy ``evm_contracts.json`` once; returns contracts imported."""
+        if not os.path.exists(contracts_file):
+            return 0
+        if self._conn().execute("SELECT 1 FROM evm_contracts LIMIT 1").fetchone():
+            return 0
+        try:
+            with open(contracts_file, "r") as f:
+                contracts = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("evm_storage: cannot read %s for migration: %s", contracts_file, e)
+            return 0
+        imported = 0
+        with self._conn() as conn:
+            for address, contract in (contracts or {}).items():
+                if not isinstance(contract, dict) or not contract.get("bytecode"):
+                    continue
+                conn.execute(
+                    "INSERT OR IGNORE INTO evm_contracts (address, bytecode, deployer, balance, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        address,
+                        contract["bytecode"],
+                        contract.get("deployer"),
+                        float(contract.get("balance") or 0.0),
+                        contract.get("created_at"),
+                    ),
+                )
+                # JSON turned the int slot keys into strings
+                slots = {int(k): int(v) for k, v in (contract.get("storage") or {}).items()}
+                self._write_slots(conn, address, slots.items())
+                imported += 1
+        logger.info("evm_storage: migrated %d contracts from %s", imported, contracts_file)
+        return imported
+
+    # ─── slots ──────────────────────────────────────────────────────────
+
+    def load_slot(self, contract: str, slot: int) -> int:
+        row = self._conn().execute(
+            "SELECT value FROM evm_storage WHERE contract = ? AND slot = ?", (contract, _hex(slot))
+        ).fetchone()
+        with self._stats_lock:
+            self.slot_reads += 1
+        return int(row["value"], 16) if row else 0
+
+    def load_all(self, contract: str) -> Dict[int, int]:
+        rows = self._conn().execute(
+            "SELECT slot, value FROM evm_storage WHERE contract = ?", (contract,)
+        ).fetchall()
+        return {int(row["slot"], 16): int(row["value"], 16) for row in rows}
+
+    def commit(self, contract: str, dirty: Dict[int, int]) -> None:
+        """Persist the dirty slots of one call in a single transaction."""
+        if not dirty:
+            return
+        with self._conn() as conn:
+            self._write_slots(conn, contract, dirty.items())
+
+    def _write_slots(self, conn, contract: str, items: Iterable[Tuple[int, int]]) -> None:
+        upserts: List[Tuple[str, str, str]] = []
+        deletes: List[Tuple[str, str]] = []
+        for slot, value in items:
+            if value:
+                upserts.append((contract, _hex(slot), _hex(value)))
+            else:
+                deletes.append((contract, _hex(slot)))
+        if upserts:
+            conn.executemany(
+                "INSERT INTO evm_storage (contract, slot, value) VALUES (?, ?, ?) "
+                "ON CONFLICT(contract, slot) DO UPDATE SET value = excluded.value",
+                upserts,
+            )
+        if deletes:
+            conn.executemany("DELETE FROM evm_storage WHERE contract = ? AND slot = ?", deletes)
+        with self._stats_lock:
+            self.slot_writes += len(upserts) + len(deletes)
+
+    def snapshot(self) -> "StateSnapshot":
+        return StateSnapshot(self.path, timeout=self.db.timeout)
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {"path": self.path, "slot_reads": self.slot_reads, "slot_writes": self.slot_writes}
+
+
+class StateSnapshot:
+    """Committed storage as of the moment the snapshot was taken.
+
+    Holds a read transaction open on a private connection, so commits made
+    afterwards are invisible to it (the database runs in WAL mode).  Slot
+    reads are cached and the connection is guarded by a lock, so worker
+    threads can share one snapshot.  Use as a context manager or ``close()``.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._slots: Dict[Tuple[str, int], int] = {}
+        self.slot_reads = 0
+        self._conn.execute("BEGIN")
+        # the WAL read snapshot is fixed by the first read, not by BEGIN
+        self._conn.execute("SELECT 1 FROM evm_storage LIMIT 1").fetchall()
+
+    def load_slot(self, contract: str, slot: int) -> int:
+        key = (contract, slot)
+        value = self._slots.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            value = self._slots.get(key)
+            if value is None:
+                if self._conn is None:
+                    raise RuntimeError("state snapshot is closed")
+                row = self._conn.execute(
+                    "SELECT value FROM evm_storage WHERE contract = ? AND slot = ?", (contract, _hex(slot))
+                ).fetchone()
+                value = self._slots[key] = int(row[0], 16) if row else 0
+                self.slot_reads += 1
+        return value
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "StateSnapshot":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class StorageJournal:
+    """One call's view of a contract's storage.
+
+    Supports the two operations the interpreter uses — ``get(slot, 0)`` and
+    ``journal[slot] = value`` — so it can stand in for ``EVMState.storage``.
+    Nothing reaches the backend until ``commit()``.
+    """
+
+    __slots__ = ("backend", "contract", "_slots", "dirty")
+
+    def __init__(self, backend, contract: str):
+        self.backend = backend
+        self.contract = contract
+        self._slots: Dict[int, int] = {}
+        self.dirty: Dict[int, int] = {}
+
+    def get(self, slot: int, default: int = 0) -> int:
+        value = self._slots.get(slot)
+        if value is None:
+            value = self.backend.load_slot(self.contract, slot) if self.backend is not None else 0
+            self._slots[slot] = value
+        return value if value else default
+
+    def __getitem__(self, slot: int) -> int:
+        return self.get(slot, 0)
+
+    def __setitem__(self, slot: int, value: int) -> None:
+        self._slots[slot] = value
+        self.dirty[slot] = value
+
+    def discard(self) -> None:
+        self._slots.clear()
+        self.dirty.clear()
+
+    def commit(self) -> int:
+        """Write the dirty slots to the backend; returns how many."""
+        count = len(self.dirty)
+        if count and self.backend is not None:
+            self.backend.commit(self.contract, self.dirty)
+        self.dirty = {}
+        return count
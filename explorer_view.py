@@ -0,0 +1,348 @@
+"""
+ThronosChain Explorer View — materialized block rows for the block viewer
+
+``get_blocks_for_viewer`` used to reload the chain, group txs by height,
+recompute every block's reward split, dedupe twice and sort on each call,
+and the viewer endpoints then sliced one page out of the result.  This view
+stores each rendered block row once, keyed by height:
+
+  explorer_block_sources(block_seq, height, block_hash, payload)
+      every block entry of the chain, in chain order
+  explorer_hashes(block_hash, first_seq, last_seq, height)
+      first / last occurrence of each block hash
+  explorer_txs(height, seq, payload)
+      the txs rendered inside the block at ``height``
+  explorer_blocks(height, block_seq, block_hash, row)
+      the winning rendered row per height
+
+The winner per height follows the legacy dedupe exactly: blocks without a
+hash come first (earliest wins), then hashed blocks ordered by the first
+occurrence of their hash, each rendered from the *last* occurrence of that
+hash.  A block row is re-rendered when a tx for its height arrives later.
+
+Like the wallet history index, the view follows a chain source (see
+``wallet_history_index``): store entries appended since the last sync are
+applied incrementally, anything else rebuilds the view.  Pages are index
+range scans on ``height``; the number of rows is kept in ``explorer_meta``
+by ``sync`` so an unfiltered page does not count the table.
+"""
+
+import json
+import logging
+import threading
+from typing import Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_META_KEY = "sources"
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _as_height(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ExplorerBlockView:
+    """Rendered explorer block rows, one per height, maintained from the chain."""
+
+    def __init__(self, connect: Callable, render: Callable, tx_types: Iterable[str]):
+        self._connect = connect
+        self._render = render
+        self.tx_types = frozenset(tx_types)
+        self._lock = threading.RLock()
+        self._schema_ready = False
+
+    # ─── schema ─────────────────────────────────────────────────────────
+
+    def ensure_schema(self, conn) -> None:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS explorer_block_sources (
+                block_seq INTEGER PRIMARY KEY,
+                height INTEGER NOT NULL,
+                block_hash TEXT,
+                payload TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_explorer_sources_height ON explorer_block_sources(height)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS explorer_hashes (
+                block_hash TEXT PRIMARY KEY,
+                first_seq INTEGER NOT NULL,
+                last_seq INTEGER NOT NULL,
+                height INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_explorer_hashes_height ON explorer_hashes(height, first_seq)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS explorer_txs (
+                height INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (height, seq)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS explorer_blocks (
+                height INTEGER PRIMARY KEY,
+                block_seq INTEGER NOT NULL,
+                block_hash TEXT,
+                row TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_explorer_blocks_hash ON explorer_blocks(block_hash)")
+        conn.execute("CREATE TABLE IF NOT EXISTS explorer_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _ready(self, conn) -> None:
+        if not self._schema_ready:
+            self.ensure_schema(conn)
+            self._schema_ready = True
+
+    def _meta(self, conn) -> dict:
+        row = conn.execute("SELECT value FROM explorer_meta WHERE key = ?", (_META_KEY,)).fetchone()
+        if row is None:
+            return {}
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return {}
+
+    # ─── maintenance ────────────────────────────────────────────────────
+
+    def sync(self, chain, rebuild: bool = True) -> bool:
+        """Catch up with ``chain``; with ``rebuild=False`` only incrementally."""
+        with self._lock, self._connect() as conn:
+            self._ready(conn)
+            meta = self._meta(conn)
+            token = chain.token()
+            if meta.get("chain") == token:
+                return True
+            delta = chain.since(meta.get("chain")) if meta else None
+            block_count = int(meta.get("block_count") or 0)
+            rows = meta.get("rows")
+            if delta is None:
+                if not rebuild:
+                    return False
+                for table in ("explorer_block_sources", "explorer_hashes", "explorer_txs", "explorer_blocks"):
+                    conn.execute(f"DELETE FROM {table}")
+                block_count, rows = self._apply(conn, chain.all(), 0, 0)
+                logger.info("explorer_view: rebuilt %d blocks", block_count)
+            else:
+                if rows is None:
+                    # meta written before the row count was tracked
+                    rows = conn.execute("SELECT COUNT(*) FROM explorer_blocks").fetchone()[0]
+                block_count, rows = self._apply(conn, delta, block_count, int(rows))
+            conn.execute(
+                "INSERT OR REPLACE INTO explorer_meta (key, value) VALUES (?, ?)",
+                (_META_KEY, _dumps({"chain": token, "block_count": block_count, "rows": rows})),
+            )
+            return True
+
+    def _apply(self, conn, entries: Iterable, block_count: int, rows: int) -> Tuple[int, int]:
+        """Apply chain entries; returns the new block count and explorer_blocks row count."""
+        dirty = set()
+        for seq, entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            if entry.get("reward") is not None:
+                height = entry.get("height")
+                height = block_count if height is None else _as_height(height)
+                block_count += 1
+                if height is None:
+                    continue
+                dirty |= self._add_block(conn, int(seq), height, entry)
+            elif entry.get("type") in self.tx_types and entry.get("height") is not None:
+                height = _as_height(entry["height"])
+                if height is None:
+                    continue
+                conn.execute(
+                    "INSERT OR REPLACE INTO explorer_txs (height, seq, payload) VALUES (?, ?, ?)",
+                    (height, int(seq), _dumps(entry)),
+                )
+                dirty.add(height)
+        for height in dirty:
+            rows += self._resolve(conn, height)
+        return block_count, rows
+
+    def _add_block(self, conn, seq: int, height: int, entry: dict) -> set:
+        block_hash = entry.get("block_hash") or None
+        conn.execute(
+            "INSERT OR REPLACE INTO explorer_block_sources (block_seq, height, block_hash, payload) VALUES (?, ?, ?, ?)",
+            (seq, height, block_hash, _dumps(entry)),
+        )
+        dirty = {height}
+        if block_hash:
+            prev = conn.execute(
+                "SELECT height FROM explorer_hashes WHERE block_hash = ?", (block_hash,)
+            ).fetchone()
+            if prev is None:
+                conn.execute(
+                    "INSERT INTO explorer_hashes (block_hash, first_seq, last_seq, height) VALUES (?, ?, ?, ?)",
+                    (block_hash, seq, seq, height),
+                )
+            else:
+                conn.execute(
+                    "UPDATE explorer_hashes SET last_seq = ?, height = ? WHERE block_hash = ?",
+                    (seq, height, block_hash),
+                )
+                dirty.add(int(prev[0]))
+        return dirty
+
+    def _resolve(self, conn, height: int) -> int:
+        """Re-render the winning block row at ``height`` (legacy dedupe order).
+
+        Returns the change in the number of explorer_blocks rows (-1, 0 or 1).
+        """
+        existed = conn.execute("SELECT 1 FROM explorer_blocks WHERE height = ?", (height,)).fetchone() is not None
+        winner = conn.execute(
+            "SELECT block_seq FROM explorer_block_sources WHERE height = ? AND block_hash IS NULL "
+            "ORDER BY block_seq LIMIT 1",
+            (height,),
+        ).fetchone()
+        if winner is None:
+            winner = conn.execute(
+                "SELECT last_seq FROM explorer_hashes WHERE height = ? ORDER BY first_seq LIMIT 1",
+                (height,),
+            ).fetchone()
+        if winner is None:
+            conn.execute("DELETE FROM explorer_blocks WHERE height = ?", (height,))
+            return -1 if existed else 0
+        block_seq = int(winner[0])
+        payload, block_hash = conn.execute(
+            "SELECT payload, block_hash FROM explorer_block_sources WHERE block_seq = ?", (block_seq,)
+        ).fetchone()
+        txs = [
+            json.loads(row[0])
+            for row in conn.execute("SELECT payload FROM explorer_txs WHERE height = ? ORDER BY seq", (height,))
+        ]
+        row = self._render(json.loads(payload), txs, height)
+        conn.execute(
+            "INSERT OR REPLACE INTO explorer_blocks (height, block_seq, block_hash, row) VALUES (?, ?, ?, ?)",
+            (height, block_seq, block_hash, _dumps(row)),
+        )
+        return 0 if existed else 1
+
+    # ─── reads ──────────────────────────────────────────────────────────
+
+    def _row_count(self, conn) -> int:
+        rows = self._meta(conn).get("rows")
+        if rows is None:
+            return conn.execute("SELECT COUNT(*) FROM explorer_blocks").fetchone()[0]
+        return int(rows)
+
+    def _visible(self, conn, max_height: Optional[int]) -> Tuple[str, list]:
+        """Height bound hiding orphans above the tip, unless it would hide everything."""
+        if max_height is None:
+            return "1 = 1", []
+        row = conn.execute("SELECT 1 FROM explorer_blocks WHERE height <= ? LIMIT 1", (max_height,)).fetchone()
+        if row is None:
+            return "1 = 1", []
+        return "height <= ?", [max_height]
+
+    def page(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        max_height: Optional[int] = None,
+        from_height: Optional[int] = None,
+        to_height: Optional[int] = None,
+        before_height: Optional[int] = None,
+    ) -> Tuple[List[dict], int]:
+        """Rows newest first plus the matching total; ``before_height`` is a keyset cursor."""
+        with self._connect() as conn:
+            self._ready(conn)
+            visible, params = self._visible(conn, max_height)
+            where = [visible]
+            if from_height is not None:
+                where.append("height >= ?")
+                params.append(int(from_height))
+            if to_height is not None:
+                where.append("height <= ?")
+                params.append(int(to_height))
+            clause = " AND ".join(where)
+            if from_height is not None or to_height is not None:
+                total = conn.execute(f"SELECT COUNT(*) FROM explorer_blocks WHERE {clause}", params).fetchone()[0]
+            else:
+                # the stored count, less any orphan rows above the tip (a short range scan)
+                total = self._row_count(conn)
+                if params:
+                    total -= conn.execute(
+                        "SELECT COUNT(*) FROM explorer_blocks WHERE height > ?", params
+                    ).fetchone()[0]
+            page_params = list(params)
+            if before_height is not None:
+                clause += " AND height < ?"
+                page_params.append(int(before_height))
+                offset = 0
+            rows = conn.execute(
+                f"SELECT row FROM explorer_blocks WHERE {clause} ORDER BY height DESC LIMIT ? OFFSET ?",
+                (*page_params, int(limit), max(int(offset), 0)),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows], int(total)
+
+    def height_bounds(self, max_height: Optional[int] = None, from_height=None, to_height=None) -> Tuple[int, int]:
+        with self._connect() as conn:
+            self._ready(conn)
+            visible, params = self._visible(conn, max_height)
+            where = [visible]
+            if from_height is not None:
+                where.append("height >= ?")
+                params.append(int(from_height))
+            if to_height is not None:
+                where.append("height <= ?")
+                params.append(int(to_height))
+            row = conn.execute(
+                f"SELECT MIN(height), MAX(height) FROM explorer_blocks WHERE {' AND '.join(where)}", params
+            ).fetchone()
+        return int(row[0] or 0), int(row[1] or 0)
+
+    def all_rows(self, max_height: Optional[int] = None) -> List[dict]:
+        """Every visible row, newest first (the ``get_blocks_for_viewer`` list)."""
+        with self._connect() as conn:
+            self._ready(conn)
+            visible, params = self._visible(conn, max_height)
+            return [
+                json.loads(row[0])
+                for row in conn.execute(f"SELECT row FROM explorer_blocks WHERE {visible} ORDER BY height DESC", params)
+            ]
+
+    def search(self, query: str, limit: int, max_height: Optional[int] = None) -> List[dict]:
+        """Exact height match first, then case-insensitive partial hash matches, newest first."""
+        out: List[dict] = []
+        seen = set()
+        with self._connect() as conn:
+            self._ready(conn)
+            visible, params = self._visible(conn, max_height)
+            if query.isdigit():
+                for height, row in conn.execute(
+                    f"SELECT height, row FROM explorer_blocks WHERE {visible} AND height = ?",
+                    (*params, int(query)),
+                ):
+                    out.append(json.loads(row))
+                    seen.add(height)
+            if len(out) < limit:
+                pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                for height, row in conn.execute(
+                    f"SELECT height, row FROM explorer_blocks WHERE {visible} AND block_hash LIKE ? ESCAPE '\\' "
+                    "ORDER BY height DESC LIMIT ?",
+                    (*params, pattern, int(limit) + len(seen)),
+                ):
+                    if height in seen:
+                        continue
+                    out.append(json.loads(row))
+                    if len(out) >= limit:
+                        break
+        return out[:limit]
@@ -0,0 +1,179 @@
+"""
+ThronosChain Ledger DB — per-thread pooled SQLite connections for ledger.sqlite3
+
+``_get_ledger_db_connection()`` used to open a fresh connection and re-run
+``PRAGMA journal_mode=WAL`` / ``busy_timeout`` for every balance lookup,
+indexed event, telemetry read and IoT reading.  ``LedgerDB`` keeps one
+connection per (thread, database path) instead:
+
+  - pragmas run once, when the thread's connection is opened
+  - the connection's statement cache (``cached_statements``) is reused, so
+    repeated queries skip re-preparing
+  - ``with conn:`` blocks nest: only the outermost block commits or rolls
+    back, which is what ``transaction()`` (``ledger_tx()`` in the server)
+    builds on to batch many small writes into one commit; a nested block
+    runs inside a SAVEPOINT, so if it raises only its own writes are undone
+  - ``after_commit()`` defers work (cache invalidation) until the outermost
+    block has committed, so readers never see the signal before the rows
+  - ``stats()`` reports connections opened, statements run and the time
+    spent in them
+
+Callers keep the existing ``with _get_ledger_db_connection() as conn:``
+pattern unchanged.  A nested block that raises rolls back to its savepoint
+and re-raises; whether the rest of the batch commits is up to the outermost
+block, exactly as when each block had its own connection.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CACHED_STATEMENTS = 256
+
+
+class LedgerConnection(sqlite3.Connection):
+    """sqlite3 connection with nested ``with`` blocks and statement timing."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.depth = 0
+        self.stats = None
+        self._after_commit = []
+
+    def _timed(self, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            if self.stats is not None:
+                self.stats.record(time.perf_counter() - t0)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def after_commit(self, fn) -> None:
+        """Call ``fn`` once the outermost ``with`` block commits (now if none is open).
+
+        Dropped if that block rolls back.
+        """
+        if self.depth == 0:
+            fn()
+            return
+        self._after_commit.append(fn)
+
+    def __enter__(self):
+        if self.depth > 0:
+            # A savepoint opened outside a transaction would start (and on
+            # RELEASE commit) one of its own, so pin the outer transaction first.
+            if not self.in_transaction:
+                super().execute("BEGIN")
+            super().execute(f"SAVEPOINT ledger_sp_{self.depth}")
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.depth -= 1
+        if self.depth > 0:
+            name = f"ledger_sp_{self.depth}"
+            if exc_type is not None:
+                super().execute(f"ROLLBACK TO {name}")
+            super().execute(f"RELEASE {name}")
+            return False
+        callbacks, self._after_commit = self._after_commit, []
+        result = super().__exit__(exc_type, exc, tb)
+        if exc_type is None:
+            for fn in callbacks:
+                fn()
+        return result
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.statements = 0
+        self.statement_seconds = 0.0
+        self.stale_rollbacks = 0
+
+    def record(self, elapsed: float) -> None:
+        with self._lock:
+            self.statements += 1
+            self.statement_seconds += elapsed
+
+    def bump(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+
+class LedgerDB:
+    """Thread-local connection pool keyed by database path."""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, cached_statements: int = DEFAULT_CACHED_STATEMENTS):
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._stats = _Stats()
+
+    def _open(self, path: str) -> LedgerConnection:
+        conn = sqlite3.connect(
+            path,
+            timeout=self.timeout,
+            factory=LedgerConnection,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        conn.stats = self._stats
+        self._stats.bump("connections_opened")
+        return conn
+
+    def connection(self, path: str) -> LedgerConnection:
+        """Return this thread's connection to ``path``, opening it on first use."""
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get(path)
+        if conn is None:
+            conn = conns[path] = self._open(path)
+        elif conn.depth == 0 and conn.in_transaction:
+            # A caller wrote outside a ``with`` block and never committed.  A
+            # throwaway connection would have rolled that back when collected.
+            logger.warning("ledger_db: rolling back uncommitted work left on %s", path)
+            self._stats.bump("stale_rollbacks")
+            conn.rollback()
+        return conn
+
+    @contextmanager
+    def transaction(self, path: str):
+        """Batch every ledger DB statement in this block into one commit."""
+        with self.connection(path) as conn:
+            yield conn
+
+    def close_thread(self) -> None:
+        """Close the calling thread's connections."""
+        conns = getattr(self._local, "conns", None) or {}
+        for conn in conns.values():
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        conns.clear()
+
+    def stats(self) -> dict:
+        s = self._stats
+        with s._lock:
+            return {
+                "connections_opened": s.connections_opened,
+                "statements": s.statements,
+                "statement_seconds": round(s.statement_seconds, 6),
+                "stale_rollbacks": s.stale_rollbacks,
+            }
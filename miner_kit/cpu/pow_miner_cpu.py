@@ -5,18 +5,33 @@
 # 2. Run:  pip install requests
 # 3. Run:  python pow_miner_cpu.py --address THR... --api https://api.thronoschain.org
 #
+# Options:
+#   --workers N       mining processes (default: one per CPU core)
+#   --mode header     mine the sha256d block-header path used by the stratum
+#                     flow instead of the legacy sha256(prev_hash+addr+nonce)
+#   --benchmark       hash a fixed job offline and report H/s per worker
+#
 # Environment variables (override defaults):
 #   THRONOS_API_URL    = https://api.thronoschain.org
 #   THR_ADDRESS        = your wallet address
 #   MINER_NAME         = optional display name
+#   MINER_WORKERS      = mining processes
 
 import argparse
 import hashlib
-import os
-import time
-import requests
 import json
+import multiprocessing as mp
+import os
+import queue
+import struct
 import sys
+import threading
+import time
+
+try:
+    import requests
+except ImportError:  # --benchmark runs without it
+    requests = None
 
 # Configuration (overridden by CLI args or env vars)
 THR_ADDRESS = os.getenv("THR_ADDRESS", "THR_PUT_YOUR_ADDRESS_HERE")
@@ -24,12 +39,189 @@ SERVER_URL   = os.getenv("THRONOS_API_URL",
                os.getenv("THRONOS_SERVER_URL",
                os.getenv("THRONOS_SERVER", "https://api.thronoschain.org")))
 MINER_NAME   = os.getenv("MINER_NAME", "")
+MINER_WORKERS = int(os.getenv("MINER_WORKERS", "0") or 0)
 SUBMIT_RETRIES    = int(os.getenv("THRONOS_SUBMIT_RETRIES", "3"))
 SUBMIT_RETRY_DELAY = float(os.getenv("THRONOS_SUBMIT_RETRY_DELAY", "2"))
+STREAM_TIMEOUT = 25
+STATUS_INTERVAL = 10
+
+LEGACY = "legacy"
+HEADER = "header"
+NONCE_SPACE = 1 << 32     # nonces per job: the 32-bit header nonce / one extranonce slice
+CHECK_EVERY = 4096        # hashes between stop-event checks and counter updates
+
+
+# ─── Hashing engine ───────────────────────────────────────────────────
+#
+# Both PoW paths hash a constant prefix followed by the nonce, so the prefix
+# is absorbed once into a sha256 state and copied for every nonce:
+#   legacy: sha256(prev_hash + address + str(nonce))
+#   header: sha256d(version|prev|merkle|time|nbits|nonce), compared reversed,
+#           with the first 64 header bytes hashed once (the midstate)
+
+def legacy_prefix(prev_hash, address):
+    return (prev_hash + address).encode()
+
+
+def header_prefix(version, prev_hash, merkle_root, ntime, nbits):
+    """The 76 header bytes before the nonce, laid out as the server builds them."""
+    return (
+        struct.pack("<I", version)
+        + bytes.fromhex(prev_hash)[::-1]
+        + bytes.fromhex(merkle_root)[::-1]
+        + struct.pack("<I", ntime)
+        + struct.pack("<I", nbits)
+    )
+
+
+def pow_hash(mode, prefix, nonce):
+    """Reference (non-midstate) PoW hash as hex, as the server computes it."""
+    if mode == HEADER:
+        digest = hashlib.sha256(hashlib.sha256(prefix + struct.pack("<I", nonce)).digest()).digest()
+        return digest[::-1].hex()
+    return hashlib.sha256(prefix + str(nonce).encode()).hexdigest()
+
+
+def scan(mode, prefix, target, start, stop, stop_event=None, progress=None):
+    """Search nonces [start, stop) for a hash <= target.
+
+    Returns (nonce, hash_hex) or None when the range is exhausted or
+    ``stop_event`` is set.  ``progress(n)`` is called every CHECK_EVERY hashes.
+    """
+    target_bytes = target.to_bytes(32, "big") if target < (1 << 256) else b"\xff" * 33
+    sha256 = hashlib.sha256
+    if mode == HEADER:
+        base = sha256(prefix[:64])
+        tail = prefix[64:]
+        pack = struct.Struct("<I").pack
+    else:
+        base = sha256(prefix)
+    nonce = start
+    while nonce < stop:
+        if stop_event is not None and stop_event.is_set():
+            return None
+        end = min(stop, nonce + CHECK_EVERY)
+        if mode == HEADER:
+            for n in range(nonce, end):
+                h = base.copy()
+                h.update(tail + pack(n))
+                digest = sha256(h.digest()).digest()[::-1]
+                if digest <= target_bytes:
+                    return n, digest.hex()
+        else:
+            for n in range(nonce, end):
+                h = base.copy()
+                h.update(str(n).encode())
+                digest = h.digest()
+                if digest <= target_bytes:
+                    return n, digest.hex()
+        if progress is not None:
+            progress(end - nonce)
+        nonce = end
+    return None
+
+
+def _scan_worker(index, mode, prefix, target, start, stop, stop_event, found, counters):
+    def progress(n):
+        counters[index] += n
+
+    result = scan(mode, prefix, target, start, stop, stop_event, progress)
+    if result is not None:
+        found.put((index,) + result)
+
+
+class MiningEngine:
+    """Splits a nonce range across worker processes sharing one stop event."""
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.stop_event = mp.Event()
+        self.rates = [0.0] * self.workers
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self, mode, prefix, target, start=0, span=NONCE_SPACE,
+            should_stop=None, max_seconds=None, report=None):
+        """Mine until a worker finds a nonce, the range runs out, ``should_stop()``
+        is true or ``max_seconds`` pass.  Returns (nonce, hash_hex) or None;
+        ``self.rates`` holds each worker's H/s afterwards."""
+        self.stop_event.clear()
+        counters = mp.Array("Q", self.workers, lock=False)
+        found = mp.Queue()
+        chunk = span // self.workers
+        procs = []
+        for i in range(self.workers):
+            lo = start + i * chunk
+            hi = start + span if i == self.workers - 1 else lo + chunk
+            proc = mp.Process(
+                target=_scan_worker,
+                args=(i, mode, prefix, target, lo, hi, self.stop_event, found, counters),
+                daemon=True,
+            )
+            proc.start()
+            procs.append(proc)
+        began = last_report = time.time()
+        result = None
+        try:
+            while True:
+                try:
+                    _, nonce, digest = found.get(timeout=0.2)
+                    result = (nonce, digest)
+                    break
+                except queue.Empty:
+                    pass
+                now = time.time()
+                if should_stop is not None and should_stop():
+                    break
+                if max_seconds is not None and now - began >= max_seconds:
+                    break
+                if not any(p.is_alive() for p in procs):
+                    try:
+                        _, nonce, digest = found.get(timeout=0.2)
+                        result = (nonce, digest)
+                    except queue.Empty:
+                        pass
+                    break
+                if report is not None and now - last_report >= STATUS_INTERVAL:
+                    report([c / (now - began) for c in counters])
+                    last_report = now
+        finally:
+            self.stop_event.set()
+            for proc in procs:
+                proc.join(2)
+                if proc.is_alive():
+                    proc.terminate()
+            elapsed = max(time.time() - began, 1e-9)
+            self.rates = [c / elapsed for c in counters]
+        return result
+
+
+def format_rates(rates):
+    per_worker = " ".join(f"w{i}={r / 1000:.1f}k" for i, r in enumerate(rates))
+    return f"{sum(rates) / 1000:.1f} kH/s ({per_worker})"
+
 
-def get_mining_work():
-    """Fetches mining work (job_id, target, prev_hash, height)."""
+# ─── Work and submission ──────────────────────────────────────────────
+
+def get_mining_work(since=None):
+    """Fetches mining work (job_id, target, prev_hash, height, extranonce).
+
+    Long-polls /api/mining/work/stream when ``since`` (the current job id) is
+    given, so a new job arrives as soon as the tip changes; falls back to
+    /api/miner/work on servers without the stream endpoint.
+    """
     try:
+        if since is not None:
+            r = requests.get(
+                f"{SERVER_URL}/api/mining/work/stream",
+                params={"address": THR_ADDRESS, "since": since, "timeout": STREAM_TIMEOUT},
+                timeout=STREAM_TIMEOUT + 10,
+            )
+            if r.status_code != 404:
+                r.raise_for_status()
+                return r.json()
+            time.sleep(STREAM_TIMEOUT)
         r = requests.get(
             f"{SERVER_URL}/api/miner/work",
             params={"address": THR_ADDRESS},
@@ -48,25 +240,66 @@ def get_mining_work():
         print(f"❌ Unexpected error fetching work: {e}")
         return None
 
-def mine_block(work):
+
+class WorkWatcher(threading.Thread):
+    """Follows the job stream and stops the engine when the job changes."""
+
+    def __init__(self, engine, work):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.job_id = work.get("job_id")
+        self.expires_at = work.get("expires_at")
+        self.new_work = None
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            work = get_mining_work(since=self.job_id)
+            if self._done.is_set():
+                return
+            if not work:
+                time.sleep(5)
+                continue
+            if work.get("job_id") != self.job_id:
+                self.new_work = work
+                self.engine.stop()
+                return
+
+    def changed(self):
+        return self.new_work is not None
+
+    def close(self):
+        self._done.set()
+
+
+def _header_merkle_root(extranonce, extranonce2):
+    """Coinbase stand-in: binds the header to this miner and extranonce."""
+    coinbase = f"{THR_ADDRESS}:{extranonce}:{extranonce2}".encode()
+    return hashlib.sha256(hashlib.sha256(coinbase).digest()).digest()[::-1].hex()
+
+
+def mine_block(work, engine, mode=LEGACY):
     """
-    CPU mining with dynamic difficulty:
-    - Fetches target from server
-    - Tries nonces until hash < target
+    Mine one job across all workers:
+    - legacy: nonces start at the job's nonce_base (this miner's extranonce)
+      and move on by NONCE_SPACE when a range runs out
+    - header: the 32-bit nonce space is searched per merkle root, and the
+      extranonce2 is bumped when it runs out
+    Returns (block, next_work): next_work is set when the job changed.
     """
     if not work:
         print("⚠️ Could not fetch mining work. Retrying...")
-        return None
+        return None, None
 
     target_hex = work.get("target", "0xffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff")
     target = int(target_hex, 16)
     reward = work.get("reward", 0)
     job_id = work.get("job_id")
-    expires_at = work.get("expires_at")
-    
-    print(f"⛏️  Starting mining for {THR_ADDRESS}")
     last_hash = work.get("prev_hash") or "0" * 64
     tip_height = work.get("height")
+    extranonce = work.get("extranonce") or "00000000"
+
+    print(f"⛏️  Starting mining for {THR_ADDRESS} ({engine.workers} workers, {mode})")
     print(f"   Last Hash: {last_hash[:16]}...")
     print(f"   Target:    {target_hex[:16]}...")
     if reward:
@@ -74,44 +307,62 @@ def mine_block(work):
     if job_id:
         print(f"   Job ID:    {job_id}")
 
-    nonce = 0
+    watcher = WorkWatcher(engine, work)
+    watcher.start()
     start = time.time()
-    last_status_time = start
-    
-    while True:
-        # Refresh info every 30 seconds or if block found elsewhere
-        if expires_at and time.time() >= float(expires_at):
-            print("🔄 Work expired. Restarting mining...")
-            return None
+    report = lambda rates: print(f"[{THR_ADDRESS}] {format_rates(rates)}")
+    nbits = int(str(work.get("nbits") or "0x1d00ffff"), 16)
+    nonce_base = int(work.get("nonce_base") or 0)
+    block = None
+    rounds = 0
+    try:
+        while block is None and not watcher.changed():
+            block = {"thr_address": THR_ADDRESS, "prev_hash": last_hash, "job_id": job_id}
+            if mode == HEADER:
+                ntime = int(time.time())
+                merkle_root = _header_merkle_root(extranonce, rounds)
+                found = engine.run(HEADER, header_prefix(1, last_hash, merkle_root, ntime, nbits), target,
+                                   should_stop=watcher.changed, report=report)
+                block.update(merkle_root=merkle_root, time=ntime, nbits=nbits, version=1)
+            else:
+                found = engine.run(LEGACY, legacy_prefix(last_hash, THR_ADDRESS), target,
+                                   start=nonce_base + rounds * NONCE_SPACE,
+                                   should_stop=watcher.changed, report=report)
+            if found:
+                block["nonce"], block["pow_hash"] = found
+            else:
+                block = None
+            rounds += 1
+    finally:
+        watcher.close()
+
+    if block is None:
+        if watcher.changed():
+            print("🔄 New job from server. Restarting mining...")
+        return None, watcher.new_work
+    duration = time.time() - start
+    print(f"✅ Found valid nonce in {duration:.1f}s — {format_rates(engine.rates)}")
+    print(f"   Hash: {block['pow_hash']}")
+    if tip_height is not None:
+        block["height"] = int(tip_height)
+    return block, None
+
+
+def report_outcome(submission_id):
+    """Waits for the queued submission's outcome and prints it."""
+    try:
+        r = requests.get(f"{SERVER_URL}/api/miner/submit/{submission_id}", params={"wait": 20}, timeout=30)
+        if r.status_code != 200:
+            return
+        data = r.json()
+    except Exception:
+        return
+    status = data.get("status")
+    if status == "accepted":
+        print(f"🏆 Block accepted at height {data.get('height')}")
+    elif status != "queued":
+        print(f"⚠️ Block {status}: {data.get('reason') or ''}")
 
-        nonce_str = str(nonce).encode()
-        data = (last_hash + THR_ADDRESS).encode() + nonce_str
-        h_hex = hashlib.sha256(data).hexdigest()
-        h_int = int(h_hex, 16)
-
-        if time.time() - last_status_time > 10:
-            elapsed = time.time() - start
-            hashrate = nonce / elapsed if elapsed > 0 else 0
-            print(f"[{THR_ADDRESS}] nonce={nonce} hash={h_hex[:16]}... ({hashrate:.1f} H/s)")
-            last_status_time = time.time()
-
-        if h_int <= target:
-            duration = time.time() - start
-            print(f"✅ Found valid nonce after {nonce} tries in {duration:.1f}s")
-            print(f"   Hash: {h_hex}")
-            block = {
-                "thr_address": THR_ADDRESS,
-                "nonce": nonce,
-                "pow_hash": h_hex,
-                "prev_hash": last_hash,
-                "job_id": job_id,
-            }
-            if tip_height is not None:
-                block["height"] = int(tip_height)
-            return block
-
-        nonce += 1
-        # time.sleep(0.0001) 
 
 def submit_block(block):
     """Submits the mined block to the server."""
@@ -129,6 +380,8 @@ def submit_block(block):
                 message = data.get("message", "") or data.get("status", "")
                 if r.status_code == 202 or "queued" in message.lower():
                     print("Submission accepted: block queued for processing")
+                    if data.get("submission_id"):
+                        report_outcome(data["submission_id"])
                 else:
                     print(f"📬 Submission successful: {data}")
                 return True
@@ -154,6 +407,30 @@ def submit_block(block):
             print(f"❌ Error submitting block: {e}")
             return False
 
+
+# ─── Benchmark ────────────────────────────────────────────────────────
+
+BENCH_PREV_HASH = "00000000" + "ab" * 28
+BENCH_ADDRESS = "THR" + "0" * 37
+BENCH_MERKLE_ROOT = "cd" * 32
+
+
+def benchmark(workers, seconds, modes):
+    """H/s against a fixed, unsolvable job — comparable across runs and machines."""
+    engine = MiningEngine(workers)
+    results = {}
+    for mode in modes:
+        if mode == HEADER:
+            prefix = header_prefix(1, BENCH_PREV_HASH, BENCH_MERKLE_ROOT, 1700000000, 0x1d00ffff)
+        else:
+            prefix = legacy_prefix(BENCH_PREV_HASH, BENCH_ADDRESS)
+        engine.run(mode, prefix, 0, max_seconds=seconds)
+        results[mode] = {"hashrate": round(sum(engine.rates), 1), "workers": [round(r, 1) for r in engine.rates]}
+        print(f"{mode:>6}: {format_rates(engine.rates)}")
+    print(json.dumps({"benchmark": results, "seconds": seconds, "workers": engine.workers}))
+    return results
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Thronos CPU PoW Miner")
     parser.add_argument("--address", "--addr", dest="address",
@@ -161,10 +438,25 @@ if __name__ == "__main__":
     parser.add_argument("--api", dest="api",
                         help="Thronos API URL (default: https://api.thronoschain.org)")
     parser.add_argument("--name", dest="name", help="Optional miner name")
+    parser.add_argument("--workers", type=int, default=MINER_WORKERS or None,
+                        help="Mining processes (default: one per CPU core)")
+    parser.add_argument("--mode", choices=(LEGACY, HEADER), default=LEGACY,
+                        help="PoW path: legacy sha256 or sha256d block header")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Report H/s against a fixed job, offline")
+    parser.add_argument("--seconds", type=float, default=10, help="Benchmark duration per mode")
     # Legacy positional arg: python pow_miner_cpu.py THR...
     parser.add_argument("address_pos", nargs="?", help=argparse.SUPPRESS)
     args = parser.parse_args()
 
+    if args.benchmark:
+        benchmark(args.workers, args.seconds, (LEGACY, HEADER))
+        sys.exit(0)
+
+    if requests is None:
+        print("⚠️  Please install requests:  pip install requests")
+        sys.exit(1)
+
     if args.address:
         THR_ADDRESS = args.address
     elif args.address_pos:
@@ -184,20 +476,22 @@ if __name__ == "__main__":
         print("   Or set env: THR_ADDRESS=THR... THRONOS_API_URL=https://api.thronoschain.org")
         sys.exit(1)
 
+    engine = MiningEngine(args.workers)
     print(f"🚀 Thronos CPU Miner started")
     print(f"   Address : {THR_ADDRESS}")
     print(f"   Server  : {SERVER_URL}")
+    print(f"   Workers : {engine.workers} ({args.mode})")
     if MINER_NAME:
         print(f"   Name    : {MINER_NAME}")
 
+    work = None
     while True:
-        work = get_mining_work()
+        work = work or get_mining_work()
         if work:
-            mined_block = mine_block(work)
+            mined_block, work = mine_block(work, engine, args.mode)
             if mined_block:
                 if not submit_block(mined_block):
                     time.sleep(1)
-            time.sleep(2)
         else:
             print("⏳ Waiting for server connection...")
             time.sleep(5)
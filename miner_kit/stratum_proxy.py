@@ -1,407 +1,527 @@
-import socket
-import threading
-import json
-import time
-import requests
-import struct
-import binascii
+"""
+Thronos Stratum Proxy — bridges stratum v1 miners (ASIC, USB sticks, GPU
+miners) to the Thronos HTTP mining API.
+
+One asyncio loop serves every downstream miner:
+
+  * a single keep-alive HTTP session follows ``/api/mining/work/stream``
+    (falling back to polling ``/api/mining/work`` on older servers), and
+    each new job is fanned out to all miners as one ``mining.notify``
+  * every miner gets its own extranonce1, so their headers never overlap
+  * shares are checked locally against the share target
+    (``SHARE_TARGET_MULTIPLIER`` x the block target); only block
+    candidates go upstream
+  * block candidates are batched through one submitter: identical headers
+    are sent once, and once a block is accepted for a tip the remaining
+    candidates on that tip are answered stale without a round-trip
+  * local stats (clients, shares/s, stale rate, upstream latency) are
+    printed every ``STATS_INTERVAL`` seconds and served as JSON on
+    ``http://127.0.0.1:STATS_PORT/``
+
+Usage:
+    pip install requests
+    python stratum_proxy.py        # then point miners at 127.0.0.1:3334
+"""
+
+import asyncio
 import hashlib
+import json
 import os
 import random
+import struct
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import requests
+except ImportError:  # checked in start_server(); tests inject their own upstream
+    requests = None
 
 # Configuration
 STRATUM_PORT = int(os.getenv("STRATUM_PORT", "3334"))
-DEFAULT_HTTP_PORT = os.getenv("PORT", "8000")
-if str(DEFAULT_HTTP_PORT) == str(STRATUM_PORT):
-    DEFAULT_HTTP_PORT = "8000"
+STATS_PORT = int(os.getenv("STATS_PORT", str(STRATUM_PORT + 1)))
 THRONOS_SERVER = os.getenv("THRONOS_SERVER", "https://thrchain.up.railway.app")
 STRATUM_PROXY_ADDRESS = os.getenv("STRATUM_PROXY_ADDRESS", "")
-POLL_INTERVAL = 1.0
 SHARE_TARGET_MULTIPLIER = float(os.getenv("SHARE_TARGET_MULTIPLIER", "16"))
-MAX_TARGET = int("f" * 64, 16)
-JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "10"))
+STREAM_TIMEOUT = float(os.getenv("STREAM_TIMEOUT", "25"))
+POLL_INTERVAL = 1.0
+BATCH_WINDOW = float(os.getenv("SUBMIT_BATCH_SECONDS", "0.05"))
+STATS_INTERVAL = float(os.getenv("STATS_INTERVAL", "60"))
+
+MAX_TARGET = (1 << 256) - 1
+DIFF1_TARGET = 0xFFFF << 208
+EXTRANONCE2_SIZE = 4
+KEEP_JOBS = 4
+MAX_LINE = 16 * 1024
+MAX_WRITE_BUFFER = 256 * 1024
+RATE_WINDOW = 60.0
+
+ERR_OTHER = 20
+ERR_STALE = 21
+ERR_DUPLICATE = 22
+ERR_LOW_DIFFICULTY = 23
+ERR_UNAUTHORIZED = 24
+ERR_NOT_SUBSCRIBED = 25
 
-# Global State
-current_job = None
-job_id_counter = 0
-clients = []
-lock = threading.Lock()
-last_prev_hash = None
-last_block_cache = None
 
 def sha256d(data):
     return hashlib.sha256(hashlib.sha256(data).digest()).digest()
 
-def hex_to_bytes(h):
-    return binascii.unhexlify(h)
 
-def bytes_to_hex(b):
-    return binascii.hexlify(b).decode()
+def swap32(data):
+    """Reverse the bytes of every 4-byte word (stratum's prevhash encoding)."""
+    return b"".join(data[i:i + 4][::-1] for i in range(0, len(data), 4))
+
+
+def _as_int(value, default):
+    if value is None:
+        return default
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def miner_address(worker):
+    """THR address of a ``THRaddress.rig`` worker name, else the proxy's own."""
+    address = (worker or "").split(".", 1)[0].strip()
+    return address if address.startswith("THR") else STRATUM_PROXY_ADDRESS
 
-def reverse_bytes(h):
-    """Reverses hex string byte-wise (for LE/BE conversion)."""
-    b = hex_to_bytes(h)
-    return bytes_to_hex(b[::-1])
 
 class Job:
-    def __init__(
-        self,
-        job_id,
-        prev_hash,
-        coinb1,
-        coinb2,
-        merkle_branch,
-        version,
-        nbits,
-        ntime,
-        clean_jobs,
-        height,
-        block_target,
-        fetched_at,
-    ):
-        self.job_id = job_id
-        self.prev_hash = prev_hash
-        self.coinb1 = coinb1
-        self.coinb2 = coinb2
-        self.merkle_branch = merkle_branch
-        self.version = version
-        self.nbits = nbits
-        self.ntime = ntime
-        self.clean_jobs = clean_jobs
-        self.height = height
-        self.block_target = block_target
-        self.fetched_at = fetched_at
-
-def get_mining_info():
-    global last_block_cache
-    try:
-        params = {"address": STRATUM_PROXY_ADDRESS} if STRATUM_PROXY_ADDRESS else None
-        r1 = requests.get(f"{THRONOS_SERVER}/api/mining/work", params=params, timeout=5)
-        r1.raise_for_status()
-        last_block = r1.json()
-        last_block_cache = last_block
-        return last_block
-    except Exception as e:
-        print(f"Error fetching mining info: {e}")
-        if last_block_cache:
-            print("Using cached mining info.")
-        return last_block_cache
-
-
-def _build_job(last_block):
-    global job_id_counter
-    prev_hash = last_block.get("prev_hash") or last_block.get("block_hash") or last_block.get("last_hash", "0" * 64)
-    tip_height = last_block.get("height")
-    target_hex = last_block.get("target")
-    block_target = int(target_hex, 16) if isinstance(target_hex, str) else MAX_TARGET
-    job_id = last_block.get("job_id")
-    if not job_id:
-        job_id_counter += 1
-        job_id = hex(job_id_counter)[2:]
-
-    prev_hash_be = reverse_bytes(prev_hash)
-
-    coinb1 = "01000000010000000000000000000000000000000000000000000000000000000000000000ffffffff0403"
-    coinb2 = "ffffffff0100f2052a010000001976a914123456789012345678901234567890123456789088ac00000000"
-
-    merkle_branch = []
-    version = "00000001"
-    nbits_hex = (last_block.get("nbits") or "1d00ffff").replace("0x", "")
-    nbits_hex = nbits_hex.zfill(8)
-    nbits_be = reverse_bytes(nbits_hex)
-
-    ntime = int(time.time())
-    ntime_hex = hex(ntime)[2:].zfill(8)
-    ntime_be = reverse_bytes(ntime_hex)
-
-    clean_jobs = True
-
-    return Job(
-        job_id,
-        prev_hash_be,
-        coinb1,
-        coinb2,
-        merkle_branch,
-        version,
-        nbits_be,
-        ntime_be,
-        clean_jobs,
-        tip_height,
-        block_target,
-        time.time(),
-    )
-
-def job_updater():
-    global current_job, last_prev_hash
-    
-    print(f"Stratum Proxy listening on 0.0.0.0:{STRATUM_PORT}")
-    print(f"Connected to Thronos Server at {THRONOS_SERVER}")
-    
-    while True:
-        last_block = get_mining_info()
-        if last_block:
-            prev_hash = last_block.get("prev_hash") or last_block.get("block_hash") or last_block.get("last_hash", "0" * 64)
-            job_age = time.time() - current_job.fetched_at if current_job else None
-            if prev_hash != last_prev_hash or (job_age is not None and job_age >= JOB_STALE_SECONDS):
-                with lock:
-                    current_job = _build_job(last_block)
-                    last_prev_hash = prev_hash
-                    nbits_hex = (last_block.get("nbits") or "1d00ffff").replace("0x", "").zfill(8)
-                    print(f"New Job #{current_job.job_id}: PrevHash={prev_hash[:8]}... nBits={nbits_hex}")
-                    notify_clients()
-                    
-        time.sleep(POLL_INTERVAL)
-
-def notify_clients():
-    if not current_job:
-        return
-        
-    params = [
-        current_job.job_id,
-        current_job.prev_hash,
-        current_job.coinb1,
-        current_job.coinb2,
-        current_job.merkle_branch,
-        current_job.version,
-        current_job.nbits,
-        current_job.ntime,
-        current_job.clean_jobs
-    ]
-    
-    msg = json.dumps({
-        "id": None,
-        "method": "mining.notify",
-        "params": params
-    }) + "\n"
-    
-    for c in clients:
+    """A downstream job built from one upstream work template."""
+
+    def __init__(self, template):
+        self.job_id = str(template.get("job_id") or f"{random.getrandbits(32):x}")
+        self.prev_hash = template.get("prev_hash") or template.get("last_hash") or "0" * 64
+        self.height = template.get("height")
+        self.block_target = _as_int(template.get("target"), MAX_TARGET)
+        self.share_target = min(int(self.block_target * SHARE_TARGET_MULTIPLIER), MAX_TARGET)
+        self.nbits = _as_int(template.get("nbits"), 0x1D00FFFF)
+        self.version = 1
+        self.ntime = int(time.time())
+        script = bytes([4]) + (self.height or 0).to_bytes(4, "little") + bytes([8]) + b"/thrprx/"
+        self.coinb1 = (
+            struct.pack("<I", 1) + b"\x01" + b"\x00" * 32 + b"\xff\xff\xff\xff"
+            + bytes([len(script) + 4 + EXTRANONCE2_SIZE]) + script
+        ).hex()
+        self.coinb2 = (b"\xff\xff\xff\xff" + b"\x01" + b"\x00" * 8 + b"\x00" + b"\x00" * 4).hex()
+        self._prev_internal = bytes.fromhex(self.prev_hash)[::-1]
+        self.shares = set()
+
+    @property
+    def difficulty(self):
+        return DIFF1_TARGET / max(self.share_target, 1)
+
+    def notify(self, clean):
+        params = [
+            self.job_id, swap32(self._prev_internal).hex(), self.coinb1, self.coinb2, [],
+            f"{self.version:08x}", f"{self.nbits:08x}", f"{self.ntime:08x}", clean,
+        ]
+        return {"id": None, "method": "mining.notify", "params": params}
+
+    def check(self, extranonce1, extranonce2, ntime, nonce):
+        """(pow hash as int, upstream payload minus the address)."""
+        root = sha256d(bytes.fromhex(self.coinb1 + extranonce1 + extranonce2 + self.coinb2))
+        header = (
+            struct.pack("<I", self.version) + self._prev_internal + root
+            + struct.pack("<I", ntime) + struct.pack("<I", self.nbits) + struct.pack("<I", nonce)
+        )
+        digest = sha256d(header)
+        payload = {
+            "job_id": self.job_id,
+            "nonce": nonce,
+            "merkle_root": root[::-1].hex(),
+            "prev_hash": self.prev_hash,
+            "time": ntime,
+            "nbits": self.nbits,
+            "version": self.version,
+            "pow_hash": digest[::-1].hex(),
+        }
+        if self.height is not None:
+            payload["height"] = int(self.height)
+        return int.from_bytes(digest, "little"), payload
+
+
+class HttpUpstream:
+    """The Thronos node over one keep-alive ``requests`` session."""
+
+    def __init__(self, server=THRONOS_SERVER, address=STRATUM_PROXY_ADDRESS, session=None):
+        self.server = server.rstrip("/")
+        self.address = address
+        self.session = session or requests.Session()
+        self.streaming = True
+
+    def fetch(self, since):
+        params = {"address": self.address} if self.address else {}
+        if self.streaming:
+            params["timeout"] = STREAM_TIMEOUT
+            if since:
+                params["since"] = since
+            r = self.session.get(f"{self.server}/api/mining/work/stream", params=params, timeout=STREAM_TIMEOUT + 10)
+            if r.status_code != 404:
+                r.raise_for_status()
+                return r.json()
+            print("[STRATUM] Server has no job stream; polling /api/mining/work")
+            self.streaming = False
+        time.sleep(POLL_INTERVAL if since else 0)
+        r = self.session.get(f"{self.server}/api/mining/work", params=params, timeout=10)
+        r.raise_for_status()
+        return r.json()
+
+    def submit(self, payload):
+        r = self.session.post(f"{self.server}/api/mining/submit", json=payload, timeout=15)
         try:
-            c.sendall(msg.encode())
-        except:
-            pass
+            body = r.json()
+        except ValueError:
+            body = {}
+        return r.status_code, body
 
 
-def refresh_job_from_server(force=False):
-    global current_job, last_prev_hash
-    last_block = get_mining_info()
-    if not last_block:
-        return
-    prev_hash = last_block.get("block_hash") or last_block.get("last_hash", "0" * 64)
-    with lock:
-        if force or prev_hash != last_prev_hash:
-            current_job = _build_job(last_block)
-            last_prev_hash = prev_hash
-            print(f"[STRATUM] Job refresh: PrevHash={prev_hash[:8]}...")
-            notify_clients()
-
-def handle_client(conn, addr):
-    print(f"Client connected: {addr}")
-    
-    # Extranonce1 generation (unique per client)
-    extranonce1 = hex(random.randint(0, 2**31))[2:].zfill(8)
-    extranonce2_size = 4
-    
-    thr_address = "UNKNOWN"
-    
-    f = conn.makefile('r')
-    
-    try:
-        for line in f:
-            if not line: break
+class Stats:
+    def __init__(self):
+        self.started = time.time()
+        self.accepted = 0
+        self.stale = 0
+        self.rejected = 0
+        self.duplicate = 0
+        self.blocks = 0
+        self.blocks_rejected = 0
+        self.upstream_submits = 0
+        self.upstream_deduped = 0
+        self.upstream_latency = None
+        self._recent = deque()
+
+    def share(self, now):
+        self.accepted += 1
+        self._recent.append(now)
+
+    def latency(self, seconds):
+        ms = seconds * 1000
+        self.upstream_latency = ms if self.upstream_latency is None else 0.8 * self.upstream_latency + 0.2 * ms
+
+    def snapshot(self, clients, job):
+        now = time.time()
+        while self._recent and now - self._recent[0] > RATE_WINDOW:
+            self._recent.popleft()
+        window = min(RATE_WINDOW, max(now - self.started, 1e-9))
+        total = self.accepted + self.stale + self.rejected + self.duplicate
+        return {
+            "clients": clients,
+            "job_id": job.job_id if job else None,
+            "height": job.height if job else None,
+            "shares_per_second": round(len(self._recent) / window, 3),
+            "accepted": self.accepted,
+            "stale": self.stale,
+            "rejected": self.rejected,
+            "duplicate": self.duplicate,
+            "stale_rate": round(self.stale / total, 4) if total else 0.0,
+            "blocks": self.blocks,
+            "blocks_rejected": self.blocks_rejected,
+            "upstream_submits": self.upstream_submits,
+            "upstream_deduped": self.upstream_deduped,
+            "upstream_latency_ms": round(self.upstream_latency, 1) if self.upstream_latency is not None else None,
+        }
+
+
+class ProxyError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class Client:
+    def __init__(self, writer, extranonce1):
+        self.writer = writer
+        self.extranonce1 = extranonce1
+        self.subscribed = False
+        self.worker = None
+        self.address = None
+        self.difficulty = None
+        self.task = None
+
+    def send(self, message):
+        if self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            print("[STRATUM] Dropping slow client")
+            self.writer.close()
+            return
+        self.writer.write(json.dumps(message).encode() + b"\n")
+
+    def push(self, job, clean):
+        if self.difficulty != job.difficulty:
+            self.difficulty = job.difficulty
+            self.send({"id": None, "method": "mining.set_difficulty", "params": [job.difficulty]})
+        self.send(job.notify(clean))
+
+
+class StratumProxy:
+    """Downstream stratum server fed by one upstream (``fetch``/``submit``)."""
+
+    def __init__(self, upstream, host="0.0.0.0", port=STRATUM_PORT, stats_port=STATS_PORT,
+                 batch_window=BATCH_WINDOW):
+        self.upstream = upstream
+        self.host = host
+        self.port = port
+        self.stats_port = stats_port
+        self.batch_window = batch_window
+        self.clients = set()
+        self.jobs = OrderedDict()
+        self.stats = Stats()
+        self._extranonce = random.getrandbits(32)
+        self._since = None
+        self._pending = None
+        self._inflight = {}
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upstream")
+        self._servers = []
+        self._tasks = []
+
+    @property
+    def job(self):
+        return next(reversed(self.jobs.values())) if self.jobs else None
+
+    # ─── lifecycle ──────────────────────────────────────────────────────
+
+    async def start(self):
+        self._pending = asyncio.Queue()
+        server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_LINE, backlog=512)
+        self.port = server.sockets[0].getsockname()[1]
+        self._servers.append(server)
+        if self.stats_port is not None:
+            stats = await asyncio.start_server(self._serve_stats, "127.0.0.1", self.stats_port)
+            self.stats_port = stats.sockets[0].getsockname()[1]
+            self._servers.append(stats)
+        self._tasks = [asyncio.ensure_future(c) for c in (self._job_loop(), self._submit_loop(), self._stats_loop())]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        handlers = [c.task for c in self.clients if c.task]
+        for server in self._servers:
+            server.close()
+        for client in list(self.clients):
+            client.writer.close()
+        if handlers:
+            await asyncio.wait(handlers, timeout=5)
+        for server in self._servers:
+            await server.wait_closed()
+        self._pool.shutdown(wait=False)
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Stratum Proxy listening on {self.host}:{self.port} (stats on 127.0.0.1:{self.stats_port})")
+        print(f"Connected to Thronos Server at {getattr(self.upstream, 'server', '?')}")
+        await asyncio.gather(*self._tasks)
+
+    # ─── upstream ───────────────────────────────────────────────────────
+
+    async def _job_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
             try:
-                req = json.loads(line)
-            except:
+                template = await loop.run_in_executor(self._pool, self.upstream.fetch, self._since)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error fetching mining info: {e}")
+                await asyncio.sleep(2)
                 continue
-                
-            msg_id = req.get("id")
-            method = req.get("method")
-            params = req.get("params", [])
-            
-            response = None
-            
+            if template and template.get("job_id") != self._since:
+                self._since = template.get("job_id")
+                self.set_job(template)
+
+    def set_job(self, template):
+        """Make ``template`` the current job and fan it out to every miner."""
+        job = Job(template)
+        current = self.job
+        clean = current is None or current.prev_hash != job.prev_hash
+        if clean:
+            self.jobs.clear()
+        self.jobs[job.job_id] = job
+        while len(self.jobs) > KEEP_JOBS:
+            self.jobs.popitem(last=False)
+        for client in list(self.clients):
+            if client.subscribed:
+                client.push(job, clean)
+        print(f"New Job #{job.job_id}: PrevHash={job.prev_hash[:8]}... height={job.height} "
+              f"nBits={job.nbits:08x} -> {len(self.clients)} clients")
+        return job
+
+    async def _submit_loop(self):
+        """Send block candidates upstream in batches over the shared session."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._pending.get()]
+            await asyncio.sleep(self.batch_window)
+            while not self._pending.empty():
+                batch.append(self._pending.get_nowait())
+            solved = set()
+            for key, payload, future in batch:
+                job = self.jobs.get(payload["job_id"])
+                if payload["prev_hash"] in solved or job is None:
+                    self.stats.upstream_deduped += 1
+                    result = (409, {"error": "stale_block", "reason": "tip_moved"})
+                else:
+                    started = time.time()
+                    try:
+                        result = await loop.run_in_executor(self._pool, self.upstream.submit, payload)
+                    except Exception as e:
+                        result = (0, {"error": f"Server Error: {e}"})
+                    self.stats.upstream_submits += 1
+                    self.stats.latency(time.time() - started)
+                    if result[0] in (200, 201, 202):
+                        solved.add(payload["prev_hash"])
+                self._inflight.pop(key, None)
+                if not future.done():
+                    future.set_result(result)
+
+    def _queue_block(self, payload):
+        key = (payload["prev_hash"], payload["merkle_root"], payload["time"], payload["nonce"])
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats.upstream_deduped += 1
+            return future
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self._pending.put_nowait((key, payload, future))
+        return future
+
+    # ─── downstream ─────────────────────────────────────────────────────
+
+    async def _handle(self, reader, writer):
+        self._extranonce = (self._extranonce + 1) & 0xFFFFFFFF
+        client = Client(writer, f"{self._extranonce:08x}")
+        client.task = asyncio.current_task()
+        self.clients.add(client)
+        try:
+            while not writer.is_closing():
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+                try:
+                    req = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(req, dict):
+                    await self._dispatch(client, req)
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    async def _dispatch(self, client, req):
+        msg_id = req.get("id")
+        method = req.get("method")
+        params = req.get("params") or []
+        try:
             if method == "mining.subscribe":
-                # Return [ [ ["mining.set_difficulty", "subscription_id_1"], ["mining.notify", "subscription_id_2"] ], extranonce1, extranonce2_size ]
-                response = {
-                    "id": msg_id,
-                    "result": [
-                        [["mining.set_difficulty", "1"], ["mining.notify", "1"]],
-                        extranonce1,
-                        extranonce2_size
-                    ],
-                    "error": None
-                }
-                
+                client.subscribed = True
+                result = [[["mining.set_difficulty", client.extranonce1], ["mining.notify", client.extranonce1]],
+                          client.extranonce1, EXTRANONCE2_SIZE]
             elif method == "mining.authorize":
-                thr_address = params[0]
-                print(f"Miner Authorized: {thr_address}")
-                response = {
-                    "id": msg_id,
-                    "result": True,
-                    "error": None
-                }
-                # Send current job immediately
-                if current_job:
-                    notify_params = [
-                        current_job.job_id,
-                        current_job.prev_hash,
-                        current_job.coinb1,
-                        current_job.coinb2,
-                        current_job.merkle_branch,
-                        current_job.version,
-                        current_job.nbits,
-                        current_job.ntime,
-                        current_job.clean_jobs
-                    ]
-                    notify_msg = json.dumps({
-                        "id": None,
-                        "method": "mining.notify",
-                        "params": notify_params
-                    }) + "\n"
-                    conn.sendall(notify_msg.encode())
-                    
+                client.worker = str(params[0]) if params else ""
+                client.address = miner_address(client.worker)
+                if not client.address:
+                    raise ProxyError(ERR_UNAUTHORIZED, "worker must be a THR address (or set STRATUM_PROXY_ADDRESS)")
+                print(f"Miner Authorized: {client.worker}")
+                result = True
             elif method == "mining.submit":
-                # params: worker_name, job_id, extranonce2, ntime, nonce
-                if len(params) >= 5:
-                    if current_job and time.time() - current_job.fetched_at > JOB_STALE_SECONDS:
-                        refresh_job_from_server(force=True)
-                        response = {"id": msg_id, "result": False, "error": [21, "Stale Job", None]}
-                        conn.sendall((json.dumps(response) + "\n").encode())
-                        continue
-                    job_id_sub = params[1]
-                    extranonce2 = params[2]
-                    ntime_hex = params[3]
-                    nonce_hex = params[4]
-                    
-                    if current_job and job_id_sub == current_job.job_id:
-                        # Reconstruct block to calculate Merkle Root
-                        # Coinbase = coinb1 + extranonce1 + extranonce2 + coinb2
-                        coinbase_hex = current_job.coinb1 + extranonce1 + extranonce2 + current_job.coinb2
-                        coinbase_bin = hex_to_bytes(coinbase_hex)
-                        
-                        # Calculate Merkle Root (Double SHA256 of coinbase)
-                        merkle_root_bin = sha256d(coinbase_bin)
-                        merkle_root_hex = bytes_to_hex(merkle_root_bin)
-                        
-                        # Prepare submission for Thronos Server
-                        # Server expects: thr_address, nonce (int), merkle_root (hex), prev_hash (hex), time (int), nbits (int), version
-                        
-                        # Convert nonce hex to int
-                        nonce_int = int(nonce_hex, 16)
-                        
-                        # Convert ntime hex to int
-                        ntime_int = int(ntime_hex, 16)
-                        
-                        # nbits is stored in current_job as BE hex string. 
-                        # Server expects integer representation of the compact bits? 
-                        # Or just the bits value. Let's send the integer value of the bits field.
-                        # current_job.nbits is BE hex (e.g. "1d00ffff" -> reversed "ffff001d")
-                        # Wait, reverse_bytes("1d00ffff") -> "ffff001d".
-                        # We need to send the original "1d00ffff" integer value to server?
-                        # Server: `header += struct.pack("<I", nbits)`
-                        # So server expects the integer that, when packed LE, matches the header bits.
-                        # The header bits are usually "1d00ffff" (0x1d00ffff).
-                        # 0x1d00ffff packed LE is ff ff 00 1d.
-                        # So we should send int(0x1d00ffff).
-                        # current_job.nbits is "ffff001d" (BE of "1d00ffff").
-                        # So we reverse it back to get "1d00ffff".
-                        nbits_orig_hex = reverse_bytes(current_job.nbits)
-                        nbits_int = int(nbits_orig_hex, 16)
-                        
-                        # Prev Hash: Server expects hex string.
-                        # current_job.prev_hash is BE (reversed). We need to reverse it back to LE/Server format.
-                        prev_hash_server = reverse_bytes(current_job.prev_hash)
-                        
-                        header  = struct.pack("<I", 1)
-                        header += bytes.fromhex(prev_hash_server)[::-1]
-                        header += bytes.fromhex(merkle_root_hex)[::-1]
-                        header += struct.pack("<I", ntime_int)
-                        header += struct.pack("<I", nbits_int)
-                        header += struct.pack("<I", nonce_int)
-                        pow_hash_hex = sha256d(header)[::-1].hex()
-                        pow_int = int(pow_hash_hex, 16)
-
-                        block_target = current_job.block_target or MAX_TARGET
-                        share_target = min(int(block_target * SHARE_TARGET_MULTIPLIER), MAX_TARGET)
-
-                        if pow_int > share_target:
-                            response = {"id": msg_id, "result": False, "error": [23, "low_difficulty_share", None]}
-                            print(f"[STRATUM] Low difficulty share job={job_id_sub} hash={pow_hash_hex[:12]}...")
-                        else:
-                            payload = {
-                                "thr_address": thr_address,
-                                "nonce": nonce_int,
-                                "job_id": current_job.job_id,
-                                "merkle_root": merkle_root_hex,
-                                "prev_hash": prev_hash_server,
-                                "time": ntime_int,
-                                "nbits": nbits_int,
-                                "version": 1,
-                                "pow_hash": pow_hash_hex,
-                            }
-                            if current_job.height is not None:
-                                payload["height"] = int(current_job.height)
-
-                            if pow_int <= block_target:
-                                print(f"Submitting block candidate: Nonce={nonce_int} Merkle={merkle_root_hex[:8]}")
-                                try:
-                                    r = requests.post(f"{THRONOS_SERVER}/api/mining/submit", json=payload, timeout=5)
-                                    try:
-                                        res_json = r.json()
-                                    except Exception:
-                                        res_json = {}
-                                    # 200/201 = immediate accept, 202 = queued for processing
-                                    if r.status_code in (200, 201, 202):
-                                        msg = res_json.get("message", "") or res_json.get("status", "")
-                                        if r.status_code == 202 or "queued" in msg.lower():
-                                            print("✅ Block accepted: queued for processing")
-                                        else:
-                                            print("✅ Block Accepted!")
-                                        response = {"id": msg_id, "result": True, "error": None}
-                                        refresh_job_from_server(force=True)
-                                    else:
-                                        if res_json.get("error") == "stale_block":
-                                            print(f"[STRATUM] Stale share: job={job_id_sub} submitted_height={res_json.get('submitted_height')} tip_height={res_json.get('tip_height')}")
-                                            refresh_job_from_server(force=True)
-                                            response = {"id": msg_id, "result": False, "error": [21, "Stale Job", None]}
-                                        else:
-                                            print(f"❌ Block Rejected: {res_json.get('error')}")
-                                            response = {"id": msg_id, "result": False, "error": [20, res_json.get('error'), None]}
-                                except Exception as e:
-                                    print(f"Submission Error: {e}")
-                                    response = {"id": msg_id, "result": False, "error": [21, "Server Error", None]}
-                            else:
-                                print(f"[STRATUM] Share accepted (not block) job={job_id_sub} hash={pow_hash_hex[:12]}...")
-                                response = {"id": msg_id, "result": True, "error": None}
-                    else:
-                        response = {"id": msg_id, "result": False, "error": [21, "Stale Job", None]}
-            
-            if response:
-                conn.sendall((json.dumps(response) + "\n").encode())
-                
-    except Exception as e:
-        print(f"Client Error: {e}")
-    finally:
-        conn.close()
-        if conn in clients:
-            clients.remove(conn)
+                result = await self._submit(client, params)
+            elif method == "mining.extranonce.subscribe":
+                result = False
+            else:
+                raise ProxyError(ERR_OTHER, f"unknown method {method}")
+        except ProxyError as e:
+            client.send({"id": msg_id, "result": None, "error": [e.code, e.message, None]})
+            return
+        client.send({"id": msg_id, "result": result, "error": None})
+        if method == "mining.authorize" and self.job is not None:
+            client.push(self.job, True)
+
+    def _reject(self, counter, code, message):
+        setattr(self.stats, counter, getattr(self.stats, counter) + 1)
+        raise ProxyError(code, message)
+
+    async def _submit(self, client, params):
+        if not client.subscribed:
+            raise ProxyError(ERR_NOT_SUBSCRIBED, "not subscribed")
+        if not client.address:
+            raise ProxyError(ERR_UNAUTHORIZED, "unauthorized worker")
+        try:
+            _, job_id, extranonce2, ntime_hex, nonce_hex = (str(p) for p in params[:5])
+            ntime, nonce = int(ntime_hex, 16), int(nonce_hex, 16)
+            if len(extranonce2) != 2 * EXTRANONCE2_SIZE or nonce >= 1 << 32 or ntime >= 1 << 32:
+                raise ValueError
+            bytes.fromhex(extranonce2)
+        except ValueError:
+            self._reject("rejected", ERR_OTHER, "malformed share")
+        job = self.jobs.get(job_id)
+        if job is None:
+            self._reject("stale", ERR_STALE, "Stale Job")
+        key = (client.extranonce1, extranonce2, ntime, nonce)
+        if key in job.shares:
+            self._reject("duplicate", ERR_DUPLICATE, "duplicate share")
+        value, payload = job.check(client.extranonce1, extranonce2, ntime, nonce)
+        if value > job.share_target:
+            self._reject("rejected", ERR_LOW_DIFFICULTY, "low_difficulty_share")
+        job.shares.add(key)
+        if value > job.block_target:
+            self.stats.share(time.time())
+            return True
+
+        payload["thr_address"] = client.address
+        print(f"Submitting block candidate: Nonce={nonce} Merkle={payload['merkle_root'][:8]}")
+        status, body = await self._queue_block(payload)
+        if status in (200, 201, 202):
+            print("✅ Block accepted: queued for processing" if status == 202 else "✅ Block Accepted!")
+            self.stats.blocks += 1
+            self.stats.share(time.time())
+            return True
+        self.stats.blocks_rejected += 1
+        if status == 409 or body.get("error") in ("stale_block", "stale_job"):
+            print(f"[STRATUM] Stale block: job={job_id} tip_height={body.get('tip_height')}")
+            self._reject("stale", ERR_STALE, "Stale Job")
+        print(f"❌ Block Rejected: {body.get('error')}")
+        self._reject("rejected", ERR_OTHER, str(body.get("error") or "block rejected"))
+
+    # ─── stats ──────────────────────────────────────────────────────────
+
+    def snapshot(self):
+        return self.stats.snapshot(len(self.clients), self.job)
+
+    async def _serve_stats(self, reader, writer):
+        try:
+            await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            body = json.dumps(self.snapshot()).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n"
+                         + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stats_loop(self):
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            s = self.snapshot()
+            print(f"[STATS] clients={s['clients']} shares/s={s['shares_per_second']} "
+                  f"stale={s['stale_rate']:.2%} blocks={s['blocks']} upstream_ms={s['upstream_latency_ms']}")
+
 
 def start_server():
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    server.bind(("0.0.0.0", STRATUM_PORT))
-    server.listen(5)
-    
-    # Start Job Updater
-    t = threading.Thread(target=job_updater)
-    t.daemon = True
-    t.start()
-    
-    while True:
-        conn, addr = server.accept()
-        clients.append(conn)
-        t_client = threading.Thread(target=handle_client, args=(conn, addr))
-        t_client.daemon = True
-        t_client.start()
+    if requests is None:
+        raise SystemExit("The stratum proxy needs the requests package: pip install requests")
+    proxy = StratumProxy(HttpUpstream())
+    try:
+        asyncio.run(proxy.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
 
 if __name__ == "__main__":
     start_server()
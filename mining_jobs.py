@@ -0,0 +1,179 @@
+"""
+ThronosChain Mining Jobs — shared job templates with change notification
+
+Every ``/api/mining/work`` call used to mint a new job id, prune the job
+cache and re-read the tip snapshot and target, and a miner only learned
+about a new tip on its next poll.  ``JobBoard`` keeps one template per
+(prev_hash, target) instead:
+
+  * the template is rebuilt when ``invalidate`` is called (the tip moved)
+    or at most every ``recheck`` seconds; a new job id is published only
+    when the (prev_hash, target) key changes
+  * every miner gets the shared template plus its own ``extranonce``, so
+    miners working the same template search disjoint nonce ranges
+  * ``wait(since, timeout)`` blocks until the current job differs from
+    ``since`` (a tip hash or a job id) or an ``until`` predicate holds —
+    the primitive behind the long-poll / SSE ``/api/mining/work/stream``
+    endpoint
+  * a superseded template stays resolvable for ``grace`` seconds, so work
+    on it is answered as stale rather than as an unknown job
+"""
+
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+EXTRANONCE_BYTES = 4
+
+
+class JobBoard:
+    """One shared mining template per (prev_hash, target), with waiters."""
+
+    def __init__(
+        self,
+        build: Callable[[], dict],
+        grace: float = 20.0,
+        recheck: float = 1.0,
+        max_miners: int = 65536,
+    ):
+        self._build = build
+        self.grace = float(grace)
+        self.recheck = float(recheck)
+        self.max_miners = max(1, int(max_miners))
+        self._cond = threading.Condition()
+        self._current: Optional[dict] = None
+        self._stale = True
+        self._checked_at = 0.0
+        # job_id -> template; superseded ones also have an expiry in _retired
+        self._jobs: dict = {}
+        self._retired: "OrderedDict[str, float]" = OrderedDict()
+        self._extranonces: "OrderedDict[str, str]" = OrderedDict()
+        self._next_extranonce = secrets.randbits(8 * EXTRANONCE_BYTES)
+        self.seq = 0
+        self.counters = {"templates": 0, "served": 0}
+
+    # ─── templates ──────────────────────────────────────────────────────
+
+    def invalidate(self) -> None:
+        """The tip moved: rebuild on the next read and wake waiters."""
+        with self._cond:
+            self._stale = True
+            self._cond.notify_all()
+
+    def wake(self) -> None:
+        """Re-check waiters' ``until`` predicates without rebuilding."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def current(self, now: Optional[float] = None) -> dict:
+        """The current template (shared; callers must not mutate it)."""
+        now = time.time() if now is None else now
+        with self._cond:
+            if self._current is None or self._stale or now - self._checked_at >= self.recheck:
+                self._refresh(now)
+            return self._current
+
+    def _refresh(self, now: float) -> None:
+        fields = self._build()
+        self._stale = False
+        self._checked_at = now
+        current = self._current
+        if current is not None and (fields.get("prev_hash"), fields.get("target")) == (
+            current.get("prev_hash"), current.get("target")
+        ):
+            return
+        self.seq += 1
+        template = {
+            **fields,
+            "job_id": f"job_{int(now * 1000)}_{secrets.token_hex(4)}",
+            "seq": self.seq,
+            "created_at": now,
+        }
+        if current is not None:
+            self._retired[current["job_id"]] = now + self.grace
+        self._jobs[template["job_id"]] = template
+        self._current = template
+        self._prune(now)
+        self.counters["templates"] += 1
+        logger.info("mining_jobs: new template %s height=%s", template["job_id"], template.get("height"))
+        self._cond.notify_all()
+
+    def _prune(self, now: float) -> None:
+        while self._retired:
+            job_id, expires_at = next(iter(self._retired.items()))
+            if expires_at > now:
+                break
+            self._retired.popitem(last=False)
+            self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str, now: Optional[float] = None) -> Optional[dict]:
+        """The template for ``job_id`` if it is current or within its grace period."""
+        now = time.time() if now is None else now
+        with self._cond:
+            self._prune(now)
+            return self._jobs.get(job_id)
+
+    # ─── per-miner work ─────────────────────────────────────────────────
+
+    def extranonce(self, miner: Optional[str]) -> str:
+        """Stable extranonce for ``miner``; anonymous callers get a fresh one."""
+        with self._cond:
+            if miner and miner in self._extranonces:
+                self._extranonces.move_to_end(miner)
+                return self._extranonces[miner]
+            value = f"{self._next_extranonce:0{2 * EXTRANONCE_BYTES}x}"
+            self._next_extranonce = (self._next_extranonce + 1) % (1 << (8 * EXTRANONCE_BYTES))
+            if miner:
+                self._extranonces[miner] = value
+                while len(self._extranonces) > self.max_miners:
+                    self._extranonces.popitem(last=False)
+            return value
+
+    def job_for(self, miner: Optional[str], template: Optional[dict] = None) -> dict:
+        """``template`` (default: the current one) personalised for ``miner``.
+
+        ``nonce_base`` puts the extranonce in the high bits of the nonce, so
+        legacy-path miners starting there never overlap another miner.
+        """
+        template = template or self.current()
+        extranonce = self.extranonce(miner)
+        with self._cond:
+            self.counters["served"] += 1
+        return {**template, "extranonce": extranonce, "nonce_base": int(extranonce, 16) << 32}
+
+    def wait(self, since: Optional[str], timeout: float, until: Optional[Callable[[], bool]] = None) -> dict:
+        """The current template once it differs from ``since``, or after ``timeout``.
+
+        ``since`` is either a tip hash or a job id; None returns at once.
+        ``until`` is an extra wake-up condition, re-checked on ``wake()``.
+        """
+        deadline = time.time() + max(0.0, float(timeout))
+        with self._cond:
+            while True:
+                now = time.time()
+                template = self.current(now)
+                if since is None or since not in (template.get("prev_hash"), template.get("job_id")):
+                    return template
+                if until is not None and until():
+                    return template
+                remaining = deadline - now
+                if remaining <= 0:
+                    return template
+                self._cond.wait(min(remaining, self.recheck))
+
+    def stats(self) -> dict:
+        with self._cond:
+            current = self._current or {}
+            return {
+                "job_id": current.get("job_id"),
+                "height": current.get("height"),
+                "seq": self.seq,
+                "retained": len(self._jobs),
+                "miners": len(self._extranonces),
+                **self.counters,
+            }
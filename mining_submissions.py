@@ -0,0 +1,171 @@
+"""
+ThronosChain Mining Submissions — outcome tracking for queued block submits
+
+``/api/miner/submit`` answers 202 and leaves the block to the background
+processor, so miners used to never learn whether their work was accepted.
+``SubmissionTracker`` gives every submit a ``submission_id`` and records
+its final outcome:
+
+  accepted   the block was committed (``height`` is set)
+  stale      the work was built on a tip that is no longer current
+  invalid    bad PoW or malformed work
+  duplicate  the same work was already submitted (the original record is
+             returned instead of queuing the block again)
+  rejected   refused for other reasons (bans, whitelist, queue full,
+             errors); the same work may be submitted again
+
+Outcomes can be polled by id (``wait``) or followed per miner through
+``updates(miner, after)``, which the job stream uses.  Resolved records
+are kept for ``ttl`` seconds, and at most ``limit`` records are kept.
+"""
+
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+ACCEPTED = "accepted"
+STALE = "stale"
+INVALID = "invalid"
+DUPLICATE = "duplicate"
+REJECTED = "rejected"
+FINAL_STATUSES = (ACCEPTED, STALE, INVALID, DUPLICATE, REJECTED)
+
+
+def _view(record: dict) -> dict:
+    return {k: v for k, v in record.items() if k != "work_key"}
+
+
+class SubmissionTracker:
+    """Submission id -> outcome record, with per-miner update cursors."""
+
+    def __init__(
+        self,
+        ttl: float = 600.0,
+        limit: int = 10000,
+        on_resolve: Optional[Callable[[dict], None]] = None,
+    ):
+        self.ttl = float(ttl)
+        self.limit = max(1, int(limit))
+        self._on_resolve = on_resolve
+        self._cond = threading.Condition()
+        # submission_id -> record, oldest first
+        self._records: "OrderedDict[str, dict]" = OrderedDict()
+        self._by_work: dict = {}
+        self._by_miner: dict = {}
+        self.seq = 0
+        self.counters = {status: 0 for status in (QUEUED,) + FINAL_STATUSES}
+
+    def open(self, miner: str, work_key: Optional[str] = None, **details) -> Tuple[dict, bool]:
+        """Track a new submission; returns (record, is_new).
+
+        When ``work_key`` matches a tracked submission, that record is
+        returned with ``is_new`` False and nothing new is tracked; work that
+        was ``rejected`` (e.g. queue full) may be submitted again.
+        """
+        now = time.time()
+        with self._cond:
+            self._prune(now)
+            existing = self._records.get(self._by_work.get(work_key)) if work_key else None
+            if existing is not None and existing["status"] != REJECTED:
+                self.counters[DUPLICATE] += 1
+                return _view(existing), False
+            submission_id = f"sub_{int(now * 1000)}_{secrets.token_hex(4)}"
+            record = {
+                **details,
+                "submission_id": submission_id,
+                "miner": miner,
+                "status": QUEUED,
+                "submitted_at": now,
+                "resolved_at": None,
+                "seq": None,
+            }
+            self._records[submission_id] = record
+            if work_key:
+                record["work_key"] = work_key
+                self._by_work[work_key] = submission_id
+            self._by_miner.setdefault(miner, []).append(submission_id)
+            self.counters[QUEUED] += 1
+            while len(self._records) > self.limit:
+                self._drop(next(iter(self._records)))
+            return _view(record), True
+
+    def resolve(self, submission_id: str, status: str, **details) -> Optional[dict]:
+        """Record the final outcome; the first resolution wins."""
+        with self._cond:
+            record = self._records.get(submission_id)
+            if record is None or record["status"] != QUEUED:
+                return None
+            self.seq += 1
+            record.update(details, status=status, resolved_at=time.time(), seq=self.seq)
+            self.counters[status] = self.counters.get(status, 0) + 1
+            self._cond.notify_all()
+            snapshot = _view(record)
+        logger.info("mining_submissions: %s %s %s", submission_id, status, details or "")
+        if self._on_resolve is not None:
+            try:
+                self._on_resolve(snapshot)
+            except Exception as exc:
+                logger.warning("mining_submissions: on_resolve failed: %s", exc)
+        return snapshot
+
+    def get(self, submission_id: str) -> Optional[dict]:
+        with self._cond:
+            record = self._records.get(submission_id)
+            return _view(record) if record is not None else None
+
+    def wait(self, submission_id: str, timeout: float) -> Optional[dict]:
+        """The record once it is resolved or ``timeout`` elapses; None if unknown."""
+        deadline = time.time() + max(0.0, float(timeout))
+        with self._cond:
+            while True:
+                record = self._records.get(submission_id)
+                if record is None or record["status"] != QUEUED:
+                    return _view(record) if record is not None else None
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return _view(record)
+                self._cond.wait(remaining)
+
+    def updates(self, miner: str, after: int) -> Tuple[List[dict], int]:
+        """``miner``'s submissions resolved after cursor ``after``, and the new cursor."""
+        with self._cond:
+            records = [self._records[sid] for sid in self._by_miner.get(miner, ()) if sid in self._records]
+            resolved = sorted(
+                (_view(r) for r in records if r["seq"] is not None and r["seq"] > after),
+                key=lambda r: r["seq"],
+            )
+            return resolved, max([after] + [r["seq"] for r in resolved])
+
+    def cursor(self) -> int:
+        with self._cond:
+            return self.seq
+
+    def _prune(self, now: float) -> None:
+        expired = [
+            sid for sid, record in self._records.items()
+            if record["resolved_at"] is not None and now - record["resolved_at"] > self.ttl
+        ]
+        for sid in expired:
+            self._drop(sid)
+
+    def _drop(self, submission_id: str) -> None:
+        record = self._records.pop(submission_id)
+        if self._by_work.get(record.get("work_key")) == submission_id:
+            self._by_work.pop(record["work_key"])
+        sids = self._by_miner.get(record["miner"])
+        if sids is not None:
+            if submission_id in sids:
+                sids.remove(submission_id)
+            if not sids:
+                self._by_miner.pop(record["miner"], None)
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = sum(1 for r in self._records.values() if r["status"] == QUEUED)
+            return {"tracked": len(self._records), "pending": pending, "counts": dict(self.counters)}
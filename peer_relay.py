@@ -0,0 +1,410 @@
+"""
+ThronosChain Peer Relay — concurrent block / tx fan-out to known peers
+
+``broadcast_block`` and ``broadcast_tx`` used to re-read ``peers.json`` and
+POST to every peer in turn with a fresh connection and a 2s timeout, so one
+dead peer delayed every broadcast by 2s and blocks queued up behind it.
+The relay keeps, per peer:
+
+  - a keep-alive ``requests.Session`` (one pooled connection per peer)
+  - a send queue: at most one pending block, since a newer block supersedes
+    a stale one that has not gone out yet, plus a bounded FIFO of txs
+  - a circuit breaker: after ``failure_threshold`` consecutive failures the
+    peer is skipped for an exponentially growing backoff, then a single
+    trial send decides whether it closes again
+  - a health score from EWMAs of success rate and latency
+
+Queues are drained on a bounded thread pool, one drain at a time per peer,
+so a slow peer only ever holds one worker and sends to a peer stay ordered.
+The peer set is cached and re-read only when the peer file changes.
+
+Blocks broadcast with a ``CompactBlock`` (see compact_block.py) go to
+``/api/v1/receive_compact_block`` first; when the peer reports missing txs
+the compact block is resent with those txs included, and peers that do not
+serve the endpoint (404) get the full block from then on.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BLOCK_PATH = "/api/v1/receive_block"
+TX_PATH = "/api/v1/receive_tx"
+COMPACT_PATH = "/api/v1/receive_compact_block"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_EWMA_ALPHA = 0.2
+
+
+def _new_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _http_post(session, url: str, payload: dict, timeout: float):
+    resp = session.post(url, json=payload, timeout=timeout)
+    try:
+        body = resp.json()
+    except ValueError:
+        body = None
+    return resp.status_code, body
+
+
+def _block_height(block: dict) -> Optional[int]:
+    try:
+        return int(block.get("height"))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with exponential backoff while open.
+
+    Once the backoff expires exactly one send is let through as a probe;
+    every other send is refused until that probe reports back.
+    """
+
+    def __init__(self, failure_threshold: int = 3, base_backoff: float = 5.0, max_backoff: float = 300.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.base_backoff = float(base_backoff)
+        self.max_backoff = float(max_backoff)
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self, now: float) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if now < self.open_until:
+                    return False
+                self.state = HALF_OPEN
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.trips = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, now: float) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.trips += 1
+                backoff = min(self.max_backoff, self.base_backoff * (2 ** (self.trips - 1)))
+                self.state = OPEN
+                self.open_until = now + backoff
+            self._probe_in_flight = False
+
+
+class PeerLink:
+    """Session, send queue, breaker and health of one peer."""
+
+    def __init__(self, url: str, session, breaker: CircuitBreaker, tx_queue_limit: int):
+        self.url = url
+        self.session = session
+        self.breaker = breaker
+        self.pending_block: Optional[tuple] = None
+        self.compact = True
+        self.pending_txs: deque = deque(maxlen=max(1, int(tx_queue_limit)))
+        self.draining = False
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.superseded = 0
+        self.tx_dropped = 0
+        self.success_ewma = 1.0
+        self.latency_ewma = 0.0
+        self.last_error = ""
+
+    def health(self, timeout: float) -> float:
+        """0..1; the success rate discounted by latency relative to the timeout."""
+        return self.success_ewma / (1.0 + self.latency_ewma / max(timeout, 1e-6))
+
+    def stats(self, timeout: float) -> dict:
+        return {
+            "url": self.url,
+            "state": self.breaker.state,
+            "health": round(self.health(timeout), 4),
+            "latency_ms": round(self.latency_ewma * 1000, 1),
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "superseded": self.superseded,
+            "tx_dropped": self.tx_dropped,
+            "queued_txs": len(self.pending_txs),
+            "queued_block": self.pending_block is not None,
+            "compact": self.compact,
+            "last_error": self.last_error,
+        }
+
+
+class PeerRelay:
+    """Fan blocks and txs out to the peer set through per-peer queues."""
+
+    def __init__(
+        self,
+        load_peers: Callable[[], List[str]],
+        peers_path: Optional[str] = None,
+        max_workers: int = 8,
+        timeout: float = 2.0,
+        tx_queue_limit: int = 500,
+        failure_threshold: int = 3,
+        base_backoff: float = 5.0,
+        max_backoff: float = 300.0,
+        transport: Callable = _http_post,
+        session_factory: Callable = _new_session,
+    ):
+        self._load_peers = load_peers
+        self.peers_path = peers_path
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = float(timeout)
+        self.tx_queue_limit = tx_queue_limit
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._transport = transport
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._links: Dict[str, PeerLink] = {}
+        self._peers: Optional[List[str]] = None
+        self._peers_stamp = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._active = 0
+
+    # ─── peer set ───────────────────────────────────────────────────────
+
+    def _stamp(self):
+        if not self.peers_path:
+            return None
+        try:
+            st = os.stat(self.peers_path)
+        except OSError:
+            return (0, 0)
+        return (st.st_mtime_ns, st.st_size)
+
+    def invalidate(self) -> None:
+        """Forget the cached peer set (call after writing the peer file)."""
+        with self._lock:
+            self._peers = None
+
+    def peers(self) -> List[str]:
+        stamp = self._stamp()
+        with self._lock:
+            if self._peers is not None and (self.peers_path is None or stamp == self._peers_stamp):
+                return list(self._peers)
+        try:
+            loaded = self._load_peers() or []
+        except Exception as e:
+            logger.warning("peer_relay: loading peers failed: %s", e)
+            loaded = []
+        peers, seen = [], set()
+        for peer in loaded:
+            if isinstance(peer, str) and peer.strip() and peer not in seen:
+                seen.add(peer)
+                peers.append(peer)
+        with self._lock:
+            self._peers = peers
+            self._peers_stamp = stamp
+            for url in set(self._links) - seen:
+                link = self._links[url]
+                # a draining link is dropped by _next once its queue is empty
+                if not link.draining:
+                    self._close_link(self._links.pop(url))
+        return list(peers)
+
+    def _close_link(self, link: PeerLink) -> None:
+        try:
+            if link.session is not None:
+                link.session.close()
+        except Exception:
+            pass
+
+    def _link(self, url: str) -> PeerLink:
+        link = self._links.get(url)
+        if link is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.base_backoff, self.max_backoff)
+            link = PeerLink(url, self._session_factory(), breaker, self.tx_queue_limit)
+            self._links[url] = link
+        return link
+
+    # ─── enqueue ────────────────────────────────────────────────────────
+
+    def broadcast_block(self, block: dict, compact=None) -> int:
+        """Queue ``block`` (and its ``CompactBlock``, if any) for every peer;
+        returns the number of peers queued."""
+        height = _block_height(block)
+
+        def enqueue(link: PeerLink) -> None:
+            pending = link.pending_block
+            if pending is not None:
+                pending_height = _block_height(pending[0])
+                if height is not None and pending_height is not None and height < pending_height:
+                    return
+                link.superseded += 1
+            link.pending_block = (block, compact)
+
+        return self._fan_out(enqueue)
+
+    def broadcast_tx(self, tx: dict) -> int:
+        """Queue ``tx`` for every peer; the oldest queued tx drops when full."""
+
+        def enqueue(link: PeerLink) -> None:
+            if len(link.pending_txs) == link.pending_txs.maxlen:
+                link.tx_dropped += 1
+            link.pending_txs.append(tx)
+
+        return self._fan_out(enqueue)
+
+    def _fan_out(self, enqueue: Callable[[PeerLink], None]) -> int:
+        peers = self.peers()
+        if not peers:
+            return 0
+        now = time.time()
+        with self._lock:
+            links = [self._link(url) for url in peers]
+            # Healthy peers are scheduled first so they get workers first.
+            links.sort(key=lambda link: link.health(self.timeout), reverse=True)
+            for link in links:
+                if link.breaker.state == OPEN and now < link.breaker.open_until:
+                    link.skipped += 1
+                    continue
+                enqueue(link)
+                if not link.draining:
+                    link.draining = True
+                    self._active += 1
+                    self._pool().submit(self._drain, link)
+        return len(links)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="peer-relay")
+        return self._executor
+
+    # ─── drain ──────────────────────────────────────────────────────────
+
+    def _next(self, link: PeerLink):
+        """Pop the next send for ``link``, or None once it is idle (lock held)."""
+        while link.pending_block is not None or link.pending_txs:
+            if not link.breaker.allow(time.time()):
+                link.skipped += len(link.pending_txs) + (link.pending_block is not None)
+                link.pending_block = None
+                link.pending_txs.clear()
+                break
+            if link.pending_block is not None:
+                pending, link.pending_block = link.pending_block, None
+                return BLOCK_PATH, pending
+            return TX_PATH, link.pending_txs.popleft()
+        link.draining = False
+        if self._peers is not None and link.url not in self._peers and self._links.get(link.url) is link:
+            # removed from the peer set while it was draining
+            self._close_link(self._links.pop(link.url))
+        self._active -= 1
+        if self._active == 0:
+            self._idle.notify_all()
+        return None
+
+    def _drain(self, link: PeerLink) -> None:
+        while True:
+            with self._lock:
+                item = self._next(link)
+            if item is None:
+                return
+            path, payload = item
+            if path == BLOCK_PATH:
+                self._send_block(link, *payload)
+            else:
+                self._post(link, path, payload)
+
+    def _send_block(self, link: PeerLink, block: dict, compact) -> None:
+        if compact is not None and link.compact:
+            ok, status, body = self._post(link, COMPACT_PATH, compact.message())
+            if ok and isinstance(body, dict) and body.get("status") == "missing":
+                ok, status, body = self._post(link, COMPACT_PATH, compact.message(body.get("missing") or ()))
+            if status != 404:
+                return
+            with self._lock:
+                link.compact = False
+        self._post(link, BLOCK_PATH, block)
+
+    def _post(self, link: PeerLink, path: str, payload: dict):
+        """One send; returns (ok, status, body) and updates the peer's health."""
+        started = time.time()
+        error = ""
+        status, body = None, None
+        try:
+            result = self._transport(link.session, link.url.rstrip("/") + path, payload, self.timeout)
+            status, body = result if isinstance(result, tuple) else (result, None)
+            ok = status is None or int(status) < 500
+            if not ok:
+                error = f"HTTP {status}"
+        except Exception as e:
+            ok = False
+            error = type(e).__name__
+        elapsed = time.time() - started
+        with self._lock:
+            link.latency_ewma += _EWMA_ALPHA * (elapsed - link.latency_ewma)
+            link.success_ewma += _EWMA_ALPHA * ((1.0 if ok else 0.0) - link.success_ewma)
+            if ok:
+                link.sent += 1
+                link.breaker.record_success()
+            else:
+                link.failed += 1
+                link.last_error = error
+                link.breaker.record_failure(time.time())
+                if link.breaker.state == OPEN:
+                    logger.info("peer_relay: %s unreachable (%s), backing off", link.url, error)
+        return ok, status, body
+
+    # ─── introspection ──────────────────────────────────────────────────
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued send has been attempted."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._idle:
+            while self._active:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            links = [link.stats(self.timeout) for link in self._links.values()]
+        links.sort(key=lambda s: s["health"], reverse=True)
+        return {"peers": links, "max_workers": self.max_workers, "timeout": self.timeout}
+
+    def close(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        with self._lock:
+            for link in self._links.values():
+                self._close_link(link)
+            self._links.clear()
@@ -0,0 +1,204 @@
+"""
+ThronosChain Rate Limit — token buckets per key with bounded memory
+
+The mining watchdog used to keep a list of request timestamps per
+``address:ip`` key, rebuild it on every request and never forget a key.
+``RateLimiter`` replaces that with one token bucket per key:
+
+  * ``hit(key)`` refills the bucket for the time elapsed, takes ``cost``
+    tokens if available and answers allowed/denied — O(1) per call
+    regardless of how busy the key is
+  * a denied hit can ban the key for ``ban_seconds`` (the watchdog's
+    behaviour); ``is_banned`` checks without spending tokens
+  * keys live in a lock-striped map: each stripe is an LRU ``OrderedDict``
+    with its own lock, so the gunicorn threads rarely contend; idle keys
+    expire after ``ttl`` and each stripe is capped at its share of
+    ``max_keys``.  A key with an active ban is never evicted (it would come
+    back unbanned); a stripe full of banned keys may exceed its cap until
+    the bans run out
+  * ``top(n)`` lists the keys with the most denials for the admin view
+
+A bucket with ``rate = limit / window`` and ``burst = limit`` admits
+``limit`` back-to-back requests and then ``limit`` per ``window`` —
+the same budget as the old sliding window.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# entry fields (a list per key keeps the hot path allocation-free)
+_TOKENS, _UPDATED, _BANNED_UNTIL, _ALLOWED, _DENIED = range(5)
+_EVICT_PER_INSERT = 2
+
+
+class _Stripe:
+    __slots__ = ("lock", "entries", "allowed", "denied", "evicted")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[str, list]" = OrderedDict()
+        self.allowed = 0
+        self.denied = 0
+        self.evicted = 0
+
+
+class RateLimiter:
+    """Token-bucket limiter keyed by string, safe across threads."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        ban_seconds: float = 0.0,
+        ttl: Optional[float] = None,
+        max_keys: int = 100_000,
+        stripes: int = 16,
+    ):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.ban_seconds = float(ban_seconds)
+        self.enabled = self.rate > 0 and self.burst > 0
+        # an idle key is forgotten once its bucket is full and any ban is over
+        refill = self.burst / self.rate if self.enabled else 0.0
+        self.ttl = max(float(ttl or 0.0), refill, self.ban_seconds, 1.0)
+        self._n = max(1, int(stripes))
+        self._stripes = [_Stripe() for _ in range(self._n)]
+        self._per_stripe = max(1, int(max_keys) // self._n)
+
+    @classmethod
+    def per_window(cls, name: str, limit: int, window: float, **kwargs) -> "RateLimiter":
+        """``limit`` requests per ``window`` seconds; ``limit <= 0`` disables."""
+        limit = max(0, int(limit))
+        return cls(name, rate=limit / window if window > 0 else 0.0, burst=limit, **kwargs)
+
+    def _stripe(self, key: str) -> _Stripe:
+        return self._stripes[hash(key) % self._n]
+
+    def _evict(self, stripe: _Stripe, now: float) -> None:
+        entries = stripe.entries
+        for _ in range(_EVICT_PER_INSERT):
+            if not entries:
+                return
+            key, oldest = next(iter(entries.items()))
+            if now - oldest[_UPDATED] <= self.ttl:
+                break
+            if oldest[_BANNED_UNTIL] > now:
+                # ban() can outlast the ttl; keep the ban, look at it again later
+                entries.move_to_end(key)
+                continue
+            entries.popitem(last=False)
+            stripe.evicted += 1
+        # LRU cap; banned keys are rotated to the back instead of dropped, at
+        # most one full pass so a stripe of banned keys cannot spin here
+        budget = len(entries)
+        while len(entries) >= self._per_stripe and budget > 0:
+            budget -= 1
+            key, oldest = next(iter(entries.items()))
+            if oldest[_BANNED_UNTIL] > now:
+                entries.move_to_end(key)
+                continue
+            entries.popitem(last=False)
+            stripe.evicted += 1
+
+    def hit(self, key: str, cost: float = 1.0, now: Optional[float] = None) -> bool:
+        """Spend ``cost`` tokens for ``key``; False when limited or banned."""
+        if not self.enabled:
+            return True
+        if now is None:
+            now = time.time()
+        stripe = self._stripes[hash(key) % self._n]
+        with stripe.lock:
+            entries = stripe.entries
+            entry = entries.get(key)
+            if entry is None:
+                # only new keys grow the map, so eviction runs on insert
+                self._evict(stripe, now)
+                entry = entries[key] = [self.burst, now, 0.0, 0, 0]
+            else:
+                entries.move_to_end(key)
+                elapsed = now - entry[_UPDATED]
+                if elapsed > 0:
+                    tokens = entry[_TOKENS] + elapsed * self.rate
+                    entry[_TOKENS] = tokens if tokens < self.burst else self.burst
+                    entry[_UPDATED] = now
+            if entry[_BANNED_UNTIL] > now:
+                entry[_DENIED] += 1
+                stripe.denied += 1
+                return False
+            if entry[_TOKENS] >= cost:
+                entry[_TOKENS] -= cost
+                entry[_ALLOWED] += 1
+                stripe.allowed += 1
+                return True
+            entry[_DENIED] += 1
+            stripe.denied += 1
+            if self.ban_seconds > 0:
+                entry[_BANNED_UNTIL] = now + self.ban_seconds
+        return False
+
+    def is_banned(self, key: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            return entry is not None and entry[_BANNED_UNTIL] > now
+
+    def ban(self, key: str, seconds: Optional[float] = None, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            if entry is None:
+                entry = stripe.entries[key] = [self.burst, now, 0.0, 0, 0]
+            entry[_BANNED_UNTIL] = now + (self.ban_seconds if seconds is None else seconds)
+
+    def reset(self, key: str) -> None:
+        stripe = self._stripe(key)
+        with stripe.lock:
+            stripe.entries.pop(key, None)
+
+    def top(self, n: int = 10, now: Optional[float] = None) -> list:
+        """The ``n`` keys with the most denied hits."""
+        now = time.time() if now is None else now
+        rows = []
+        for stripe in self._stripes:
+            with stripe.lock:
+                rows.extend((key, list(entry)) for key, entry in stripe.entries.items() if entry[_DENIED])
+        return [
+            {
+                "key": key,
+                "denied": entry[_DENIED],
+                "allowed": entry[_ALLOWED],
+                "tokens": round(min(self.burst, entry[_TOKENS] + max(0.0, now - entry[_UPDATED]) * self.rate), 2),
+                "banned_for": round(max(0.0, entry[_BANNED_UNTIL] - now), 1),
+            }
+            for key, entry in heapq.nlargest(n, rows, key=lambda row: row[1][_DENIED])
+        ]
+
+    def stats(self) -> dict:
+        keys = allowed = denied = evicted = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                keys += len(stripe.entries)
+                allowed += stripe.allowed
+                denied += stripe.denied
+                evicted += stripe.evicted
+        return {
+            "name": self.name,
+            "enabled": self.enabled,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "ban_seconds": self.ban_seconds,
+            "keys": keys,
+            "allowed": allowed,
+            "denied": denied,
+            "evicted": evicted,
+        }
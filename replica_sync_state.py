@@ -0,0 +1,195 @@
+"""
+ThronosChain Replica Sync State — O(1) "synced?" / "chain non-empty?" answers
+
+Replica request guards (``replica_sync_guard`` and ``forward_reads_to_leader``)
+used to parse LAST_BLOCK_FILE *and* the full CHAIN_FILE on every ``/api/*``
+GET just to decide whether to answer locally or proxy.  This tracker keeps
+the answers in memory and refreshes them only when a file's ``(mtime, size)``
+changes, checked at most once per ``stat_interval``:
+
+  - LAST_BLOCK_FILE is small; it is re-parsed only when it changes
+  - CHAIN_FILE is never parsed: only its first bytes are read to tell ``[]``
+    from a non-empty list
+  - the leader's tip height is learned from ``observe_remote_height`` (blocks
+    pushed by peers) or an optional ``remote_tip_fn`` polled in the
+    background, so sync progress is measured rather than a constant
+
+The sync process can call ``invalidate()`` after writing either file to make
+the next read pick it up without waiting for the stat interval.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CHAIN_PEEK_BYTES = 4096
+
+
+def _stat_key(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _chain_file_non_empty(path: str) -> bool:
+    """True when ``path`` holds a JSON list with at least one element."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(CHAIN_PEEK_BYTES)
+    except OSError:
+        return False
+    head = head.lstrip()
+    if not head.startswith(b"["):
+        return False
+    rest = head[1:].lstrip()
+    return bool(rest) and not rest.startswith(b"]")
+
+
+def _as_height(value) -> Optional[int]:
+    try:
+        height = int(value)
+    except (TypeError, ValueError):
+        return None
+    return height if height >= 0 else None
+
+
+class ReplicaSyncState:
+    """Cached sync status of a replica's LAST_BLOCK_FILE / CHAIN_FILE."""
+
+    def __init__(
+        self,
+        last_block_path: str,
+        chain_path: str,
+        stat_interval: float = 1.0,
+        remote_tip_fn: Optional[Callable[[], Optional[int]]] = None,
+        remote_ttl: float = 30.0,
+    ):
+        self.last_block_path = last_block_path
+        self.chain_path = chain_path
+        self.stat_interval = stat_interval
+        self.remote_tip_fn = remote_tip_fn
+        self.remote_ttl = remote_ttl
+        self._lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self._last_block_key = None
+        self._chain_key = None
+        self._last_block: dict = {}
+        self._chain_non_empty = False
+        self._remote_height: Optional[int] = None
+        self._remote_checked_at = float("-inf")
+        self._remote_fetching = False
+
+    # ─── refresh ────────────────────────────────────────────────────────
+
+    def invalidate(self) -> None:
+        """Force the next read to re-stat both files."""
+        with self._lock:
+            self._checked_at = float("-inf")
+
+    def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._checked_at < self.stat_interval:
+                return
+            self._checked_at = now
+            key = _stat_key(self.last_block_path)
+            if key != self._last_block_key:
+                self._last_block_key = key
+                self._last_block = self._read_last_block()
+            key = _stat_key(self.chain_path)
+            if key != self._chain_key:
+                self._chain_key = key
+                self._chain_non_empty = key is not None and _chain_file_non_empty(self.chain_path)
+
+    def _read_last_block(self) -> dict:
+        try:
+            with open(self.last_block_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    # ─── answers ────────────────────────────────────────────────────────
+
+    @property
+    def chain_ready(self) -> bool:
+        """CHAIN_FILE holds at least one entry."""
+        self.refresh()
+        return self._chain_non_empty
+
+    @property
+    def has_tip(self) -> bool:
+        """LAST_BLOCK_FILE names a block (hash or non-negative height)."""
+        self.refresh()
+        last_block = self._last_block
+        return bool(last_block.get("block_hash")) or last_block.get("height") not in (None, -1)
+
+    @property
+    def pending(self) -> bool:
+        """Nothing synced yet: no tip recorded and an empty chain."""
+        return not self.has_tip and not self.chain_ready
+
+    @property
+    def local_height(self) -> Optional[int]:
+        self.refresh()
+        return _as_height(self._last_block.get("height"))
+
+    # ─── remote tip / progress ──────────────────────────────────────────
+
+    def observe_remote_height(self, height) -> None:
+        """Record a leader/peer tip height (e.g. from a pushed block)."""
+        height = _as_height(height)
+        if height is None:
+            return
+        with self._lock:
+            if self._remote_height is None or height > self._remote_height:
+                self._remote_height = height
+            self._remote_checked_at = time.monotonic()
+
+    def _maybe_poll_remote(self) -> None:
+        if self.remote_tip_fn is None:
+            return
+        with self._lock:
+            if self._remote_fetching or time.monotonic() - self._remote_checked_at < self.remote_ttl:
+                return
+            self._remote_fetching = True
+        threading.Thread(target=self._poll_remote, name="replica-sync-remote-tip", daemon=True).start()
+
+    def _poll_remote(self) -> None:
+        try:
+            self.observe_remote_height(self.remote_tip_fn())
+        except Exception as exc:
+            logger.debug("replica_sync_state: remote tip poll failed: %s", exc)
+        finally:
+            with self._lock:
+                self._remote_fetching = False
+                self._remote_checked_at = time.monotonic()
+
+    def progress(self) -> dict:
+        """
+        Sync status for the replica guard.  ``progress`` is the local share of
+        the leader's tip height in percent, or None while the tip is unknown.
+        """
+        self._maybe_poll_remote()
+        local = self.local_height
+        remote = self._remote_height
+        if remote is None:
+            pct = None
+        elif remote == 0:
+            pct = 100.0 if local is not None else 0.0
+        else:
+            pct = round(min(100.0, 100.0 * ((local or 0) / remote)), 2)
+        return {
+            "status": "syncing" if self.pending else "synced",
+            "progress": pct,
+            "local_height": local,
+            "target_height": remote,
+            "chain_ready": self._chain_non_empty,
+        }
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""EVM interpreter micro-benchmarks: stepwise if/elif loop vs pre-decoded blocks.
+
+``ThronosEVM._execute_bytecode_stepwise`` is the original interpreter: it
+decodes the hex on every call and walks an if/elif chain per opcode.
+``_execute_bytecode`` runs cached CodeObjects (basic blocks, precharged
+gas, table dispatch).  Each program is run ``--calls`` times through both
+and the script prints executed instructions per second:
+
+  * loop        — counter loop of arithmetic, DUP/SWAP and JUMPI
+  * sstore      — one SSTORE and SLOAD per iteration
+  * keccak      — SHA3 over a 64-byte memory word pair per iteration
+
+    python scripts/evm_bench.py --iterations 2000 --calls 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evm_core_v3 import CODE_CACHE, EVMState, ThronosEVM, keccak256, _keccak256_py  # noqa: E402
+
+
+def _loop(body: str, iterations: int) -> str:
+    """``i = iterations; do { body } while (--i)`` with ``i`` kept on the stack.
+
+    ``body`` must leave the stack as it found it; ``i`` is on top.
+    """
+    if iterations >= 1 << 32:
+        raise ValueError("iterations must fit in PUSH4")
+    head = "63" + f"{iterations:08x}"              # 0: PUSH4 n
+    loop = 5
+    code = head + "5b" + body                      # JUMPDEST, body
+    code += "6001" "90" "03"                        # PUSH1 1 SWAP1 SUB  -> i - 1
+    code += "80" "61" + f"{loop:04x}" "57"         # DUP1 PUSH2 loop JUMPI
+    return code + "00"                              # STOP
+
+
+PROGRAMS = {
+    # a few arithmetic and stack ops per iteration
+    "loop": lambda n: _loop("80" "6003" "02" "6007" "01" "6002" "04" "50", n),
+    # storage[i] = i; storage[i] read back
+    "sstore": lambda n: _loop("80" "80" "55" "80" "54" "50", n),
+    # mem[0] = i; keccak(mem[0:64])
+    "keccak": lambda n: _loop("80" "6000" "52" "6040" "6000" "20" "50", n),
+}
+
+
+def _measure(run, bytecode: str, calls: int) -> tuple[float, int]:
+    steps = 0
+    started = time.perf_counter()
+    for _ in range(calls):
+        state = EVMState(gas_limit=10 ** 12)
+        ok, result = run(bytecode, state, {})
+        if not ok:
+            raise SystemExit(f"benchmark program failed: {result}")
+        steps += state.steps
+    return time.perf_counter() - started, steps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=2000, help="loop iterations per call")
+    parser.add_argument("--calls", type=int, default=20, help="calls per program and interpreter")
+    args = parser.parse_args()
+
+    native = keccak256 is not _keccak256_py
+    print(f"keccak provider: {'native' if native else 'pure-python fallback'}")
+    evm = ThronosEVM(tempfile.mkdtemp(prefix="evm_bench_"))
+    print(f"  {'program':<8} {'ops/call':>9} {'stepwise ops/s':>15} {'blocks ops/s':>13} {'speedup':>8}")
+    for name, build in PROGRAMS.items():
+        bytecode = build(args.iterations)
+        slow, steps = _measure(evm._execute_bytecode_stepwise, bytecode, args.calls)
+        fast, fast_steps = _measure(evm._execute_bytecode, bytecode, args.calls)
+        assert steps == fast_steps
+        print(
+            f"  {name:<8} {steps // args.calls:>9} {steps / slow:>15,.0f} "
+            f"{steps / fast:>13,.0f} {slow / fast:>7.2f}x"
+        )
+    print(f"code cache: {CODE_CACHE.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Measure block broadcast latency against N in-process Flask peers.
+
+Each peer is a minimal Flask app serving ``/api/v1/receive_block`` and
+``/api/v1/receive_tx`` on a local port; a few can be made slow or left
+unreachable.  The script broadcasts blocks through the legacy sequential
+loop (fresh connection per POST, 2s timeout) and through ``PeerRelay``, and
+reports the time until every live peer has received each block.
+
+    python scripts/peer_relay_bench.py --peers 16 --dead 2 --slow 2 --blocks 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+import requests
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from peer_relay import PeerRelay  # noqa: E402
+
+
+class Peer:
+    """A Flask peer recording when each block height arrives."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.arrivals: dict[int, float] = {}
+        self.cond = threading.Condition()
+        app = Flask(f"peer-{id(self)}")
+
+        @app.route("/api/v1/receive_block", methods=["POST"])
+        def receive_block():
+            time.sleep(self.delay)
+            block = request.get_json() or {}
+            with self.cond:
+                self.arrivals.setdefault(int(block.get("height", -1)), time.perf_counter())
+                self.cond.notify_all()
+            return jsonify(status="added"), 201
+
+        @app.route("/api/v1/receive_tx", methods=["POST"])
+        def receive_tx():
+            time.sleep(self.delay)
+            return jsonify(status="ok"), 200
+
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def wait_for(self, height: int, timeout: float) -> float | None:
+        deadline = time.perf_counter() + timeout
+        with self.cond:
+            while height not in self.arrivals:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return None
+                self.cond.wait(remaining)
+            return self.arrivals[height]
+
+
+def _dead_url(blackhole: bool) -> str:
+    """A local port with nothing listening (connection refused), or with
+    ``blackhole`` a non-routable address that hangs until the timeout."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return f"http://{'10.255.255.1' if blackhole else '127.0.0.1'}:{port}"
+
+
+def legacy_broadcast(peers: list[str], block: dict) -> None:
+    for peer in peers:
+        try:
+            requests.post(peer.rstrip("/") + "/api/v1/receive_block", json=block, timeout=2)
+        except Exception:
+            pass
+
+
+def run(name: str, broadcast, live: list[Peer], blocks: int, interval: float, base_height: int) -> list[float]:
+    latencies = []
+    for i in range(blocks):
+        height = base_height + i
+        started = time.perf_counter()
+        broadcast({"height": height, "block_hash": f"{height:064x}", "reward": 1.0})
+        arrivals = [peer.wait_for(height, 30) for peer in live]
+        if all(arrivals):
+            latencies.append(max(arrivals) - started)
+        time.sleep(interval)
+    if latencies:
+        print(
+            f"{name:>8}: blocks={len(latencies)} p50={statistics.median(latencies) * 1000:.1f}ms "
+            f"max={max(latencies) * 1000:.1f}ms"
+        )
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peers", type=int, default=8, help="live peers")
+    parser.add_argument("--slow", type=int, default=1, help="live peers answering after --slow-delay")
+    parser.add_argument("--slow-delay", type=float, default=0.3)
+    parser.add_argument("--dead", type=int, default=1, help="unreachable peers")
+    parser.add_argument("--blackhole", action="store_true", help="dead peers time out instead of refusing")
+    parser.add_argument("--blocks", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between blocks")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    live = [Peer(args.slow_delay if i < args.slow else 0.0) for i in range(args.peers)]
+    urls = [_dead_url(args.blackhole) for _ in range(args.dead)] + [peer.url for peer in live]
+    print(f"peers: {len(live)} live ({args.slow} slow), {args.dead} dead")
+
+    if not args.skip_legacy:
+        run("legacy", lambda block: legacy_broadcast(urls, block), live, args.blocks, args.interval, 0)
+
+    relay = PeerRelay(lambda: urls, max_workers=args.workers)
+    run("relay", relay.broadcast_block, live, args.blocks, args.interval, 1_000_000)
+    relay.flush(30)
+    for peer in relay.stats()["peers"]:
+        print(f"  {peer['url']:<28} {peer['state']:<9} health={peer['health']:.2f} "
+              f"sent={peer['sent']} failed={peer['failed']} skipped={peer['skipped']}")
+    relay.close()
+    for peer in live:
+        peer.server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Per-call cost of the mining watchdog: sliding-window lists vs token buckets.
+
+The legacy watchdog appended a timestamp to a per-key list and rebuilt the
+list on every request, so a call costs O(requests in the window) and keys
+are never forgotten.  ``RateLimiter`` does a constant amount of work per
+call.  The script measures ns/call for:
+
+  * one hot key at increasing per-window limits (list length grows with it)
+  * many distinct keys (memory retained afterwards)
+  * 32 threads hitting the limiter together, as the gunicorn workers do
+
+    python scripts/rate_limit_bench.py --calls 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import RateLimiter  # noqa: E402
+
+WINDOW = 60.0
+
+
+class LegacyWatchdog:
+    """The pre-token-bucket watchdog logic, kept here for comparison."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.requests: dict[str, list[float]] = {}
+        self.banned: dict[str, float] = {}
+
+    def hit(self, key: str, now: float) -> bool:
+        samples = self.requests.get(key, [])
+        samples.append(now)
+        samples = [ts for ts in samples if now - ts <= WINDOW]
+        self.requests[key] = samples
+        if len(samples) > self.limit:
+            self.banned[key] = now + 300
+            return False
+        return True
+
+
+def _per_call(fn, calls: int, keys: list[str], step: float) -> float:
+    now = 1_000_000.0
+    n = len(keys)
+    started = time.perf_counter()
+    for i in range(calls):
+        fn(keys[i % n], now + i * step)
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def hot_key(calls: int) -> None:
+    print("one hot key, calls spread evenly over the window")
+    print(f"  {'limit/min':>10} {'legacy ns':>10} {'bucket ns':>10}")
+    for limit in (60, 1_000, 10_000):
+        step = WINDOW / limit  # just under the limit: nothing is banned
+        legacy = LegacyWatchdog(limit + 1)
+        bucket = RateLimiter.per_window("bench", limit + 1, WINDOW)
+        n = min(calls, limit * 4)
+        a = _per_call(legacy.hit, n, ["k"], step)
+        b = _per_call(lambda key, now: bucket.hit(key, now=now), n, ["k"], step)
+        print(f"  {limit:>10} {a:>10.0f} {b:>10.0f}")
+
+
+def many_keys(calls: int) -> None:
+    print("distinct keys (address:ip), one call each")
+    print(f"  {'keys':>10} {'legacy ns':>10} {'bucket ns':>10} {'legacy kept':>12} {'bucket kept':>12}")
+    for count in (1_000, 100_000, min(calls * 5, 1_000_000)):
+        keys = [f"THR{i:040x}:10.0.{i % 256}.{i // 256 % 256}" for i in range(count)]
+        legacy = LegacyWatchdog(60)
+        bucket = RateLimiter.per_window("bench", 60, WINDOW, max_keys=100_000)
+        a = _per_call(legacy.hit, count, keys, 0.0)
+        b = _per_call(lambda key, now: bucket.hit(key, now=now), count, keys, 0.0)
+        print(f"  {count:>10} {a:>10.0f} {b:>10.0f} {len(legacy.requests):>12} {bucket.stats()['keys']:>12}")
+
+
+def threaded(calls: int, threads: int = 32) -> None:
+    bucket = RateLimiter.per_window("bench", 1_000_000, WINDOW)
+    per_thread = max(1, calls // threads)
+
+    def worker(t: int) -> None:
+        keys = [f"k{t}_{i}" for i in range(64)]
+        for i in range(per_thread):
+            bucket.hit(keys[i & 63])
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    total = per_thread * threads
+    print(f"{threads} threads: {total} calls in {elapsed:.2f}s = {elapsed / total * 1e9:.0f} ns/call wall")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+    hot_key(args.calls)
+    many_keys(args.calls)
+    threaded(args.calls)
+
+
+if __name__ == "__main__":
+    main()
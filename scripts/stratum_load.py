@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Drive the stratum engine with thousands of simulated miners.
+
+Every client opens a TCP connection, subscribes, authorizes as a THR
+address and then submits a share every ``--interval`` seconds (random
+nonces on the current job, so the server does a full header rebuild and
+sha256d per share).  The script reports connect time, share throughput,
+accept/reject counts and submit round-trip latency.
+
+With ``--local`` (the default when no ``--port`` is given) an in-process
+``StratumServer`` is started with a fake node that moves the tip every
+``--block-interval`` seconds, so ``mining.notify`` fan-out is exercised
+too.  Raise the fd limit for large runs (``ulimit -n 65536``).
+
+    python scripts/stratum_load.py --clients 2000 --seconds 20
+    python scripts/stratum_load.py --host 127.0.0.1 --port 3334 --clients 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stratum_engine import StratumServer  # noqa: E402
+
+
+class FakeNode:
+    """Work templates whose tip advances every ``interval`` seconds; blocks are refused."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.height = 1
+        self._stop = threading.Event()
+
+    def fetch(self, since):
+        if since is not None and not self._stop.wait(self.interval):
+            self.height += 1
+        return {
+            "job_id": f"job_{self.height}",
+            "height": self.height,
+            "prev_hash": f"{self.height:064x}",
+            "target": "0x0",
+            "nbits": "0x1d00ffff",
+        }
+
+    def submit(self, payload):
+        return 409, {"error": "load test"}
+
+    def close(self):
+        self._stop.set()
+
+
+class Stats:
+    def __init__(self):
+        self.connected = 0
+        self.failed = 0
+        self.accepted = 0
+        self.rejected = {}
+        self.notifies = 0
+        self.latencies: list = []
+
+
+async def client(index: int, host: str, port: int, interval: float, deadline: float, stats: Stats) -> None:
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        stats.failed += 1
+        return
+    stats.connected += 1
+    pending: dict = {}
+    job = {}
+    extranonce1 = None
+
+    async def read_loop():
+        nonlocal extranonce1
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            message = json.loads(line)
+            if message.get("method") == "mining.notify":
+                stats.notifies += 1
+                job["id"], job["ntime"] = message["params"][0], message["params"][7]
+                continue
+            sent = pending.pop(message.get("id"), None)
+            if sent is None:
+                continue
+            method, started = sent
+            if method == "mining.subscribe":
+                extranonce1 = message["result"][1]
+            elif method == "mining.submit":
+                stats.latencies.append(time.perf_counter() - started)
+                if message.get("result"):
+                    stats.accepted += 1
+                else:
+                    reason = (message.get("error") or [0, "unknown"])[1]
+                    stats.rejected[reason] = stats.rejected.get(reason, 0) + 1
+
+    ids = iter(range(1, 1 << 30))
+
+    def send(method: str, params: list) -> None:
+        msg_id = next(ids)
+        pending[msg_id] = (method, time.perf_counter())
+        writer.write(json.dumps({"id": msg_id, "method": method, "params": params}).encode() + b"\n")
+
+    reader_task = asyncio.ensure_future(read_loop())
+    worker = f"THR{index:040x}.rig{index}"
+    send("mining.subscribe", ["stratum_load/1.0"])
+    send("mining.authorize", [worker, "x"])
+    await asyncio.sleep(random.random() * interval)
+    try:
+        while time.time() < deadline and not reader_task.done():
+            if job and extranonce1:
+                send("mining.submit", [worker, job["id"], f"{random.getrandbits(32):08x}", job["ntime"],
+                                       f"{random.getrandbits(32):08x}"])
+                await writer.drain()
+            await asyncio.sleep(interval)
+    finally:
+        reader_task.cancel()
+        writer.close()
+
+
+async def run(args) -> None:
+    server = node = None
+    host, port = args.host, args.port
+    if args.local:
+        node = FakeNode(args.block_interval)
+        server = StratumServer(node, host="127.0.0.1", port=0, start_difficulty=args.difficulty,
+                               min_difficulty=args.difficulty / 1e6, share_time=args.interval * 4)
+        await server.start()
+        host, port = "127.0.0.1", server.port
+        while server.current_job is None:
+            await asyncio.sleep(0.01)
+
+    stats = Stats()
+    started = time.time()
+    deadline = started + args.seconds
+    tasks = []
+    for i in range(args.clients):
+        tasks.append(asyncio.ensure_future(client(i, host, port, args.interval, deadline, stats)))
+        if i % 200 == 199:
+            await asyncio.sleep(0.05)
+    connect_time = time.time() - started
+    await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.time() - started
+
+    lat = sorted(stats.latencies) or [0.0]
+    shares = stats.accepted + sum(stats.rejected.values())
+    report = {
+        "clients": args.clients,
+        "connected": stats.connected,
+        "connect_failures": stats.failed,
+        "connect_seconds": round(connect_time, 2),
+        "shares": shares,
+        "shares_per_second": round(shares / elapsed, 1),
+        "accepted": stats.accepted,
+        "rejected": stats.rejected,
+        "notifies": stats.notifies,
+        "latency_ms_p50": round(statistics.median(lat) * 1000, 2),
+        "latency_ms_p99": round(lat[min(len(lat) - 1, int(len(lat) * 0.99))] * 1000, 2),
+    }
+    if server is not None:
+        report["server"] = server.stats()
+        node.close()
+        await server.close()
+    print(json.dumps(report, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="remote stratum port (omit for --local)")
+    parser.add_argument("--local", action="store_true", help="start an in-process server with a fake node")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between shares per client")
+    parser.add_argument("--difficulty", type=float, default=1e-10, help="local server start difficulty")
+    parser.add_argument("--block-interval", type=float, default=5.0, help="local fake tip interval")
+    args = parser.parse_args()
+    if args.port is None:
+        args.local = True
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -30,10 +30,11 @@ from __future__ import annotations
 # - Real Fiat Gateway (Stripe + Bank Withdrawals) (V5.0)
 # - Admin Withdrawal Panel (V5.1)
 
-import os, json, time, hashlib, logging, secrets, random, uuid, zipfile, struct, binascii, tempfile, shutil, sqlite3, base64, hmac
+import os, json, time, hashlib, logging, secrets, random, uuid, zipfile, struct, binascii, tempfile, shutil, base64, hmac
 import sys
 import threading
 import queue
+import heapq
 import atexit
 from collections import Counter
 from decimal import Decimal, ROUND_DOWN
@@ -187,24 +188,28 @@ def _background_block_processor():
     """Process mined blocks asynchronously to avoid 499 timeouts."""
     while _BACKGROUND_WORKERS_ACTIVE:
         try:
-            data, submit_time = _BLOCK_PROCESS_QUEUE.get(timeout=1)
+            data, submit_time, submission_id = _BLOCK_PROCESS_QUEUE.get(timeout=1)
+        except queue.Empty:
+            continue
+        try:
             # Push both app context AND test request context so Flask operations work
             with app.app_context():
                 with app.test_request_context():
-                    _process_mining_submission(data, require_job_id=False)
+                    result = _process_mining_submission(data, require_job_id=False)
+                    status, details = _submission_outcome(result)
+            MINING_SUBMISSIONS.resolve(submission_id, status, **details)
             logger.info(f"Background block processor: completed block in {time.time() - submit_time:.2f}s")
-        except queue.Empty:
-            continue
         except Exception as e:
             logger.error(f"Background block processor error: {e}")
+            MINING_SUBMISSIONS.resolve(submission_id, mining_submissions.REJECTED, reason="processing_error")
 
 def _background_block_broadcaster():
     """Broadcast mined blocks to peers asynchronously to avoid 499 timeouts."""
     while _BACKGROUND_WORKERS_ACTIVE:
         try:
-            block = _BROADCAST_QUEUE.get(timeout=1)
+            block, txs = _BROADCAST_QUEUE.get(timeout=1)
             try:
-                broadcast_block(block)
+                broadcast_block(block, txs)
             except Exception as e:
                 logger.warning(f"Failed to broadcast block: {e}")
         except queue.Empty:
@@ -696,15 +701,9 @@ def inject_build_id():
 def _replica_sync_pending() -> bool:
     if NODE_ROLE != "replica":
         return False
-    last_block = load_json(LAST_BLOCK_FILE, {})
-    block_hash = last_block.get("block_hash")
-    height = last_block.get("height")
-    chain = load_json(CHAIN_FILE, [])
-    if block_hash:
-        return False
-    if height not in (None, -1):
+    if CHAIN_STORE is not None and len(CHAIN_STORE) > 0:
         return False
-    return not bool(chain)
+    return REPLICA_SYNC_STATE.pending
 
 
 @app.before_request
@@ -717,7 +716,7 @@ def replica_sync_guard():
         return None
     if not _replica_sync_pending():
         return None
-    return jsonify({"status": "syncing", "progress": 99}), 200
+    return jsonify(REPLICA_SYNC_STATE.progress()), 200
 
 # ─── API ERROR HANDLERS ────────────────────────────────────────────────
 def _api_error_response(status_code: int, message: str):
@@ -840,6 +839,12 @@ HEALTH_CACHE: dict = {"ts": 0.0, "data": None}
 MEMPOOL_COUNT_CACHE: dict = {"ts": 0.0, "count": 0}
 BALANCE_CACHE: dict = {}
 BALANCE_CACHE_TTL = float(_strip_env_quotes(os.getenv("BALANCE_CACHE_TTL_SECONDS", "10")))
+# Cached wallet balances are keyed on a per-address version bumped by the
+# writes that touch that address (ledger saves, token ledgers, chain entries);
+# the epoch is bumped when an unknown set of wallets changed.
+_BALANCE_EPOCH = [time.time_ns()]
+_BALANCE_VERSIONS: dict = {}
+_BALANCE_VERSIONS_LOCK = threading.Lock()
 TOKEN_PRICE_CACHE: dict = {}  # {symbol: {"ts": timestamp, "price": float, "pools_hash": str}}
 TOKEN_PRICE_CACHE_TTL = float(_strip_env_quotes(os.getenv("TOKEN_PRICE_CACHE_TTL_SECONDS", "30")))  # Cache prices for 30 seconds
 WALLET_DATA_CACHE: dict = {}  # {wallet_addr: {"ts": timestamp, "data": dict, "tip_hash": str}}
@@ -869,6 +874,13 @@ MINING_WATCHDOG_WINDOW_SECONDS = int(_strip_env_quotes(os.getenv("MINING_WATCHDO
 MINING_WATCHDOG_MAX_INVALID = int(_strip_env_quotes(os.getenv("MINING_WATCHDOG_MAX_INVALID", "12")))
 MINING_WATCHDOG_MAX_REQUESTS = int(_strip_env_quotes(os.getenv("MINING_WATCHDOG_MAX_REQUESTS", "60")))
 MINING_WATCHDOG_BAN_SECONDS = int(_strip_env_quotes(os.getenv("MINING_WATCHDOG_BAN_SECONDS", "300")))
+# Per-key token buckets on hot write endpoints (see rate_limit.py); 0 disables.
+# Off by default so existing deployments keep their current behaviour; set a
+# per-minute limit to turn one on.
+SWAP_RATE_LIMIT_PER_MIN = int(_strip_env_quotes(os.getenv("SWAP_RATE_LIMIT_PER_MIN", "0")) or 0)
+WALLET_SEND_RATE_LIMIT_PER_MIN = int(_strip_env_quotes(os.getenv("WALLET_SEND_RATE_LIMIT_PER_MIN", "0")) or 0)
+AI_CHAT_RATE_LIMIT_PER_MIN = int(_strip_env_quotes(os.getenv("AI_CHAT_RATE_LIMIT_PER_MIN", "0")) or 0)
+RATE_LIMIT_MAX_KEYS = int(_strip_env_quotes(os.getenv("RATE_LIMIT_MAX_KEYS", "100000")) or 100000)
 HEARTBEAT_ENABLED = _strip_env_quotes(os.getenv("HEARTBEAT_ENABLED", "1")).lower() in ("1", "true", "yes")
 HEARTBEAT_LOG_ERRORS = _strip_env_quotes(os.getenv("HEARTBEAT_LOG_ERRORS", "0")).lower() in ("1", "true", "yes")
 MUSIC_MODAL_ENABLED = _strip_env_quotes(os.getenv("MUSIC_MODAL_ENABLED", "1")).lower() in ("1", "true", "yes")
@@ -1097,7 +1109,13 @@ X9_NONCE_CACHE_FILE = os.path.join(DATA_DIR, "x9_nonce_cache.json")
 # Register optional EVM routes (if module exists)
 if register_evm_routes is not None:
     try:
-        register_evm_routes(app, DATA_DIR, LEDGER_FILE, CHAIN_FILE, PLEDGE_CHAIN)  # type: ignore
+        # load/save/append are defined further down; resolve them per call
+        register_evm_routes(  # type: ignore
+            app, DATA_DIR, LEDGER_FILE, CHAIN_FILE, PLEDGE_CHAIN,
+            load_json=lambda path, default: load_json(path, default),
+            save_json=lambda path, data: save_json(path, data),
+            append_chain=lambda entries: append_chain_entries(entries),
+        )
         print('[EVM] routes registered')
     except Exception as _e:
         print(f'[EVM] routes not registered: {_e}')
@@ -1531,7 +1549,14 @@ GATEWAY_ADDRESS   = "THR_FIAT_GATEWAY_V1"
 
 # FIX 8: Initialize billing module (clean separation: Chat=credits, Architect=THR)
 import billing
-billing.init_billing(DATA_DIR, LEDGER_FILE, CHAIN_FILE, AI_CREDITS_FILE, AI_WALLET_ADDRESS)
+billing.init_billing(
+    DATA_DIR, LEDGER_FILE, CHAIN_FILE, AI_CREDITS_FILE, AI_WALLET_ADDRESS,
+    # ledger/chain writes go through the stores below, not the JSON mirrors
+    load_json=lambda path, default: load_json(path, default),
+    save_json=lambda path, data: save_json(path, data),
+    append_chain=lambda entries: append_chain_entries(entries),
+    chain_length=lambda: chain_length(),
+)
 
 # --- Learn‑to‑Earn Token Config ---
 #
@@ -1548,6 +1573,62 @@ L2E_LEDGER_FILE = os.path.join(DATA_DIR, "l2e_ledger.json")
 # --- Ledger Storage Config ---
 LEDGER_DB_FILE = os.path.join(DATA_DIR, "ledger.sqlite3")
 USE_SQLITE_LEDGER = _strip_env_quotes(os.getenv("USE_SQLITE_LEDGER", "1" if NODE_ROLE == "master" else "0")).lower() in ("1", "true", "yes")
+# With SQLite enabled, saves write only changed rows and the JSON ledger files
+# become mirrors refreshed at most once per debounce window.
+LEDGER_MIRROR_DEBOUNCE_SECONDS = float(_strip_env_quotes(os.getenv("LEDGER_MIRROR_DEBOUNCE_SECONDS", "5")) or 5)
+# Connections to LEDGER_DB_FILE are pooled per thread (see ledger_db.py).
+from contextlib import nullcontext
+
+from ledger_db import LedgerDB
+
+LEDGER_DB = LedgerDB(timeout=30.0)
+from token_balance_index import SYMBOL_PREFIX, TokenBalanceIndex, touched_addresses
+
+TOKEN_BALANCE_RECONCILE_SECONDS = float(_strip_env_quotes(os.getenv("TOKEN_BALANCE_RECONCILE_SECONDS", "60")) or 60)
+TOKEN_BALANCE_INDEX = None
+from wallet_history_index import JournalSource, JsonListSource, StoreChainSource, WalletHistoryIndex
+
+# Per-address wallet history (see wallet_history_index.py); created once the
+# history projection is defined, only when the SQLite ledger is enabled.
+WALLET_HISTORY_INDEX = None
+
+# Materialized explorer block rows (see explorer_view.py).  Derived data in
+# its own SQLite file, so replicas without the SQLite ledger have it too.
+from explorer_view import ExplorerBlockView
+
+EXPLORER_VIEW_DB_FILE = os.path.join(DATA_DIR, "explorer_view.sqlite3")
+USE_EXPLORER_VIEW = _strip_env_quotes(os.getenv("USE_EXPLORER_VIEW", "1")).lower() in ("1", "true", "yes")
+EXPLORER_VIEW = None
+
+# --- Chain Storage Config ---
+# The canonical chain (CHAIN_FILE) is persisted in append-only segment files
+# (see chain_store.py).  CHAIN_FILE itself is kept as a compact JSON mirror,
+# written in the background, for modules that still read it directly.
+from chain_store import ChainStore
+
+CHAIN_STORE_DIR = os.path.join(DATA_DIR, "chain_store")
+USE_CHAIN_STORE = _strip_env_quotes(os.getenv("USE_CHAIN_STORE", "1" if NODE_ROLE == "master" else "0")).lower() in ("1", "true", "yes")
+CHAIN_MIRROR_DEBOUNCE_SECONDS = float(_strip_env_quotes(os.getenv("CHAIN_MIRROR_DEBOUNCE_SECONDS", "5")) or 5)
+CHAIN_STORE = None
+# Block/tx counts, supply totals and the tip are folded in per commit (see
+# chain_state.py) and checkpointed so restarts only replay the newest entries.
+from chain_state import ChainState
+
+CHAIN_STATE_FILE = os.path.join(DATA_DIR, "chain_state.json")
+CHAIN_STATE_CHECKPOINT_SECONDS = float(_strip_env_quotes(os.getenv("CHAIN_STATE_CHECKPOINT_SECONDS", "30")) or 30)
+# The normalized tx log (TX_LOG_FILE) is kept in an indexed append-only
+# journal (see tx_log_store.py); TX_LOG_FILE is a debounced JSON mirror.
+from tx_log_store import TxLogJournal
+
+TX_LOG_JOURNAL_FILE = os.path.join(DATA_DIR, "tx_ledger.journal.jsonl")
+USE_TX_LOG_JOURNAL = _strip_env_quotes(os.getenv("USE_TX_LOG_JOURNAL", "1" if NODE_ROLE == "master" else "0")).lower() in ("1", "true", "yes")
+TX_LOG_MIRROR_DEBOUNCE_SECONDS = float(_strip_env_quotes(os.getenv("TX_LOG_MIRROR_DEBOUNCE_SECONDS", "30")) or 30)
+TX_LOG_STORE = None
+# Replica sync guards re-stat LAST_BLOCK_FILE / CHAIN_FILE at most this often
+# (see replica_sync_state.py).
+from replica_sync_state import ReplicaSyncState
+
+REPLICA_SYNC_STAT_INTERVAL_SECONDS = float(_strip_env_quotes(os.getenv("REPLICA_SYNC_STAT_INTERVAL_SECONDS", "1")) or 1)
 
 # Courses registry for Learn‑to‑Earn
 COURSES_FILE = os.path.join(DATA_DIR, "courses.json")
@@ -1562,6 +1643,44 @@ COURSES_FILE = os.path.join(DATA_DIR, "courses.json")
 # introducing additional dependencies.
 
 PEERS_FILE = os.path.join(DATA_DIR, "peers.json")
+# Broadcasts go through per-peer queues drained on a bounded pool with
+# keep-alive sessions and circuit breakers (see peer_relay.py).
+from peer_relay import PeerRelay
+from compact_block import CompactBlock, reconstruct as reconstruct_compact_block
+
+PEER_RELAY_MAX_WORKERS = int(_strip_env_quotes(os.getenv("PEER_RELAY_MAX_WORKERS", "8")) or 8)
+PEER_RELAY_TIMEOUT_SECONDS = float(_strip_env_quotes(os.getenv("PEER_RELAY_TIMEOUT_SECONDS", "2")) or 2)
+PEER_RELAY_TX_QUEUE = int(_strip_env_quotes(os.getenv("PEER_RELAY_TX_QUEUE", "500")) or 500)
+PEER_RELAY = None
+# Headers-first ranged chain sync (see chain_sync.py).  Every node serves
+# /api/v1/headers and /api/v1/blocks; a writable node with
+# CHAIN_SYNC_PEER_URL set also pulls missing blocks from that peer.
+from chain_sync import ChainSyncClient, HeaderValidationError, HttpSyncTransport, MAX_HEADERS, MAX_RANGE_BLOCKS, block_header, group_blocks, parse_checkpoint, parse_range
+
+CHAIN_SYNC_PEER_URL = _strip_env_quotes(os.getenv("CHAIN_SYNC_PEER_URL", "")).strip()
+CHAIN_SYNC_INTERVAL_SECONDS = float(_strip_env_quotes(os.getenv("CHAIN_SYNC_INTERVAL_SECONDS", "30")) or 30)
+CHAIN_SYNC_BATCH_BLOCKS = int(_strip_env_quotes(os.getenv("CHAIN_SYNC_BATCH_BLOCKS", "100")) or 100)
+CHAIN_SYNC_PIPELINE = int(_strip_env_quotes(os.getenv("CHAIN_SYNC_PIPELINE", "4")) or 4)
+# "<height>" or "<height>:<block_hash>": synced history up to this height is
+# trusted, so stratum blocks mined before stratum_header was recorded can be
+# synced (linkage and hash <= target only) and pre-upgrade blocks keep their
+# stored rewards.  Unset: every block is fully checked.
+CHAIN_SYNC_CHECKPOINT = parse_checkpoint(_strip_env_quotes(os.getenv("CHAIN_SYNC_CHECKPOINT", "")))
+# Peer blocks are validated (PoW, linkage), deduplicated and orphan-pooled
+# before they are committed (see block_intake.py).
+from block_intake import ADDED, DUPLICATE, IN_FLIGHT, ORPHAN, BlockHashIndex, BlockIntake
+
+BLOCK_INTAKE_ORPHAN_LIMIT = int(_strip_env_quotes(os.getenv("BLOCK_INTAKE_ORPHAN_LIMIT", "256")) or 256)
+BLOCK_INTAKE = None
+# Mining work is served from one shared template per tip/target, pushed to
+# miners over /api/mining/work/stream (see mining_jobs.py).
+from mining_jobs import JobBoard
+from rate_limit import RateLimiter
+import mining_submissions
+from mining_submissions import SubmissionTracker
+
+MINING_JOBS = None
+MINING_SUBMISSIONS = None
 
 # --- Tokens & DeFi Config (New for V3.8) ---
 #
@@ -1974,12 +2093,75 @@ def _load_json_file(path, default):
 
 
 def _get_ledger_db_connection():
-    conn = sqlite3.connect(LEDGER_DB_FILE, timeout=30)  # Wait up to 30s if locked
-    conn.row_factory = sqlite3.Row
-    # Enable WAL mode for better concurrent read/write performance
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA busy_timeout=30000")  # 30 second busy timeout
-    return conn
+    # Per-thread pooled connection (WAL + 30s busy timeout set once on open);
+    # ``with conn:`` commits unless nested inside ledger_tx().
+    return LEDGER_DB.connection(LEDGER_DB_FILE)
+
+
+def ledger_tx():
+    """Group ledger DB writes on this thread into a single commit."""
+    if not USE_SQLITE_LEDGER:
+        return nullcontext()
+    return LEDGER_DB.transaction(LEDGER_DB_FILE)
+
+
+def _address_norm(address) -> str:
+    """Case-folded address key stored in the ``*address_norm`` columns."""
+    return str(address or "").strip().upper()
+
+
+def invalidate_wallet_balances(addresses=None) -> None:
+    """Invalidate cached balances for ``addresses`` (every wallet when None)."""
+    with _BALANCE_VERSIONS_LOCK:
+        if addresses is None:
+            _BALANCE_EPOCH[0] += 1
+            _BALANCE_VERSIONS.clear()
+            return
+        for address in addresses:
+            norm = _address_norm(address)
+            if norm:
+                _BALANCE_VERSIONS[norm] = _BALANCE_VERSIONS.get(norm, 0) + 1
+
+
+def _invalidate_wallet_balances_after_commit(addresses=None) -> None:
+    """invalidate_wallet_balances() once the ledger DB write on this thread commits.
+
+    Bumping first would let a concurrent reader pair the new version with the
+    old row and cache it for BALANCE_CACHE_TTL.
+    """
+    if not USE_SQLITE_LEDGER:
+        invalidate_wallet_balances(addresses)
+        return
+    _get_ledger_db_connection().after_commit(lambda: invalidate_wallet_balances(addresses))
+
+
+def _wallet_balance_version(wallet: str) -> str:
+    with _BALANCE_VERSIONS_LOCK:
+        return f"{_BALANCE_EPOCH[0]}:{_BALANCE_VERSIONS.get(_address_norm(wallet), 0)}"
+
+
+def _ensure_column(conn, table: str, column: str, decl: str) -> bool:
+    """ALTER TABLE ADD COLUMN when missing; returns True if it was added."""
+    columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column in columns:
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return True
+
+
+def _backfill_address_norm(conn, table: str, pairs) -> int:
+    """Fill NULL normalized-address columns from their source columns."""
+    filled = 0
+    for source, target in pairs:
+        rows = conn.execute(
+            f"SELECT rowid, {source} FROM {table} WHERE {target} IS NULL AND {source} IS NOT NULL"
+        ).fetchall()
+        conn.executemany(
+            f"UPDATE {table} SET {target} = ? WHERE rowid = ?",
+            [(_address_norm(row[1]), row[0]) for row in rows],
+        )
+        filled += len(rows)
+    return filled
 
 
 def _ledger_type_for_path(path: str) -> str | None:
@@ -1992,6 +2174,37 @@ def _ledger_type_for_path(path: str) -> str | None:
     return None
 
 
+class TrackedLedger(dict):
+    """
+    Balances dict returned by load_json() for SQLite-backed ledgers.
+
+    Records which addresses were assigned since load so save_json() can
+    UPSERT only those rows instead of the whole ledger.  Deletions are not
+    tracked: like the full-ledger UPSERT before it, saving never removes rows.
+    """
+
+    def __init__(self, ledger_type: str, data=()):
+        super().__init__(data)
+        self.ledger_type = ledger_type
+        self.dirty = set()
+
+    def __reduce__(self):
+        return (TrackedLedger, (self.ledger_type, dict(self)))
+
+    def __setitem__(self, address, balance):
+        super().__setitem__(address, balance)
+        self.dirty.add(address)
+
+    def update(self, *args, **kwargs):
+        for address, balance in dict(*args, **kwargs).items():
+            self[address] = balance
+
+    def setdefault(self, address, default=None):
+        if address not in self:
+            self[address] = default
+        return self[address]
+
+
 def _load_ledger_from_sqlite(ledger_type: str) -> dict:
     if not USE_SQLITE_LEDGER:
         return {}
@@ -2000,30 +2213,38 @@ def _load_ledger_from_sqlite(ledger_type: str) -> dict:
             "SELECT address, balance FROM balances WHERE ledger_type = ?",
             (ledger_type,),
         ).fetchall()
-    return {row["address"]: row["balance"] for row in rows}
+    return TrackedLedger(ledger_type, ((row["address"], row["balance"]) for row in rows))
 
 
 def _write_ledger_to_sqlite(ledger_type: str, ledger: dict) -> None:
+    """UPSERT ledger rows in one transaction (only dirty rows for a TrackedLedger)."""
     if not USE_SQLITE_LEDGER:
         return
     now_ts = int(time.time())
+    tracked = isinstance(ledger, TrackedLedger) and ledger.ledger_type == ledger_type
+    if tracked:
+        addresses = [a for a in ledger.dirty if a and a in ledger]
+    else:
+        addresses = [a for a in ledger if a]
     entries = [
-        (ledger_type, address, float(balance), now_ts)
-        for address, balance in ledger.items()
-        if address
+        (ledger_type, address, _address_norm(address), float(ledger[address]), now_ts)
+        for address in addresses
     ]
     if not entries:
         return
     with _get_ledger_db_connection() as conn:
         conn.executemany(
             """
-            INSERT INTO balances (ledger_type, address, balance, updated_at)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO balances (ledger_type, address, address_norm, balance, updated_at)
+            VALUES (?, ?, ?, ?, ?)
             ON CONFLICT(ledger_type, address)
             DO UPDATE SET balance = excluded.balance, updated_at = excluded.updated_at
             """,
             entries,
         )
+        _invalidate_wallet_balances_after_commit(addresses if tracked else None)
+    if isinstance(ledger, TrackedLedger):
+        ledger.dirty.difference_update(addresses)
 
 
 def _init_ledger_db():
@@ -2079,6 +2300,21 @@ def _init_ledger_db():
         conn.execute("CREATE INDEX IF NOT EXISTS idx_event_from_addr ON event_index(from_address)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_event_to_addr ON event_index(to_address)")
 
+        # Normalized (upper-cased) addresses: case-insensitive balance and
+        # history lookups hit an index instead of scanning with UPPER().
+        _ensure_column(conn, "balances", "address_norm", "TEXT")
+        _ensure_column(conn, "event_index", "from_address_norm", "TEXT")
+        _ensure_column(conn, "event_index", "to_address_norm", "TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_balances_ledger_norm ON balances(ledger_type, address_norm)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_event_from_norm ON event_index(from_address_norm, timestamp DESC)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_event_to_norm ON event_index(to_address_norm, timestamp DESC)")
+        filled = _backfill_address_norm(conn, "balances", [("address", "address_norm")])
+        filled += _backfill_address_norm(
+            conn, "event_index", [("from_address", "from_address_norm"), ("to_address", "to_address_norm")]
+        )
+        if filled:
+            logger.info("[ledger_db] backfilled %d normalized addresses", filled)
+
         # Telemetry cache table (NEW - for dashboard stats)
         conn.execute(
             """
@@ -2239,8 +2475,8 @@ def _index_transaction_event(tx: dict) -> None:
                 """
                 INSERT OR REPLACE INTO event_index
                 (event_type, event_id, height, timestamp, from_address, to_address,
-                 amount, asset_symbol, metadata, indexed_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                 from_address_norm, to_address_norm, amount, asset_symbol, metadata, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     tx.get("type", "transaction"),
@@ -2249,6 +2485,8 @@ def _index_transaction_event(tx: dict) -> None:
                     tx.get("timestamp", ""),
                     tx.get("from"),
                     tx.get("to"),
+                    _address_norm(tx.get("from")) if tx.get("from") else None,
+                    _address_norm(tx.get("to")) if tx.get("to") else None,
                     tx.get("amount"),
                     tx.get("symbol", "THR"),
                     json.dumps({k: v for k, v in tx.items()
@@ -2282,8 +2520,9 @@ def _get_recent_events(event_type: str = None, limit: int = 100, address: str =
                 params.append(event_type)
 
             if address:
-                query += " AND (from_address = ? OR to_address = ?)"
-                params.extend([address, address])
+                norm = _address_norm(address)
+                query += " AND (from_address_norm = ? OR to_address_norm = ?)"
+                params.extend([norm, norm])
 
             query += " ORDER BY timestamp DESC LIMIT ?"
             params.append(limit)
@@ -2505,6 +2744,10 @@ def _update_music_play_tip(track_id: str, wallet_address: str, tip_amount: float
 
 
 def load_json(path, default):
+    if path == CHAIN_FILE and CHAIN_STORE is not None:
+        return _load_chain_from_store()
+    if path == TX_LOG_FILE and TX_LOG_STORE is not None:
+        return TX_LOG_STORE.load_all()
     ledger_type = _ledger_type_for_path(path)
     if ledger_type:
         ledger_data = _load_ledger_from_sqlite(ledger_type)
@@ -2530,9 +2773,25 @@ _seed_chain_meta()
 
 
 def save_json(path, data):
+    if path == CHAIN_FILE and CHAIN_STORE is not None:
+        _save_chain_to_store(data)
+        return
+    if path == TX_LOG_FILE and TX_LOG_STORE is not None:
+        _save_tx_log_to_store(data)
+        return
     ledger_type = _ledger_type_for_path(path)
     if ledger_type:
         _write_ledger_to_sqlite(ledger_type, data)
+        if USE_SQLITE_LEDGER:
+            # SQLite is authoritative; the JSON file is a debounced mirror.
+            _LEDGER_MIRRORS[ledger_type].schedule()
+            return
+    _write_json_file(path, data)
+    if ledger_type:
+        invalidate_wallet_balances()
+
+
+def _write_json_file(path, data):
     os.makedirs(os.path.dirname(path), exist_ok=True)
     dir_name = os.path.dirname(path)
     base_name = os.path.basename(path)
@@ -2550,6 +2809,9 @@ def save_json(path, data):
 
 
 def atomic_write_json(path: str, data) -> None:
+    if path == TX_LOG_FILE and TX_LOG_STORE is not None:
+        _save_tx_log_to_store(data)
+        return
     os.makedirs(os.path.dirname(path), exist_ok=True)
     dir_name = os.path.dirname(path)
     base_name = os.path.basename(path)
@@ -2569,7 +2831,402 @@ def atomic_write_json(path: str, data) -> None:
                 pass
 
 
+class _DebouncedSnapshotter:
+    """Coalesce bursts of writes into one background snapshot every ``delay`` seconds."""
+
+    def __init__(self, name: str, delay: float, write_fn):
+        self.name = name
+        self.delay = max(0.0, float(delay))
+        self._write_fn = write_fn
+        self._pending = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def schedule(self) -> None:
+        self._pending.set()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"snapshot-{self.name}", daemon=True)
+                self._thread.start()
+
+    def flush(self) -> None:
+        if self._pending.is_set():
+            self._pending.clear()
+            self._write()
+
+    def _write(self) -> None:
+        try:
+            self._write_fn()
+        except Exception as exc:
+            logger.warning("[snapshot] %s write failed: %s", self.name, exc)
+
+    def _run(self) -> None:
+        while True:
+            if not self._pending.wait(timeout=60):
+                with self._lock:
+                    if not self._pending.is_set():
+                        self._thread = None
+                        return
+                continue
+            time.sleep(self.delay)
+            if self._pending.is_set():
+                self._pending.clear()
+                self._write()
+
+
+# Guards the recorded mirror mtime/size, the external-write check and the
+# final replace of the mirror.  The serialize + fsync runs outside it (one
+# writer at a time under _CHAIN_MIRROR_WRITE_LOCK) so chain reads and appends
+# never wait on it.
+_CHAIN_MIRROR_LOCK = threading.RLock()
+_CHAIN_MIRROR_WRITE_LOCK = threading.Lock()
+
+
+def _chain_mirror_changed(st) -> bool:
+    known = (CHAIN_STORE.get_meta("mirror_mtime_ns"), CHAIN_STORE.get_meta("mirror_size"))
+    return known != (st.st_mtime_ns, st.st_size)
+
+
+def _publish_chain_mirror(tmp_path: str, path: str) -> bool:
+    """Replace the mirror unless it was written from outside since the last absorb."""
+    with _CHAIN_MIRROR_LOCK:
+        try:
+            if _chain_mirror_changed(os.stat(path)):
+                return False
+        except OSError:
+            pass
+        os.replace(tmp_path, path)
+        st = os.stat(path)
+        CHAIN_STORE.set_meta(mirror_mtime_ns=st.st_mtime_ns, mirror_size=st.st_size)
+        return True
+
+
+def _write_chain_mirror() -> None:
+    with _CHAIN_MIRROR_WRITE_LOCK:
+        while True:
+            _chain_store_absorb_external_write()
+            # an outside write that landed during the serialize is absorbed
+            # and the snapshot retaken instead of being overwritten
+            if CHAIN_STORE.write_json_snapshot(CHAIN_FILE, publish=_publish_chain_mirror) is not None:
+                return
+
+
+_CHAIN_MIRROR = _DebouncedSnapshotter("chain", CHAIN_MIRROR_DEBOUNCE_SECONDS, _write_chain_mirror)
+atexit.register(_CHAIN_MIRROR.flush)
+
+
+def _ledger_mirror_writer(ledger_type: str, path: str):
+    def _write():
+        _write_json_file(path, dict(_load_ledger_from_sqlite(ledger_type)))
+    return _write
+
+
+_LEDGER_MIRRORS = {
+    ledger_type: _DebouncedSnapshotter(f"ledger-{ledger_type}", LEDGER_MIRROR_DEBOUNCE_SECONDS, _ledger_mirror_writer(ledger_type, path))
+    for ledger_type, path in (("thr", LEDGER_FILE), ("wbtc", WBTC_LEDGER_FILE), ("l2e", L2E_LEDGER_FILE))
+}
+for _mirror in _LEDGER_MIRRORS.values():
+    atexit.register(_mirror.flush)
+
+
+def _chain_store_absorb_external_write() -> None:
+    """
+    Pick up entries that something other than the mirror writer added to
+    CHAIN_FILE.
+
+    The file lags the store by up to CHAIN_MIRROR_DEBOUNCE_SECONDS, so an
+    outside writer has usually appended to a stale copy: only entries whose
+    block_hash/tx_id the store does not hold yet are appended, and the store
+    is never rewritten from the file.
+    """
+    with _CHAIN_MIRROR_LOCK:
+        try:
+            st = os.stat(CHAIN_FILE)
+        except OSError:
+            return
+        if not _chain_mirror_changed(st):
+            return
+        chain = _load_json_file(CHAIN_FILE, None)
+        fresh = CHAIN_STORE.absorb(chain) if isinstance(chain, list) else []
+        CHAIN_STORE.set_meta(mirror_mtime_ns=st.st_mtime_ns, mirror_size=st.st_size)
+    if fresh:
+        logger.warning("[chain_store] %s changed outside the store, absorbed %d new entries", CHAIN_FILE, len(fresh))
+        invalidate_wallet_balances(touched_addresses(fresh))
+        _CHAIN_MIRROR.schedule()
+
+
+def _load_chain_from_store() -> list:
+    _chain_store_absorb_external_write()
+    return CHAIN_STORE.load_all()
+
+
+def _save_chain_to_store(chain: list) -> None:
+    if not isinstance(chain, list):
+        raise TypeError("chain must be a list")
+    _chain_store_absorb_external_write()
+    CHAIN_STORE.sync_list(chain)
+    _CHAIN_MIRROR.schedule()
+
+
+def append_chain_entries(entries: list) -> None:
+    """Append blocks/txs to CHAIN_FILE without rewriting the existing chain."""
+    entries = [e for e in entries if e is not None]
+    if not entries:
+        return
+    if CHAIN_STORE is None:
+        before = chain_version()
+        chain = load_json(CHAIN_FILE, [])
+        chain.extend(entries)
+        save_json(CHAIN_FILE, chain)
+        _BLOCK_HASH_INDEX.note(entries, before, chain_version())
+        invalidate_wallet_balances(touched_addresses(entries))
+        return
+    _enforce_write_protection(CHAIN_FILE)
+    _chain_store_absorb_external_write()
+    with _CHAIN_STATE_LOCK:
+        state = _CHAIN_STATE if _CHAIN_STATE_SOURCE is CHAIN_STORE else None
+        current = state is not None and state.is_current(CHAIN_STORE)
+        CHAIN_STORE.append_many(entries)
+        if current:
+            state.apply_many(entries)
+            _CHAIN_STATE_CHECKPOINT.schedule()
+    # only once the entries are readable, or a reader could cache the old view
+    invalidate_wallet_balances(touched_addresses(entries))
+    _CHAIN_MIRROR.schedule()
+    _sync_wallet_history_index()
+    _sync_explorer_view()
+
+
+def chain_last_block() -> dict | None:
+    """Latest entry with a ``reward`` (i.e. a mined block) in CHAIN_FILE."""
+    if CHAIN_STORE is not None:
+        _chain_store_absorb_external_write()
+        return CHAIN_STORE.last_block()
+    for entry in reversed(load_json(CHAIN_FILE, [])):
+        if isinstance(entry, dict) and entry.get("reward") is not None:
+            return entry
+    return None
+
+
+def chain_version():
+    """Cheap change token for CHAIN_FILE (store index mtime, or file mtime without the store)."""
+    if CHAIN_STORE is not None:
+        _chain_store_absorb_external_write()
+        return (len(CHAIN_STORE), CHAIN_STORE.mtime_ns())
+    try:
+        return os.path.getmtime(CHAIN_FILE)
+    except OSError:
+        return 0
+
+
+def chain_length() -> int:
+    """Number of entries (blocks + txs) in CHAIN_FILE."""
+    if CHAIN_STORE is not None:
+        _chain_store_absorb_external_write()
+        return len(CHAIN_STORE)
+    return len(load_json(CHAIN_FILE, []))
+
+
+def chain_block_count() -> int:
+    if CHAIN_STORE is not None:
+        _chain_store_absorb_external_write()
+        return CHAIN_STORE.block_count
+    return sum(1 for b in load_json(CHAIN_FILE, []) if isinstance(b, dict) and b.get("reward") is not None)
+
+
+# block_hash -> height (and tip) for peer block intake without the chain
+# store; advanced by append_chain_entries, rebuilt after any other write.
+_BLOCK_HASH_INDEX = BlockHashIndex(lambda: load_json(CHAIN_FILE, []), chain_version)
+
+
+def known_block_height(block_hash: str):
+    """Height of a block already in the chain (-1 if it has none), else None."""
+    if CHAIN_STORE is not None:
+        _chain_store_absorb_external_write()
+        if not CHAIN_STORE.has_hash(block_hash):
+            return None
+        block = CHAIN_STORE.get_by_hash(block_hash) or {}
+        if block.get("reward") is None:
+            return None
+        height = block.get("height")
+        return -1 if height is None else int(height)
+    return _BLOCK_HASH_INDEX.height_of(block_hash)
+
+
+def _chain_tip():
+    """(block_hash, height) of the last block, None on an empty chain."""
+    if CHAIN_STORE is not None:
+        block = chain_last_block()
+        return (block.get("block_hash"), block.get("height")) if block else None
+    return _BLOCK_HASH_INDEX.tip()
+
+
+def chain_has_hash(key: str) -> bool:
+    """True if a block_hash (blocks) or tx_id (txs) is already in CHAIN_FILE."""
+    if CHAIN_STORE is not None:
+        _chain_store_absorb_external_write()
+        return CHAIN_STORE.has_hash(key)
+    for entry in load_json(CHAIN_FILE, []):
+        if isinstance(entry, dict) and key in (entry.get("block_hash"), entry.get("tx_id")):
+            return True
+    return False
+
+
+_CHAIN_STATE = None
+_CHAIN_STATE_SOURCE = None
+_CHAIN_STATE_LOCK = threading.RLock()
+
+
+def _write_chain_state_checkpoint() -> None:
+    with _CHAIN_STATE_LOCK:
+        if _CHAIN_STATE is not None and _CHAIN_STATE_SOURCE is CHAIN_STORE and CHAIN_STORE is not None:
+            _CHAIN_STATE.save_checkpoint(CHAIN_STATE_FILE)
+
+
+_CHAIN_STATE_CHECKPOINT = _DebouncedSnapshotter("chain_state", CHAIN_STATE_CHECKPOINT_SECONDS, _write_chain_state_checkpoint)
+atexit.register(_CHAIN_STATE_CHECKPOINT.flush)
+
+
+def chain_state() -> ChainState:
+    """
+    Aggregates over CHAIN_FILE (block/tx counts, supply totals, tip, reward
+    blocks), folded forward from the last commit instead of rescanning.
+
+    With the chain store the state catches up on entries appended since it
+    was last read and is rebuilt only after a store rewrite; without it the
+    state is rebuilt when CHAIN_FILE's mtime changes.
+    """
+    global _CHAIN_STATE, _CHAIN_STATE_SOURCE
+    with _CHAIN_STATE_LOCK:
+        if CHAIN_STORE is not None:
+            _chain_store_absorb_external_write()
+            state = _CHAIN_STATE if _CHAIN_STATE_SOURCE is CHAIN_STORE else None
+            if state is None:
+                state = ChainState.restore(CHAIN_STORE, CHAIN_STATE_FILE)
+                changed = True
+            elif state.generation != CHAIN_STORE.generation or state.entry_count > len(CHAIN_STORE):
+                state = ChainState.rebuild(CHAIN_STORE)
+                changed = True
+            else:
+                changed = state.catch_up(CHAIN_STORE) > 0
+            _CHAIN_STATE, _CHAIN_STATE_SOURCE = state, CHAIN_STORE
+            if changed:
+                _CHAIN_STATE_CHECKPOINT.schedule()
+            return state
+        version = chain_version()
+        if _CHAIN_STATE is None or _CHAIN_STATE_SOURCE != version:
+            _CHAIN_STATE = ChainState.from_entries(load_json(CHAIN_FILE, []))
+            _CHAIN_STATE_SOURCE = version
+        return _CHAIN_STATE
+
+
+def _chain_source():
+    """CHAIN_FILE as a source for the derived views (store-backed or JSON)."""
+    if CHAIN_STORE is not None:
+        _chain_store_absorb_external_write()
+        return StoreChainSource(CHAIN_STORE)
+    return JsonListSource(CHAIN_FILE, lambda: load_json(CHAIN_FILE, []))
+
+
+def _wallet_history_sources():
+    chain = _chain_source()
+    if TX_LOG_STORE is not None:
+        tx_log = JournalSource(TX_LOG_STORE)
+    else:
+        tx_log = JsonListSource(TX_LOG_FILE, load_tx_log)
+    return chain, tx_log
+
+
+def wallet_history_index():
+    """The wallet history index, caught up with CHAIN_FILE and the tx log (None when unavailable)."""
+    index = WALLET_HISTORY_INDEX
+    if index is None:
+        return None
+    try:
+        index.sync(*_wallet_history_sources())
+    except Exception as exc:
+        logger.warning("[wallet_history_index] sync failed, using full scan: %s", exc)
+        return None
+    return index
+
+
+def _sync_wallet_history_index() -> None:
+    """Fold newly committed chain / tx_log entries into the index (incremental only)."""
+    index = WALLET_HISTORY_INDEX
+    if index is None:
+        return
+    try:
+        index.sync(*_wallet_history_sources(), rebuild=False)
+    except Exception as exc:
+        logger.warning("[wallet_history_index] incremental sync failed: %s", exc)
+
+
+def explorer_view():
+    """The explorer block view, caught up with CHAIN_FILE (None when unavailable)."""
+    view = EXPLORER_VIEW
+    if view is None:
+        return None
+    try:
+        view.sync(_chain_source())
+    except Exception as exc:
+        logger.warning("[explorer_view] sync failed, rebuilding blocks in memory: %s", exc)
+        return None
+    return view
+
+
+def _sync_explorer_view() -> None:
+    """Render newly committed blocks into the explorer view (incremental only)."""
+    view = EXPLORER_VIEW
+    if view is None:
+        return
+    try:
+        view.sync(_chain_source(), rebuild=False)
+    except Exception as exc:
+        logger.warning("[explorer_view] incremental sync failed: %s", exc)
+
+
+_TX_LOG_MIRROR = _DebouncedSnapshotter("tx_log", TX_LOG_MIRROR_DEBOUNCE_SECONDS, lambda: TX_LOG_STORE.write_json_snapshot(TX_LOG_FILE))
+atexit.register(_TX_LOG_MIRROR.flush)
+
+
+def _save_tx_log_to_store(records: list) -> None:
+    if not isinstance(records, list):
+        raise TypeError("tx log must be a list")
+    TX_LOG_STORE.replace_all(records)
+    _TX_LOG_MIRROR.schedule()
+
+
+def _init_tx_log_store():
+    """Open the tx log journal, importing TX_LOG_FILE on first start."""
+    global TX_LOG_STORE
+    if not USE_TX_LOG_JOURNAL:
+        return
+    store = TxLogJournal(TX_LOG_JOURNAL_FILE)
+    imported = store.migrate_from_json(TX_LOG_FILE)
+    TX_LOG_STORE = store
+    logger.info("[tx_log] journal ready: %d records (migrated=%d)", len(store), imported)
+
+
+def _init_chain_store():
+    """Open the segmented chain store, migrating CHAIN_FILE on first start."""
+    global CHAIN_STORE
+    if not USE_CHAIN_STORE:
+        return
+    store = ChainStore(CHAIN_STORE_DIR)
+    imported = store.migrate_from_json(CHAIN_FILE)
+    if imported or store.get_meta("mirror_mtime_ns") is None:
+        try:
+            st = os.stat(CHAIN_FILE)
+            store.set_meta(mirror_mtime_ns=st.st_mtime_ns, mirror_size=st.st_size)
+        except OSError:
+            pass
+    CHAIN_STORE = store
+    logger.info("[chain_store] ready: %d entries, %d blocks (migrated=%d)", len(store), store.block_count, imported)
+
+
 _init_ledger_db()
+_init_chain_store()
+_init_tx_log_store()
 
 
 def _default_tokens_registry() -> dict:
@@ -3851,7 +4508,7 @@ def record_ai_interaction(
     append_ai_interaction(entry)
     try:
         if "create_ai_transfer_from_ledger_entry" in globals():
-            create_ai_transfer_from_ledger_entry(entry)
+            create_ai_transfer_from_ledger_entry(entry, append_chain=append_chain_entries)
         else:
             logger.warning("AI transfer handler missing; skipping entry", extra={"provider": provider, "model": model})
     except Exception:
@@ -3990,34 +4647,26 @@ def _aggregate_model_metrics(interactions: list[dict]) -> dict:
 
 # ─── LIGHTWEIGHT CHAIN CACHE ────────────────────────────────────────────────
 # Mining/miner support endpoints are latency-sensitive and should not block on
-# repeated full-chain reads.  Keep a simple mtime-based cache for the chain and
-# re-use derived views (e.g., reward-bearing blocks).
+# repeated full-chain reads.  Keep a simple mtime-based cache for the chain;
+# reward-bearing blocks come from the incrementally maintained chain_state().
 CHAIN_CACHE = {
     "mtime": 0.0,
     "chain": [],
-    "reward_blocks": [],
 }
 
 
 def load_chain_cached():
-    try:
-        mtime = os.path.getmtime(CHAIN_FILE)
-    except OSError:
-        mtime = 0
+    mtime = chain_version()
     if CHAIN_CACHE["chain"] and CHAIN_CACHE["mtime"] == mtime:
         return CHAIN_CACHE["chain"]
 
     chain = load_json(CHAIN_FILE, [])
-    reward_blocks = [b for b in chain if isinstance(b, dict) and b.get("reward") is not None]
-    CHAIN_CACHE.update({"mtime": mtime, "chain": chain, "reward_blocks": reward_blocks})
+    CHAIN_CACHE.update({"mtime": mtime, "chain": chain})
     return chain
 
 
 def get_reward_blocks():
-    if CHAIN_CACHE["reward_blocks"]:
-        return CHAIN_CACHE["reward_blocks"]
-    load_chain_cached()
-    return CHAIN_CACHE["reward_blocks"]
+    return chain_state().reward_blocks
 
 def load_mempool():
     return load_json(MEMPOOL_FILE, [])
@@ -4044,6 +4693,53 @@ def save_tx_log(txs):
     save_json(TX_LOG_FILE, txs)
 
 
+def tx_log_count() -> int:
+    if TX_LOG_STORE is not None:
+        return len(TX_LOG_STORE)
+    return len(load_tx_log())
+
+
+def iter_tx_log(offset: int = 0, limit: int | None = None, page_size: int = 500):
+    """Yield normalized tx records newest-first, one journal page at a time."""
+    if TX_LOG_STORE is None:
+        records = load_tx_log()
+        yield from records[offset:None if limit is None else offset + limit]
+        return
+    remaining = limit
+    while remaining is None or remaining > 0:
+        count = page_size if remaining is None else min(page_size, remaining)
+        page = list(TX_LOG_STORE.iter_page(offset, count))
+        yield from page
+        if len(page) < count:
+            return
+        offset += count
+        if remaining is not None:
+            remaining -= count
+
+
+def upsert_tx_log_record(record: dict) -> dict:
+    """Insert or merge-update one tx log record by tx_id without rewriting the log."""
+    if TX_LOG_STORE is not None:
+        _enforce_write_protection(TX_LOG_FILE)
+        merged = TX_LOG_STORE.upsert(record)
+        _TX_LOG_MIRROR.schedule()
+        _sync_wallet_history_index()
+        return merged
+    ledger = load_tx_log()
+    merged = record
+    for idx, existing in enumerate(ledger):
+        if record.get("tx_id") and existing.get("tx_id") == record.get("tx_id"):
+            merged = existing.copy()
+            merged.update(record)
+            ledger[idx] = merged
+            break
+    else:
+        ledger.append(record)
+    ledger.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+    save_tx_log(ledger)
+    return merged
+
+
 def _canonical_kind(kind_raw: str) -> str:
     """Map heterogeneous kind/type values to a canonical taxonomy.
 
@@ -4536,14 +5232,33 @@ def _apply_legacy_liquidity_backfill(raw: dict) -> dict:
     return raw
 
 
-def _seed_tx_log_from_chain() -> list[dict]:
-    """Ensure the tx ledger contains legacy chain entries (deduped)."""
+def _seed_tx_log_from_chain() -> int:
+    """Ensure the tx ledger contains legacy chain entries (deduped). Returns records added."""
+
+    if TX_LOG_STORE is not None and CHAIN_STORE is not None:
+        # Only normalize chain entries appended since the last seed.
+        seeded = int(CHAIN_STORE.get_meta("tx_log_seeded_len", 0) or 0)
+        if seeded > len(CHAIN_STORE):
+            seeded = 0
+        total = len(CHAIN_STORE)
+        fresh = []
+        for raw in CHAIN_STORE.iter_range(seeded, total):
+            raw = _apply_legacy_ai_job_backfill(raw)
+            raw = _apply_legacy_liquidity_backfill(raw)
+            norm = _normalize_tx_for_display(raw)
+            if norm:
+                fresh.append(norm)
+        added = TX_LOG_STORE.add_missing(fresh)
+        CHAIN_STORE.set_meta(tx_log_seeded_len=total)
+        if added:
+            _TX_LOG_MIRROR.schedule()
+        return added
 
     ledger = load_tx_log()
     seen = {entry.get("tx_id") or entry.get("hash") for entry in ledger if isinstance(entry, dict)}
     chain = load_json(CHAIN_FILE, [])
 
-    updated = False
+    added = 0
     for raw in chain:
         raw = _apply_legacy_ai_job_backfill(raw)
         raw = _apply_legacy_liquidity_backfill(raw)
@@ -4556,13 +5271,13 @@ def _seed_tx_log_from_chain() -> list[dict]:
         ledger.append(norm)
         if tx_id:
             seen.add(tx_id)
-        updated = True
+        added += 1
 
-    if updated:
+    if added:
         ledger.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
         save_tx_log(ledger)
 
-    return ledger
+    return added
 
 
 def persist_normalized_tx(raw_tx: dict, status_override: str | None = None):
@@ -4575,21 +5290,7 @@ def persist_normalized_tx(raw_tx: dict, status_override: str | None = None):
     if status_override:
         norm["status"] = status_override
 
-    ledger = load_tx_log()
-    replaced = False
-    for idx, existing in enumerate(ledger):
-        if existing.get("tx_id") == norm.get("tx_id"):
-            merged = existing.copy()
-            merged.update(norm)
-            ledger[idx] = merged
-            replaced = True
-            break
-
-    if not replaced:
-        ledger.append(norm)
-
-    ledger.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-    save_tx_log(ledger)
+    upsert_tx_log_record(norm)
 
 
 def _pick_fiat_validator() -> dict:
@@ -4669,6 +5370,19 @@ def load_token_balances():
 
 def save_token_balances(balances):
     save_json(TOKEN_BALANCES_FILE, balances)
+    _sync_token_balance_index(lambda: TOKEN_BALANCE_INDEX.sync_symbols(balances))
+
+
+def _sync_token_balance_index(sync) -> None:
+    """Mirror a token balance file write into the index (best effort; reconcile repairs)."""
+    if not USE_SQLITE_LEDGER or TOKEN_BALANCE_INDEX is None:
+        invalidate_wallet_balances()
+        return
+    try:
+        _invalidate_wallet_balances_after_commit(sync())
+    except Exception as exc:
+        logger.warning("[token_balance_index] sync failed: %s", exc)
+        invalidate_wallet_balances()
 
 def load_pools():
     """Load all Thronos-native AMM pools from ``POOLS_FILE`` (pools.json).
@@ -5274,15 +5988,54 @@ def get_all_tokens():
     return catalog
 
 
+def _sqlite_balance_lookup(conn, ledger_type: str, address: str):
+    """
+    Balance row for ``address``: exact primary-key hit first, then the
+    (ledger_type, address_norm) index for mixed-case legacy records.
+    Returns (row, source) with source sqlite_exact | sqlite_upper | zero.
+    """
+    row = conn.execute(
+        "SELECT balance FROM balances WHERE ledger_type = ? AND address = ?",
+        (ledger_type, address),
+    ).fetchone()
+    if row:
+        return row, "sqlite_exact"
+    row = conn.execute(
+        "SELECT balance FROM balances WHERE ledger_type = ? AND address_norm = ? LIMIT 1",
+        (ledger_type, _address_norm(address)),
+    ).fetchone()
+    if row:
+        return row, "sqlite_upper"
+    return None, "zero"
+
+
+_JSON_LEDGER_NORM_INDEX: dict = {}
+
+
+def _json_ledger_norm_key(path: str, ledger: dict, address: str) -> str | None:
+    """Ledger key matching ``address`` case-insensitively, via a per-file normalized index."""
+    try:
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    cached = _JSON_LEDGER_NORM_INDEX.get(path)
+    if cached is None or stamp is None or cached[0] != stamp:
+        index: dict = {}
+        for key in ledger:
+            index.setdefault(_address_norm(key), key)
+        cached = (stamp, index)
+        _JSON_LEDGER_NORM_INDEX[path] = cached
+    key = cached[1].get(_address_norm(address))
+    return key if key in ledger else None
+
+
 def get_balance_from_store(wallet: str, ledger_type: str, default: float = 0.0) -> float:
     if not wallet:
         return default
     if USE_SQLITE_LEDGER:
         with _get_ledger_db_connection() as conn:
-            row = conn.execute(
-                "SELECT balance FROM balances WHERE ledger_type = ? AND address = ?",
-                (ledger_type, wallet),
-            ).fetchone()
+            row, _ = _sqlite_balance_lookup(conn, ledger_type, wallet)
         if row:
             return float(row["balance"])
         return default
@@ -5294,7 +6047,10 @@ def get_balance_from_store(wallet: str, ledger_type: str, default: float = 0.0)
     if not ledger_path:
         return default
     ledger = load_json(ledger_path, {})
-    return float(ledger.get(wallet, default))
+    if wallet in ledger:
+        return float(ledger[wallet])
+    key = _json_ledger_norm_key(ledger_path, ledger, wallet)
+    return float(ledger[key]) if key is not None else default
 
 
 def get_thr_balance(address: str) -> tuple[float, str]:
@@ -5304,8 +6060,9 @@ def get_thr_balance(address: str) -> tuple[float, str]:
     Tries (in order):
     1. Exact match (fastest path)
     2. Uppercase address (most wallets canonicalize to upper)
-    3. Case-insensitive scan (for mixed-case legacy records)
-    4. SQLite UPPER() match (when USE_SQLITE_LEDGER=True)
+    3. Case-insensitive match via the normalized-address index (for
+       mixed-case legacy records)
+    4. SQLite address_norm match (when USE_SQLITE_LEDGER=True)
 
     Returns (balance, source) where source is one of:
       ledger_exact | ledger_upper | ledger_case_insensitive |
@@ -5318,18 +6075,9 @@ def get_thr_balance(address: str) -> tuple[float, str]:
 
     if USE_SQLITE_LEDGER:
         with _get_ledger_db_connection() as conn:
-            row = conn.execute(
-                "SELECT balance FROM balances WHERE ledger_type = 'thr' AND address = ?",
-                (address,),
-            ).fetchone()
-            if row:
-                return float(row["balance"]), "sqlite_exact"
-            row = conn.execute(
-                "SELECT balance FROM balances WHERE ledger_type = 'thr' AND UPPER(address) = UPPER(?)",
-                (address,),
-            ).fetchone()
-            if row:
-                return float(row["balance"]), "sqlite_upper"
+            row, source = _sqlite_balance_lookup(conn, "thr", address)
+        if row:
+            return float(row["balance"]), source
         return 0.0, "zero"
 
     # JSON ledger fallback
@@ -5338,10 +6086,10 @@ def get_thr_balance(address: str) -> tuple[float, str]:
         return float(ledger[address]), "ledger_exact"
     if addr_upper in ledger:
         return float(ledger[addr_upper]), "ledger_upper"
-    # Case-insensitive scan (O(n) but only reached for legacy mixed-case records)
-    for k, v in ledger.items():
-        if k.upper() == addr_upper:
-            return float(v), "ledger_case_insensitive"
+    # Case-insensitive match (only reached for legacy mixed-case records)
+    key = _json_ledger_norm_key(LEDGER_FILE, ledger, address)
+    if key is not None:
+        return float(ledger[key]), "ledger_case_insensitive"
     return 0.0, "zero"
 
 
@@ -5565,16 +6313,37 @@ def get_withdrawal_fee_distinction(dest_chain: str) -> dict:
 
 
 def get_wallet_balances(wallet: str):
-    thr_balance = round(get_balance_from_store(wallet, "thr", 0.0), 6)
-    wbtc_balance = round(get_balance_from_store(wallet, "wbtc", 0.0), 8)
-    l2e_balance = round(get_balance_from_store(wallet, "l2e", 0.0), 6)
+    # With SQLite, native and custom-token balances come from one indexed
+    # query (token_balance_index.py) instead of one ledger file per token.
+    portfolio = None
+    if USE_SQLITE_LEDGER and TOKEN_BALANCE_INDEX is not None:
+        portfolio = TOKEN_BALANCE_INDEX.portfolio(wallet)
+    if portfolio is not None:
+        thr_balance = round(portfolio.get("ledger:thr", 0.0), 6)
+        wbtc_balance = round(portfolio.get("ledger:wbtc", 0.0), 8)
+        l2e_balance = round(portfolio.get("ledger:l2e", 0.0), 6)
+        symbol_balances = {
+            symbol: portfolio.get(SYMBOL_PREFIX + symbol, 0.0)
+            for symbol in TOKEN_BALANCE_INDEX.legacy_symbols()
+        }
+    else:
+        thr_balance = round(get_balance_from_store(wallet, "thr", 0.0), 6)
+        wbtc_balance = round(get_balance_from_store(wallet, "wbtc", 0.0), 8)
+        l2e_balance = round(get_balance_from_store(wallet, "l2e", 0.0), 6)
+        symbol_balances = {
+            symbol: balances.get(wallet, 0.0) if isinstance(balances, dict) else 0.0
+            for symbol, balances in load_token_balances().items()
+        }
 
-    custom_token_balances = load_token_balances()
+    # Prices are memoized for this request; pools are read at most once.
     prices_cache = {}
+    request_pools = []
 
     def price_for(symbol):
         if symbol not in prices_cache:
-            prices_cache[symbol] = get_token_price_in_thr(symbol)
+            if not request_pools:
+                request_pools.append(load_pools())
+            prices_cache[symbol] = get_token_price_in_thr(symbol, pools=request_pools[0])
         return prices_cache[symbol]
 
     wbtc_price = price_for("WBTC")
@@ -5643,8 +6412,11 @@ def get_wallet_balances(wallet: str):
         token_id = token_data.get("id")
         if not token_id:
             continue
-        token_ledger = load_custom_token_ledger(token_id)
-        token_balance = round(float(token_ledger.get(wallet, 0.0)), token_data.get("decimals", 6))
+        if portfolio is not None:
+            raw_balance = portfolio.get(token_id, 0.0)
+        else:
+            raw_balance = load_custom_token_ledger(token_id).get(wallet, 0.0)
+        token_balance = round(float(raw_balance), token_data.get("decimals", 6))
 
         # CRITICAL FIX #2: Use correct logo URL (media vs static)
         logo_path = resolve_token_logo(token_data)
@@ -5684,9 +6456,9 @@ def get_wallet_balances(wallet: str):
         "WBTC": wbtc_balance,
         "L2E": l2e_balance,
     }
-    for symbol, balances in custom_token_balances.items():
+    for symbol, balance in symbol_balances.items():
         try:
-            token_balances[symbol] = round(float(balances.get(wallet, 0.0)), 6)
+            token_balances[symbol] = round(float(balance), 6)
         except Exception:
             token_balances[symbol] = 0.0
 
@@ -5703,7 +6475,7 @@ def _balance_cache_key(wallet: str) -> str:
     return f"balances:{wallet}"
 
 
-def _get_cached_balances_from_redis(wallet: str, tip_hash: str) -> dict | None:
+def _get_cached_balances_from_redis(wallet: str, version: str) -> dict | None:
     if not REDIS_CLIENT:
         return None
     try:
@@ -5711,18 +6483,18 @@ def _get_cached_balances_from_redis(wallet: str, tip_hash: str) -> dict | None:
         if not raw:
             return None
         payload = json.loads(raw)
-        if payload.get("tip_hash") != tip_hash:
+        if payload.get("version") != version:
             return None
         return payload.get("data")
     except Exception:
         return None
 
 
-def _set_cached_balances_in_redis(wallet: str, tip_hash: str, data: dict) -> None:
+def _set_cached_balances_in_redis(wallet: str, version: str, data: dict) -> None:
     if not REDIS_CLIENT:
         return
     try:
-        payload = json.dumps({"tip_hash": tip_hash, "data": data})
+        payload = json.dumps({"version": version, "data": data})
         REDIS_CLIENT.setex(_balance_cache_key(wallet), int(BALANCE_CACHE_TTL), payload)
     except Exception:
         return
@@ -5730,27 +6502,24 @@ def _set_cached_balances_in_redis(wallet: str, tip_hash: str, data: dict) -> Non
 
 def get_wallet_balances_cached(wallet: str) -> dict:
     now = time.time()
-    # Try to get tip_hash but don't block if it takes too long
-    try:
-        snapshot = LAST_BLOCK_SNAPSHOT if LAST_BLOCK_SNAPSHOT else load_json(LAST_BLOCK_FILE, {})
-        tip_hash = (snapshot.get("block_hash") or "").strip() if isinstance(snapshot, dict) else ""
-    except Exception:
-        tip_hash = ""  # Fallback: cache without block validation
+    # Entries stay valid until a write touches this wallet (or the TTL lapses),
+    # not until the next block on the chain.
+    version = _wallet_balance_version(wallet)
 
-    redis_payload = _get_cached_balances_from_redis(wallet, tip_hash)
+    redis_payload = _get_cached_balances_from_redis(wallet, version)
     if redis_payload:
         return redis_payload
 
     entry = BALANCE_CACHE.get(wallet)
     if (
         entry
-        and entry.get("tip_hash") == tip_hash
+        and entry.get("version") == version
         and now - entry.get("ts", 0.0) < BALANCE_CACHE_TTL
     ):
         return entry["data"]
     data = get_wallet_balances(wallet)
-    BALANCE_CACHE[wallet] = {"ts": now, "data": data, "tip_hash": tip_hash}
-    _set_cached_balances_in_redis(wallet, tip_hash, data)
+    BALANCE_CACHE[wallet] = {"ts": now, "data": data, "version": version}
+    _set_cached_balances_in_redis(wallet, version, data)
     return data
 
 def load_attest_store():
@@ -6557,10 +7326,9 @@ def _is_live_session_access_allowed(access_type: str, enrollment: dict | None, l
 #
 # Thronos v3.7 introduces a rudimentary peer‑to‑peer network.  Each node
 # maintains a list of known peers in ``peers.json``.  These helpers load and
-# persist the peer list and provide simple broadcast functions for
-# transactions and blocks.  Networking here is best‑effort: failed HTTP
-# requests are silently ignored.  In future versions, failure handling and
-# peer pruning could be added.
+# persist the peer list and hand transactions and blocks to ``PEER_RELAY``,
+# which fans them out concurrently.  Networking here is best‑effort: failed
+# sends are counted per peer and unreachable peers are backed off.
 
 def load_peers() -> list:
     """Load the list of known peer URLs from ``PEERS_FILE``.  Returns an
@@ -6578,33 +7346,39 @@ def save_peers(peers: list) -> None:
             seen.add(p)
             unique.append(p)
     save_json(PEERS_FILE, unique)
+    if PEER_RELAY is not None:
+        PEER_RELAY.invalidate()
+
+
+PEER_RELAY = PeerRelay(
+    load_peers,
+    peers_path=PEERS_FILE,
+    max_workers=PEER_RELAY_MAX_WORKERS,
+    timeout=PEER_RELAY_TIMEOUT_SECONDS,
+    tx_queue_limit=PEER_RELAY_TX_QUEUE,
+)
 
 
 def broadcast_tx(tx: dict) -> None:
-    """Broadcast a single transaction to all known peers.  Uses a POST
-    request to the peer's ``/api/v1/receive_tx`` endpoint.  Errors during
-    broadcast are ignored."""
-    peers = load_peers()
-    for peer in peers:
-        try:
-            # ensure trailing slash is not duplicated
-            url = peer.rstrip("/") + "/api/v1/receive_tx"
-            requests.post(url, json=tx, timeout=2)
-        except Exception:
-            pass
+    """Broadcast a single transaction to all known peers.  The tx is queued
+    for each peer's ``/api/v1/receive_tx`` endpoint and sent in the
+    background; this call does not wait for the network."""
+    try:
+        PEER_RELAY.broadcast_tx(tx)
+    except Exception as e:
+        logger.warning("broadcast_tx: relay error: %s", e)
 
 
-def broadcast_block(block: dict) -> None:
-    """Broadcast a mined block to all known peers.  Uses a POST
-    request to the peer's ``/api/v1/receive_block`` endpoint.  Errors during
-    broadcast are ignored."""
-    peers = load_peers()
-    for peer in peers:
-        try:
-            url = peer.rstrip("/") + "/api/v1/receive_block"
-            requests.post(url, json=block, timeout=2)
-        except Exception:
-            pass
+def broadcast_block(block: dict, txs: list | None = None) -> None:
+    """Broadcast a mined block to all known peers.  The block is queued for
+    each peer, replacing any older block still waiting for that peer, and
+    sent in the background.  With the block's included ``txs`` it goes out
+    as a compact block (header + short tx ids, see compact_block.py)."""
+    try:
+        compact = CompactBlock(block, txs) if txs is not None else None
+        PEER_RELAY.broadcast_block(block, compact)
+    except Exception as e:
+        logger.warning("broadcast_block: relay error: %s", e)
 
 # --- AI Packs & Credits helpers ------------------------------------------------
 
@@ -7646,11 +8420,9 @@ def recompute_height_offset_from_ledger():
     global HEIGHT_OFFSET
 
     ledger = load_json(LEDGER_FILE, {})
-    chain  = load_json(CHAIN_FILE, [])
 
     # Όσα blocks υπάρχουν ΗΔΗ στο chain
-    blocks = [b for b in chain if isinstance(b, dict) and b.get("reward") is not None]
-    minted_from_blocks = sum(float(b.get("reward", 0.0)) for b in blocks)
+    minted_from_blocks = chain_state().minted_from_blocks
 
     # Συνολικό supply από ledger (άθροισμα όλων των διευθύνσεων)
     total_ledger = sum(float(v) for v in ledger.values())
@@ -7680,40 +8452,19 @@ def recompute_height_offset_from_ledger():
 
 
 def compute_thr_supply_metrics(chain: list | None = None, pools: list | None = None) -> dict:
-    """Compute THR supply metrics from chain events and pools."""
-    if chain is None:
-        chain = load_json(CHAIN_FILE, [])
+    """
+    Compute THR supply metrics from chain events and pools.
+
+    Without an explicit ``chain`` the totals come from chain_state(), which
+    folds each committed entry in once instead of rescanning the chain.
+    """
+    state = chain_state() if chain is None else ChainState.from_entries(chain)
     if pools is None:
         pools = load_pools()
 
-    minted_from_blocks = sum(
-        float(block.get("reward", 0.0))
-        for block in chain
-        if isinstance(block, dict) and block.get("reward") is not None
-    )
-    minted_from_admin = 0.0
-    burned_from_fees = 0.0
-    burned_from_events = 0.0
-
-    for tx in chain:
-        if not isinstance(tx, dict) or tx.get("reward") is not None:
-            continue
-        tx_type = (tx.get("type") or "").lower()
-        if tx_type in {"mint", "coinbase", "reward"}:
-            minted_from_admin += float(tx.get("amount", 0.0) or 0.0)
-        burned_from_fees += float(tx.get("fee_burned", 0.0) or tx.get("fee", 0.0) or 0.0)
-        if tx_type in {"burn", "thr_burn"}:
-            burned_from_events += float(tx.get("amount", 0.0) or 0.0)
-        burned_from_events += float(tx.get("burn_amount", 0.0) or tx.get("burned_thr", 0.0) or 0.0)
-
-    burned_from_blocks = sum(
-        float((block.get("reward_split") or {}).get("burn", block.get("pool_fee", 0.0)) or 0.0)
-        for block in chain
-        if isinstance(block, dict) and block.get("reward") is not None
-    )
-
-    minted_total_thr = minted_from_blocks + minted_from_admin
-    burned_total_thr = burned_from_blocks + burned_from_fees + burned_from_events
+    totals = state.supply_totals()
+    minted_total_thr = totals["minted_from_blocks"] + totals["minted_from_admin"]
+    burned_total_thr = totals["burned_from_blocks"] + totals["burned_from_fees"] + totals["burned_from_events"]
     total_supply_thr = max(round(minted_total_thr - burned_total_thr, 6), 0.0)
 
     locked_in_pools_thr = 0.0
@@ -7748,11 +8499,9 @@ def update_last_block(entry, is_block=True):
     - total_supply (άθροισμα ledger)
     ώστε η αρχική σελίδα να ξέρει ΠΟΣΑ block και ΠΟΣΟ supply έχουμε.
     """
-    chain  = load_json(CHAIN_FILE, [])
-    blocks = [b for b in chain if isinstance(b, dict) and b.get("reward") is not None]
-    block_count = HEIGHT_OFFSET + len(blocks)
+    block_count = HEIGHT_OFFSET + chain_state().block_count
 
-    supply_metrics = compute_thr_supply_metrics(chain=chain)
+    supply_metrics = compute_thr_supply_metrics()
     total_supply = supply_metrics["total_supply_thr"]
 
     # Build the summary for the last block or transaction.  When
@@ -7780,6 +8529,7 @@ def update_last_block(entry, is_block=True):
             summary["timestamp"] = existing.get("timestamp")
             summary["thr_address"] = existing.get("thr_address")
     save_json(LAST_BLOCK_FILE, summary)
+    REPLICA_SYNC_STATE.invalidate()
     LAST_BLOCK_SNAPSHOT.clear()
     LAST_BLOCK_SNAPSHOT.update(summary)
     set_chain_meta(
@@ -7795,6 +8545,8 @@ def update_last_block(entry, is_block=True):
             "timestamp": summary.get("timestamp"),
         },
     })
+    if is_block and MINING_JOBS is not None:
+        MINING_JOBS.invalidate()
 
 
 def get_last_block_snapshot() -> dict:
@@ -8140,28 +8892,143 @@ def enqueue_offline_corpus(wallet: str, prompt: str, response: str, files, sessi
 
 
 # ─── VIEWER HELPERS ────────────────────────────────
+_VIEWER_TX_TYPES = frozenset((
+    "transfer",
+    "coinbase",
+    "service_payment",
+    "ai_knowledge",
+    "token_transfer",
+    "token_create",
+    "token_mint",
+    "token_burn",
+    "swap",
+    "bridge",
+    "ai_credits",
+    "mail_attestation",
+    "referral_earning",
+    "l2e",
+    "iot",
+    "autopilot",
+))
+
+
+def _render_viewer_block(b: dict, block_txs: list, height) -> dict:
+    """Explorer row for one block entry and the txs recorded at its height."""
+    # Always use current schedule (calculate_reward + 80/10/5/5 split) for display.
+    # Old blocks stored with pre-upgrade rewards (e.g. 1.0 THR / 90-10 split) are
+    # rendered with the post-upgrade schedule so the explorer reflects current economics.
+    try:
+        scheduled_reward = calculate_reward(int(height))
+    except Exception:
+        scheduled_reward = 8.0  # Phase C5 initial reward
+
+    stored_reward = float(b.get("reward", 0.0) or 0.0)
+    rsplit = b.get("reward_split") or {}
+    stored_split_total = (
+        float(rsplit.get("miner", 0.0))
+        + float(rsplit.get("ai", 0.0))
+        + float(rsplit.get("burn", 0.0))
+        + float(rsplit.get("full_nodes", 0.0))
+        + float(rsplit.get("ecosystem", 0.0))
+    ) if rsplit else 0.0
+
+    # Trust stored values only if they match the current schedule (post-upgrade blocks).
+    # Otherwise (pre-upgrade / corrupt data) regenerate from calculate_reward(height).
+    if rsplit and abs(stored_split_total - scheduled_reward) < 0.001:
+        total_reward = stored_split_total
+        reward_to_miner = float(rsplit.get("miner", 0.0))
+        reward_to_ai = float(rsplit.get("ai", 0.0))
+        burn_from_split = (
+            float(rsplit.get("burn", 0.0))
+            + float(rsplit.get("full_nodes", 0.0))
+            + float(rsplit.get("ecosystem", 0.0))
+        )
+    elif stored_reward > 0 and abs(stored_reward - scheduled_reward) < 0.001:
+        # Stored total matches schedule but no split info — derive 80/10/5/5
+        total_reward = stored_reward
+        reward_to_miner = total_reward * 0.80
+        reward_to_ai = total_reward * 0.10
+        burn_from_split = total_reward * 0.10  # 5% full_nodes + 5% ecosystem
+    else:
+        # Pre-upgrade or corrupt block — render with current schedule
+        total_reward = scheduled_reward
+        reward_to_miner = total_reward * 0.80
+        reward_to_ai = total_reward * 0.10
+        burn_from_split = total_reward * 0.10
+
+    fees_from_txs = sum(float(tx.get("fee_burned", 0.0) or tx.get("fee", 0.0)) for tx in block_txs)
+
+    miner_address = b.get("thr_address") or b.get("miner_address") or ""
+    if not miner_address and block_txs:
+        for tx in block_txs:
+            if tx.get("type") in ("coinbase", "mining_reward"):
+                miner_address = tx.get("to") or tx.get("thr_address") or ""
+                break
+
+    return {
+        "index": height,
+        "hash": b.get("block_hash", ""),
+        "thr_address": miner_address,
+        "fee_burned": round(burn_from_split + fees_from_txs, 6),
+        "reward_to_miner": round(reward_to_miner, 6),
+        "reward_to_ai": round(reward_to_ai, 6),
+        "reward": round(total_reward, 6),
+        "is_stratum": bool(b.get("is_stratum")),
+        "nonce": b.get("nonce", "-"),
+        "transactions": block_txs,
+        "timestamp": b.get("timestamp", "")
+    }
+
+
+EXPLORER_VIEW = (
+    ExplorerBlockView(lambda: LEDGER_DB.connection(EXPLORER_VIEW_DB_FILE), _render_viewer_block, _VIEWER_TX_TYPES)
+    if USE_EXPLORER_VIEW else None
+)
+
+
+def _viewer_max_height():
+    """
+    Highest height shown by the viewer.
+
+    Orphan / phantom blocks: anything whose height is more than 1 above the
+    canonical tip (from last_block.json) is treated as an orphan and excluded
+    from the viewer. This prevents corrupted past mining state (e.g. ghost
+    blocks at heights 204773/204772 while real tip is 200285) from polluting
+    the display.  Allows tip_height + 1 (block currently being mined).
+    """
+    try:
+        tip_snapshot = get_last_block_snapshot() or {}
+        tip_height = int(tip_snapshot.get("height") or 0)
+    except Exception:
+        return None
+    return tip_height + 1 if tip_height > 0 else None
+
+
+def _explorer_etag() -> str:
+    """Weak ETag for explorer block pages: changes with the tip and the chain."""
+    snapshot = get_last_block_snapshot() or {}
+    tip_hash = str(snapshot.get("block_hash") or snapshot.get("last_hash") or "genesis")
+    digest = hashlib.sha1(repr((tip_hash, snapshot.get("height"), chain_version())).encode()).hexdigest()
+    return f"{tip_hash[:16]}-{digest[:12]}"
+
+
+def _explorer_not_modified(etag: str):
+    """304 response when the client's If-None-Match already has ``etag``."""
+    if request.if_none_match.contains_weak(etag):
+        resp = app.response_class(status=304)
+        resp.set_etag(etag, weak=True)
+        return resp
+    return None
+
+
 def get_blocks_for_viewer():
+    view = explorer_view()
+    if view is not None:
+        return view.all_rows(_viewer_max_height())
+
     chain = load_json(CHAIN_FILE, [])
 
     # Pre-index transactions by height for O(1) lookup instead of O(n) per block
-    _TX_TYPES = frozenset((
-        "transfer",
-        "coinbase",
-        "service_payment",
-        "ai_knowledge",
-        "token_transfer",
-        "token_create",
-        "token_mint",
-        "token_burn",
-        "swap",
-        "bridge",
-        "ai_credits",
-        "mail_attestation",
-        "referral_earning",
-        "l2e",
-        "iot",
-        "autopilot",
-    ))
     txs_by_height = {}
     raw_blocks = []
     for entry in chain:
@@ -8169,7 +9036,7 @@ def get_blocks_for_viewer():
             continue
         if entry.get("reward") is not None:
             raw_blocks.append(entry)
-        elif entry.get("type") in _TX_TYPES and entry.get("height") is not None:
+        elif entry.get("type") in _VIEWER_TX_TYPES and entry.get("height") is not None:
             h = entry["height"]
             txs_by_height.setdefault(h, []).append(entry)
 
@@ -8178,72 +9045,7 @@ def get_blocks_for_viewer():
         height = b.get("height")
         if height is None:
             height = len(blocks)
-        block_txs = txs_by_height.get(height, [])
-
-        # Always use current schedule (calculate_reward + 80/10/5/5 split) for display.
-        # Old blocks stored with pre-upgrade rewards (e.g. 1.0 THR / 90-10 split) are
-        # rendered with the post-upgrade schedule so the explorer reflects current economics.
-        try:
-            scheduled_reward = calculate_reward(int(height))
-        except Exception:
-            scheduled_reward = 8.0  # Phase C5 initial reward
-
-        stored_reward = float(b.get("reward", 0.0) or 0.0)
-        rsplit = b.get("reward_split") or {}
-        stored_split_total = (
-            float(rsplit.get("miner", 0.0))
-            + float(rsplit.get("ai", 0.0))
-            + float(rsplit.get("burn", 0.0))
-            + float(rsplit.get("full_nodes", 0.0))
-            + float(rsplit.get("ecosystem", 0.0))
-        ) if rsplit else 0.0
-
-        # Trust stored values only if they match the current schedule (post-upgrade blocks).
-        # Otherwise (pre-upgrade / corrupt data) regenerate from calculate_reward(height).
-        if rsplit and abs(stored_split_total - scheduled_reward) < 0.001:
-            total_reward = stored_split_total
-            reward_to_miner = float(rsplit.get("miner", 0.0))
-            reward_to_ai = float(rsplit.get("ai", 0.0))
-            burn_from_split = (
-                float(rsplit.get("burn", 0.0))
-                + float(rsplit.get("full_nodes", 0.0))
-                + float(rsplit.get("ecosystem", 0.0))
-            )
-        elif stored_reward > 0 and abs(stored_reward - scheduled_reward) < 0.001:
-            # Stored total matches schedule but no split info — derive 80/10/5/5
-            total_reward = stored_reward
-            reward_to_miner = total_reward * 0.80
-            reward_to_ai = total_reward * 0.10
-            burn_from_split = total_reward * 0.10  # 5% full_nodes + 5% ecosystem
-        else:
-            # Pre-upgrade or corrupt block — render with current schedule
-            total_reward = scheduled_reward
-            reward_to_miner = total_reward * 0.80
-            reward_to_ai = total_reward * 0.10
-            burn_from_split = total_reward * 0.10
-
-        fees_from_txs = sum(float(tx.get("fee_burned", 0.0) or tx.get("fee", 0.0)) for tx in block_txs)
-
-        miner_address = b.get("thr_address") or b.get("miner_address") or ""
-        if not miner_address and block_txs:
-            for tx in block_txs:
-                if tx.get("type") in ("coinbase", "mining_reward"):
-                    miner_address = tx.get("to") or tx.get("thr_address") or ""
-                    break
-
-        blocks.append({
-            "index": height,
-            "hash": b.get("block_hash", ""),
-            "thr_address": miner_address,
-            "fee_burned": round(burn_from_split + fees_from_txs, 6),
-            "reward_to_miner": round(reward_to_miner, 6),
-            "reward_to_ai": round(reward_to_ai, 6),
-            "reward": round(total_reward, 6),
-            "is_stratum": bool(b.get("is_stratum")),
-            "nonce": b.get("nonce", "-"),
-            "transactions": block_txs,
-            "timestamp": b.get("timestamp", "")
-        })
+        blocks.append(_render_viewer_block(b, txs_by_height.get(height, []), height))
 
     # PR-3: Dedupe blocks by hash before returning (keep last occurrence)
     seen_hashes = {}
@@ -8272,17 +9074,9 @@ def get_blocks_for_viewer():
 
     final_blocks.sort(key=lambda x: x["index"], reverse=True)
 
-    # Filter orphan / phantom blocks: anything whose height is more than 1 above
-    # the canonical tip (from last_block.json) is treated as an orphan and excluded
-    # from the viewer. This prevents corrupted past mining state (e.g. ghost blocks
-    # at heights 204773/204772 while real tip is 200285) from polluting the display.
+    max_visible_height = _viewer_max_height()
     try:
-        tip_snapshot = get_last_block_snapshot() or {}
-        tip_height = int(tip_snapshot.get("height") or 0)
-        if tip_height > 0:
-            # Allow tip_height + 1 (block currently being mined) and tip_height itself.
-            # Anything substantially above tip is an orphan.
-            max_visible_height = tip_height + 1
+        if max_visible_height is not None:
             filtered = [b for b in final_blocks if int(b.get("index") or 0) <= max_visible_height]
             # If filtering would empty the list (e.g. fresh node), fall back to unfiltered.
             if filtered:
@@ -8294,17 +9088,29 @@ def get_blocks_for_viewer():
 
 def _tx_feed(include_pending: bool = True, include_bridge: bool = True) -> list[dict]:
     """Return normalized tx records from the shared ledger plus optional extras."""
+    return list(_iter_tx_feed(include_pending=include_pending, include_bridge=include_bridge))
+
 
-    # Use load_tx_log directly - seeding happens at startup, not on every request
-    records = list(load_tx_log())
-    # Canonicalize kinds in case the ledger has legacy values
-    for r in records:
-        if isinstance(r, dict):
-            r_kind = _canonical_kind(r.get("kind") or r.get("type") or "")
-            r["kind"] = r_kind
-            r.setdefault("type", r_kind)
+def _iter_tx_feed(include_pending: bool = True, include_bridge: bool = True):
+    """
+    Yield the tx feed newest-first without materializing the whole tx log.
+
+    The log is read page by page (already timestamp-ordered); mempool and
+    bridge extras are small, so they are sorted and merged in.
+    """
+    extras: list[dict] = []
+    extra_ids: set = set()
+
+    def _logged(tx_id) -> bool:
+        if TX_LOG_STORE is not None:
+            return tx_id in TX_LOG_STORE
+        return tx_id in log_ids
 
-    seen_ids = {r.get("tx_id") for r in records if r.get("tx_id")}
+    log_records = None
+    log_ids: set = set()
+    if TX_LOG_STORE is None:
+        log_records = list(load_tx_log())
+        log_ids = {r.get("tx_id") for r in log_records if isinstance(r, dict) and r.get("tx_id")}
 
     if include_pending:
         for raw_tx in load_mempool():
@@ -8312,12 +9118,12 @@ def _tx_feed(include_pending: bool = True, include_bridge: bool = True) -> list[
             if not norm:
                 continue
             tx_id = norm.get("tx_id")
-            if tx_id and tx_id in seen_ids:
+            if tx_id and (tx_id in extra_ids or _logged(tx_id)):
                 continue
             norm["status"] = "pending"
-            records.append(norm)
+            extras.append(norm)
             if tx_id:
-                seen_ids.add(tx_id)
+                extra_ids.add(tx_id)
 
     if include_bridge:
         for bridge_tx in _load_bridge_txs():
@@ -8328,14 +9134,30 @@ def _tx_feed(include_pending: bool = True, include_bridge: bool = True) -> list[
             if not norm:
                 continue
             tx_id = norm.get("tx_id")
-            if tx_id and tx_id in seen_ids:
+            if tx_id and (tx_id in extra_ids or _logged(tx_id)):
                 continue
-            records.append(norm)
+            extras.append(norm)
             if tx_id:
-                seen_ids.add(tx_id)
+                extra_ids.add(tx_id)
 
-    records.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-    return records
+    def _ts(record) -> str:
+        return str(record.get("timestamp") or "")
+
+    extras.sort(key=_ts, reverse=True)
+
+    def _log_iter():
+        records = log_records if log_records is not None else iter_tx_log()
+        for r in records:
+            # Canonicalize kinds in case the ledger has legacy values
+            if isinstance(r, dict):
+                r_kind = _canonical_kind(r.get("kind") or r.get("type") or "")
+                r["kind"] = r_kind
+                r.setdefault("type", r_kind)
+            yield r
+
+    if log_records is not None:
+        log_records.sort(key=_ts, reverse=True)
+    yield from heapq.merge(_log_iter(), extras, key=_ts, reverse=True)
 
 
 def get_transactions_for_viewer():
@@ -8555,11 +9377,31 @@ def forward_writes_to_leader():
     return response
 
 
+def _fetch_leader_tip_height():
+    if not LEADER_URL:
+        return None
+    resp = requests.get(f"{LEADER_URL.rstrip('/')}/api/last_block_hash", timeout=5)
+    if not resp.ok:
+        return None
+    return (resp.json() or {}).get("height")
+
+
+# Replica guards run on every /api/* GET; answer them from stat-refreshed
+# state instead of parsing LAST_BLOCK_FILE / CHAIN_FILE per request.
+REPLICA_SYNC_STATE = ReplicaSyncState(
+    LAST_BLOCK_FILE,
+    CHAIN_FILE,
+    stat_interval=REPLICA_SYNC_STAT_INTERVAL_SECONDS,
+    remote_tip_fn=_fetch_leader_tip_height if NODE_ROLE == "replica" else None,
+)
+
+
 def _chain_ready() -> bool:
     """Return True if the local chain file has at least one block."""
     try:
-        chain = load_json(CHAIN_FILE, [])
-        return len(chain) > 0
+        if CHAIN_STORE is not None:
+            return len(CHAIN_STORE) > 0
+        return REPLICA_SYNC_STATE.chain_ready
     except Exception:
         return False
 
@@ -8852,7 +9694,10 @@ def api_viewer_search():
     }
 
     # Search in blocks
-    if search_type in ["all", "blocks"]:
+    view = explorer_view() if search_type in ["all", "blocks"] else None
+    if view is not None:
+        results["blocks"] = view.search(query, limit, _viewer_max_height())
+    elif search_type in ["all", "blocks"]:
         all_blocks = get_blocks_for_viewer()
         query_lower = query.lower()
 
@@ -8907,18 +9752,38 @@ def api_viewer_load_more():
     limit = min(request.args.get("limit", type=int, default=50), 200)
 
     if data_type == "blocks":
+        etag = _explorer_etag()
+        not_modified = _explorer_not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        view = explorer_view()
+        if view is not None:
+            before_height = request.args.get("before_height", type=int)
+            blocks, total = view.page(
+                offset, limit, _viewer_max_height(), before_height=before_height,
+            )
+            has_more = len(blocks) == limit and (before_height is not None or offset + limit < total)
+            resp = jsonify({
+                "ok": True,
+                "blocks": blocks,
+                "total": total,
+                "offset": offset,
+                "has_more": has_more,
+                "next_before_height": blocks[-1].get("index") if has_more else None,
+            })
+            resp.set_etag(etag, weak=True)
+            return resp, 200
+
         all_blocks = get_blocks_for_viewer()
-        # Return blocks in reverse order (newest first) with offset
-        start = max(0, len(all_blocks) - offset - limit)
-        end = len(all_blocks) - offset
-        blocks = all_blocks[start:end][::-1]  # Reverse to show newest first
+        # Blocks are already sorted newest first
+        blocks = all_blocks[offset:offset + limit]
 
         return jsonify({
             "ok": True,
             "blocks": blocks,
             "total": len(all_blocks),
             "offset": offset,
-            "has_more": start > 0
+            "has_more": offset + limit < len(all_blocks)
         }), 200
 
     elif data_type == "txs":
@@ -8955,6 +9820,34 @@ def api_blocks():
     limit = min(request.args.get("limit", type=int, default=100), 500)
     from_height = request.args.get("from_height", type=int)
     to_height = request.args.get("to_height", type=int)
+    before_height = request.args.get("before_height", type=int)
+
+    etag = _explorer_etag()
+    not_modified = _explorer_not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    view = explorer_view()
+    if view is not None:
+        max_height = _viewer_max_height()
+        blocks, total = view.page(
+            offset, limit, max_height, from_height=from_height, to_height=to_height, before_height=before_height,
+        )
+        min_height, max_height_seen = view.height_bounds(max_height, from_height, to_height)
+        has_more = len(blocks) == limit and (before_height is not None or offset + limit < total)
+        resp = jsonify({
+            "ok": True,
+            "blocks": blocks,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "has_more": has_more,
+            "next_before_height": blocks[-1].get("index") if has_more else None,
+            "min_height": min_height,
+            "max_height": max_height_seen
+        })
+        resp.set_etag(etag, weak=True)
+        return resp, 200
 
     # Get all blocks
     all_blocks = get_blocks_for_viewer()
@@ -9351,301 +10244,272 @@ def api_wallet_mining_stats():
     }), 200
 
 
-def _collect_wallet_history_transactions(address: str, category_filter: str):
-    # Load chain + tx_log ONCE (avoid the O(n²) get_blocks_for_viewer call)
-    chain = load_json(CHAIN_FILE, [])
-    tx_log = load_tx_log()
+_WALLET_HISTORY_CATEGORY_MAP = {
+    "thr": "thr",
+    "token_transfer": "tokens",
+    "music_tip": "music",
+    "music_stream": "music",
+    "music_royalty": "music",
+    "ai_reward": "architect",
+    "ai_credits": "ai_credits",
+    "architect": "architect_job",
+    "architect_job": "architect",
+    "t2e": "t2e_reward_thr",
+    "l2e": "l2e",
+    "iot_telemetry": "iot",
+    "iot": "iot",
+    "bridge": "bridge",
+    "pledge": "gateway",
+    "mining": "mining",
+    "swaps": "swaps",
+    "swap": "swaps",
+    "liquidity": "liquidity",
+    "nft": "nft",
+    "nft_mint": "nft",
+    "nft_buy": "nft",
+    "iot_reward": "iot",
+    "iot_mining_reward": "iot",
+    "music_gps_telemetry": "iot",
+    "gps_mining": "iot",
+    "verifyid": "verifyid",
+    "other": "other",
+    "gateway": "gateway",
+    "fiat_buy": "gateway",
+    "fiat_deposit": "gateway",
+    "fiat_onramp": "gateway",
+    "fiat_sell_request": "gateway",
+    "fiat_withdrawal": "gateway",
+    "fiat_offramp": "gateway",
+    "iot_purchase": "gateway",
+    "sentinel": "sentinel",
+    "sentinel_subscription": "sentinel",
+    "sentinel_fee": "sentinel",
+    "sentinel_gift": "sentinel",
+}
 
-    addr_lower = address.lower()
 
-    # Category mapping used for all tx types
-    category_map = {
-        "thr": "thr",
-        "token_transfer": "tokens",
-        "music_tip": "music",
-        "music_stream": "music",
-        "music_royalty": "music",
-        "ai_reward": "architect",
-        "ai_credits": "ai_credits",
-        "architect": "architect_job",
-        "architect_job": "architect",
-        "t2e": "t2e_reward_thr",
-        "l2e": "l2e",
-        "iot_telemetry": "iot",
-        "iot": "iot",
-        "bridge": "bridge",
-        "pledge": "gateway",
-        "mining": "mining",
-        "swaps": "swaps",
-        "swap": "swaps",
-        "liquidity": "liquidity",
-        "nft": "nft",
-        "nft_mint": "nft",
-        "nft_buy": "nft",
-        "iot_reward": "iot",
-        "iot_mining_reward": "iot",
-        "music_gps_telemetry": "iot",
-        "gps_mining": "iot",
-        "verifyid": "verifyid",
-        "other": "other",
-        "gateway": "gateway",
-        "fiat_buy": "gateway",
-        "fiat_deposit": "gateway",
-        "fiat_onramp": "gateway",
-        "fiat_sell_request": "gateway",
-        "fiat_withdrawal": "gateway",
-        "fiat_offramp": "gateway",
-        "iot_purchase": "gateway",
-        "sentinel": "sentinel",
-        "sentinel_subscription": "sentinel",
-        "sentinel_fee": "sentinel",
-        "sentinel_gift": "sentinel",
+def _wallet_history_row(address: str, item_key, category, direction, amount, timestamp, item=None) -> dict:
+    return {
+        "address": address,
+        "item_key": item_key,
+        "category": category,
+        "direction": direction,
+        "amount": amount,
+        "ts": _parse_timestamp(timestamp),
+        "ts_text": timestamp if isinstance(timestamp, str) else None,
+        "item": item,
     }
 
-    # Merge chain + tx_log, deduplicate by tx_id
-    seen_tx_ids = set()
-    all_txs = []
-    for tx in chain:
-        if not isinstance(tx, dict):
-            continue
-        tid = tx.get("tx_id") or tx.get("id")
-        if tid and tid in seen_tx_ids:
-            continue
-        if tid:
-            seen_tx_ids.add(tid)
-        all_txs.append(tx)
-    for tx in tx_log:
-        if not isinstance(tx, dict):
-            continue
-        tid = tx.get("tx_id") or tx.get("id")
-        if tid and tid in seen_tx_ids:
-            continue
-        if tid:
-            seen_tx_ids.add(tid)
-        all_txs.append(tx)
 
-    wallet_txs = []
-    mining_ids = set()
+def _wallet_history_mining_item(tx: dict, miner_addr: str, block_hash: str, reward_id: str,
+                                amount: float, reward_to_miner, reward_to_ai) -> dict:
+    return normalize_history_item({
+        "kind": "mining_reward",
+        "type": "mining_reward",
+        "category": "mining",
+        "direction": "received",
+        "from": "COINBASE",
+        "to": miner_addr,
+        "asset_symbol": "THR",
+        "symbol": "THR",
+        "amount": amount,
+        "timestamp": tx.get("timestamp"),
+        "block_height": tx.get("height") or tx.get("index"),
+        "block_hash": block_hash,
+        "thr_address": miner_addr,
+        "id": reward_id,
+        "meta": {
+            "block_height": tx.get("height") or tx.get("index"),
+            "block_hash": block_hash,
+            "fee_burned": tx.get("fee_burned"),
+            "reward_to_miner": reward_to_miner,
+            "reward_to_ai": reward_to_ai,
+            "source": "stratum" if tx.get("is_stratum") else "legacy",
+        },
+    })
 
-    # Single pass: collect regular txs AND mining rewards from chain entries
-    for tx in all_txs:
-        tx_type = (tx.get("type") or tx.get("kind") or "").lower()
 
-        # --- Mining / coinbase entries → extract block reward ---
-        if tx_type in ("coinbase", "mining_reward", "mint"):
-            miner_addr = tx.get("to") or tx.get("thr_address")
-            if not miner_addr or miner_addr.lower() != addr_lower:
-                continue
-            block_hash = tx.get("block_hash") or tx.get("hash") or ""
-            reward_id = f"reward:{block_hash}:{miner_addr}"
-            if reward_id in mining_ids:
-                continue
-            mining_ids.add(reward_id)
-            rsplit = tx.get("reward_split") or {}
-            reward_amt = float(
-                rsplit.get("miner")
-                or tx.get("reward_to_miner")
-                or tx.get("reward")
-                or tx.get("amount")
-                or 0.0
-            )
-            wallet_txs.append(normalize_history_item({
-                "kind": "mining_reward",
-                "type": "mining_reward",
-                "category": "mining",
-                "direction": "received",
-                "from": "COINBASE",
-                "to": miner_addr,
-                "asset_symbol": "THR",
-                "symbol": "THR",
-                "amount": reward_amt,
-                "timestamp": tx.get("timestamp"),
-                "block_height": tx.get("height") or tx.get("index"),
-                "block_hash": block_hash,
-                "thr_address": miner_addr,
-                "id": reward_id,
-                "meta": {
-                    "block_height": tx.get("height") or tx.get("index"),
-                    "block_hash": block_hash,
-                    "fee_burned": tx.get("fee_burned"),
-                    "reward_to_miner": tx.get("reward_to_miner", tx.get("reward")),
-                    "reward_to_ai": tx.get("reward_to_ai"),
-                    "source": "stratum" if tx.get("is_stratum") else "legacy",
-                },
-            }))
-            continue
+def _wallet_history_projection(tx: dict) -> list:
+    """
+    Wallet history rows contributed by one chain / tx_log entry: one per
+    party, with the category and direction as seen by that party.  Mining
+    rows carry their synthesized reward item (``item``); regular rows are
+    rendered from the entry by ``_wallet_history_item``.
+    """
+    if not isinstance(tx, dict):
+        return []
+    tx_type = (tx.get("type") or tx.get("kind") or "").lower()
 
-        # --- Block entries (have "reward" key, no "type") → extract miner reward ---
-        if tx.get("reward") is not None and not tx_type:
-            block_miner = tx.get("thr_address") or tx.get("miner_address") or tx.get("miner")
-            if not block_miner or block_miner.lower() != addr_lower:
-                continue
-            block_hash = tx.get("block_hash") or ""
-            reward_id = f"reward:{block_hash}:{block_miner}"
-            if reward_id in mining_ids:
-                continue
-            mining_ids.add(reward_id)
-            # Always render mining rewards with the CURRENT halving schedule (Phase C5: 8 THR + 80/10/5/5).
-            # Pre-upgrade blocks have stale stored values (e.g. 1.0 THR / 90-10 split) — recompute for display.
-            try:
-                _height_for_reward = int(tx.get("height") or tx.get("index") or 0)
-                scheduled_reward = calculate_reward(_height_for_reward)
-            except Exception:
-                scheduled_reward = 8.0
-
-            stored_reward = float(tx.get("reward", 0.0) or 0.0)
-            rsplit = tx.get("reward_split") or {}
-            stored_split_total = (
-                float(rsplit.get("miner", 0.0))
-                + float(rsplit.get("ai", 0.0))
-                + float(rsplit.get("burn", 0.0))
-                + float(rsplit.get("full_nodes", 0.0))
-                + float(rsplit.get("ecosystem", 0.0))
-            ) if rsplit else 0.0
-
-            if rsplit and abs(stored_split_total - scheduled_reward) < 0.001:
-                total_reward = stored_split_total
-                reward_to_miner = float(rsplit.get("miner", 0.0))
-                reward_to_ai = float(rsplit.get("ai", 0.0))
-            elif stored_reward > 0 and abs(stored_reward - scheduled_reward) < 0.001:
-                total_reward = stored_reward
-                reward_to_miner = total_reward * 0.80
-                reward_to_ai = total_reward * 0.10
-            else:
-                total_reward = scheduled_reward
-                reward_to_miner = total_reward * 0.80
-                reward_to_ai = total_reward * 0.10
-            wallet_txs.append(normalize_history_item({
-                "kind": "mining_reward",
-                "type": "mining_reward",
-                "category": "mining",
-                "direction": "received",
-                "from": "COINBASE",
-                "to": block_miner,
-                "asset_symbol": "THR",
-                "symbol": "THR",
-                "amount": reward_to_miner,
-                "timestamp": tx.get("timestamp"),
-                "block_height": tx.get("height") or tx.get("index"),
-                "block_hash": block_hash,
-                "thr_address": block_miner,
-                "id": reward_id,
-                "meta": {
-                    "block_height": tx.get("height") or tx.get("index"),
-                    "block_hash": block_hash,
-                    "fee_burned": tx.get("fee_burned"),
-                    "reward_to_miner": reward_to_miner,
-                    "reward_to_ai": reward_to_ai,
-                    "source": "stratum" if tx.get("is_stratum") else "legacy",
-                },
-            }))
-            continue
+    # --- Mining / coinbase entries → extract block reward ---
+    if tx_type in ("coinbase", "mining_reward", "mint"):
+        miner_addr = tx.get("to") or tx.get("thr_address")
+        if not miner_addr:
+            return []
+        block_hash = tx.get("block_hash") or tx.get("hash") or ""
+        reward_id = f"reward:{block_hash}:{miner_addr}"
+        rsplit = tx.get("reward_split") or {}
+        reward_amt = float(
+            rsplit.get("miner")
+            or tx.get("reward_to_miner")
+            or tx.get("reward")
+            or tx.get("amount")
+            or 0.0
+        )
+        item = _wallet_history_mining_item(
+            tx, miner_addr, block_hash, reward_id, reward_amt,
+            tx.get("reward_to_miner", tx.get("reward")), tx.get("reward_to_ai"),
+        )
+        return [_wallet_history_row(miner_addr, reward_id, item.get("category"), "received", reward_amt, item.get("timestamp"), item)]
 
-        # --- Regular transactions ---
-        tx_from = tx.get("from") or tx.get("sender")
-        tx_to = tx.get("to") or tx.get("recipient")
-        tx_address = tx.get("address")  # IoT telemetry
-        tx_meta = tx.get("meta") if isinstance(tx.get("meta"), dict) else {}
+    # --- Block entries (have "reward" key, no "type") → extract miner reward ---
+    if tx.get("reward") is not None and not tx_type:
+        block_miner = tx.get("thr_address") or tx.get("miner_address") or tx.get("miner")
+        if not block_miner:
+            return []
+        block_hash = tx.get("block_hash") or ""
+        reward_id = f"reward:{block_hash}:{block_miner}"
+        # Always render mining rewards with the CURRENT halving schedule (Phase C5: 8 THR + 80/10/5/5).
+        # Pre-upgrade blocks have stale stored values (e.g. 1.0 THR / 90-10 split) — recompute for display.
+        try:
+            _height_for_reward = int(tx.get("height") or tx.get("index") or 0)
+            scheduled_reward = calculate_reward(_height_for_reward)
+        except Exception:
+            scheduled_reward = 8.0
 
-        parties = {
-            tx_from,
-            tx_to,
-            tx_address,
-            tx.get("thr_address"),
-            tx.get("wallet"),
-            tx.get("wallet_address"),
-            tx.get("owner"),
-            tx.get("user_wallet"),
-            tx.get("sender_wallet"),
-            tx.get("recipient_wallet"),
-            # Fix: Include pool/swap participants so they appear in wallet history
-            tx.get("trader"),
-            tx.get("provider"),
-            tx_meta.get("wallet"),
-            tx_meta.get("wallet_address"),
-            tx_meta.get("thr_address"),
-            tx_meta.get("owner"),
-            tx_meta.get("artist_wallet"),
-            tx_meta.get("tipper_wallet"),
-            tx_meta.get("trader"),
-            tx_meta.get("provider"),
-        }
-        parties = {str(p).lower() for p in parties if p}
-        if addr_lower not in parties:
-            continue
+        stored_reward = float(tx.get("reward", 0.0) or 0.0)
+        rsplit = tx.get("reward_split") or {}
+        stored_split_total = (
+            float(rsplit.get("miner", 0.0))
+            + float(rsplit.get("ai", 0.0))
+            + float(rsplit.get("burn", 0.0))
+            + float(rsplit.get("full_nodes", 0.0))
+            + float(rsplit.get("ecosystem", 0.0))
+        ) if rsplit else 0.0
 
-        tx_copy = dict(tx)
-        raw_category = _categorize_transaction(tx)
-        tx_copy["category"] = category_map.get(raw_category, raw_category)
+        if rsplit and abs(stored_split_total - scheduled_reward) < 0.001:
+            total_reward = stored_split_total
+            reward_to_miner = float(rsplit.get("miner", 0.0))
+            reward_to_ai = float(rsplit.get("ai", 0.0))
+        elif stored_reward > 0 and abs(stored_reward - scheduled_reward) < 0.001:
+            total_reward = stored_reward
+            reward_to_miner = total_reward * 0.80
+            reward_to_ai = total_reward * 0.10
+        else:
+            total_reward = scheduled_reward
+            reward_to_miner = total_reward * 0.80
+            reward_to_ai = total_reward * 0.10
+        item = _wallet_history_mining_item(
+            tx, block_miner, block_hash, reward_id, reward_to_miner, reward_to_miner, reward_to_ai,
+        )
+        return [_wallet_history_row(block_miner, reward_id, item.get("category"), "received", reward_to_miner, item.get("timestamp"), item)]
+
+    # --- Regular transactions ---
+    tx_from = tx.get("from") or tx.get("sender")
+    tx_to = tx.get("to") or tx.get("recipient")
+    tx_address = tx.get("address")  # IoT telemetry
+    tx_meta = tx.get("meta") if isinstance(tx.get("meta"), dict) else {}
+
+    parties = [
+        tx_from,
+        tx_to,
+        tx_address,
+        tx.get("thr_address"),
+        tx.get("wallet"),
+        tx.get("wallet_address"),
+        tx.get("owner"),
+        tx.get("user_wallet"),
+        tx.get("sender_wallet"),
+        tx.get("recipient_wallet"),
+        # Fix: Include pool/swap participants so they appear in wallet history
+        tx.get("trader"),
+        tx.get("provider"),
+        tx_meta.get("wallet"),
+        tx_meta.get("wallet_address"),
+        tx_meta.get("thr_address"),
+        tx_meta.get("owner"),
+        tx_meta.get("artist_wallet"),
+        tx_meta.get("tipper_wallet"),
+        tx_meta.get("trader"),
+        tx_meta.get("provider"),
+    ]
+    by_lower = {}
+    for party in parties:
+        if party:
+            by_lower.setdefault(str(party).lower(), str(party))
+    if not by_lower:
+        return []
 
-        # Normalize symbol: ensure 'symbol' is always set for frontend rendering
-        if not tx_copy.get("symbol") and tx_copy.get("token_symbol"):
-            tx_copy["symbol"] = tx_copy["token_symbol"]
-        if not tx_copy.get("asset_symbol") and tx_copy.get("token_symbol"):
-            tx_copy["asset_symbol"] = tx_copy["token_symbol"]
+    raw_category = _categorize_transaction(tx)
+    category = _WALLET_HISTORY_CATEGORY_MAP.get(raw_category, raw_category)
+    try:
+        amount = float(tx.get("amount", 0) or 0)
+    except Exception:
+        amount = 0.0
+    to_lower = str(tx_to).lower() if tx_to else None
+    from_lower = str(tx_from).lower() if tx_from else None
+    timestamp = tx.get("timestamp", "")
 
-        if tx_to and str(tx_to).lower() == addr_lower:
-            tx_copy["direction"] = "received"
-        elif tx_from and str(tx_from).lower() == addr_lower:
-            tx_copy["direction"] = "sent"
+    rows = []
+    for party_lower, party in by_lower.items():
+        if to_lower == party_lower:
+            direction = "received"
+        elif from_lower == party_lower:
+            direction = "sent"
         else:
-            tx_copy["direction"] = "related"
+            direction = "related"
+        rows.append(_wallet_history_row(party, None, category, direction, amount, timestamp))
+    return rows
 
-        wallet_txs.append(tx_copy)
 
-    # Apply category filter
-    if category_filter:
-        wallet_txs = [tx for tx in wallet_txs if tx.get("category", "").lower() == category_filter]
+def _wallet_history_item(tx: dict, row: dict) -> dict:
+    """Render one history item from its source entry and projection row."""
+    if row.get("item") is not None:
+        item = dict(row["item"])
+    else:
+        item = dict(tx)
+        item["category"] = row.get("category")
 
-    for tx in wallet_txs:
-        for key in ("image_url", "logo_url", "audio_url", "cover_url"):
-            if key in tx:
-                tx[key] = normalize_media_url(str(tx.get(key) or ""))
+        # Normalize symbol: ensure 'symbol' is always set for frontend rendering
+        if not item.get("symbol") and item.get("token_symbol"):
+            item["symbol"] = item["token_symbol"]
+        if not item.get("asset_symbol") and item.get("token_symbol"):
+            item["asset_symbol"] = item["token_symbol"]
 
-    # Sort by timestamp descending
-    wallet_txs.sort(key=lambda t: _parse_timestamp(t.get("timestamp", "")), reverse=True)
+        item["direction"] = row.get("direction")
 
-    # Calculate category summaries
-    summary = {
-        "total_mining": 0.0,
-        "total_ai_rewards": 0.0,
-        "total_music_tips_sent": 0.0,
-        "total_music_tips_received": 0.0,
-        "total_iot_rewards": 0.0,
-        "total_sent": 0.0,
-        "total_received": 0.0,
-        "mining_count": 0,
-        "ai_reward_count": 0,
-        "music_tip_count": 0,
-        "iot_count": 0
-    }
+    for key in ("image_url", "logo_url", "audio_url", "cover_url"):
+        if key in item:
+            item[key] = normalize_media_url(str(item.get(key) or ""))
+    return item
 
-    for tx in wallet_txs:
-        category = tx.get("category", "other")
-        direction = tx.get("direction", "related")
-        try:
-            amount = float(tx.get("amount", 0) or 0)
-        except Exception:
-            amount = 0.0
+
+def _summarize_wallet_history(groups) -> dict:
+    """Fold ``(category, direction, count, amount)`` groups into the history summary."""
+    summary = _empty_wallet_history_summary()
+
+    for category, direction, count, amount in groups:
+        category = category or "other"
+        direction = direction or "related"
+        amount = float(amount or 0.0)
 
         if category == "mining":
             summary["total_mining"] += amount
-            summary["mining_count"] += 1
+            summary["mining_count"] += count
         elif category == "ai_reward":
             summary["total_ai_rewards"] += amount
-            summary["ai_reward_count"] += 1
+            summary["ai_reward_count"] += count
         elif category == "music_tip":
             if direction == "sent":
                 summary["total_music_tips_sent"] += amount
             elif direction == "received":
                 summary["total_music_tips_received"] += amount
-            summary["music_tip_count"] += 1
+            summary["music_tip_count"] += count
         elif category == "iot_telemetry":
             # IoT txs represent work done, rewards come via ai_reward
-            summary["iot_count"] += 1
+            summary["iot_count"] += count
         elif category == "sentinel":
             summary["total_sentinel_spent"] += amount
-            summary["sentinel_count"] += 1
+            summary["sentinel_count"] += count
 
         if direction == "received":
             summary["total_received"] += amount
@@ -9657,11 +10521,91 @@ def _collect_wallet_history_transactions(address: str, category_filter: str):
         if isinstance(summary[key], float):
             summary[key] = round(summary[key], 6)
 
-    return wallet_txs, summary
+    return summary
+
+
+def _collect_wallet_history_transactions(address: str, category_filter: str):
+    """Full-scan wallet history (used when the wallet history index is unavailable)."""
+    # Load chain + tx_log ONCE (avoid the O(n²) get_blocks_for_viewer call)
+    chain = load_json(CHAIN_FILE, [])
+    tx_log = load_tx_log()
+
+    addr_lower = address.lower()
+
+    # Merge chain + tx_log, deduplicate by tx_id
+    seen_tx_ids = set()
+    all_txs = []
+    for tx in chain + tx_log:
+        if not isinstance(tx, dict):
+            continue
+        tid = tx.get("tx_id") or tx.get("id")
+        if tid and tid in seen_tx_ids:
+            continue
+        if tid:
+            seen_tx_ids.add(tid)
+        all_txs.append(tx)
+
+    wallet_txs = []
+    mining_ids = set()
+    for tx in all_txs:
+        for row in _wallet_history_projection(tx):
+            if row["address"].lower() != addr_lower:
+                continue
+            if row["item_key"] is not None:
+                if row["item_key"] in mining_ids:
+                    continue
+                mining_ids.add(row["item_key"])
+            wallet_txs.append((tx, row))
+
+    # Apply category filter
+    if category_filter:
+        wallet_txs = [(tx, row) for tx, row in wallet_txs if (row.get("category") or "").lower() == category_filter]
+
+    # Sort by timestamp descending
+    wallet_txs.sort(key=lambda pair: pair[1]["ts"], reverse=True)
+
+    groups: dict = {}
+    for _tx, row in wallet_txs:
+        group = groups.setdefault((row.get("category"), row.get("direction")), [0, 0.0])
+        group[0] += 1
+        group[1] += float(row.get("amount") or 0.0)
+    summary = _summarize_wallet_history(
+        (category, direction, count, amount) for (category, direction), (count, amount) in groups.items()
+    )
 
+    return [_wallet_history_item(tx, row) for tx, row in wallet_txs], summary
+
+
+def _build_wallet_history(address: str, category_filter: str, limit: int, cursor: int,
+                          after: str | None = None, ts_from: str = "", ts_to: str = ""):
+    """
+    One page of wallet history.  ``cursor`` is the legacy offset; ``after``
+    is a keyset cursor (``next_after`` of the previous page) and makes the
+    page cost O(limit) when the wallet history index is available.
+    """
+    index = wallet_history_index()
+    if index is not None:
+        pairs, next_after = index.page(
+            address, category_filter, limit, after=after, offset=cursor, ts_from=ts_from, ts_to=ts_to,
+        )
+        groups = index.totals(address, category_filter, ts_from=ts_from, ts_to=ts_to)
+        total = sum(count for _cat, _direction, count, _amount in groups)
+        paged = [_wallet_history_item(tx, row) for tx, row in pairs]
+        return {
+            "transactions": paged,
+            "summary": _summarize_wallet_history(groups),
+            "total_transactions": total,
+            "limit": limit,
+            "cursor": cursor,
+            "next_cursor": cursor + limit if next_after and not after else None,
+            "next_after": next_after,
+        }
 
-def _build_wallet_history(address: str, category_filter: str, limit: int, cursor: int):
     wallet_txs, summary = _collect_wallet_history_transactions(address, category_filter)
+    if ts_from:
+        wallet_txs = [tx for tx in wallet_txs if tx.get("timestamp", "") >= ts_from]
+    if ts_to:
+        wallet_txs = [tx for tx in wallet_txs if tx.get("timestamp", "") <= ts_to]
 
     total = len(wallet_txs)
     paged = wallet_txs[cursor:cursor + limit]
@@ -9674,9 +10618,13 @@ def _build_wallet_history(address: str, category_filter: str, limit: int, cursor
         "limit": limit,
         "cursor": cursor,
         "next_cursor": next_cursor,
+        "next_after": None,
     }
 
 
+WALLET_HISTORY_INDEX = WalletHistoryIndex(_get_ledger_db_connection, _wallet_history_projection) if USE_SQLITE_LEDGER else None
+
+
 def _empty_wallet_history_summary() -> dict:
     return {
         "total_mining": 0.0,
@@ -9774,10 +10722,13 @@ def api_wallet_history():
     - category: Optional filter (mining, ai_reward, music_tip, iot_telemetry, etc.)
     - limit: Max entries to return (default 200)
     - cursor: Offset cursor for pagination
+    - after: Keyset cursor (``next_after`` of the previous page); preferred
+      over ``cursor`` for deep pages
     - exclude_source: Comma-separated sources to hide (default: none)
     - status: Filter by "pending" or "confirmed"
     """
     address = (request.args.get("address") or request.args.get("wallet") or "").strip()
+    after = request.args.get("after", "").strip() or None
     category_filter = request.args.get("category", "").strip().lower()
     exclude_source = request.args.get("exclude_source", "").strip().lower()
     status_filter = request.args.get("status", "").strip().lower()
@@ -9794,7 +10745,7 @@ def api_wallet_history():
         return jsonify({"ok": False, "error": "Address required"}), 400
 
     try:
-        payload = _build_wallet_history(address, category_filter, limit, cursor)
+        payload = _build_wallet_history(address, category_filter, limit, cursor, after=after)
     except Exception as exc:
         logger.error("[wallet_history] failed: %s", exc)
         payload = _build_wallet_history_fallback(address, limit, cursor)
@@ -9846,7 +10797,7 @@ def api_ledger_alias():
     if wallet:
         payload = _build_wallet_history(wallet, "", limit, 0)
         return jsonify({"ok": True, "wallet": wallet, "ledger": payload.get("transactions", []), "summary": payload.get("summary", {})}), 200
-    return jsonify({"ok": True, "ledger": load_tx_log()[:limit]}), 200
+    return jsonify({"ok": True, "ledger": list(iter_tx_log(limit=limit))}), 200
 
 
 # NOTE: /wallet page hidden - use wallet widget in base.html instead
@@ -9883,16 +10834,7 @@ def api_wallet_dashboard():
     # Best-effort THR balance snapshot.
     thr_balance = 0.0
     try:
-        if USE_SQLITE_LEDGER:
-            with _get_ledger_db_connection() as conn:
-                row = conn.execute(
-                    "SELECT balance FROM balances WHERE ledger_type = 'thr' AND address = ?",
-                    (address,),
-                ).fetchone()
-                thr_balance = float(row["balance"] or 0.0) if row else 0.0
-        else:
-            ledger_map = load_json(LEDGER_FILE, {})
-            thr_balance = float(ledger_map.get(address, 0.0) or 0.0)
+        thr_balance = float(get_thr_balance(address)[0] or 0.0)
     except Exception:
         thr_balance = 0.0
 
@@ -9920,6 +10862,7 @@ def api_v2_wallet_history():
     - address: THR address (required)
     - limit: Max transactions to return (default: 100)
     - offset: Skip first N transactions (default: 0)
+    - after: Keyset cursor from ``next_after`` (optional, replaces offset)
     - category: Filter by category (optional)
     - from_date: ISO timestamp filter (optional)
     - to_date: ISO timestamp filter (optional)
@@ -9932,7 +10875,8 @@ def api_v2_wallet_history():
         "total": 1234,
         "limit": 100,
         "offset": 0,
-        "has_more": true
+        "has_more": true,
+        "next_after": "..."
     }
     """
     address = request.args.get("address", "").strip()
@@ -9944,6 +10888,7 @@ def api_v2_wallet_history():
         offset = int(request.args.get("offset", 0))
     except (TypeError, ValueError):
         offset = 0
+    after = request.args.get("after", "").strip() or None
     category_filter = request.args.get("category", "").strip().lower()
     from_date = request.args.get("from_date", "").strip()
     to_date = request.args.get("to_date", "").strip()
@@ -9951,27 +10896,19 @@ def api_v2_wallet_history():
     if not address:
         return jsonify({"ok": False, "error": "Address required"}), 400
 
-    wallet_txs, _summary = _collect_wallet_history_transactions(address, category_filter)
-
-    if from_date:
-        wallet_txs = [tx for tx in wallet_txs if tx.get("timestamp", "") >= from_date]
-
-    if to_date:
-        wallet_txs = [tx for tx in wallet_txs if tx.get("timestamp", "") <= to_date]
-
-    # Pagination
-    total = len(wallet_txs)
-    paginated_txs = wallet_txs[offset:offset + limit]
-    has_more = (offset + limit) < total
+    page = _build_wallet_history(
+        address, category_filter, limit, offset, after=after, ts_from=from_date, ts_to=to_date,
+    )
 
     return jsonify({
         "ok": True,
         "address": address,
-        "transactions": paginated_txs,
-        "total": total,
+        "transactions": page["transactions"],
+        "total": page["total_transactions"],
         "limit": limit,
         "offset": offset,
-        "has_more": has_more,
+        "has_more": page["next_after"] is not None or page["next_cursor"] is not None,
+        "next_after": page["next_after"],
         "endpoint": "v2",
         "node": "microservice-optimized"
     }), 200
@@ -11775,18 +12712,14 @@ def api_last_block_hash():
 def network_stats():
     try:
         pledges = load_json(PLEDGE_CHAIN, [])
-        chain   = load_json(CHAIN_FILE, [])
+        state   = chain_state()
         ledger  = load_json(LEDGER_FILE, {})
 
         pledge_count = len(pledges)
 
-        blocks = [b for b in chain if isinstance(b, dict) and b.get("reward") is not None]
-        block_count = HEIGHT_OFFSET + len(blocks)
+        block_count = HEIGHT_OFFSET + state.block_count
 
-        tx_count = len([
-            t for t in chain
-            if isinstance(t, dict) and t.get("type") in ("transfer", "service_payment", "ai_knowledge", "coinbase")
-        ])
+        tx_count = state.count_types(("transfer", "service_payment", "ai_knowledge", "coinbase"))
 
         burned     = float(ledger.get(BURN_ADDRESS, 0))
         ai_balance = float(ledger.get(AI_WALLET_ADDRESS, 0))
@@ -12193,7 +13126,7 @@ def api_tx_feed():
 
     kinds = {k.strip().lower() for k in kinds_param.split(",") if k.strip()}
     exclude_kinds = {k.strip().lower() for k in exclude_kinds_param.split(",") if k.strip()}
-    has_tx_log = bool(load_tx_log())
+    has_tx_log = tx_log_count() > 0
 
     def _classify_tx_feed_entry(tx: dict) -> dict:
         if not isinstance(tx, dict):
@@ -12345,7 +13278,7 @@ def api_tx_feed():
             # Fall through to legacy method
 
     # Fallback: Legacy chain scan (slower)
-    feed = _tx_feed(include_pending=include_pending, include_bridge=include_bridge)
+    feed = _iter_tx_feed(include_pending=include_pending, include_bridge=include_bridge)
     normalized = []
     for tx in feed:
         kind = _canonical_kind(tx.get("kind") or tx.get("type") or "")
@@ -15551,7 +16484,9 @@ def api_admin_sigbalbot_execute(batch_id):
         from sigbalbot_milestone_airdrop import SigBalBotMilestoneAirdrop
         data = request.get_json(silent=True) or {}
         dry_run = bool(data.get("dry_run", False))
-        airdrop = SigBalBotMilestoneAirdrop(dry_run=dry_run)
+        airdrop = SigBalBotMilestoneAirdrop(
+            dry_run=dry_run, load_json=load_json, save_json=save_json, append_chain=append_chain_entries,
+        )
         result = airdrop.execute_approved_allocation(batch_id)
         if "error" in result:
             return jsonify({"ok": False, **result}), 400
@@ -15720,7 +16655,9 @@ def _check_auto_distribute():
 
         delay_hours = config.get("auto_distribute_delay_hours", 24)
         from sigbalbot_milestone_airdrop import SigBalBotMilestoneAirdrop
-        airdrop = SigBalBotMilestoneAirdrop()
+        airdrop = SigBalBotMilestoneAirdrop(
+            load_json=load_json, save_json=save_json, append_chain=append_chain_entries,
+        )
 
         for batch_id, alloc in airdrop.allocations.items():
             if alloc.get("status") != "approved":
@@ -16611,9 +17548,7 @@ def api_sentinel_subscribe():
         "note": f"Sentinel {package_id.upper()} subscription ({pkg['duration_days']}d)",
     }
     try:
-        tx_log_data = load_tx_log()
-        tx_log_data.insert(0, sentinel_tx_entry)  # newest first
-        save_tx_log(tx_log_data)
+        upsert_tx_log_record(sentinel_tx_entry)
     except Exception as tx_log_err:
         logger.warning("[SENTINEL_SUB] failed to write tx_log entry: %s", tx_log_err)
 
@@ -18954,6 +19889,9 @@ def _handle_ai_chat_proxy():
 @app.route("/api/ai/chat", methods=["POST"])
 @app.route("/api/chat", methods=["POST"])
 def api_ai_chat():
+    limited = _rate_limited(AI_CHAT_RATE_LIMIT)
+    if limited:
+        return limited
     if _is_proxy_mode_enabled():
         return _handle_ai_chat_proxy()
     return _handle_ai_chat_master()
@@ -23922,7 +24860,7 @@ def api_history():
         }), 200
 
 
-def get_token_price_in_thr(symbol):
+def get_token_price_in_thr(symbol, pools=None):
     """
     PR-4: Multi-hop pricing graph.
     Calculate token price in THR from liquidity pool reserves.
@@ -23933,6 +24871,7 @@ def get_token_price_in_thr(symbol):
     Otherwise, routes through intermediary tokens (e.g., LOUMIDIS -> JAM -> THR).
 
     OPTIMIZATION: Caches prices for 30 seconds to avoid repeated BFS calculations.
+    Callers pricing many symbols can pass the already-loaded ``pools``.
     """
     if symbol == "THR":
         return 1.0
@@ -23943,7 +24882,8 @@ def get_token_price_in_thr(symbol):
     if cached and now - cached.get("ts", 0) < TOKEN_PRICE_CACHE_TTL:
         return cached.get("price")
 
-    pools = load_pools()
+    if pools is None:
+        pools = load_pools()
 
     # Build adjacency graph: token -> [(neighbor_token, exchange_rate, pool_liquidity), ...]
     graph = {}
@@ -26314,20 +27254,26 @@ def _collect_normalized_history_from_chain(
     aliases_lower = {a.lower() for a in aliases}
 
     try:
-        chain  = load_json(CHAIN_FILE, [])
-        tx_log = load_json(TX_LOG_FILE, [])
+        index = wallet_history_index()
+        if index is not None:
+            # Candidates from the per-address index; the party check below
+            # still decides membership.
+            all_txs = index.entries_for(aliases)
+        else:
+            chain  = load_json(CHAIN_FILE, [])
+            tx_log = load_json(TX_LOG_FILE, [])
 
-        seen_ids: set = set()
-        all_txs: list = []
-        for tx in chain + tx_log:
-            if not isinstance(tx, dict):
-                continue
-            tid = tx.get("tx_id") or tx.get("id")
-            if tid and tid in seen_ids:
-                continue
-            if tid:
-                seen_ids.add(tid)
-            all_txs.append(tx)
+            seen_ids: set = set()
+            all_txs = []
+            for tx in chain + tx_log:
+                if not isinstance(tx, dict):
+                    continue
+                tid = tx.get("tx_id") or tx.get("id")
+                if tid and tid in seen_ids:
+                    continue
+                if tid:
+                    seen_ids.add(tid)
+                all_txs.append(tx)
 
         events = []
         for tx in all_txs:
@@ -26979,6 +27925,15 @@ CUSTOM_TOKENS_LEDGER_DIR = os.path.join(DATA_DIR, "custom_ledgers")
 
 os.makedirs(CUSTOM_TOKENS_LEDGER_DIR, exist_ok=True)
 
+# SQLite mirror of custom_ledgers/*.json and token_balances.json used for
+# one-query wallet portfolios (see token_balance_index.py).
+TOKEN_BALANCE_INDEX = TokenBalanceIndex(
+    _get_ledger_db_connection,
+    CUSTOM_TOKENS_LEDGER_DIR,
+    TOKEN_BALANCES_FILE,
+    reconcile_interval=TOKEN_BALANCE_RECONCILE_SECONDS,
+)
+
 # CRITICAL FIX #2: Ensure tokens logo directory exists
 STATIC_TOKENS_DIR = os.path.join(BASE_DIR, "static", "img", "tokens")
 os.makedirs(STATIC_TOKENS_DIR, exist_ok=True)
@@ -27094,6 +28049,7 @@ def save_custom_token_ledger(token_id, ledger):
     """Save ledger for a specific custom token"""
     ledger_file = os.path.join(CUSTOM_TOKENS_LEDGER_DIR, f"{token_id}.json")
     save_json(ledger_file, ledger)
+    _sync_token_balance_index(lambda: TOKEN_BALANCE_INDEX.sync_token(token_id, ledger))
 
 def load_custom_token_ledger_by_symbol(symbol: str):
     token_entry = get_custom_token_entry_by_symbol(symbol)
@@ -27754,6 +28710,10 @@ def api_wallet_send():
     passphrase = (data.get("passphrase") or "").strip()
     speed = (data.get("speed") or "fast").lower()
 
+    limited = _rate_limited(WALLET_SEND_RATE_LIMIT, from_addr)
+    if limited:
+        return limited
+
     if token == "THR":
         # Native THR send
         from flask import g
@@ -28822,6 +29782,10 @@ def send_thr():
     tx_id=(data.get("tx_id") or data.get("client_tx_id") or "").strip() or None
     expected_fee=data.get("expected_fee")
 
+    limited = _rate_limited(WALLET_SEND_RATE_LIMIT, from_thr)
+    if limited:
+        return limited
+
     # Validate THR addresses
     if not validate_thr_address(from_thr):
         return _reject_tx(tx_id, "invalid_from_address", 400, {"from": from_thr, "to": to_thr, "amount": amount_raw})
@@ -30175,6 +31139,10 @@ def api_swap_execute():
         passphrase = (data.get("passphrase") or "").strip()
         min_amount_out_raw = data.get("min_amount_out") or inner.get("min_amount_out") or 0
 
+        limited = _rate_limited(SWAP_RATE_LIMIT, trader)
+        if limited:
+            return limited
+
         # Safe amount parsing - any TypeError/ValueError is 400
         try:
             amount_in = float(data.get("amount_in") or inner.get("amount_in") or 0)
@@ -31990,17 +32958,43 @@ def aggregator_step():
 
 
 # ─── MINING WATCHDOG ───────────────────────────────
-MINING_WATCHDOG_STATE = {
-    "requests": {},
-    "invalid": {},
-    "banned": {},
+# Token buckets per address:ip (see rate_limit.py). Going over either budget
+# bans the key for MINING_WATCHDOG_BAN_SECONDS.
+MINING_WATCHDOG_REQUESTS = RateLimiter.per_window(
+    "mining_requests", MINING_WATCHDOG_MAX_REQUESTS, MINING_WATCHDOG_WINDOW_SECONDS,
+    ban_seconds=MINING_WATCHDOG_BAN_SECONDS, max_keys=RATE_LIMIT_MAX_KEYS,
+)
+MINING_WATCHDOG_INVALID = RateLimiter.per_window(
+    "mining_invalid", MINING_WATCHDOG_MAX_INVALID, MINING_WATCHDOG_WINDOW_SECONDS,
+    ban_seconds=MINING_WATCHDOG_BAN_SECONDS, max_keys=RATE_LIMIT_MAX_KEYS,
+)
+SWAP_RATE_LIMIT = RateLimiter.per_window("swap", SWAP_RATE_LIMIT_PER_MIN, 60, max_keys=RATE_LIMIT_MAX_KEYS)
+WALLET_SEND_RATE_LIMIT = RateLimiter.per_window(
+    "wallet_send", WALLET_SEND_RATE_LIMIT_PER_MIN, 60, max_keys=RATE_LIMIT_MAX_KEYS
+)
+AI_CHAT_RATE_LIMIT = RateLimiter.per_window("ai_chat", AI_CHAT_RATE_LIMIT_PER_MIN, 60, max_keys=RATE_LIMIT_MAX_KEYS)
+RATE_LIMITERS = {
+    limiter.name: limiter
+    for limiter in (
+        MINING_WATCHDOG_REQUESTS, MINING_WATCHDOG_INVALID, SWAP_RATE_LIMIT, WALLET_SEND_RATE_LIMIT, AI_CHAT_RATE_LIMIT
+    )
 }
-MINING_JOB_CACHE: dict[str, dict] = {}
 MINING_JOB_TTL_SECONDS = int(_strip_env_quotes(os.getenv("MINING_JOB_TTL_SECONDS", "20")))
-
-
-def _prune_watchdog_samples(samples: list[float], now: float, window: int) -> list[float]:
-    return [ts for ts in samples if now - ts <= window]
+# Long-poll / SSE waiters each hold a gunicorn thread; past the cap the
+# stream endpoint answers immediately, like /api/mining/work.
+MINING_STREAM_TIMEOUT_SECONDS = float(_strip_env_quotes(os.getenv("MINING_STREAM_TIMEOUT_SECONDS", "25")) or 25)
+MINING_STREAM_MAX_SECONDS = float(_strip_env_quotes(os.getenv("MINING_STREAM_MAX_SECONDS", "300")) or 300)
+MINING_STREAM_MAX_WAITERS = int(_strip_env_quotes(os.getenv("MINING_STREAM_MAX_WAITERS", "12")) or 12)
+_MINING_STREAM_SLOTS = threading.BoundedSemaphore(max(1, MINING_STREAM_MAX_WAITERS))
+
+
+def _rate_limited(limiter: RateLimiter, subject: str = ""):
+    """429 response when ``subject``:client-ip is over ``limiter``'s budget, else None."""
+    key = f"{subject}:{request.remote_addr or 'unknown'}"
+    if limiter.hit(key):
+        return None
+    logger.info("rate_limited limiter=%s key=%s", limiter.name, key)
+    return jsonify(ok=False, status="error", error="rate_limited", limiter=limiter.name), 429
 
 
 def _mining_watchdog_key(thr_address: str) -> str:
@@ -32009,54 +33003,33 @@ def _mining_watchdog_key(thr_address: str) -> str:
 
 
 def _mining_watchdog_is_banned(key: str, now: float) -> bool:
-    banned_until = MINING_WATCHDOG_STATE["banned"].get(key)
-    if not banned_until:
-        return False
-    if now >= banned_until:
-        MINING_WATCHDOG_STATE["banned"].pop(key, None)
-        return False
-    return True
-
-
-def _mining_watchdog_ban(key: str, now: float) -> None:
-    MINING_WATCHDOG_STATE["banned"][key] = now + MINING_WATCHDOG_BAN_SECONDS
+    return MINING_WATCHDOG_REQUESTS.is_banned(key, now) or MINING_WATCHDOG_INVALID.is_banned(key, now)
 
 
 def _mining_watchdog_register_request(key: str, now: float) -> bool:
-    if MINING_WATCHDOG_MAX_REQUESTS <= 0:
-        return False
-    samples = MINING_WATCHDOG_STATE["requests"].get(key, [])
-    samples.append(now)
-    samples = _prune_watchdog_samples(samples, now, MINING_WATCHDOG_WINDOW_SECONDS)
-    MINING_WATCHDOG_STATE["requests"][key] = samples
-    if len(samples) > MINING_WATCHDOG_MAX_REQUESTS:
-        _mining_watchdog_ban(key, now)
-        return True
-    return False
+    return not MINING_WATCHDOG_REQUESTS.hit(key, now=now)
 
 
 def _mining_watchdog_register_invalid(key: str, now: float) -> bool:
-    if MINING_WATCHDOG_MAX_INVALID <= 0:
-        return False
-    samples = MINING_WATCHDOG_STATE["invalid"].get(key, [])
-    samples.append(now)
-    samples = _prune_watchdog_samples(samples, now, MINING_WATCHDOG_WINDOW_SECONDS)
-    MINING_WATCHDOG_STATE["invalid"][key] = samples
-    if len(samples) > MINING_WATCHDOG_MAX_INVALID:
-        _mining_watchdog_ban(key, now)
-        return True
-    return False
+    return not MINING_WATCHDOG_INVALID.hit(key, now=now)
 
 
-def _prune_mining_jobs(now: float) -> None:
-    expired = [job_id for job_id, job in MINING_JOB_CACHE.items() if job.get("expires_at", 0) <= now]
-    for job_id in expired:
-        MINING_JOB_CACHE.pop(job_id, None)
+@app.route("/api/admin/security/rate-limits", methods=["GET"])
+def api_admin_rate_limits():
+    """Per-limiter counters and the keys with the most denied requests."""
+    denied = require_admin()
+    if denied:
+        return denied
+    try:
+        top_n = max(1, min(int(request.args.get("top", 10)), 100))
+    except (TypeError, ValueError):
+        top_n = 10
+    return jsonify(ok=True, limiters=[
+        {**limiter.stats(), "top_offenders": limiter.top(top_n)} for limiter in RATE_LIMITERS.values()
+    ]), 200
 
 
-def _create_mining_job(thr_address: str | None = None) -> dict:
-    now = time.time()
-    _prune_mining_jobs(now)
+def _build_mining_template() -> dict:
     last_block = get_last_block_snapshot()
     prev_hash = last_block.get("block_hash") or "0" * 64
     tip_height = last_block.get("height")
@@ -32066,45 +33039,85 @@ def _create_mining_job(thr_address: str | None = None) -> dict:
             tip_height = int(block_count)
     height = int(tip_height) + 1 if tip_height is not None else None
     target = get_mining_target()
-    nbits = target_to_bits(target)
     # Calculate reward based on height (with halving schedule)
     reward = calculate_reward(height if height is not None else 0)
-    # Calculate difficulty from target
-    difficulty = int(INITIAL_TARGET // target) if target > 0 else 1
-    job_id = f"job_{int(now * 1000)}_{secrets.token_hex(4)}"
-    expires_at = now + MINING_JOB_TTL_SECONDS
-    MINING_JOB_CACHE[job_id] = {
-        "job_id": job_id,
-        "address": thr_address,
-        "prev_hash": prev_hash,
-        "height": height,
-        "target": target,
-        "expires_at": expires_at,
-    }
     return {
-        "job_id": job_id,
         "height": height,
         "prev_hash": prev_hash,
-        "target": hex(target),
-        "nbits": hex(nbits),
+        "target": target,
+        "nbits": target_to_bits(target),
         "reward": reward,
-        "difficulty_int": difficulty,
-        "expires_at": expires_at,
+        # Calculate difficulty from target
+        "difficulty_int": int(INITIAL_TARGET // target) if target > 0 else 1,
+    }
+
+
+MINING_JOBS = JobBoard(_build_mining_template, grace=MINING_JOB_TTL_SECONDS)
+
+
+def _mining_job_payload(job: dict) -> dict:
+    return {
+        "job_id": job["job_id"],
+        "seq": job["seq"],
+        "height": job["height"],
+        "prev_hash": job["prev_hash"],
+        "target": hex(job["target"]),
+        "nbits": hex(job["nbits"]),
+        "reward": job["reward"],
+        "difficulty_int": job["difficulty_int"],
+        "extranonce": job["extranonce"],
+        "nonce_base": job["nonce_base"],
+        "expires_at": time.time() + MINING_JOB_TTL_SECONDS,
     }
 
 
+def _create_mining_job(thr_address: str | None = None) -> dict:
+    return _mining_job_payload(MINING_JOBS.job_for(thr_address))
+
+
 def _get_job_or_stale(job_id: str, thr_address: str | None, now: float):
-    job = MINING_JOB_CACHE.get(job_id)
+    job = MINING_JOBS.get(job_id, now)
     if not job:
         return None, ("missing_job", "stale_job")
-    if job.get("expires_at", 0) <= now:
-        MINING_JOB_CACHE.pop(job_id, None)
-        return None, ("expired_job", "stale_job")
-    if job.get("address") and thr_address and job["address"] != thr_address:
-        return None, ("address_mismatch", "unauthorized")
     return job, None
 
 
+# Outcomes of /api/miner/submit, resolved by the background block processor
+# and pushed to the miner's job stream (see mining_submissions.py).
+MINING_SUBMISSIONS = SubmissionTracker(
+    ttl=float(_strip_env_quotes(os.getenv("MINING_SUBMISSION_TTL_SECONDS", "600")) or 600),
+    on_resolve=lambda record: MINING_JOBS.wake(),
+)
+
+
+def _submission_work_key(data: dict, thr_address: str) -> str:
+    return ":".join(str(data.get(k) or "") for k in ("prev_hash", "job_id", "merkle_root", "nonce")) + f":{thr_address}"
+
+
+def _submission_tip_hash() -> str:
+    """Tip hash for the early stale check: LAST_HASH_CACHE, kept current by update_last_block."""
+    cached = LAST_HASH_CACHE.get("data") or {}
+    return cached.get("last_hash") or get_last_block_snapshot().get("block_hash") or "0" * 64
+
+
+def _submission_outcome(result) -> tuple[str, dict]:
+    """Map a _process_mining_submission response to a tracked outcome."""
+    resp, code = result if isinstance(result, tuple) else (result, result.status_code)
+    body = resp.get_json(silent=True) or {}
+    if code == 200:
+        return mining_submissions.ACCEPTED, {"height": body.get("height"), "reward": body.get("reward")}
+    reason = body.get("reason") or body.get("error")
+    if code == 409:
+        return mining_submissions.STALE, {
+            "reason": reason,
+            "tip_height": body.get("tip_height"),
+            "tip_hash": body.get("tip_hash"),
+        }
+    if code == 400:
+        return mining_submissions.INVALID, {"reason": reason}
+    return mining_submissions.REJECTED, {"reason": reason, "http_status": code}
+
+
 # ─── IoT MINER BLOCK REWARDS ──────────────────────────
 IOT_REWARD_PER_BLOCK = 0.001   # Max THR per block for IoT miners
 IOT_MAX_REWARDS_PER_BLOCK = 5  # Max IoT wallets rewarded per block
@@ -32141,7 +33154,7 @@ def _distribute_iot_block_rewards(block_height: int, block_hash: str) -> int:
 
         total_points = sum(pts for _, pts in sorted_wallets)
         rewards_paid = 0
-        chain = load_json(CHAIN_FILE, [])
+        reward_txs = []
         ts = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
 
         for wallet, points in sorted_wallets:
@@ -32176,12 +33189,12 @@ def _distribute_iot_block_rewards(block_height: int, block_hash: str) -> int:
                     "pool_source": "AI_WALLET_FEE_SHARE",
                 }
             }
-            chain.append(reward_tx)
+            reward_txs.append(reward_tx)
             persist_normalized_tx(reward_tx)
             rewards_paid += 1
 
         save_json(LEDGER_FILE, ledger)
-        save_json(CHAIN_FILE, chain)
+        append_chain_entries(reward_txs)
 
         # Clear processed pending rewards
         state["pending_rewards"] = []
@@ -32463,8 +33476,6 @@ def _process_mining_submission(data: dict, require_job_id: bool = False):
             return jsonify(error="Mining temporarily banned", reason="banned_by_watchdog"), 429
         return jsonify(error=f"Insufficient difficulty. Target: {hex(current_target)}"), 400
 
-    chain=load_json(CHAIN_FILE,[])
-
     # Reward split με σωστό height (blocks + offset)
     block_count = last_block.get("block_count")
     if submitted_height is not None:
@@ -32474,8 +33485,7 @@ def _process_mining_submission(data: dict, require_job_id: bool = False):
         local_height = max(int(block_count) - HEIGHT_OFFSET, 0)
         height = int(block_count)
     else:
-        blocks=[b for b in chain if isinstance(b,dict) and b.get("reward") is not None]
-        local_height  = len(blocks)
+        local_height  = chain_block_count()
         height        = HEIGHT_OFFSET + local_height
     total_reward  = calculate_reward(height)
 
@@ -32519,6 +33529,9 @@ def _process_mining_submission(data: dict, require_job_id: bool = False):
         "type":"block",
         "target":current_target,
         "is_stratum":is_stratum,
+        # Stratum header inputs, so peers can recompute pow_hash (chain_sync.pow_hash)
+        **({"stratum_header": {"version": version, "merkle_root": merkle_root, "time": time_val, "nbits": nbits}}
+           if is_stratum else {}),
         # Phase 6: Heat recovery bonus metadata
         "heat_bonus": heat_bonus_info
     }
@@ -32527,9 +33540,9 @@ def _process_mining_submission(data: dict, require_job_id: bool = False):
     # Check if there's already a block at this height or later
     # BUT: if prev_hash matches the actual chain tip's hash, we're building on the
     # correct chain even if the stored height is corrupted (phantom orphan blocks).
-    blocks = [b for b in chain if isinstance(b, dict) and b.get("reward") is not None]
-    chain_tip_height = blocks[-1].get("height", -1) if blocks else -1
-    chain_tip_hash = blocks[-1].get("block_hash", "") if blocks else ""
+    chain_tip = chain_last_block()
+    chain_tip_height = chain_tip.get("height", -1) if chain_tip else -1
+    chain_tip_hash = chain_tip.get("block_hash", "") if chain_tip else ""
 
     # Only reject as stale if height is wrong AND prev_hash doesn't match the tip
     if height <= chain_tip_height and prev_hash != chain_tip_hash:
@@ -32557,7 +33570,7 @@ def _process_mining_submission(data: dict, require_job_id: bool = False):
             height, chain_tip_height
         )
 
-    chain.append(new_block)
+    new_entries = [new_block]
     _index_block_event(new_block)  # Index for fast queries
 
     reward_tx_id = f"reward:{pow_hash}:{thr_address}"
@@ -32590,13 +33603,14 @@ def _process_mining_submission(data: dict, require_job_id: bool = False):
     pool=load_mempool()
     included=[]
     if pool:
-        for tx in list(pool):
-            tx["height"]=height
-            tx["status"]="confirmed"
-            tx["timestamp"]=ts
-            chain.append(tx)
-            _index_transaction_event(tx)  # Index for fast wallet queries
-            included.append(tx)
+        with ledger_tx():
+            for tx in list(pool):
+                tx["height"]=height
+                tx["status"]="confirmed"
+                tx["timestamp"]=ts
+                new_entries.append(tx)
+                _index_transaction_event(tx)  # Index for fast wallet queries
+                included.append(tx)
         save_mempool([])
 
     # Batch ledger updates: read once, update all, write once (instead of read-write-read-write)
@@ -32604,28 +33618,7 @@ def _process_mining_submission(data: dict, require_job_id: bool = False):
 
     # Process included mempool transactions
     if pool and included:
-        for tx in included:
-            if tx.get("type")=="transfer":
-                to_thr=tx["to"]
-                amt=float(tx["amount"])
-                fee=float(tx.get("fee_burned",0.0))
-                ledger[to_thr]=round(ledger.get(to_thr,0.0)+amt,6)
-                ledger[BURN_ADDRESS]=round(ledger.get(BURN_ADDRESS,0.0)+fee,6)
-            elif tx.get("type")=="token_transfer":
-                sym = tx.get("symbol")
-                tok = get_custom_token(sym)
-                amt = float(tx.get("amount", 0.0))
-                fee = float(tx.get("fee_burned", 0.0))
-                to_addr = tx.get("to")
-
-                # Credit receiver's custom-token balance at block-time (sender already deducted at submit-time).
-                if tok and to_addr:
-                    tledger = load_custom_token_ledger(tok["id"])
-                    tledger[to_addr] = round(float(tledger.get(to_addr, 0.0)) + amt, tok.get("decimals", 8))
-                    save_custom_token_ledger(tok["id"], tledger)
-
-                # Account THR fee burn to burn address for transparency.
-                ledger[BURN_ADDRESS] = round(ledger.get(BURN_ADDRESS, 0.0) + fee, 6)
+        _apply_block_tx_deltas(ledger, included)
 
     # Add mining rewards to same ledger update (batch optimization)
     ledger[thr_address]=round(ledger.get(thr_address,0.0)+miner_share,6)
@@ -32636,7 +33629,7 @@ def _process_mining_submission(data: dict, require_job_id: bool = False):
     # Single write operation
     save_json(LEDGER_FILE,ledger)
 
-    save_json(CHAIN_FILE, chain)
+    append_chain_entries(new_entries)
     update_last_block(new_block, is_block=True)
 
     # IoT miner rewards: AI Agent distributes pending IoT rewards embedded in block
@@ -32647,11 +33640,11 @@ def _process_mining_submission(data: dict, require_job_id: bool = False):
     # their chains without polling.
     # Queue block for async broadcast to peers (avoid network timeouts)
     try:
-        _BROADCAST_QUEUE.put(new_block, block=False)
+        _BROADCAST_QUEUE.put((new_block, included), block=False)
     except queue.Full:
         # If queue is full, do broadcast synchronously
         try:
-            broadcast_block(new_block)
+            broadcast_block(new_block, included)
         except Exception:
             logger.warning(f"Failed to broadcast block {height}")
 
@@ -32660,6 +33653,37 @@ def _process_mining_submission(data: dict, require_job_id: bool = False):
     return jsonify(status="accepted", height=height, reward=miner_share, tx_included=len(included), iot_rewards=iot_rewards_paid), 200
 
 
+def _apply_block_tx_deltas(ledger: dict, txs: list) -> None:
+    """Block-time ledger effects of the mempool txs a locally mined block
+    includes: the receiver is credited and the burned fee is accounted to
+    BURN_ADDRESS.  Peer blocks get it only for txs this node debited (see
+    ``_accept_peer_blocks``).
+    """
+    for tx in txs:
+        if tx.get("type")=="transfer":
+            to_thr=tx.get("to")
+            amt=float(tx.get("amount",0.0))
+            fee=float(tx.get("fee_burned",0.0))
+            if to_thr:
+                ledger[to_thr]=round(ledger.get(to_thr,0.0)+amt,6)
+            ledger[BURN_ADDRESS]=round(ledger.get(BURN_ADDRESS,0.0)+fee,6)
+        elif tx.get("type")=="token_transfer":
+            sym = tx.get("symbol")
+            tok = get_custom_token(sym)
+            amt = float(tx.get("amount", 0.0))
+            fee = float(tx.get("fee_burned", 0.0))
+            to_addr = tx.get("to")
+
+            # Credit receiver's custom-token balance at block-time (sender already deducted at submit-time).
+            if tok and to_addr:
+                tledger = load_custom_token_ledger(tok["id"])
+                tledger[to_addr] = round(float(tledger.get(to_addr, 0.0)) + amt, tok.get("decimals", 8))
+                save_custom_token_ledger(tok["id"], tledger)
+
+            # Account THR fee burn to burn address for transparency.
+            ledger[BURN_ADDRESS] = round(ledger.get(BURN_ADDRESS, 0.0) + fee, 6)
+
+
 @app.route("/submit_block", methods=["POST"])
 @app.route("/api/submit_block", methods=["POST"])
 def submit_block():
@@ -32674,6 +33698,84 @@ def api_mining_work():
     return jsonify({"ok": True, **job}), 200
 
 
+def _submission_updates_pending(address: str | None, after: int | None):
+    if not address or after is None:
+        return None
+    return lambda: bool(MINING_SUBMISSIONS.updates(address, after)[0])
+
+
+def _mining_job_events(address: str | None, since: str | None, after: int | None):
+    deadline = time.time() + MINING_STREAM_MAX_SECONDS
+    if address and after is None:
+        after = MINING_SUBMISSIONS.cursor()
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return
+        template = MINING_JOBS.wait(
+            since, min(MINING_STREAM_TIMEOUT_SECONDS, remaining), until=_submission_updates_pending(address, after)
+        )
+        sent = False
+        if address:
+            updates, after = MINING_SUBMISSIONS.updates(address, after)
+            for record in updates:
+                yield f"event: submission\ndata: {json.dumps(record)}\n\n"
+                sent = True
+        if since not in (template["prev_hash"], template["job_id"]):
+            since = template["job_id"]
+            payload = _mining_job_payload(MINING_JOBS.job_for(address, template))
+            yield f"id: {template['seq']}\nevent: job\ndata: {json.dumps(payload)}\n\n"
+            sent = True
+        if not sent:
+            yield ": keepalive\n\n"
+
+
+@app.route("/api/mining/work/stream")
+def api_mining_work_stream():
+    """Mining jobs pushed when the tip or target changes.
+
+    With ``Accept: text/event-stream`` this is an SSE stream of ``job``
+    events, plus ``submission`` events as the miner's /api/miner/submit
+    outcomes resolve.  Otherwise it long-polls: the job is returned as soon
+    as it differs from ``since`` (a tip hash or job id), or after
+    ``timeout`` seconds with ``changed`` false.  With ``address`` and an
+    ``after`` cursor the long-poll also returns early with the submissions
+    resolved since that cursor.
+    """
+    address = (request.args.get("address") or request.args.get("thr_address") or "").strip() or None
+    since = (request.args.get("since") or "").strip() or None
+    try:
+        timeout = float(request.args.get("timeout", MINING_STREAM_TIMEOUT_SECONDS))
+    except (TypeError, ValueError):
+        timeout = MINING_STREAM_TIMEOUT_SECONDS
+    timeout = max(0.0, min(timeout, MINING_STREAM_TIMEOUT_SECONDS))
+    try:
+        after = int(request.args["after"]) if request.args.get("after") not in (None, "") else None
+    except (TypeError, ValueError):
+        after = None
+
+    if not _MINING_STREAM_SLOTS.acquire(blocking=False):
+        template = MINING_JOBS.current()
+    elif "text/event-stream" in (request.headers.get("Accept") or ""):
+        resp = Response(
+            _mining_job_events(address, since, after),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        resp.call_on_close(_MINING_STREAM_SLOTS.release)
+        return resp
+    else:
+        try:
+            template = MINING_JOBS.wait(since, timeout, until=_submission_updates_pending(address, after))
+        finally:
+            _MINING_STREAM_SLOTS.release()
+    changed = since not in (template["prev_hash"], template["job_id"])
+    job = _mining_job_payload(MINING_JOBS.job_for(address, template))
+    if address and after is not None:
+        job["submissions"], job["cursor"] = MINING_SUBMISSIONS.updates(address, after)
+    return jsonify({"ok": True, "changed": changed, **job}), 200
+
+
 @app.route("/api/mining/submit", methods=["POST"])
 def api_mining_submit():
     data = request.get_json() or {}
@@ -32712,25 +33814,72 @@ def api_miner_submit():
     if not thr_address or nonce is None:
         return jsonify(error="Missing mining data"), 400
 
+    prev_hash = data.get("prev_hash")
+    if not prev_hash and data.get("job_id"):
+        prev_hash = (MINING_JOBS.get(data["job_id"]) or {}).get("prev_hash")
+    record, is_new = MINING_SUBMISSIONS.open(
+        thr_address,
+        work_key=_submission_work_key(data, thr_address),
+        job_id=data.get("job_id"),
+        prev_hash=prev_hash,
+        submitted_height=data.get("height"),
+    )
+    submission_id = record["submission_id"]
+    if not is_new:
+        return jsonify(status=mining_submissions.DUPLICATE, submission_id=submission_id, original=record), 200
+
+    # Work on an old tip is answered here, before it takes a queue slot
+    tip_hash = _submission_tip_hash()
+    if prev_hash and prev_hash != tip_hash:
+        MINING_SUBMISSIONS.resolve(submission_id, mining_submissions.STALE, reason="prev_mismatch", tip_hash=tip_hash)
+        return jsonify(
+            error="stale_block",
+            reason="prev_mismatch",
+            submission_id=submission_id,
+            tip_hash=tip_hash,
+        ), 409
+
     # Queue for background processing
     try:
-        _BLOCK_PROCESS_QUEUE.put((data, time.time()), block=False)
+        _BLOCK_PROCESS_QUEUE.put((data, time.time(), submission_id), block=False)
         return jsonify(
             status="accepted",
             message="Block queued for processing",
+            submission_id=submission_id,
             height=data.get("height"),
             thr_address=thr_address
         ), 202
     except queue.Full:
         # Queue is full - return 503 instead of blocking (prevents timeouts)
         logger.warning(f"Block processing queue is full - rejecting block from {thr_address}")
+        MINING_SUBMISSIONS.resolve(submission_id, mining_submissions.REJECTED, reason="queue_full")
         return jsonify(
             error="Node processing limit reached",
             reason="queue_full",
+            submission_id=submission_id,
             message="Please retry after a moment"
         ), 503
 
 
+@app.route("/api/miner/submit/<submission_id>")
+def api_miner_submit_status(submission_id):
+    """Outcome of a queued submit; ``?wait=N`` long-polls until it is resolved."""
+    try:
+        wait = max(0.0, min(float(request.args.get("wait", 0)), MINING_STREAM_TIMEOUT_SECONDS))
+    except (TypeError, ValueError):
+        wait = 0.0
+    if wait and _MINING_STREAM_SLOTS.acquire(blocking=False):
+        try:
+            record = MINING_SUBMISSIONS.wait(submission_id, wait)
+        finally:
+            _MINING_STREAM_SLOTS.release()
+    else:
+        record = MINING_SUBMISSIONS.get(submission_id)
+    if record is None:
+        return jsonify(ok=False, error="unknown submission_id"), 404
+    return jsonify(ok=True, **record), 200
+
+
 # ─── BACKGROUND MINTER / WATCHDOG ──────────────────
 def submit_mining_block_for_pledge(thr_addr):
     chain = load_json(CHAIN_FILE, [])
@@ -32866,12 +34015,12 @@ def update_telemetry_cache_job():
         last_block = get_last_block_snapshot()
 
         # Calculate hashrate (blocks/day * difficulty)
-        chain = load_json(CHAIN_FILE, [])
-        blocks = [b for b in chain if isinstance(b, dict) and b.get("reward") is not None]
-        block_count = len(blocks)
+        state = chain_state()
+        blocks = state.reward_blocks
+        block_count = state.block_count
 
         # Get recent blocks for TPS calculation
-        recent_blocks = blocks[-60:] if len(blocks) >= 60 else blocks  # Last 60 blocks
+        recent_blocks = blocks[-60:]  # Last 60 blocks
         if len(recent_blocks) >= 2:
             time_span = 0
             first_ts = recent_blocks[0].get("timestamp", "")
@@ -32894,15 +34043,13 @@ def update_telemetry_cache_job():
             tps = 0
 
         # Count transactions
-        tx_count = sum(1 for item in chain
-                      if isinstance(item, dict) and item.get("type") in
-                      ["transfer", "token_transfer", "swap", "bridge", "service_payment"])
+        tx_count = state.count_types(["transfer", "token_transfer", "swap", "bridge", "service_payment"])
 
         # Get difficulty
         difficulty = last_block.get("difficulty", 0)
 
         # Estimate hashrate (very rough: blocks_per_day * difficulty)
-        if len(blocks) >= 144:  # At least 1 day of blocks
+        if block_count >= 144:  # At least 1 day of blocks
             blocks_per_day = 1440  # 1 block/min = 1440/day
             hashrate = blocks_per_day * difficulty
         else:
@@ -32914,6 +34061,7 @@ def update_telemetry_cache_job():
         _update_telemetry_cache("tx_count", tx_count)
         _update_telemetry_cache("block_count", block_count)
         _update_telemetry_cache("tps", round(tps, 4))
+        _update_telemetry_cache("ledger_db", LEDGER_DB.stats())
 
         logger.debug(f"[TELEMETRY] Updated cache: blocks={block_count}, txs={tx_count}, tps={tps:.4f}, hashrate={hashrate}")
 
@@ -33305,6 +34453,110 @@ def api_v1_block_by_height(height: int):
     return jsonify(block=block, height=height), 200
 
 
+def _iter_height_range(start: int, stop: int):
+    """``(block, txs)`` for heights ``start..stop``, stopping at the first gap."""
+    if CHAIN_STORE is not None:
+        _chain_store_absorb_external_write()
+        yield from CHAIN_STORE.iter_heights(start, stop)
+        return
+    by_height = {}
+    for block, txs in group_blocks(load_json(CHAIN_FILE, [])):
+        try:
+            height = int(block.get("height"))
+        except (TypeError, ValueError):
+            continue
+        if start <= height <= stop:
+            by_height[height] = (block, txs)
+    for height in range(start, stop + 1):
+        if height not in by_height:
+            return
+        yield by_height[height]
+
+
+@app.route("/api/v1/headers", methods=["GET"])
+def api_v1_headers():
+    """Block headers from height ``from`` (``count`` of them, at most
+    MAX_HEADERS) for headers-first sync; see chain_sync.py."""
+    try:
+        start = max(int(request.args.get("from", 0)), 0)
+        count = min(max(int(request.args.get("count", MAX_HEADERS)), 1), MAX_HEADERS)
+    except (TypeError, ValueError):
+        return jsonify(error="invalid_range"), 400
+    headers = [block_header(block) for block, _ in _iter_height_range(start, start + count - 1)]
+    tip = chain_last_block() or {}
+    return jsonify(headers=headers, tip_height=tip.get("height")), 200
+
+
+@app.route("/api/v1/blocks", methods=["GET"])
+def api_v1_blocks_range():
+    """Blocks with their txs for ``range=A-B`` (inclusive, at most
+    MAX_RANGE_BLOCKS), streamed as NDJSON: one ``{"block", "txs"}`` per line."""
+    bounds = parse_range(request.args.get("range", ""))
+    if bounds is None:
+        return jsonify(error="invalid_range"), 400
+    start, stop = bounds
+    stop = min(stop, start + MAX_RANGE_BLOCKS - 1)
+
+    def _lines():
+        for block, txs in _iter_height_range(start, stop):
+            yield json.dumps({"block": block, "txs": txs}, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    return Response(_lines(), mimetype="application/x-ndjson")
+
+
+_CHAIN_SYNC_STATUS = {}
+_CHAIN_SYNC_LOCK = threading.Lock()
+
+
+def sync_chain_from_peer(base_url: str, max_blocks: int | None = None) -> dict:
+    """Pull the blocks missing locally from ``base_url`` (headers first,
+    bodies pipelined, one ledger transaction + chain append per batch).
+    Every batch is validated by ``BLOCK_INTAKE`` before it is committed."""
+    with _CHAIN_SYNC_LOCK:
+        client = ChainSyncClient(
+            HttpSyncTransport(base_url),
+            _apply_synced_batch,
+            batch_blocks=CHAIN_SYNC_BATCH_BLOCKS,
+            pipeline_depth=CHAIN_SYNC_PIPELINE,
+            max_target=_peer_block_target_limit,
+            checkpoint=CHAIN_SYNC_CHECKPOINT,
+        )
+        tip = chain_last_block()
+        stats = client.sync(tip, start_height=HEIGHT_OFFSET, max_blocks=max_blocks)
+        stats.update(peer=base_url, finished_at=time.time())
+        _CHAIN_SYNC_STATUS.clear()
+        _CHAIN_SYNC_STATUS.update(stats)
+        if stats["blocks"]:
+            REPLICA_SYNC_STATE.invalidate()
+        return stats
+
+
+def _apply_synced_batch(groups: list) -> None:
+    status, details = BLOCK_INTAKE.submit_batch(groups)
+    if status != ADDED:
+        raise HeaderValidationError(f"peer batch rejected at height {details.get('height')}: {details.get('reason')}")
+
+
+@app.route("/api/v1/sync/status", methods=["GET"])
+def api_v1_sync_status():
+    """Result of the last chain sync run (blocks, seconds, blocks/s)."""
+    return jsonify(
+        peer=CHAIN_SYNC_PEER_URL or None,
+        last_run=dict(_CHAIN_SYNC_STATUS) or None,
+        intake=BLOCK_INTAKE.stats(),
+    ), 200
+
+
+def _chain_sync_loop():
+    while True:
+        try:
+            sync_chain_from_peer(CHAIN_SYNC_PEER_URL)
+        except Exception as e:
+            logger.warning("chain_sync: sync from %s failed: %s", CHAIN_SYNC_PEER_URL, e)
+            _CHAIN_SYNC_STATUS.update(error=str(e), finished_at=time.time())
+        time.sleep(CHAIN_SYNC_INTERVAL_SECONDS)
+
+
 @app.route("/api/v1/blockhash/<string:block_hash>", methods=["GET"])
 def api_v1_block_by_hash(block_hash: str):
     """Fetch a block by its hash.  Returns 404 if no matching block is
@@ -33404,6 +34656,12 @@ def api_v1_get_peers():
     return jsonify(peers=load_peers()), 200
 
 
+@app.route("/api/v1/peers/health", methods=["GET"])
+def api_v1_peers_health():
+    """Per-peer relay state: breaker, health score, latency and counters."""
+    return jsonify(PEER_RELAY.stats()), 200
+
+
 @app.route("/api/v1/peers", methods=["POST"])
 def api_v1_add_peer():
     """Add a new peer URL to the local registry.  Expects a JSON body
@@ -33425,10 +34683,12 @@ def api_v1_receive_tx():
     """Endpoint for peer nodes to push transactions to this node.  The
     incoming transaction should be a JSON object conforming to the Thronos
     transaction schema.  The transaction is appended to the mempool if it
-    does not already exist."""
+    does not already exist, marked ``relayed``: this node never debited its
+    sender."""
     tx = request.get_json() or {}
     if not isinstance(tx, dict) or not tx.get("tx_id"):
         return jsonify(error="invalid_tx"), 400
+    tx["relayed"] = True
     pool = load_mempool()
     if all(t.get("tx_id") != tx.get("tx_id") for t in pool):
         pool.append(tx)
@@ -33439,26 +34699,130 @@ def api_v1_receive_tx():
 @app.route("/api/v1/receive_block", methods=["POST"])
 def api_v1_receive_block():
     """Endpoint for peer nodes to push newly mined blocks to this node.
-    This simple implementation verifies that the incoming object has a
-    ``block_hash`` and ``reward`` field before appending it to the chain.  A
-    more complete implementation would perform full validation and fork
-    resolution."""
+    The block goes through ``BLOCK_INTAKE`` (see block_intake.py): duplicate
+    and in-flight checks, PoW against this node's target, the scheduled
+    reward for its height, prev-hash validation against the tip, and
+    an orphan pool for blocks whose parent has not arrived yet.  Fork
+    resolution is out of scope: blocks on a known non-tip parent are
+    rejected as stale."""
     block = request.get_json() or {}
     if not isinstance(block, dict) or not block.get("block_hash") or block.get("reward") is None:
         return jsonify(error="invalid_block"), 400
-    chain = load_json(CHAIN_FILE, [])
-    if any(b.get("block_hash") == block.get("block_hash") for b in chain if isinstance(b, dict)):
+    REPLICA_SYNC_STATE.observe_remote_height(block.get("height"))
+    return _block_intake_response(*BLOCK_INTAKE.submit(block))
+
+
+@app.route("/api/v1/receive_compact_block", methods=["POST"])
+def api_v1_receive_compact_block():
+    """Compact variant of ``receive_block`` (see compact_block.py).  The
+    block's txs are rebuilt from the local mempool; if some are not there the
+    reply is ``status=missing`` with their indexes and the sender resends the
+    compact block with those txs in full."""
+    message = request.get_json(silent=True) or {}
+    header = message.get("header") if isinstance(message, dict) else None
+    if not isinstance(header, dict) or not header.get("block_hash") or header.get("reward") is None:
+        return jsonify(error="invalid_block"), 400
+    REPLICA_SYNC_STATE.observe_remote_height(header.get("height"))
+    if known_block_height(header.get("block_hash")) is not None:
         return jsonify(status="duplicate"), 200
-    chain.append(block)
-    save_json(CHAIN_FILE, chain)
-    thr_addr = block.get("thr_address")
-    reward = float(block.get("reward", 0.0))
-    if thr_addr:
-        ledger = load_json(LEDGER_FILE, {})
-        ledger[thr_addr] = round(float(ledger.get(thr_addr, 0.0)) + reward, 6)
-        save_json(LEDGER_FILE, ledger)
-    update_last_block(block, is_block=True)
-    return jsonify(status="added"), 201
+    reason = BLOCK_INTAKE.check_block(header)
+    if reason:
+        return jsonify(error="invalid_block", reason=reason), 400
+    try:
+        txs, missing = reconstruct_compact_block(message, load_mempool())
+    except ValueError:
+        return jsonify(error="invalid_block"), 400
+    if missing:
+        return jsonify(status="missing", missing=missing), 200
+    return _block_intake_response(*BLOCK_INTAKE.submit(header, txs))
+
+
+def _block_intake_response(status: str, details: dict):
+    if status == ADDED:
+        return jsonify(status=status, **details), 201
+    if status == DUPLICATE:
+        return jsonify(status=status), 200
+    if status in (IN_FLIGHT, ORPHAN):
+        return jsonify(status=status, **details), 202
+    return jsonify(error="invalid_block", **details), 400
+
+
+def _accept_peer_blocks(groups: list, pool: list | None = None) -> None:
+    """Append peer ``(block, txs)`` groups in one chain append, drop their
+    txs from the mempool and credit the block rewards, all in one ledger
+    transaction (a failed append rolls the credits back).
+
+    A peer's tx carries no signature this node can check, so only the txs
+    this node debited itself are verified: ones in the local mempool that
+    were submitted here rather than relayed in (``relayed``).  Their local
+    copies are confirmed, get their block-time deltas
+    (``_apply_block_tx_deltas``) and go on the chain.  Every other tx stays
+    off the chain, the tx log and the history index, since no balance here
+    reflects it; it is still dropped from the mempool so it is not mined
+    again."""
+    if not groups:
+        return
+    pool = load_mempool() if pool is None else pool
+    debited = {tx.get("tx_id"): tx for tx in pool if tx.get("tx_id") and not tx.get("relayed")}
+    entries = []
+    verified = []
+    included = set()
+    rewards = {}
+    for block, txs in groups:
+        entries.append(block)
+        for tx in txs:
+            included.add(tx.get("tx_id"))
+            local = debited.pop(tx.get("tx_id"), None)
+            if local is None:
+                continue
+            local.update(height=block.get("height"), status="confirmed", timestamp=block.get("timestamp") or local.get("timestamp"))
+            entries.append(local)
+            verified.append(local)
+        thr_addr = block.get("thr_address")
+        if thr_addr:
+            rewards[thr_addr] = rewards.get(thr_addr, 0.0) + float(block.get("reward", 0.0))
+    with ledger_tx():
+        if rewards or verified:
+            ledger = load_json(LEDGER_FILE, {})
+            for thr_addr, reward in rewards.items():
+                ledger[thr_addr] = round(float(ledger.get(thr_addr, 0.0)) + reward, 6)
+            _apply_block_tx_deltas(ledger, verified)
+            save_json(LEDGER_FILE, ledger)
+        append_chain_entries(entries)
+    skipped = len(included) - len(verified)
+    if skipped:
+        logger.info("[block_intake] kept %d unverified peer tx(s) off the chain", skipped)
+    if included:
+        remaining = [tx for tx in pool if tx.get("tx_id") not in included]
+        if len(remaining) != len(pool):
+            save_mempool(remaining)
+    update_last_block(groups[-1][0], is_block=True)
+
+
+def _peer_block_target_limit(height: int) -> int:
+    """Easiest target a peer block at ``height`` may claim.
+
+    Blocks in the retarget window of the next local block get
+    ``get_mining_target()``; each window further ahead (a sync batch can
+    cross boundaries before its blocks are committed) may be up to 4x easier,
+    the per-window clamp of ``_retarget_apply_one_window``.
+    """
+    target = get_mining_target()
+    ahead = (int(height) - HEIGHT_OFFSET) // RETARGET_INTERVAL - chain_block_count() // RETARGET_INTERVAL
+    if ahead > 0:
+        target = min(INITIAL_TARGET, target * 4 ** min(ahead, 64))
+    return target
+
+
+BLOCK_INTAKE = BlockIntake(
+    known_block_height,
+    _chain_tip,
+    _accept_peer_blocks,
+    max_target=_peer_block_target_limit,
+    reward_for=calculate_reward,
+    orphan_limit=BLOCK_INTAKE_ORPHAN_LIMIT,
+    checkpoint=CHAIN_SYNC_CHECKPOINT,
+)
 
 
 # ─── CareerForge L2 AI tx types ─────────────────────────────────────────────
@@ -33922,6 +35286,12 @@ if is_replica() and HEARTBEAT_ENABLED:
         heartbeat_thread.start()
         print(f"[HEARTBEAT] Replica heartbeat sender started -> {MASTER_INTERNAL_URL}")
 
+# Writable nodes with CHAIN_SYNC_PEER_URL pull missing blocks from that peer
+# (replicas are READ_ONLY and only serve the sync endpoints).
+if CHAIN_SYNC_PEER_URL and not READ_ONLY:
+    threading.Thread(target=_chain_sync_loop, name="chain-sync", daemon=True).start()
+    print(f"[CHAIN_SYNC] Pulling blocks from {CHAIN_SYNC_PEER_URL} every {CHAIN_SYNC_INTERVAL_SECONDS:.0f}s")
+
 # ─── ADMIN MINT ENDPOINT (NEW) ───────────────────────────────────────
 #
 # The BTC → THR bridge requires a privileged endpoint to mint new THR
@@ -47793,6 +49163,8 @@ _register_cp_routes(
     persist_normalized_tx_fn=persist_normalized_tx,
     update_last_block_fn=update_last_block,
     contract_proof_api_key=_CONTRACT_PROOF_API_KEY,
+    chain_length_fn=chain_length,
+    append_chain_fn=append_chain_entries,
 )
 print("✓ CONTRACT_ANCHOR_V1 contract proof routes loaded")
 
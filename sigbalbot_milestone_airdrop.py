@@ -70,6 +70,11 @@ def save_json(path: str, data):
         json.dump(data, f, indent=2)
 
 
+# defaults for SigBalBotMilestoneAirdrop, whose storage hooks shadow the names
+_load_json_file = load_json
+_save_json_file = save_json
+
+
 def _utc_now_str() -> str:
     return time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
 
@@ -89,8 +94,14 @@ class SigBalBotMilestoneAirdrop:
     """Tracks SigBalBot qualifying wins and distributes THR at milestones
     with admin-approval gating and idempotent payout execution."""
 
-    def __init__(self, *, dry_run: bool = False):
+    def __init__(self, *, dry_run: bool = False, load_json=None, save_json=None, append_chain=None):
+        """``load_json``/``save_json``/``append_chain`` let the host route
+        ledger and chain writes through its own stores instead of the JSON
+        files (``append_chain`` takes a list of chain entries)."""
         self.dry_run = dry_run
+        self._load_json = load_json or _load_json_file
+        self._save_json = save_json or _save_json_file
+        self._append_chain = append_chain or self._append_chain_file
         self.state = self._load_state()
         self.total_wins: int = self.state.get("total_wins", 0)
         self.milestones_reached: int = self.state.get("milestones_reached", 0)
@@ -239,9 +250,14 @@ class SigBalBotMilestoneAirdrop:
 
     # ── Chain operations ────────────────────────────────────────────────
 
+    def _append_chain_file(self, entries: List[Dict[str, Any]]) -> None:
+        chain = self._load_json(CHAIN_FILE, [])
+        chain.extend(entries)
+        self._save_json(CHAIN_FILE, chain)
+
     def _check_existing_tx(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
         """Check if a transaction with this idempotency key already exists."""
-        chain = load_json(CHAIN_FILE, [])
+        chain = self._load_json(CHAIN_FILE, [])
         if not isinstance(chain, list):
             return None
         for tx in chain:
@@ -251,7 +267,7 @@ class SigBalBotMilestoneAirdrop:
 
     def _verify_chain_entry(self, tx_id: str) -> bool:
         """Confirm a transaction exists in the chain file after write."""
-        chain = load_json(CHAIN_FILE, [])
+        chain = self._load_json(CHAIN_FILE, [])
         if not isinstance(chain, list):
             return False
         return any(
@@ -459,11 +475,10 @@ class SigBalBotMilestoneAirdrop:
             tx_hash = f"SIGBAL-AIRDROP-{allocation['milestone_number']}-{_idempotency_key(batch_id, address)[:12]}"
 
             if not self.dry_run:
-                ledger = load_json(LEDGER_FILE, {})
+                ledger = self._load_json(LEDGER_FILE, {})
                 ledger[address] = round(float(ledger.get(address, 0)) + amount, 6)
-                save_json(LEDGER_FILE, ledger)
+                self._save_json(LEDGER_FILE, ledger)
 
-                chain = load_json(CHAIN_FILE, [])
                 tx = {
                     "type": "sigbalbot_milestone_airdrop",
                     "from": "ai_pool",
@@ -485,8 +500,7 @@ class SigBalBotMilestoneAirdrop:
                         "wallet_snapshot": payout["wallet_snapshot"],
                     },
                 }
-                chain.append(tx)
-                save_json(CHAIN_FILE, chain)
+                self._append_chain([tx])
 
                 if self._verify_chain_entry(tx_hash):
                     payout["status"] = "confirmed"
@@ -494,13 +508,13 @@ class SigBalBotMilestoneAirdrop:
                     payout["confirmed_at"] = _utc_now_str()
                     result["confirmed"] += 1
 
-                    chain = load_json(CHAIN_FILE, [])
+                    chain = self._load_json(CHAIN_FILE, [])
                     for entry in chain:
                         if isinstance(entry, dict) and entry.get("tx_id") == tx_hash:
                             entry["status"] = "confirmed"
                             entry["confirmed_at"] = payout["confirmed_at"]
                             break
-                    save_json(CHAIN_FILE, chain)
+                    self._save_json(CHAIN_FILE, chain)
                 else:
                     payout["status"] = "failed"
                     result["failed"] += 1
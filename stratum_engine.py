@@ -1,125 +1,591 @@
 """
-stratum_engine.py
-~~~~~~~~~~~~~~~~~~
-
-A very simple Stratum job server for ThronosChain.  This engine accepts
-incoming TCP connections from SHA‑256 miners on port 3334 and exchanges
-minimal Stratum protocol messages.  It is intended as a **placeholder** to
-enable miners (such as cgminer, bfgminer or USB sticks) to connect during
-development.  The server currently issues a fixed job template and does not
-validate shares or record work.
-
-In a production environment, the Stratum engine would need to assemble block
-templates from the local blockchain state, assign unique extranonces and
-difficulty targets to connected miners, validate incoming shares against the
-current target and credit miners with rewards.  This demonstration server
-provides only the handshake and a static job for illustrative purposes.
+ThronosChain Stratum Engine — asyncio stratum v1 server for SHA-256 miners
+
+``start.sh`` runs this next to the Flask app on the master node.  Miners
+(cgminer, bfgminer, USB sticks, ASICs) connect on ``STRATUM_PORT`` and get:
+
+  * job templates built from the chain tip: the node's
+    ``/api/mining/work/stream`` is long-polled, and every connection gets a
+    ``mining.notify`` (clean_jobs) as soon as the tip or target changes
+  * a unique 4-byte extranonce1 per connection, so no two miners ever hash
+    the same header
+  * share validation: the header is rebuilt from the coinbase, extranonce
+    and nonce, hashed with sha256d and checked against the connection's
+    share target; duplicate shares and shares on dropped jobs are refused.
+    The per-job duplicate set holds at most ``max_job_shares`` keys: a job
+    that fills up is re-issued under a fresh job id (same template, new
+    ntime) and further shares on the full job are answered stale
+  * per-connection vardiff: difficulty is retargeted towards one share
+    every ``share_time`` seconds and pushed with ``mining.set_difficulty``
+  * found blocks (hash at or below the chain target) go straight to the
+    node's synchronous commit path (``/submit_block``), whose answer
+    decides the share result
+
+The header layout matches ``_process_mining_submission``: version, prev
+hash, merkle root, ntime, nbits and nonce, little-endian, and the PoW hash
+is the byte-reversed sha256d.  ``scripts/stratum_load.py`` drives the
+server with thousands of simulated clients.
 """
 
+import asyncio
+import hashlib
+import itertools
 import json
+import logging
 import os
-import select
-import socket
-import threading
+import secrets
+import struct
 import time
+from collections import OrderedDict, deque
+from typing import Optional, Tuple
 
+logger = logging.getLogger(__name__)
 
 HOST = os.getenv("STRATUM_HOST", "0.0.0.0")
 PORT = int(os.getenv("STRATUM_PORT", "3334"))
+NODE_URL = os.getenv("STRATUM_NODE_URL", f"http://127.0.0.1:{os.getenv('PORT', '8000')}")
+START_DIFFICULTY = float(os.getenv("STRATUM_START_DIFFICULTY", "1") or 1)
+MIN_DIFFICULTY = float(os.getenv("STRATUM_MIN_DIFFICULTY", "0.001") or 0.001)
+MAX_DIFFICULTY = float(os.getenv("STRATUM_MAX_DIFFICULTY", "1e12") or 1e12)
+SHARE_TIME = float(os.getenv("STRATUM_SHARE_SECONDS", "10") or 10)
+MAX_JOB_SHARES = int(os.getenv("STRATUM_MAX_JOB_SHARES", "200000") or 200000)
 
+# Bitcoin's difficulty-1 target; share difficulty D means target DIFF1 / D
+DIFF1_TARGET = 0xFFFF << 208
+MAX_TARGET = (1 << 256) - 1
+EXTRANONCE1_SIZE = 4
+EXTRANONCE2_SIZE = 4
+KEEP_JOBS = 8
+MAX_LINE = 16 * 1024
+MAX_WRITE_BUFFER = 256 * 1024
+NTIME_SLACK = 7200
 
-def build_static_job() -> dict:
-    """Build a static mining job for demonstration purposes.
+ERR_OTHER = 20
+ERR_STALE = 21
+ERR_DUPLICATE = 22
+ERR_LOW_DIFFICULTY = 23
+ERR_UNAUTHORIZED = 24
+ERR_NOT_SUBSCRIBED = 25
 
-    Returns
-    -------
-    dict
-        A minimal Stratum job JSON object containing dummy values.  Miners
-        connecting to this server will be assigned the same job.
-    """
-    job_id = int(time.time())
-    # In a real implementation, `prev_hash` and `merkle_root` must reflect
-    # the current block template.  Here we use placeholder values.
-    return {
-        "id": job_id,
-        "prev_hash": "00" * 32,
-        "merkle_root": "11" * 32,
-        "version": 536870912,
-        "bits": "1d00ffff",
-        "time": int(time.time()),
-        "clean_jobs": True,
-    }
-
-
-def handle_client(conn: socket.socket, addr: tuple) -> None:
-    """Handle an individual miner connection.
-
-    This function reads a subscription request, responds with a minimal
-    `mining.subscribe` response and then sends a single `mining.notify`
-    containing a static job.  The client connection is kept open until the
-    remote end closes it or the server is shut down.
+
+def sha256d(data: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def swap32(data: bytes) -> bytes:
+    """Reverse the bytes of every 4-byte word (stratum's prevhash encoding)."""
+    return b"".join(data[i:i + 4][::-1] for i in range(0, len(data), 4))
+
+
+def difficulty_to_target(difficulty: float) -> int:
+    return min(MAX_TARGET, int(DIFF1_TARGET / difficulty))
+
+
+def merkle_root(coinbase: bytes, branches) -> bytes:
+    root = sha256d(coinbase)
+    for branch in branches:
+        root = sha256d(root + branch)
+    return root
+
+
+def _push(data: bytes) -> bytes:
+    return bytes([len(data)]) + data
+
+
+def _as_int(value, default: int) -> int:
+    if value is None:
+        return default
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+class StratumJob:
+    """One ``mining.notify`` job built from a node work template."""
+
+    def __init__(self, job_id: str, template: dict, tag: bytes = b"/thronos/"):
+        self.job_id = job_id
+        self.template = template
+        self.prev_hash = template.get("prev_hash") or "0" * 64
+        self.height = template.get("height")
+        self.block_target = _as_int(template.get("target"), MAX_TARGET)
+        self.nbits = _as_int(template.get("nbits"), 0x1D00FFFF)
+        self.version = 1
+        self.ntime = int(time.time())
+        script = _push((self.height or 0).to_bytes(4, "little")) + _push(tag)
+        script_len = len(script) + EXTRANONCE1_SIZE + EXTRANONCE2_SIZE
+        # coinbase = coinb1 | extranonce1 | extranonce2 | coinb2
+        self.coinb1 = (
+            struct.pack("<I", 1) + b"\x01" + b"\x00" * 32 + b"\xff\xff\xff\xff"
+            + bytes([script_len]) + script
+        ).hex()
+        self.coinb2 = (b"\xff\xff\xff\xff" + b"\x01" + b"\x00" * 8 + b"\x00" + b"\x00" * 4).hex()
+        self.branches: list = []
+        self._prev_internal = bytes.fromhex(self.prev_hash)[::-1]
+
+    def notify_params(self, clean: bool) -> list:
+        return [
+            self.job_id,
+            swap32(self._prev_internal).hex(),
+            self.coinb1,
+            self.coinb2,
+            [b.hex() for b in self.branches],
+            f"{self.version:08x}",
+            f"{self.nbits:08x}",
+            f"{self.ntime:08x}",
+            clean,
+        ]
+
+    def header(self, extranonce1: str, extranonce2: str, ntime: int, nonce: int) -> Tuple[bytes, bytes]:
+        """(80-byte header, merkle root as stored in it)."""
+        coinbase = bytes.fromhex(self.coinb1 + extranonce1 + extranonce2 + self.coinb2)
+        root = merkle_root(coinbase, self.branches)
+        header = (
+            struct.pack("<I", self.version) + self._prev_internal + root
+            + struct.pack("<I", ntime) + struct.pack("<I", self.nbits) + struct.pack("<I", nonce)
+        )
+        return header, root
+
+    def submission(self, address: str, root: bytes, ntime: int, nonce: int, pow_hash: str) -> dict:
+        """The node's /submit_block payload; it rebuilds the same header."""
+        payload = {
+            "thr_address": address,
+            "nonce": nonce,
+            "merkle_root": root[::-1].hex(),
+            "prev_hash": self.prev_hash,
+            "time": ntime,
+            "nbits": self.nbits,
+            "version": self.version,
+            "pow_hash": pow_hash,
+        }
+        if self.height is not None:
+            payload["height"] = int(self.height)
+        return payload
+
+
+class Vardiff:
+    """Retargets a connection's difficulty towards one share per ``share_time``."""
+
+    def __init__(self, difficulty: float, minimum: float, maximum: float,
+                 share_time: float, retarget_time: float, window: int = 16):
+        self.difficulty = difficulty
+        self.minimum = minimum
+        self.maximum = maximum
+        self.share_time = share_time
+        self.retarget_time = retarget_time
+        self._shares: deque = deque(maxlen=window)
+        self._last_retarget = time.time()
+
+    def record(self, now: float) -> Optional[float]:
+        """Note an accepted share; returns the new difficulty when it changes."""
+        self._shares.append(now)
+        elapsed = now - self._last_retarget
+        if elapsed < self.retarget_time and len(self._shares) < self._shares.maxlen:
+            return None
+        if len(self._shares) >= 2:
+            average = (self._shares[-1] - self._shares[0]) / (len(self._shares) - 1)
+        else:
+            average = elapsed
+        return self._retarget(now, average)
+
+    def idle(self, now: float) -> Optional[float]:
+        """Ease difficulty when no share has arrived for a while."""
+        last = self._shares[-1] if self._shares else self._last_retarget
+        if now - last < max(self.retarget_time, 2 * self.share_time):
+            return None
+        return self._retarget(now, now - last)
+
+    def _retarget(self, now: float, average: float) -> Optional[float]:
+        self._last_retarget = now
+        self._shares.clear()
+        factor = max(0.25, min(4.0, self.share_time / max(average, 1e-3)))
+        new = max(self.minimum, min(self.maximum, self.difficulty * factor))
+        if abs(new - self.difficulty) / self.difficulty < 0.1:
+            return None
+        self.difficulty = new
+        return new
+
+
+class StratumError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class Connection:
+    def __init__(self, server: "StratumServer", reader, writer, extranonce1: str):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.extranonce1 = extranonce1
+        self.peer = writer.get_extra_info("peername")
+        self.subscribed = False
+        self.address: Optional[str] = None
+        self.worker: Optional[str] = None
+        self.vardiff = Vardiff(server.start_difficulty, server.min_difficulty, server.max_difficulty,
+                               server.share_time, server.retarget_time)
+        self.task: Optional[asyncio.Task] = None
+        self.previous_difficulty: Optional[float] = None
+        self.retargeted_at = 0.0
+        self.accepted = 0
+        self.rejected = 0
+        self.connected_at = time.time()
+
+    def send(self, message: dict) -> None:
+        if self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            logger.warning("stratum: dropping slow client %s", self.peer)
+            self.writer.close()
+            return
+        self.writer.write(json.dumps(message).encode() + b"\n")
+
+    def notify(self, job: StratumJob, clean: bool) -> None:
+        self.send({"id": None, "method": "mining.notify", "params": job.notify_params(clean)})
+
+    def set_difficulty(self, difficulty: float) -> None:
+        self.send({"id": None, "method": "mining.set_difficulty", "params": [difficulty]})
+
+    def share_target(self, now: float) -> int:
+        """Current share target; the previous, easier one stays valid briefly after a retarget."""
+        difficulty = self.vardiff.difficulty
+        if self.previous_difficulty is not None and now - self.retargeted_at < self.server.retarget_grace:
+            difficulty = min(difficulty, self.previous_difficulty)
+        return difficulty_to_target(difficulty)
+
+
+class StratumServer:
+    """Stratum v1 over asyncio streams, fed by a node backend.
+
+    ``backend.fetch(since)`` returns the node's next work template (blocking
+    until it differs from job id ``since``); ``backend.submit(payload)``
+    commits a found block and returns ``(http_status, body)``.  Both are
+    blocking and run in the default executor.
     """
-    print(f"[Stratum] New connection from {addr}")
-    try:
-        # Read subscription message from client
-        data = conn.recv(1024)
-        if not data:
+
+    def __init__(
+        self,
+        backend,
+        host: str = HOST,
+        port: int = PORT,
+        start_difficulty: float = START_DIFFICULTY,
+        min_difficulty: float = MIN_DIFFICULTY,
+        max_difficulty: float = MAX_DIFFICULTY,
+        share_time: float = SHARE_TIME,
+        retarget_time: Optional[float] = None,
+        retarget_grace: float = 5.0,
+        max_job_shares: int = MAX_JOB_SHARES,
+    ):
+        self.backend = backend
+        self.host = host
+        self.port = port
+        self.start_difficulty = start_difficulty
+        self.min_difficulty = min_difficulty
+        self.max_difficulty = max_difficulty
+        self.share_time = share_time
+        self.retarget_time = retarget_time if retarget_time is not None else 3 * share_time
+        self.retarget_grace = retarget_grace
+        self.max_job_shares = max(1, int(max_job_shares))
+        self.connections: set = set()
+        self._jobs: "OrderedDict[str, StratumJob]" = OrderedDict()
+        self._shares: dict = {}
+        self._job_ids = itertools.count(int(time.time()) & 0xFFFF)
+        self._extranonce = secrets.randbits(8 * EXTRANONCE1_SIZE)
+        self._server = None
+        self._tasks: list = []
+        self._since: Optional[str] = None
+        self.started_at = time.time()
+        self.counters = {
+            "shares": 0, "stale": 0, "duplicate": 0, "low_difficulty": 0, "invalid": 0,
+            "blocks": 0, "blocks_rejected": 0, "connections_total": 0,
+        }
+
+    # ─── lifecycle ──────────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_LINE, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._tasks = [asyncio.ensure_future(self._job_loop()), asyncio.ensure_future(self._idle_loop())]
+        logger.info("stratum: listening on %s:%s", self.host, self.port)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        if self._server is not None:
+            self._server.close()
+        handlers = [conn.task for conn in self.connections]
+        for conn in list(self.connections):
+            conn.writer.close()
+        if handlers:
+            await asyncio.wait(handlers, timeout=5)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    # ─── jobs ───────────────────────────────────────────────────────────
+
+    @property
+    def current_job(self) -> Optional[StratumJob]:
+        return next(reversed(self._jobs.values()), None) if self._jobs else None
+
+    async def _job_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                template = await loop.run_in_executor(None, self.backend.fetch, self._since)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("stratum: work fetch failed: %s", exc)
+                await asyncio.sleep(2)
+                continue
+            if template and template.get("job_id") != self._since:
+                self._since = template.get("job_id")
+                self.set_template(template)
+
+    def set_template(self, template: dict) -> StratumJob:
+        """Publish a new node template to every subscribed connection."""
+        previous = self.current_job
+        job = StratumJob(f"{next(self._job_ids) & 0xFFFFFFFF:x}", template)
+        clean = previous is None or previous.prev_hash != job.prev_hash
+        if clean:
+            for job_id in list(self._jobs):
+                self._drop_job(job_id)
+        self._jobs[job.job_id] = job
+        self._shares[job.job_id] = set()
+        while len(self._jobs) > KEEP_JOBS:
+            self._drop_job(next(iter(self._jobs)))
+        for conn in list(self.connections):
+            if conn.subscribed:
+                conn.notify(job, clean)
+        logger.info("stratum: job %s height=%s clean=%s -> %d connections",
+                    job.job_id, job.height, clean, len(self.connections))
+        return job
+
+    def _drop_job(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+        self._shares.pop(job_id, None)
+
+    async def _idle_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, self.share_time))
+            now = time.time()
+            for conn in list(self.connections):
+                if conn.address:
+                    previous = conn.vardiff.difficulty
+                    self._retarget(conn, previous, conn.vardiff.idle(now), now)
+
+    def _retarget(self, conn: Connection, previous: float, difficulty: Optional[float], now: float) -> None:
+        if difficulty is None:
             return
+        conn.previous_difficulty = previous
+        conn.retargeted_at = now
+        conn.set_difficulty(difficulty)
+
+    def _next_extranonce1(self) -> str:
+        self._extranonce = (self._extranonce + 1) % (1 << (8 * EXTRANONCE1_SIZE))
+        return f"{self._extranonce:0{2 * EXTRANONCE1_SIZE}x}"
+
+    # ─── connections ────────────────────────────────────────────────────
+
+    async def _handle(self, reader, writer) -> None:
+        conn = Connection(self, reader, writer, self._next_extranonce1())
+        conn.task = asyncio.current_task()
+        self.connections.add(conn)
+        self.counters["connections_total"] += 1
         try:
-            msg = data.decode().strip()
-        except Exception:
-            msg = str(data)
-        print(f"[Stratum] Received: {msg}")
-        # Respond with a basic subscription ack
-        # Format: [message_id, [extranonce1, extranonce2], extranonce_size]
-        sub_resp = [1, ["deadbeef", "cafebabe"], 4]
-        conn.sendall(json.dumps(sub_resp).encode() + b"\n")
-        # Send a single job notification
-        job = build_static_job()
-        notif = [
-            "mining.notify",
-            job["id"],
-            job["prev_hash"],
-            job["merkle_root"],
-            format(job["time"], "x"),
-            job["bits"],
-            True,
-        ]
-        conn.sendall(json.dumps(notif).encode() + b"\n")
-        # Keep the connection alive until client disconnects
-        while True:
-            ready, _, _ = select.select([conn], [], [], 30)
-            if conn in ready:
-                data = conn.recv(1024)
-                if not data:
+            while not writer.is_closing():
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
                     break
-                # Here we would process share submissions
-                # For now, just log the incoming data
-                print(f"[Stratum] Share from {addr}: {data.strip()}\n")
-    except Exception as exc:
-        print(f"[Stratum] Error handling client {addr}: {exc}")
-    finally:
-        try:
-            conn.close()
-        except Exception:
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(message, dict):
+                    await self._dispatch(conn, message)
+        except (ConnectionError, asyncio.IncompleteReadError):
             pass
-        print(f"[Stratum] Connection closed {addr}")
+        finally:
+            self.connections.discard(conn)
+            writer.close()
+
+    async def _dispatch(self, conn: Connection, message: dict) -> None:
+        msg_id = message.get("id")
+        method = message.get("method")
+        params = message.get("params") or []
+        try:
+            if method == "mining.subscribe":
+                result = self._subscribe(conn)
+            elif method == "mining.authorize":
+                result = self._authorize(conn, params)
+            elif method == "mining.submit":
+                result = await self._submit(conn, params)
+            elif method == "mining.extranonce.subscribe":
+                result = False
+            else:
+                raise StratumError(ERR_OTHER, f"unknown method {method}")
+        except StratumError as exc:
+            conn.send({"id": msg_id, "result": None, "error": [exc.code, exc.message, None]})
+            return
+        conn.send({"id": msg_id, "result": result, "error": None})
+        if method == "mining.authorize" and result:
+            conn.set_difficulty(conn.vardiff.difficulty)
+            if self.current_job is not None:
+                conn.notify(self.current_job, True)
+
+    def _subscribe(self, conn: Connection) -> list:
+        conn.subscribed = True
+        sub_id = conn.extranonce1
+        return [[["mining.set_difficulty", sub_id], ["mining.notify", sub_id]], conn.extranonce1, EXTRANONCE2_SIZE]
+
+    def _authorize(self, conn: Connection, params: list) -> bool:
+        worker = str(params[0]) if params else ""
+        address = worker.split(".", 1)[0].strip()
+        if not address.startswith("THR") or len(address) < 6:
+            raise StratumError(ERR_UNAUTHORIZED, "worker must be a THR address")
+        conn.address, conn.worker = address, worker
+        return True
+
+    # ─── shares ─────────────────────────────────────────────────────────
+
+    async def _submit(self, conn: Connection, params: list) -> bool:
+        if not conn.subscribed:
+            raise StratumError(ERR_NOT_SUBSCRIBED, "not subscribed")
+        if not conn.address:
+            raise StratumError(ERR_UNAUTHORIZED, "unauthorized worker")
+        now = time.time()
+        try:
+            _, job_id, extranonce2, ntime_hex, nonce_hex = (str(p) for p in params[:5])
+            ntime, nonce = int(ntime_hex, 16), int(nonce_hex, 16)
+            if len(extranonce2) != 2 * EXTRANONCE2_SIZE:
+                raise ValueError("extranonce2 size")
+            bytes.fromhex(extranonce2)
+        except ValueError:
+            return self._reject(conn, "invalid", ERR_OTHER, "malformed share")
+        job = self._jobs.get(job_id)
+        if job is None:
+            return self._reject(conn, "stale", ERR_STALE, "job not found")
+        if not job.ntime <= ntime <= now + NTIME_SLACK or nonce >= 1 << 32:
+            return self._reject(conn, "invalid", ERR_OTHER, "ntime or nonce out of range")
+        share_key = (conn.extranonce1, extranonce2, ntime, nonce)
+        seen = self._shares[job_id]
+        if share_key in seen:
+            return self._reject(conn, "duplicate", ERR_DUPLICATE, "duplicate share")
+        if len(seen) >= self.max_job_shares:
+            return self._reject(conn, "stale", ERR_STALE, "job share limit reached")
+
+        header, root = job.header(conn.extranonce1, extranonce2, ntime, nonce)
+        value = int.from_bytes(sha256d(header), "little")
+        if value <= job.block_target:
+            self._remember_share(job, seen, share_key)
+            return await self._submit_block(conn, job, root, ntime, nonce, value)
+        if value > conn.share_target(now):
+            return self._reject(conn, "low_difficulty", ERR_LOW_DIFFICULTY, "low difficulty share")
+        self._remember_share(job, seen, share_key)
+        self._accept(conn, now)
+        return True
+
+    def _remember_share(self, job: StratumJob, seen: set, share_key: tuple) -> None:
+        seen.add(share_key)
+        if len(seen) >= self.max_job_shares and job is self.current_job:
+            # Re-issue the template so the next shares land in a fresh set;
+            # the full job is kept until it ages out of KEEP_JOBS.
+            logger.info("stratum: job %s reached %d shares, re-issuing", job.job_id, len(seen))
+            self.set_template(job.template)
+
+    async def _submit_block(self, conn: Connection, job: StratumJob, root: bytes, ntime: int, nonce: int,
+                            value: int) -> bool:
+        payload = job.submission(conn.address, root, ntime, nonce, f"{value:064x}")
+        loop = asyncio.get_running_loop()
+        try:
+            status, body = await loop.run_in_executor(None, self.backend.submit, payload)
+        except Exception as exc:
+            logger.error("stratum: block submit failed: %s", exc)
+            status, body = 0, {"error": str(exc)}
+        body = body or {}
+        if status in (200, 201, 202):
+            self.counters["blocks"] += 1
+            logger.info("stratum: block %s at height %s by %s", payload["pow_hash"][:16], job.height, conn.worker)
+            self._accept(conn, time.time())
+            return True
+        self.counters["blocks_rejected"] += 1
+        logger.warning("stratum: block rejected (%s): %s", status, body.get("error"))
+        if status == 409:
+            return self._reject(conn, "stale", ERR_STALE, "stale block")
+        return self._reject(conn, "invalid", ERR_OTHER, str(body.get("error") or "block rejected"))
+
+    def _accept(self, conn: Connection, now: float) -> None:
+        conn.accepted += 1
+        self.counters["shares"] += 1
+        previous = conn.vardiff.difficulty
+        self._retarget(conn, previous, conn.vardiff.record(now), now)
+
+    def _reject(self, conn: Connection, counter: str, code: int, message: str):
+        conn.rejected += 1
+        self.counters[counter] += 1
+        raise StratumError(code, message)
+
+    def stats(self) -> dict:
+        uptime = max(time.time() - self.started_at, 1e-9)
+        job = self.current_job
+        return {
+            "connections": len(self.connections),
+            "authorized": sum(1 for c in self.connections if c.address),
+            "job_id": job.job_id if job else None,
+            "height": job.height if job else None,
+            "shares_per_second": round(self.counters["shares"] / uptime, 3),
+            **self.counters,
+        }
+
+
+class HttpNodeBackend:
+    """Work from the node's job stream; blocks to its synchronous ``/submit_block``."""
+
+    def __init__(self, base_url: str = NODE_URL, timeout: float = 60.0, stream_timeout: float = 25.0, session=None):
+        if session is None:
+            import requests
+
+            session = requests.Session()
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.stream_timeout = stream_timeout
+        self.session = session
+
+    def fetch(self, since: Optional[str]) -> dict:
+        params = {"timeout": self.stream_timeout}
+        if since:
+            params["since"] = since
+        resp = self.session.get(
+            f"{self.base_url}/api/mining/work/stream", params=params, timeout=self.stream_timeout + 10
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    def submit(self, payload: dict) -> Tuple[int, dict]:
+        resp = self.session.post(f"{self.base_url}/submit_block", json=payload, timeout=self.timeout)
+        try:
+            body = resp.json()
+        except ValueError:
+            body = {}
+        return resp.status_code, body
 
 
 def start_server() -> None:
     """Start the Stratum server."""
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as srv:
-        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        srv.bind((HOST, PORT))
-        srv.listen(5)
-        print(f"[Stratum] Listening on {HOST}:{PORT}")
-        try:
-            while True:
-                conn, addr = srv.accept()
-                threading.Thread(target=handle_client, args=(conn, addr), daemon=True).start()
-        except KeyboardInterrupt:
-            print("[Stratum] Server shutting down")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    server = StratumServer(HttpNodeBackend(NODE_URL))
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("stratum: shutting down")
 
 
 if __name__ == "__main__":
-    start_server()
\ No newline at end of file
+    start_server()
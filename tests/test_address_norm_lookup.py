@@ -0,0 +1,65 @@
+"""Case-insensitive balance/history lookups through the address_norm columns."""
+
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import server
+
+
+@pytest.fixture
+def ledger_db(tmp_path, monkeypatch):
+    db_file = tmp_path / "ledger.sqlite3"
+    monkeypatch.setattr(server, "LEDGER_DB_FILE", str(db_file))
+    monkeypatch.setattr(server, "LEDGER_FILE", str(tmp_path / "ledger.json"))
+    monkeypatch.setattr(server, "USE_SQLITE_LEDGER", True)
+    return db_file
+
+
+def test_backfill_adds_column_to_legacy_schema(ledger_db):
+    with sqlite3.connect(ledger_db) as conn:
+        conn.execute(
+            "CREATE TABLE balances (ledger_type TEXT NOT NULL, address TEXT NOT NULL, "
+            "balance REAL NOT NULL DEFAULT 0, updated_at INTEGER NOT NULL, PRIMARY KEY (ledger_type, address))"
+        )
+        conn.execute("INSERT INTO balances VALUES ('thr', 'thrMixedCase', 7.5, 0)")
+    server._init_ledger_db()
+    with sqlite3.connect(ledger_db) as conn:
+        assert conn.execute("SELECT address_norm FROM balances").fetchone()[0] == "THRMIXEDCASE"
+        plan = " ".join(
+            row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT balance FROM balances WHERE ledger_type = 'thr' AND address_norm = 'X'"
+            )
+        )
+    assert "idx_balances_ledger_norm" in plan
+    assert server.get_thr_balance("THRMIXEDCASE") == (7.5, "sqlite_upper")
+    assert server.get_balance_from_store("thrmixedcase", "thr") == 7.5
+
+
+def test_new_rows_are_normalized_on_write(ledger_db):
+    server._init_ledger_db()
+    server._write_ledger_to_sqlite("thr", {"thrAbC": 1.25})
+    assert server.get_thr_balance("thrAbC") == (1.25, "sqlite_exact")
+    assert server.get_thr_balance("THRABC") == (1.25, "sqlite_upper")
+    assert server.get_thr_balance("THRNONE") == (0.0, "zero")
+
+
+def test_event_history_matches_any_case(ledger_db):
+    server._init_ledger_db()
+    server._index_transaction_event({"tx_id": "T1", "type": "transfer", "from": "thrSender", "to": "THRDEST", "timestamp": "1"})
+    assert [e["event_id"] for e in server._get_recent_events(address="THRSENDER")] == ["T1"]
+    assert [e["event_id"] for e in server._get_recent_events(address="thrdest")] == ["T1"]
+
+
+def test_json_ledger_case_insensitive(tmp_path, monkeypatch):
+    ledger_file = tmp_path / "ledger.json"
+    ledger_file.write_text(json.dumps({"thrLegacy": 3.0, "THROTHER": 1.0}))
+    monkeypatch.setattr(server, "LEDGER_FILE", str(ledger_file))
+    monkeypatch.setattr(server, "USE_SQLITE_LEDGER", False)
+    assert server.get_thr_balance("THRLEGACY") == (3.0, "ledger_case_insensitive")
+    assert server.get_balance_from_store("throther", "thr") == 1.0
@@ -0,0 +1,256 @@
+"""
+Tests for validating peer block intake (block_intake.py).
+
+Covers:
+  1. Blocks extending the tip are committed; duplicates are not
+  2. PoW: recomputed hash mismatches, insufficient work and too-easy
+     targets (fixed or per-height caps) are rejected
+  3. Out-of-order arrivals wait in the orphan pool and commit as one batch
+  4. Stale blocks (known non-tip parent) and bad heights are rejected
+  5. Concurrent submissions of one block commit it exactly once
+  6. BlockHashIndex advances on note() and rebuilds after other writes
+  7. submit_batch validates a synced run and commits it in one call
+  8. A reward that differs from the schedule is rejected, except for synced
+     history at or below the checkpoint
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from block_intake import ADDED, DUPLICATE, IN_FLIGHT, INVALID, ORPHAN, BlockHashIndex, BlockIntake
+from chain_sync import Checkpoint, pow_hash
+
+MAX_TARGET = 1 << 252
+
+
+def _block(height, prev_hash, **extra):
+    """A legacy block mined against MAX_TARGET (``extra`` applied after mining)."""
+    block = {
+        "prev_hash": prev_hash,
+        "height": height,
+        "target": MAX_TARGET,
+        "reward": 8.0,
+        "thr_address": extra.pop("thr_address", "thrM"),
+        "nonce": 0,
+    }
+    while int(pow_hash(block), 16) > MAX_TARGET:
+        block["nonce"] += 1
+    block["block_hash"] = pow_hash(block)
+    block.update(extra)
+    return block
+
+
+def _blocks(n, start=0, prev="0" * 64):
+    out = []
+    for h in range(start, start + n):
+        block = _block(h, prev)
+        prev = block["block_hash"]
+        out.append(block)
+    return out
+
+
+class Chain:
+    """In-memory chain standing in for the server's lookup / tip / commit."""
+
+    def __init__(self, blocks=(), commit_delay=0.0):
+        self.blocks = list(blocks)
+        self.commits = []
+        self.commit_delay = commit_delay
+
+    def lookup(self, block_hash):
+        return next((b["height"] for b in self.blocks if b["block_hash"] == block_hash), None)
+
+    def tip(self):
+        return (self.blocks[-1]["block_hash"], self.blocks[-1]["height"]) if self.blocks else None
+
+    def commit(self, groups):
+        time.sleep(self.commit_delay)
+        self.commits.append([b["height"] for b, _ in groups])
+        self.blocks += [b for b, _ in groups]
+
+    def intake(self, **kwargs):
+        return BlockIntake(self.lookup, self.tip, self.commit, max_target=MAX_TARGET, **kwargs)
+
+
+class TestValidation:
+    def test_extends_tip_and_dedupes(self):
+        blocks = _blocks(3)
+        chain = Chain(blocks[:2])
+        intake = chain.intake()
+        assert intake.submit(blocks[2], [{"tx_id": "T"}]) == (ADDED, {"connected": 0, "height": 2})
+        assert intake.submit(blocks[2])[0] == DUPLICATE
+        assert chain.commits == [[2]]
+
+    def test_pow(self):
+        chain = Chain(_blocks(1))
+        intake = chain.intake()
+        tip_hash = chain.tip()[0]
+        weak = _block(1, tip_hash, target=1)
+        assert intake.submit(weak) == (INVALID, {"reason": "insufficient_work"})
+        easy = _block(1, tip_hash, target=MAX_TARGET << 1)
+        assert intake.submit(easy) == (INVALID, {"reason": "target_too_easy"})
+        assert intake.submit(_block(1, tip_hash, block_hash="xyz"))[1] == {"reason": "bad_hash"}
+        assert chain.commits == []
+
+    def test_per_height_target_cap(self):
+        blocks = _blocks(3)
+        chain = Chain(blocks[:1])
+        # only height 2 may use the easy target
+        intake = BlockIntake(chain.lookup, chain.tip, chain.commit,
+                             max_target=lambda height: MAX_TARGET if height >= 2 else MAX_TARGET >> 8)
+        assert intake.submit(blocks[1]) == (INVALID, {"reason": "target_too_easy"})
+        assert intake.submit_batch([(blocks[1], [])]) == (INVALID, {"reason": "target_too_easy", "height": 1})
+        no_height = dict(blocks[1], height=None)
+        assert intake.check_pow(no_height) == "missing_height"
+        assert chain.commits == []
+
+    def test_reward_must_match_schedule(self):
+        blocks = _blocks(3)
+        chain = Chain(blocks[:1])
+        intake = chain.intake(reward_for=lambda height: 8.0)
+        greedy = _block(1, blocks[0]["block_hash"], reward=8000.0)
+        assert intake.submit(greedy) == (INVALID, {"reason": "bad_reward"})
+        assert intake.submit_batch([(greedy, [])]) == (INVALID, {"reason": "bad_reward", "height": 1})
+        assert intake.check_block(dict(blocks[1], reward="lots")) == "bad_reward"
+        assert intake.submit(blocks[1])[0] == ADDED
+        assert chain.commits == [[1]]
+
+    def test_self_reported_hash_is_recomputed(self):
+        chain = Chain(_blocks(1))
+        intake = chain.intake()
+        tip_hash = chain.tip()[0]
+        forged = _block(1, tip_hash, block_hash="0" * 64)
+        assert intake.submit(forged) == (INVALID, {"reason": "hash_mismatch"})
+        # same hash, rewritten payout address
+        stolen = _block(1, tip_hash)
+        stolen["thr_address"] = "thrThief"
+        assert intake.submit(stolen) == (INVALID, {"reason": "hash_mismatch"})
+        stratum = _block(1, tip_hash, is_stratum=True)
+        assert intake.submit(stratum) == (INVALID, {"reason": "unverifiable_hash"})
+        assert chain.commits == []
+
+    def test_stale_and_bad_height(self):
+        blocks = _blocks(3)
+        chain = Chain(blocks)
+        intake = chain.intake()
+        fork = _block(2, blocks[1]["block_hash"], thr_address="thrFork")
+        assert intake.submit(fork) == (INVALID, {"reason": "stale"})
+        skip = _block(7, blocks[2]["block_hash"])
+        assert intake.submit(skip) == (INVALID, {"reason": "bad_height"})
+
+    def test_malformed(self):
+        intake = Chain().intake()
+        assert intake.submit({"block_hash": "aa"})[0] == INVALID
+        assert intake.submit("nope")[0] == INVALID
+
+
+class TestOrphans:
+    def test_out_of_order_arrivals_connect_in_one_batch(self):
+        blocks = _blocks(6)
+        chain = Chain(blocks[:1])
+        intake = chain.intake()
+        for block in (blocks[4], blocks[2], blocks[3]):
+            assert intake.submit(block)[0] == ORPHAN
+        assert intake.orphan_count() == 3
+        assert intake.submit(blocks[1]) == (ADDED, {"connected": 3, "height": 4})
+        assert chain.commits == [[1, 2, 3, 4]]
+        assert intake.orphan_count() == 0
+        assert intake.submit(blocks[5])[0] == ADDED
+
+    def test_pool_is_bounded_and_expires(self):
+        blocks = _blocks(10)
+        intake = Chain(blocks[:1]).intake(orphan_limit=3, orphan_ttl=0.05)
+        for block in blocks[2:7]:
+            intake.submit(block)
+        assert intake.orphan_count() == 3
+        time.sleep(0.06)
+        intake.submit(blocks[8])
+        assert intake.orphan_count() == 1
+
+
+class TestConcurrency:
+    def test_duplicate_submissions_commit_once(self):
+        blocks = _blocks(2)
+        chain = Chain(blocks[:1], commit_delay=0.05)
+        intake = chain.intake()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(intake.submit(dict(blocks[1]))[0]))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert chain.commits == [[1]]
+        assert results.count(ADDED) == 1
+        assert set(results) <= {ADDED, IN_FLIGHT, DUPLICATE}
+        stats = intake.stats()
+        assert stats["processing"] == 0
+        assert stats["counts"][ADDED] == 1
+
+
+class TestBatch:
+    def test_run_commits_once(self):
+        blocks = _blocks(6)
+        chain = Chain(blocks[:2])
+        intake = chain.intake()
+        # blocks already present at the front are skipped
+        assert intake.submit_batch([(b, []) for b in blocks[1:]]) == (ADDED, {"added": 4})
+        assert chain.commits == [[2, 3, 4, 5]]
+        assert intake.stats()["counts"][ADDED] == 4
+
+    def test_invalid_block_commits_nothing(self):
+        blocks = _blocks(4)
+        chain = Chain(blocks[:1])
+        intake = chain.intake()
+        weak = dict(blocks[2], target=MAX_TARGET << 1)
+        groups = [(blocks[1], []), (weak, []), (blocks[3], [])]
+        assert intake.submit_batch(groups) == (INVALID, {"reason": "target_too_easy", "height": 2})
+        gap = [(blocks[1], []), (blocks[3], [])]
+        assert intake.submit_batch(gap)[1]["reason"] == "orphan"
+        assert chain.commits == []
+
+    def test_history_keeps_its_stored_reward(self):
+        # pre-upgrade blocks were minted at 1.0 THR, the schedule now says 8.0
+        old = [dict(b, reward=1.0) for b in _blocks(4)]
+        chain = Chain()
+        intake = chain.intake(reward_for=lambda height: 8.0, checkpoint=Checkpoint(2))
+        assert intake.submit_batch([(b, []) for b in old]) == (INVALID, {"reason": "bad_reward", "height": 3})
+        assert intake.submit_batch([(b, []) for b in old[:3]]) == (ADDED, {"added": 3})
+        assert intake.check_reward(dict(old[1], reward=-1.0), synced=True) == "bad_reward"
+        # relayed blocks always follow the schedule
+        assert intake.check_reward(old[1]) == "bad_reward"
+        assert chain.commits == [[0, 1, 2]]
+
+
+class TestBlockHashIndex:
+    def test_note_and_rebuild(self):
+        chain = _blocks(3)
+        version = [1]
+        loads = []
+
+        def load():
+            loads.append(1)
+            return list(chain)
+
+        index = BlockHashIndex(load, lambda: version[0])
+        assert index.height_of(chain[1]["block_hash"]) == 1
+        assert index.tip() == (chain[2]["block_hash"], 2)
+
+        new = _blocks(1, start=3, prev=chain[2]["block_hash"])
+        chain.extend(new + [{"tx_id": "T"}])
+        index.note(new + [{"tx_id": "T"}], before=1, after=2)
+        version[0] = 2
+        assert index.height_of(new[0]["block_hash"]) == 3
+        assert len(loads) == 1
+
+        chain.append(_block(4, new[0]["block_hash"]))
+        version[0] = 3
+        assert index.tip() == (chain[-1]["block_hash"], 4)
+        assert len(loads) == 2
+        stray = _block(9, "x")
+        index.note([stray], before=2, after=4)
+        assert index.height_of(stray["block_hash"]) is None
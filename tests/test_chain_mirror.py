@@ -0,0 +1,108 @@
+"""Chain store JSON mirror: external-write detection and writer locking (server.py)."""
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import server
+from chain_store import ChainStore
+
+
+def _block(height):
+    return {"block_hash": f"{height:064x}", "height": height, "reward": 1.0, "thr_address": "THR_MINER"}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ChainStore(str(tmp_path / "chain_store"))
+    store.append_many([_block(h) for h in range(3)])
+    monkeypatch.setattr(server, "CHAIN_STORE", store)
+    monkeypatch.setattr(server, "CHAIN_FILE", str(tmp_path / "phantom_tx_chain.json"))
+    return store
+
+
+def _credits(n):
+    return {"type": "CREDITS_CONSUME", "tx_id": f"CREDITS-{n}", "from": "THR_USER", "amount": 1.0}
+
+
+def _count_syncs(store, monkeypatch):
+    calls = []
+    real = store.absorb
+    monkeypatch.setattr(store, "absorb", lambda entries: calls.append(len(entries)) or real(entries))
+    return calls
+
+
+def test_own_mirror_is_not_reimported(store, monkeypatch):
+    server._write_chain_mirror()
+    calls = _count_syncs(store, monkeypatch)
+    server._chain_store_absorb_external_write()
+    assert calls == []
+    with open(server.CHAIN_FILE, encoding="utf-8") as f:
+        assert json.load(f) == store.load_all()
+
+
+def test_external_write_is_imported_once(store, monkeypatch):
+    server._write_chain_mirror()
+    calls = _count_syncs(store, monkeypatch)
+    with open(server.CHAIN_FILE, "w", encoding="utf-8") as f:
+        json.dump([_block(h) for h in range(4)], f)
+    server._chain_store_absorb_external_write()
+    server._chain_store_absorb_external_write()
+    assert calls == [4]
+    assert len(store) == 4
+
+
+def test_reads_do_not_wait_for_mirror_write(store, monkeypatch):
+    real = store.write_json_snapshot
+    lengths = []
+
+    def write_json_snapshot(path, publish=None):
+        reader = threading.Thread(target=lambda: lengths.append(server.chain_length()))
+        reader.start()
+        reader.join(timeout=5)
+        return real(path, publish=publish)
+
+    monkeypatch.setattr(store, "write_json_snapshot", write_json_snapshot)
+    calls = _count_syncs(store, monkeypatch)
+    server._write_chain_mirror()
+    assert lengths == [3]
+    # the reader saw the file mid-write and left it alone
+    assert calls == []
+    server._chain_store_absorb_external_write()
+    assert calls == []
+
+
+def test_stale_external_write_never_rolls_the_store_back(store, monkeypatch):
+    store.append_many([_block(h) for h in range(3, 5)])
+    generation = store.generation
+    with open(server.CHAIN_FILE, "w", encoding="utf-8") as f:
+        json.dump([_block(h) for h in range(3)] + [_credits(1)], f)
+    server._chain_store_absorb_external_write()
+    assert [e.get("block_hash") or e["tx_id"] for e in store.load_all()] == (
+        [_block(h)["block_hash"] for h in range(5)] + ["CREDITS-1"]
+    )
+    assert store.generation == generation
+
+
+def test_external_write_during_mirror_write_is_not_overwritten(store, monkeypatch):
+    server._write_chain_mirror()
+    real = store.write_json_snapshot
+    raced = []
+
+    def write_json_snapshot(path, publish=None):
+        if not raced:
+            raced.append(True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(store.load_all() + [_credits(2)], f)
+        return real(path, publish=publish)
+
+    monkeypatch.setattr(store, "write_json_snapshot", write_json_snapshot)
+    server._write_chain_mirror()
+    assert store.get_by_hash("CREDITS-2") is not None
+    with open(server.CHAIN_FILE, encoding="utf-8") as f:
+        assert json.load(f) == store.load_all()
@@ -0,0 +1,165 @@
+"""
+Tests for the incremental chain aggregates (chain_state.py).
+
+Covers:
+  1. Folding entries matches the legacy full-chain scans
+  2. Store-backed reward block view (len / index / slices)
+  3. Catch-up after appends, rebuild after a store rewrite
+  4. Checkpoint resume replays only the new tail; stale checkpoints rebuild
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_state import ChainState
+from chain_store import ChainStore
+
+
+def _block(height, reward=1.0, **extra):
+    return {
+        "type": "block",
+        "block_hash": f"{height:064x}",
+        "height": height,
+        "reward": reward,
+        "pool_fee": 0.005,
+        "timestamp": f"2026-01-01 00:{height // 60:02d}:{height % 60:02d} UTC",
+        "thr_address": "THR_MINER",
+        **extra,
+    }
+
+
+def _chain(blocks):
+    chain = []
+    for h in range(blocks):
+        chain.append(_block(h, reward_split={"burn": 0.01}) if h % 3 == 0 else _block(h))
+        chain.append({"type": "transfer", "tx_id": f"TX-{h}", "amount": 2.0, "fee_burned": 0.001})
+        if h % 4 == 0:
+            chain.append({"type": "coinbase", "tx_id": f"CB-{h}", "amount": 0.5})
+        if h % 5 == 0:
+            chain.append({"type": "thr_burn", "tx_id": f"BURN-{h}", "amount": 0.25, "burn_amount": 0.1})
+    return chain
+
+
+def _legacy_totals(chain):
+    """Reference: the pre-ChainState compute_thr_supply_metrics scans."""
+    blocks = [b for b in chain if isinstance(b, dict) and b.get("reward") is not None]
+    minted_from_admin = burned_from_fees = burned_from_events = 0.0
+    for tx in chain:
+        if not isinstance(tx, dict) or tx.get("reward") is not None:
+            continue
+        tx_type = (tx.get("type") or "").lower()
+        if tx_type in {"mint", "coinbase", "reward"}:
+            minted_from_admin += float(tx.get("amount", 0.0) or 0.0)
+        burned_from_fees += float(tx.get("fee_burned", 0.0) or tx.get("fee", 0.0) or 0.0)
+        if tx_type in {"burn", "thr_burn"}:
+            burned_from_events += float(tx.get("amount", 0.0) or 0.0)
+        burned_from_events += float(tx.get("burn_amount", 0.0) or tx.get("burned_thr", 0.0) or 0.0)
+    return {
+        "minted_from_blocks": sum(float(b.get("reward", 0.0)) for b in blocks),
+        "minted_from_admin": minted_from_admin,
+        "burned_from_fees": burned_from_fees,
+        "burned_from_events": burned_from_events,
+        "burned_from_blocks": sum(
+            float((b.get("reward_split") or {}).get("burn", b.get("pool_fee", 0.0)) or 0.0) for b in blocks
+        ),
+    }
+
+
+@pytest.fixture
+def tmp():
+    with tempfile.TemporaryDirectory() as d:
+        yield d
+
+
+class TestFolding:
+    def test_matches_legacy_scans(self):
+        chain = _chain(50) + ["junk", None]
+        state = ChainState.from_entries(chain)
+        assert state.supply_totals() == _legacy_totals(chain)
+        assert state.entry_count == len(chain)
+        assert state.block_count == 50
+        assert state.count_types(["transfer", "coinbase"]) == 50 + 13
+        assert state.tip["block_hash"] == _block(49)["block_hash"]
+        assert [b["height"] for b in state.reward_blocks] == list(range(50))
+
+    def test_incremental_equals_full(self):
+        chain = _chain(30)
+        state = ChainState()
+        for i in range(0, len(chain), 7):
+            state.apply_many(chain[i:i + 7])
+        assert state.to_checkpoint() == ChainState.from_entries(chain).to_checkpoint()
+
+
+class TestStoreSync:
+    def test_block_view(self, tmp):
+        store = ChainStore(os.path.join(tmp, "store"), segment_max_entries=7)
+        chain = _chain(20)
+        store.append_many(chain)
+        blocks = ChainState.rebuild(store).reward_blocks
+        assert len(blocks) == 20 and blocks
+        assert blocks[0] == chain[0]
+        assert blocks[-1]["height"] == 19
+        assert [b["height"] for b in blocks[-5:]] == list(range(15, 20))
+        assert [b["height"] for b in blocks[4:8]] == [4, 5, 6, 7]
+        assert blocks[30:] == []
+        with pytest.raises(IndexError):
+            blocks[20]
+
+    def test_catch_up_and_rewrite(self, tmp):
+        store = ChainStore(os.path.join(tmp, "store"))
+        chain = _chain(10)
+        store.append_many(chain)
+        state = ChainState.rebuild(store)
+        more = _chain(12)[len(chain):]
+        store.append_many(more)
+        assert not state.is_current(store)
+        assert state.catch_up(store) == len(more)
+        assert state.to_checkpoint() == ChainState.from_entries(chain + more).to_checkpoint()
+
+        store.rewrite(chain[:5])
+        assert store.generation == 1
+        assert not state.is_current(store)
+        assert ChainState.rebuild(store).entry_count == 5
+
+
+class TestCheckpoint:
+    def test_resume_replays_only_tail(self, tmp, monkeypatch):
+        store = ChainStore(os.path.join(tmp, "store"))
+        checkpoint = os.path.join(tmp, "chain_state.json")
+        chain = _chain(40)
+        store.append_many(chain[:60])
+        ChainState.rebuild(store).save_checkpoint(checkpoint)
+        store.append_many(chain[60:])
+
+        replayed = []
+        original = ChainStore.iter_range
+
+        def _spy(self, start=0, stop=None):
+            replayed.append(start)
+            return original(self, start, stop)
+
+        monkeypatch.setattr(ChainStore, "iter_range", _spy)
+        state = ChainState.restore(store, checkpoint)
+        assert replayed == [60]
+        assert state.to_checkpoint() == ChainState.from_entries(chain).to_checkpoint()
+
+    def test_stale_checkpoint_rebuilds(self, tmp):
+        store = ChainStore(os.path.join(tmp, "store"))
+        checkpoint = os.path.join(tmp, "chain_state.json")
+        chain = _chain(10)
+        store.append_many(chain)
+        ChainState.rebuild(store).save_checkpoint(checkpoint)
+        mutated = [dict(e) for e in chain]
+        mutated[-1]["tx_id"] = "OTHER"
+        store.rewrite(mutated)
+        assert ChainState.restore(store, checkpoint).tip_key == "OTHER"
+
+        with open(checkpoint, "w", encoding="utf-8") as f:
+            json.dump({"version": 999}, f)
+        assert ChainState.restore(store, checkpoint).entry_count == len(chain)
@@ -0,0 +1,298 @@
+"""
+Tests for headers-first chain sync (chain_sync.py).
+
+Covers:
+  1. A follower catches up from a serving ChainStore, batch by batch
+  2. Header validation: linkage, consecutive heights, PoW recomputed from
+     the header (legacy and stratum) against a capped (fixed or per-height),
+     mandatory target
+  3. Bodies that do not match validated headers are rejected
+  4. Resuming from the local tip; max_blocks; throughput stats
+  5. group_blocks / parse_range / parse_checkpoint helpers
+  6. Legacy stratum blocks (no stratum_header) sync up to a trusted
+     checkpoint, through BlockIntake.submit_batch, and nowhere above it
+"""
+
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from block_intake import ADDED, BlockIntake
+from chain_store import ChainStore
+from chain_sync import (
+    Checkpoint,
+    ChainSyncClient,
+    HeaderValidationError,
+    block_header,
+    group_blocks,
+    parse_checkpoint,
+    parse_range,
+    pow_hash,
+    validate_headers,
+)
+
+TARGET = 1 << 252
+
+
+def _block(height, prev_hash):
+    block = {
+        "prev_hash": prev_hash,
+        "height": height,
+        "target": TARGET,
+        "reward": 8.0,
+        "thr_address": "thrM",
+        "nonce": 0,
+    }
+    while int(pow_hash(block), 16) > TARGET:
+        block["nonce"] += 1
+    block["block_hash"] = pow_hash(block)
+    return block
+
+
+def _legacy_stratum_block(height, prev_hash):
+    """A stratum block as mined before stratum_header was stored: its hash
+    met the target but cannot be recomputed from the block."""
+    block = {"prev_hash": prev_hash, "height": height, "target": TARGET, "reward": 8.0,
+             "thr_address": "thrM", "nonce": 0, "is_stratum": True}
+    seed = 0
+    while True:
+        digest = hashlib.sha256(f"stratum-{height}-{seed}".encode()).hexdigest()
+        if int(digest, 16) <= TARGET:
+            return dict(block, block_hash=digest)
+        seed += 1
+
+
+def _chain(blocks, txs_per_block=2, legacy_stratum=()):
+    chain, prev = [], "0" * 64
+    for h in range(blocks):
+        block = _legacy_stratum_block(h, prev) if h in legacy_stratum else _block(h, prev)
+        prev = block["block_hash"]
+        chain.append(block)
+        chain.extend({"tx_id": f"TX-{h}-{n}", "height": h, "type": "transfer"} for n in range(txs_per_block))
+    return chain
+
+
+class StoreTransport:
+    """Serves /api/v1/headers and /api/v1/blocks straight from a ChainStore."""
+
+    def __init__(self, store):
+        self.store = store
+        self.block_requests = []
+        self._lock = threading.Lock()
+
+    def headers(self, start, count):
+        return [block_header(block) for block, _ in self.store.iter_heights(start, start + count - 1)]
+
+    def blocks(self, start, stop):
+        with self._lock:
+            self.block_requests.append((start, stop))
+        return list(self.store.iter_heights(start, stop))
+
+
+@pytest.fixture
+def stores():
+    with tempfile.TemporaryDirectory() as d:
+        leader = ChainStore(os.path.join(d, "leader"), fsync=False)
+        follower = ChainStore(os.path.join(d, "follower"), fsync=False)
+        yield leader, follower
+
+
+def _apply_to(store, batches):
+    def apply(groups):
+        batches.append(len(groups))
+        store.append_many([entry for block, txs in groups for entry in [block] + txs])
+    return apply
+
+
+class TestSync:
+    def test_catch_up(self, stores):
+        leader, follower = stores
+        leader.append_many(_chain(250))
+        batches = []
+        client = ChainSyncClient(StoreTransport(leader), _apply_to(follower, batches),
+                                 header_count=120, batch_blocks=50, pipeline_depth=3, max_target=TARGET)
+        stats = client.sync(None)
+        assert follower.load_all() == leader.load_all()
+        assert stats["blocks"] == 250 and stats["txs"] == 500
+        assert stats["to_height"] == 249
+        assert batches == [50, 50, 20, 50, 50, 20, 10]
+        assert stats["blocks_per_second"] > 0
+
+    def test_resume_from_tip_and_max_blocks(self, stores):
+        leader, follower = stores
+        chain = _chain(40, txs_per_block=0)
+        leader.append_many(chain)
+        follower.append_many(chain[:10])
+        transport = StoreTransport(leader)
+        client = ChainSyncClient(transport, _apply_to(follower, []), batch_blocks=8)
+        stats = client.sync(follower.last_block(), max_blocks=12)
+        assert stats["from_height"] == 10 and stats["to_height"] == 21
+        assert transport.block_requests[0] == (10, 17)
+        client.sync(follower.last_block())
+        assert follower.load_all() == chain
+        assert client.sync(follower.last_block())["blocks"] == 0
+
+    def test_mismatched_bodies_are_rejected(self, stores):
+        leader, follower = stores
+        leader.append_many(_chain(5))
+        transport = StoreTransport(leader)
+        real_blocks = transport.blocks
+        transport.blocks = lambda start, stop: [({**b, "block_hash": "f" * 64}, txs) for b, txs in real_blocks(start, stop)]
+        client = ChainSyncClient(transport, _apply_to(follower, []))
+        with pytest.raises(HeaderValidationError):
+            client.sync(None)
+        # same hash, but a body that pays someone else
+        transport.blocks = lambda start, stop: [({**b, "thr_address": "thrX"}, txs) for b, txs in real_blocks(start, stop)]
+        with pytest.raises(HeaderValidationError):
+            client.sync(None)
+        assert len(follower) == 0
+
+
+class TestLegacyStratumHistory:
+    def _intake_apply(self, follower, checkpoint):
+        def tip():
+            block = follower.last_block()
+            return (block["block_hash"], block["height"]) if block else None
+
+        def commit(groups):
+            follower.append_many([entry for block, txs in groups for entry in [block] + txs])
+
+        intake = BlockIntake(lambda h: None, tip, commit, max_target=TARGET,
+                             reward_for=lambda height: 8.0, checkpoint=checkpoint)
+
+        def apply(groups):
+            status, details = intake.submit_batch(groups)
+            if status != ADDED:
+                raise HeaderValidationError(f"rejected at {details.get('height')}: {details.get('reason')}")
+        return apply
+
+    def test_syncs_up_to_checkpoint(self, stores):
+        leader, follower = stores
+        chain = _chain(6, txs_per_block=1, legacy_stratum=(1, 2, 3))
+        leader.append_many(chain)
+        checkpoint = Checkpoint(3, chain[6]["block_hash"])  # block 3
+        client = ChainSyncClient(StoreTransport(leader), self._intake_apply(follower, checkpoint),
+                                 batch_blocks=2, max_target=TARGET, checkpoint=checkpoint)
+        assert client.sync(None)["blocks"] == 6
+        assert follower.load_all() == chain
+
+    def test_rejected_without_checkpoint(self, stores):
+        leader, follower = stores
+        leader.append_many(_chain(4, legacy_stratum=(2,)))
+        client = ChainSyncClient(StoreTransport(leader), self._intake_apply(follower, None), max_target=TARGET)
+        with pytest.raises(HeaderValidationError, match="block 2 fails PoW: unverifiable_hash"):
+            client.sync(None)
+        assert len(follower) == 0
+
+    def test_rejected_above_checkpoint(self, stores):
+        leader, follower = stores
+        leader.append_many(_chain(4, legacy_stratum=(1, 3)))
+        client = ChainSyncClient(StoreTransport(leader), self._intake_apply(follower, Checkpoint(2)),
+                                 max_target=TARGET, checkpoint=Checkpoint(2))
+        with pytest.raises(HeaderValidationError, match="block 3 fails PoW: unverifiable_hash"):
+            client.sync(None)
+
+    def test_batch_is_checked_without_header_validation(self, stores):
+        _, follower = stores
+        groups = list(group_blocks(_chain(3, legacy_stratum=(1,))))
+        with pytest.raises(HeaderValidationError, match="unverifiable_hash"):
+            self._intake_apply(follower, None)(groups)
+        self._intake_apply(follower, Checkpoint(1))(groups)
+        assert len(follower) == 9
+
+    def test_checkpoint_hash_must_match(self):
+        headers = [block_header(b) for b, _ in group_blocks(_chain(4, legacy_stratum=(1, 2)))]
+        validate_headers(headers, max_target=TARGET, checkpoint=Checkpoint(2, headers[2]["block_hash"]))
+        with pytest.raises(HeaderValidationError, match="checkpoint_mismatch"):
+            validate_headers(headers, max_target=TARGET, checkpoint=Checkpoint(2, "ab" * 32))
+        # below the checkpoint the target is not capped, but the work still counts
+        headers[1]["target"] = 1
+        with pytest.raises(HeaderValidationError, match="above its target"):
+            validate_headers(headers, max_target=TARGET, checkpoint=Checkpoint(2))
+
+
+class TestHeaderValidation:
+    def test_valid_chain(self):
+        headers = [block_header(b) for b, _ in group_blocks(_chain(5))]
+        validate_headers(headers[1:], anchor=headers[0])
+
+    def test_broken_linkage(self):
+        headers = [block_header(b) for b, _ in group_blocks(_chain(5))]
+        headers[3]["prev_hash"] = "ab" * 32
+        with pytest.raises(HeaderValidationError, match="does not link"):
+            validate_headers(headers)
+
+    def test_height_gap(self):
+        headers = [block_header(b) for b, _ in group_blocks(_chain(5))]
+        with pytest.raises(HeaderValidationError, match="does not follow"):
+            validate_headers(headers[2:], anchor=headers[0])
+
+    def test_pow_above_target(self):
+        headers = [block_header(b) for b, _ in group_blocks(_chain(3))]
+        headers[2]["target"] = 1
+        with pytest.raises(HeaderValidationError, match="above its target"):
+            validate_headers(headers)
+        headers[2]["target"] = hex(1 << 256)
+        with pytest.raises(HeaderValidationError, match="target_too_easy"):
+            validate_headers(headers)
+        headers[2]["target"] = TARGET << 1
+        validate_headers(headers)
+        with pytest.raises(HeaderValidationError, match="target_too_easy"):
+            validate_headers(headers, max_target=TARGET)
+
+    def test_per_height_target_cap(self):
+        headers = [block_header(b) for b, _ in group_blocks(_chain(3))]
+        validate_headers(headers, max_target=lambda height: TARGET)
+        with pytest.raises(HeaderValidationError, match="block 2 fails PoW: target_too_easy"):
+            validate_headers(headers, max_target=lambda height: TARGET if height < 2 else TARGET >> 4)
+
+    def test_missing_target_rejected(self):
+        headers = [block_header(b) for b, _ in group_blocks(_chain(2))]
+        headers[1]["target"] = None
+        with pytest.raises(HeaderValidationError, match="missing_target"):
+            validate_headers(headers)
+
+    def test_hash_is_recomputed(self):
+        headers = [block_header(b) for b, _ in group_blocks(_chain(2))]
+        # a self-reported hash below the target does not count
+        headers[1]["block_hash"] = "0" * 64
+        with pytest.raises(HeaderValidationError, match="hash_mismatch"):
+            validate_headers(headers)
+        headers = [block_header(b) for b, _ in group_blocks(_chain(2))]
+        headers[1]["nonce"] += 1
+        with pytest.raises(HeaderValidationError):
+            validate_headers(headers)
+
+    def test_stratum_header(self):
+        header = {
+            "prev_hash": "00" * 32,
+            "nonce": 7,
+            "is_stratum": True,
+            "stratum_header": {"version": 1, "merkle_root": "11" * 32, "time": 1700000000, "nbits": 0x1d00ffff},
+        }
+        raw = (struct.pack("<I", 1) + bytes(32) + bytes.fromhex("11" * 32)
+               + struct.pack("<I", 1700000000) + struct.pack("<I", 0x1d00ffff) + struct.pack("<I", 7))
+        assert pow_hash(header) == hashlib.sha256(hashlib.sha256(raw).digest()).digest()[::-1].hex()
+        # a stratum block without its header inputs cannot be verified
+        assert pow_hash({"prev_hash": "00" * 32, "nonce": 7, "is_stratum": True, "thr_address": "thrM"}) is None
+
+
+def test_helpers():
+    chain = [{"tx_id": "orphan"}] + _chain(2, txs_per_block=1)
+    assert [(b["height"], [t["tx_id"] for t in txs]) for b, txs in group_blocks(chain)] == [
+        (0, ["TX-0-0"]), (1, ["TX-1-0"]),
+    ]
+    assert parse_range("5-9") == (5, 9)
+    assert parse_range("7") == (7, 7)
+    assert parse_range("9-5") is None
+    assert parse_range("x") is None
+    assert parse_checkpoint("120") == Checkpoint(120, None)
+    assert parse_checkpoint(" 120:ABcd ") == Checkpoint(120, "abcd")
+    assert parse_checkpoint("") is None and parse_checkpoint("x:ab") is None
@@ -0,0 +1,154 @@
+"""
+Tests for compact block relay (compact_block.py + PeerRelay).
+
+Covers:
+  1. Reconstruction from the mempool re-applies the block-time fields
+  2. Txs stamped differently or without tx_id always travel in full
+  3. Missing and ambiguous short ids are reported by index
+  4. Two nodes sharing a mempool fixture: the receiver rebuilds the block,
+     missing txs take one extra round trip, and a peer without the compact
+     endpoint gets the full block
+"""
+
+import copy
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compact_block
+from compact_block import SHORT_ID_HEX, CompactBlock, reconstruct
+from peer_relay import BLOCK_PATH, COMPACT_PATH, PeerRelay
+
+CONFIRM = {"height": 7, "status": "confirmed", "timestamp": "2026-10-16 12:00:00 UTC"}
+
+
+@pytest.fixture
+def mempool():
+    return [
+        {"tx_id": f"TX-{i}", "type": "transfer", "from": "thrA", "to": "thrB", "amount": i, "status": "pending"}
+        for i in range(20)
+    ]
+
+
+def _mine(mempool):
+    """What submit_block does: stamp every mempool tx and include it."""
+    block = {"block_hash": "ab" * 32, "height": 7, "reward": 8.0, "thr_address": "thrM", "timestamp": CONFIRM["timestamp"]}
+    txs = [{**copy.deepcopy(tx), **CONFIRM} for tx in mempool]
+    return block, txs
+
+
+class TestReconstruct:
+    def test_round_trip(self, mempool):
+        block, txs = _mine(mempool)
+        message = CompactBlock(block, txs).message()
+        assert message["prefilled"] == {}
+        assert all(len(sid) == SHORT_ID_HEX for sid in message["short_ids"])
+        rebuilt, missing = reconstruct(message, list(reversed(mempool)))
+        assert missing == []
+        assert rebuilt == txs
+
+    def test_irregular_txs_are_prefilled(self, mempool):
+        block, txs = _mine(mempool[:3])
+        txs[1]["timestamp"] = "earlier"
+        txs.append({"type": "note", **CONFIRM})
+        message = CompactBlock(block, txs).message()
+        assert sorted(message["prefilled"]) == ["1", "3"]
+        rebuilt, missing = reconstruct(message, mempool)
+        assert missing == [] and rebuilt == txs
+
+    def test_missing_and_prefill_on_request(self, mempool):
+        block, txs = _mine(mempool)
+        compact = CompactBlock(block, txs)
+        partial = [tx for tx in mempool if tx["tx_id"] not in ("TX-3", "TX-11")]
+        rebuilt, missing = reconstruct(compact.message(), partial)
+        assert missing == [3, 11] and rebuilt[3] is None
+        rebuilt, missing = reconstruct(compact.message(missing), partial)
+        assert missing == [] and rebuilt == txs
+
+    def test_ambiguous_short_id_is_missing(self, mempool, monkeypatch):
+        block, txs = _mine(mempool[:3])
+        message = CompactBlock(block, txs).message()
+        collide = {"TX-0", "TX-1"}
+        real = compact_block.short_id
+        monkeypatch.setattr(
+            compact_block, "short_id",
+            lambda block_hash, tx_id: "c0111de00000" if tx_id in collide else real(block_hash, tx_id),
+        )
+        message["short_ids"][:2] = ["c0111de00000", "c0111de00000"]
+        rebuilt, missing = reconstruct(message, mempool[:3] + [dict(mempool[2])])
+        assert missing == [0, 1]
+        assert rebuilt[2] == txs[2]
+
+    def test_malformed(self):
+        with pytest.raises(ValueError):
+            reconstruct({"version": 99}, [])
+        with pytest.raises(ValueError):
+            reconstruct({"version": 1, "header": {}, "short_ids": "x"}, [])
+
+
+class Node:
+    """Receiver side of /api/v1/receive_compact_block and /receive_block."""
+
+    def __init__(self, mempool, compact=True):
+        self.mempool = mempool
+        self.compact = compact
+        self.chain = []
+        self.requests = []
+
+    def __call__(self, session, url, payload, timeout):
+        path = url[len("http://node"):]
+        self.requests.append(path)
+        if path == BLOCK_PATH:
+            self.chain.append(payload)
+            return 201, {"status": "added"}
+        if path != COMPACT_PATH or not self.compact:
+            return 404, None
+        txs, missing = reconstruct(payload, self.mempool)
+        if missing:
+            return 200, {"status": "missing", "missing": missing}
+        self.chain += [payload["header"]] + txs
+        included = {tx["tx_id"] for tx in txs}
+        self.mempool = [tx for tx in self.mempool if tx["tx_id"] not in included]
+        return 201, {"status": "added"}
+
+
+def _relay(node):
+    return PeerRelay(lambda: ["http://node"], transport=node, session_factory=lambda: None)
+
+
+class TestTwoNodes:
+    def test_receiver_rebuilds_from_shared_mempool(self, mempool):
+        node = Node(copy.deepcopy(mempool))
+        relay = _relay(node)
+        block, txs = _mine(mempool)
+        relay.broadcast_block(block, CompactBlock(block, txs))
+        assert relay.flush(5)
+        assert node.requests == [COMPACT_PATH]
+        assert node.chain == [block] + txs
+        assert node.mempool == []
+        relay.close()
+
+    def test_missing_txs_take_one_round_trip(self, mempool):
+        node = Node(copy.deepcopy(mempool[5:]))
+        relay = _relay(node)
+        block, txs = _mine(mempool)
+        relay.broadcast_block(block, CompactBlock(block, txs))
+        assert relay.flush(5)
+        assert node.requests == [COMPACT_PATH, COMPACT_PATH]
+        assert node.chain == [block] + txs
+        relay.close()
+
+    def test_falls_back_to_full_block(self, mempool):
+        node = Node(copy.deepcopy(mempool), compact=False)
+        relay = _relay(node)
+        for height in (7, 8):
+            block, txs = _mine(mempool)
+            block = {**block, "height": height}
+            relay.broadcast_block(block, CompactBlock(block, txs))
+            assert relay.flush(5)
+        assert node.requests == [COMPACT_PATH, BLOCK_PATH, BLOCK_PATH]
+        assert relay.stats()["peers"][0]["compact"] is False
+        relay.close()
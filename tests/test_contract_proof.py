@@ -492,3 +492,32 @@ class TestPublicProofLookup:
         with app.test_client() as c:
             resp = c.get(f"/api/contracts/proof/{fake}")
             assert resp.status_code == 404
+
+
+# ── 24. Segmented chain store append path ────────────────────────────────────
+
+class TestChainStoreAppendPath:
+    def test_anchor_appends_without_full_chain_load(self, data_dir):
+        from chain_store import ChainStore
+
+        store = ChainStore(os.path.join(data_dir, "chain_store"))
+        store.append_many([{"type": "block", "block_hash": "a" * 64, "reward": 1.0, "height": 0}])
+
+        def _no_full_load(path, default):
+            raise AssertionError("full chain load on the store append path")
+
+        record, created = anchor_contract_proof(
+            payload=_valid_payload(),
+            data_dir=data_dir,
+            chain_file=os.path.join(data_dir, "phantom_tx_chain.json"),
+            load_json_fn=_no_full_load,
+            save_json_fn=_no_full_load,
+            persist_normalized_tx_fn=None,
+            update_last_block_fn=None,
+            is_master_node=True,
+            chain_length_fn=lambda: len(store),
+            append_chain_fn=store.append_many,
+        )
+        assert created is True
+        assert record["block_height"] == 1
+        assert store.get_by_hash(record["tx_id"])["type"] == TX_TYPE
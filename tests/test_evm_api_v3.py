@@ -0,0 +1,110 @@
+"""
+Tests for the EVM Flask routes (evm_api_v3.py).
+
+Covers:
+  1. /api/evm/static_call is rate limited per client and its gas is capped
+     at EVM_STATIC_CALL_GAS_CAP
+  2. /api/evm/estimate_gas shares that limiter and gas cap
+  3. Deploy txs and ledger writes go through the host's storage hooks
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from evm_api_v3 import register_evm_routes
+from evm_core_v3 import EVM_STATIC_CALL_GAS_CAP
+from rate_limit import RateLimiter
+
+# JUMPDEST; PUSH1 0; JUMP — spins until out of gas
+SPIN = "5b" "6000" "56"
+
+
+def _app(tmp_path, **kwargs):
+    d = str(tmp_path)
+    app = Flask("evm_api_test")
+    evm = register_evm_routes(
+        app, d, os.path.join(d, "ledger.json"), os.path.join(d, "chain.json"),
+        os.path.join(d, "pledge_chain.json"), **kwargs
+    )
+    return app.test_client(), evm
+
+
+def _deploy(evm, runtime):
+    ok, addr, message = evm.deploy_contract("00", "THRdeployer")
+    assert ok, message
+    evm.contracts[addr]["bytecode"] = runtime
+    return addr
+
+
+class TestStaticCall:
+    def test_gas_is_capped(self, tmp_path):
+        client, evm = _app(tmp_path)
+        addr = _deploy(evm, SPIN)
+        resp = client.post("/api/evm/static_call", json={"contract_address": addr, "gas_limit": 10 ** 9})
+        body = resp.get_json()
+        assert resp.status_code == 400 and body["out_of_gas"]
+        assert body["gas_used"] <= EVM_STATIC_CALL_GAS_CAP
+
+    def test_rate_limited_per_client(self, tmp_path):
+        client, evm = _app(tmp_path, static_call_limiter=RateLimiter.per_window("evm_static_call", 2, 60))
+        addr = _deploy(evm, "00")
+        codes = [
+            client.post("/api/evm/static_call", json={"contract_address": addr}).status_code
+            for _ in range(3)
+        ]
+        assert codes == [200, 200, 429]
+        other = client.post(
+            "/api/evm/static_call", json={"contract_address": addr},
+            environ_base={"REMOTE_ADDR": "10.0.0.2"},
+        )
+        assert other.status_code == 200
+
+
+class TestEstimateGas:
+    def test_gas_is_capped(self, tmp_path):
+        client, _evm = _app(tmp_path)
+        resp = client.post("/api/evm/estimate_gas", json={"bytecode": SPIN, "gas_limit": 10 ** 9})
+        body = resp.get_json()
+        assert resp.status_code == 400 and body["out_of_gas"]
+        assert body["gas_used"] <= EVM_STATIC_CALL_GAS_CAP
+
+    def test_shares_the_static_call_limiter(self, tmp_path):
+        client, evm = _app(tmp_path, static_call_limiter=RateLimiter.per_window("evm_static_call", 3, 60))
+        addr = _deploy(evm, "00")
+        resp = client.post("/api/evm/estimate_gas", json={"bytecode": "00"})
+        assert resp.status_code == 200 and resp.get_json()["runs"] == 2  # costs two tokens
+        assert client.post("/api/evm/static_call", json={"contract_address": addr}).status_code == 200
+        resp = client.post("/api/evm/estimate_gas", json={"bytecode": "00"})
+        assert resp.status_code == 429
+        assert resp.get_json()["limiter"] == "evm_static_call"
+
+
+class TestStorageHooks:
+    def test_deploy_goes_through_host_hooks(self, tmp_path):
+        d = str(tmp_path)
+        with open(os.path.join(d, "pledge_chain.json"), "w") as f:
+            json.dump([{"thr_address": "THRdeployer", "send_auth_hash": hashlib.sha256(b"s3cret:auth").hexdigest()}], f)
+        files = {os.path.join(d, "ledger.json"): {"THRdeployer": 100.0}}
+        appended = []
+
+        def load_json(path, default):
+            if path in files:
+                return dict(files[path])
+            with open(path) as f:
+                return json.load(f)
+
+        client, _evm = _app(tmp_path, load_json=load_json, save_json=files.__setitem__, append_chain=appended.extend)
+        resp = client.post("/api/evm/deploy", json={
+            "deployer": "THRdeployer", "auth_secret": "s3cret", "bytecode": "00", "gas_limit": 100000,
+        })
+        assert resp.status_code == 200, resp.get_json()
+        assert [tx["tx_id"] for tx in appended] == [resp.get_json()["tx_id"]]
+        assert files[os.path.join(d, "ledger.json")]["THRdeployer"] == 99.0
+        assert not os.path.exists(os.path.join(d, "chain.json"))
+        assert not os.path.exists(os.path.join(d, "ledger.json"))
@@ -0,0 +1,176 @@
+"""
+Tests for the pre-decoded EVM interpreter (evm_core_v3.py).
+
+Covers:
+  1. Code analysis: JUMPDEST bitmap skips PUSH data, PUSH immediates and
+     basic blocks with precharged gas
+  2. CodeCache hits by bytecode string and by code hash, LRU bound
+  3. Execution: loops, storage, SHA3 (Keccak-256), RETURN/REVERT
+  4. Errors: invalid jump, stack underflow/overflow, out of gas, truncated
+     PUSH, unsupported opcode
+  5. Same results and gas as the stepwise reference interpreter
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evm_core_v3 import (
+    CodeCache,
+    CodeObject,
+    EVMState,
+    GAS_COSTS,
+    ThronosEVM,
+    keccak256,
+    _keccak256_py,
+)
+
+# counter = 0; do { storage[counter] = counter; counter++ } while (counter < n)
+# then return storage[n - 1] as a 32-byte word
+LOOP_SSTORE = (
+    "6000"        # 0  PUSH1 0 (i)
+    "5b"          # 2  JUMPDEST
+    "8080"        # 3  DUP1 DUP1
+    "55"          # 5  SSTORE  storage[i] = i
+    "6001" "01"   # 6  PUSH1 1 ADD
+    "80" "600a"   # 9  DUP1 PUSH1 10
+    "11"          # 12 GT      10 > i
+    "6002" "57"   # 13 PUSH1 2 JUMPI
+    "6009" "54"   # 16 PUSH1 9 SLOAD
+    "6000" "52"   # 19 PUSH1 0 MSTORE
+    "6020" "6000" "f3"  # RETURN(0, 32)
+)
+
+
+_EVM = ThronosEVM(tempfile.mkdtemp(prefix="evm_core_test_"))
+
+
+def _run(bytecode, gas=1_000_000, stepwise=False):
+    evm = _EVM
+    state = EVMState(gas)
+    run = evm._execute_bytecode_stepwise if stepwise else evm._execute_bytecode
+    ok, result = run(bytecode, state, {})
+    return ok, result, state
+
+
+class TestCodeObject:
+    def test_jumpdest_bitmap_skips_push_data(self):
+        # PUSH2 0x5b5b, JUMPDEST
+        obj = CodeObject(bytes.fromhex("615b5b5b"))
+        assert list(obj.jumpdests) == [0, 0, 0, 1]
+
+    def test_blocks_and_precharged_gas(self):
+        obj = CodeObject(bytes.fromhex(LOOP_SSTORE))
+        assert sorted(obj.blocks) == [0, 2, 16]
+        gas, needed, growth, instrs, next_pc, count = obj.blocks[2]
+        assert gas == (GAS_COSTS["JUMPDEST"] + 2 * GAS_COSTS["DUP"] + GAS_COSTS["SSTORE"]
+                       + 3 * GAS_COSTS["PUSH"] + GAS_COSTS["ADD"] + GAS_COSTS["DUP"]
+                       + GAS_COSTS["GT"] + GAS_COSTS["JUMPI"])
+        assert (needed, next_pc, count) == (1, 16, 11)
+        # JUMPDEST only costs gas; PUSH immediates are pre-decoded
+        assert len(instrs) == 10
+        assert instrs[3][1] == 1 and instrs[6][1] == 10
+
+    def test_truncated_push_and_unsupported_end_blocks(self):
+        obj = CodeObject(bytes.fromhex("60016102"))
+        assert sorted(obj.blocks) == [0]
+        assert obj.blocks[0][4] == 4
+
+
+class TestCodeCache:
+    def test_hits_by_string_and_hash(self):
+        cache = CodeCache(max_entries=2)
+        a = cache.get("0x6001")
+        assert cache.get("0x6001") is a
+        assert cache.get("6001") is a  # same code hash, different spelling
+        assert cache.stats() == {"entries": 1, "max_entries": 2, "hits": 2, "misses": 1}
+        cache.get("6002")
+        cache.get("6003")
+        assert cache.stats()["entries"] == 2
+        assert cache.get("6001") is not a
+
+
+class TestExecution:
+    def test_loop_with_storage(self):
+        ok, result, state = _run(LOOP_SSTORE)
+        assert ok is True
+        assert int.from_bytes(result, "big") == 9
+        assert state.storage == {i: i for i in range(10)}
+
+    def test_sha3(self):
+        # MSTORE 0x616263 right-aligned at word 0, SHA3(29, 3), return it
+        code = "62616263" "6000" "52" "6003" "601d" "20" "6000" "52" "6020" "6000" "f3"
+        ok, result, state = _run(code)
+        assert ok is True
+        assert result.hex() == "4e03657aea45a94fc7d47ba826c8d667c0d1e6e33a64a036ec44f58fa12d6c45"
+        assert state.gas_used == 7 * 3 + 2 * 3 + 30 + 6
+
+    def test_keccak_provider_matches_reference(self):
+        for data in (b"", b"abc", bytes(range(256)) * 3):
+            assert keccak256(data) == _keccak256_py(data)
+
+    def test_revert_returns_data(self):
+        code = "602a" "6000" "52" "6020" "6000" "fd"
+        ok, result, state = _run(code)
+        assert ok is False and state.reverted
+        assert int.from_bytes(result, "big") == 42
+
+
+class TestErrors:
+    def test_invalid_jump_destination(self):
+        # jumping into PUSH data is rejected
+        ok, result, _ = _run("6003" "56" "605b")
+        assert ok is False and "Invalid jump destination" in result
+
+    def test_stack_underflow_and_overflow(self):
+        ok, result, _ = _run("01")
+        assert ok is False and "Stack underflow" in result
+        ok, result, _ = _run("5b" "6000" "6000" "56")
+        assert ok is False and "Stack overflow" in result
+
+    def test_out_of_gas_before_block_runs(self):
+        ok, result, state = _run("6001" "6000" "55", gas=100)
+        assert (ok, result) == (False, "Out of gas")
+        assert state.storage == {}
+
+    def test_truncated_push_and_unsupported(self):
+        ok, result, _ = _run("6001" "61ff")
+        assert ok is False and "Invalid PUSH" in result
+        ok, result, _ = _run("fe")
+        assert ok is False and "Unsupported opcode: 0xfe" in result
+
+    def test_bad_hex(self):
+        ok, result, _ = _run("zz")
+        assert ok is False and result.startswith("Bytecode execution error")
+
+
+class TestMatchesStepwise:
+    def test_same_result_gas_and_steps(self):
+        programs = [
+            LOOP_SSTORE,
+            "62616263" "6000" "52" "6003" "601d" "20" "6000" "52" "6020" "6000" "f3",
+            "6005" "6003" "03" "6002" "02" "6007" "04" "58" "90" "50" "6000" "52" "6020" "6000" "f3",
+            "602a" "6000" "52" "6020" "6000" "fd",
+            "6001" "6002" "10" "15" "6003" "6003" "14" "00",
+        ]
+        for code in programs:
+            fast = _run(code)
+            slow = _run(code, stepwise=True)
+            assert fast[:2] == slow[:2], code
+            assert fast[2].gas_used == slow[2].gas_used, code
+            assert fast[2].steps == slow[2].steps, code
+            assert fast[2].storage == slow[2].storage, code
+
+    def test_call_contract_uses_cache(self, tmp_path):
+        evm = ThronosEVM(str(tmp_path))
+        ok, addr, _ = evm.deploy_contract("00", "THRdeployer")
+        assert ok
+        evm.contracts[addr]["bytecode"] = LOOP_SSTORE
+        before = evm.code_cache.stats()
+        for _ in range(3):
+            ok, result, gas_used = evm.call_contract(addr, "THRcaller", b"")
+            assert ok and int.from_bytes(result, "big") == 9
+        after = evm.code_cache.stats()
+        assert after["hits"] - before["hits"] >= 2
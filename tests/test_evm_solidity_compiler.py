@@ -0,0 +1,163 @@
+"""
+Tests for the content-addressed compile service (evm_solidity_compiler.py).
+
+Uses the built-in fallback compiler only (solc is switched off).
+
+Covers:
+  1. Cache keys change with source, contract name, settings and compiler
+  2. Successful artifacts are stored on disk and reused across restarts
+  3. Concurrent identical compiles share one job (single-flight)
+  4. Slow compiles run in the background; callers get a job to poll
+  5. Failures are not cached and are retried
+  6. New compiles past max_pending are refused; finished jobs are trimmed
+     past an unfinished one
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evm_solidity_compiler import BUILTIN_COMPILER_VERSION, CompileQueueFull, CompileService, SolidityCompiler
+
+SOURCE = """
+pragma solidity ^0.8.0;
+contract Counter {
+    uint256 private count;
+    function inc() public { count += 1; }
+    function get() public view returns (uint256) { return count; }
+}
+"""
+
+
+def _service(tmp_path, **kwargs):
+    compiler = SolidityCompiler(str(tmp_path))
+    compiler.solc_available = False
+    compiler._compiler_version = None
+    return CompileService(compiler, **kwargs)
+
+
+def _slow(service, delay, calls):
+    original = service.compiler.compile_solidity
+
+    def compile_solidity(*args, **kwargs):
+        calls.append(args[0])
+        time.sleep(delay)
+        return original(*args, **kwargs)
+
+    service.compiler.compile_solidity = compile_solidity
+
+
+class TestCacheKey:
+    def test_key_inputs(self, tmp_path):
+        service = _service(tmp_path)
+        base = service.cache_key(SOURCE, "Counter")
+        assert base == service.cache_key(SOURCE, "Counter", {"optimize": True, "runs": 200})
+        assert base != service.cache_key(SOURCE + " ", "Counter")
+        assert base != service.cache_key(SOURCE, "Other")
+        assert base != service.cache_key(SOURCE, "Counter", {"optimize": False})
+        service.compiler._compiler_version = "0.8.26"
+        assert base != service.cache_key(SOURCE, "Counter")
+
+
+class TestArtifacts:
+    def test_compile_then_reuse_from_disk(self, tmp_path):
+        service = _service(tmp_path)
+        job = service.compile(SOURCE, "Counter", wait=5)
+        assert job.status == "done" and not job.cached
+        assert job.result["compiler_version"] == BUILTIN_COMPILER_VERSION
+        assert [f["name"] for f in job.result["abi"]] == ["inc", "get"]
+        assert (tmp_path / "compile_cache" / f"{job.key}.json").exists()
+        assert service.compile(SOURCE, "Counter", wait=5) is job
+
+        restarted = _service(tmp_path)
+        again = restarted.compile(SOURCE, "Counter", wait=0)
+        assert again.finished and again.cached
+        assert again.result["bytecode"] == job.result["bytecode"]
+        assert restarted.stats["compiles"] == 0
+        assert restarted.get_job(job.key).cached
+        assert restarted.get_job("f" * 64) is None
+        assert restarted.get_job("../etc/passwd") is None
+
+
+class TestSingleFlight:
+    def test_concurrent_identical_compiles_share_one_job(self, tmp_path):
+        service = _service(tmp_path)
+        calls = []
+        _slow(service, 0.2, calls)
+        jobs = []
+        lock = threading.Lock()
+
+        def request():
+            job = service.compile(SOURCE, "Counter", wait=5)
+            with lock:
+                jobs.append(job)
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1
+        assert len({id(job) for job in jobs}) == 1 and jobs[0].status == "done"
+        assert service.stats["compiles"] == 1
+        assert service.stats["joined_in_flight"] + service.stats["cache_hits"] == 7
+
+    def test_background_job_does_not_block(self, tmp_path):
+        service = _service(tmp_path)
+        _slow(service, 0.3, [])
+        started = time.perf_counter()
+        job = service.compile(SOURCE, "Counter", wait=0)
+        assert time.perf_counter() - started < 0.2
+        assert not job.finished and job.status in ("queued", "running")
+        assert service.get_job(job.key) is job
+        assert job.wait(5) and job.status == "done"
+
+
+class TestFailures:
+    def test_failures_retry(self, tmp_path):
+        service = _service(tmp_path)
+        calls = []
+        _slow(service, 0, calls)
+        bad = "pragma solidity ^0.8.0;"
+        first = service.compile(bad, wait=5)
+        assert first.status == "failed"
+        assert not (tmp_path / "compile_cache" / f"{first.key}.json").exists()
+        second = service.compile(bad, wait=5)
+        assert second is not first and len(calls) == 2
+
+
+class TestBounds:
+    def test_queue_full_rejects_new_compiles(self, tmp_path):
+        service = _service(tmp_path, workers=1, max_pending=2)
+        _slow(service, 0.3, [])
+        first = service.compile(SOURCE, "Counter", wait=0)
+        service.compile(SOURCE, "Second", wait=0)
+        try:
+            service.compile(SOURCE, "Third", wait=0)
+            raise AssertionError("expected CompileQueueFull")
+        except CompileQueueFull:
+            pass
+        assert service.stats["rejected"] == 1
+        # joining an in-flight job is still allowed
+        assert service.compile(SOURCE, "Counter", wait=0) is first
+        assert first.wait(5)
+        assert service.compile(SOURCE, "Second", wait=5).status == "done"
+        assert service.compile(SOURCE, "Third", wait=5).status == "done"
+
+    def test_history_trims_past_unfinished_job(self, tmp_path):
+        names = [f"C{i}" for i in range(5)]
+        warm = _service(tmp_path)
+        for name in names:
+            assert warm.compile(SOURCE, name, wait=5).status == "done"
+
+        service = _service(tmp_path, history=2)
+        _slow(service, 0.3, [])
+        blocked = service.compile(SOURCE, "Blocked", wait=0)
+        for name in names:
+            assert service.compile(SOURCE, name, wait=0).cached
+        assert not blocked.finished
+        assert list(service._jobs) == [blocked.key, service.cache_key(SOURCE, "C4")]
+        assert blocked.wait(5)
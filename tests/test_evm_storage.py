@@ -0,0 +1,211 @@
+"""
+Tests for journaled EVM contract storage (evm_storage.py, ThronosEVM).
+
+Covers:
+  1. A successful call commits only its dirty slots; state survives restart
+  2. A reverted or failing call leaves storage untouched
+  3. static_call executes against current storage and writes nothing
+  4. Constructor writes persist with the deploy; zero values delete the slot
+  5. One-time migration from the legacy evm_contracts.json
+  6. Dry runs: snapshot isolation, exact gas estimates, revert reasons,
+     no write lock taken
+  7. multicall: request order, one shared snapshot, per-call failures
+"""
+
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evm_core_v3 import ThronosEVM, decode_revert_reason
+from evm_storage import EVMStorage, StorageJournal
+
+# storage[0] += 1
+INCREMENT = "6000" "54" "6001" "01" "6000" "55" "00"
+# storage[0] += 1, then REVERT
+INCREMENT_REVERT = "6000" "54" "6001" "01" "6000" "55" "6000" "6000" "fd"
+# storage[0] += 1, then an unsupported opcode
+INCREMENT_FAIL = "6000" "54" "6001" "01" "6000" "55" "fe"
+# return storage[0]
+READ = "6000" "54" "6000" "52" "6020" "6000" "f3"
+# revert with Error("nope")
+REVERT_REASON = (
+    "7f" "08c379a0" + "00" * 28 + "6000" "52"    # selector
+    "6020" "6004" "52"                           # string offset
+    "6004" "6024" "52"                           # string length
+    "7f" + b"nope".hex() + "00" * 28 + "6044" "52"
+    "6064" "6000" "fd"                           # REVERT(0, 100)
+)
+
+
+def _deploy(evm, runtime):
+    ok, addr, message = evm.deploy_contract("00", "THRdeployer")
+    assert ok, message
+    # the stub deploy has no runtime-code split, so point it at the program
+    evm.contracts[addr]["bytecode"] = runtime
+    return addr
+
+
+class TestJournal:
+    def test_commit_writes_only_dirty_slots(self, tmp_path):
+        evm = ThronosEVM(str(tmp_path))
+        addr = _deploy(evm, INCREMENT)
+        before = evm.storage.stats()["slot_writes"]
+        for _ in range(3):
+            ok, _, gas_used = evm.call_contract(addr, "THRcaller", b"")
+            assert ok and gas_used > 0
+        assert evm.storage.stats()["slot_writes"] - before == 3
+        assert evm.get_storage(addr, 0) == 3
+
+        restarted = ThronosEVM(str(tmp_path))
+        assert addr in restarted.contracts
+        assert restarted.get_storage(addr, 0) == 3
+        assert restarted.get_contract(addr)["storage"] == {"0": 3}
+
+    def test_revert_and_failure_roll_back(self, tmp_path):
+        evm = ThronosEVM(str(tmp_path))
+        addr = _deploy(evm, INCREMENT)
+        evm.call_contract(addr, "THRcaller", b"")
+        for program in (INCREMENT_REVERT, INCREMENT_FAIL):
+            evm.contracts[addr]["bytecode"] = program
+            ok, _, _ = evm.call_contract(addr, "THRcaller", b"")
+            assert ok is False
+            assert evm.get_storage(addr, 0) == 1
+
+    def test_static_call_writes_nothing(self, tmp_path):
+        evm = ThronosEVM(str(tmp_path))
+        addr = _deploy(evm, INCREMENT)
+        evm.call_contract(addr, "THRcaller", b"")
+        writes = evm.storage.stats()["slot_writes"]
+        ok, _, gas_used = evm.static_call(addr, "THRcaller", b"")
+        assert ok and gas_used > 0
+        assert evm.get_storage(addr, 0) == 1
+        assert evm.storage.stats()["slot_writes"] == writes
+
+        evm.contracts[addr]["bytecode"] = READ
+        ok, result, _ = evm.static_call(addr, "THRcaller", b"")
+        assert ok and int.from_bytes(result, "big") == 1
+        assert evm.static_call("CONTRACT_missing", "THRcaller", b"") == (False, "Contract not found", 0)
+
+    def test_constructor_storage_and_zero_delete(self, tmp_path):
+        evm = ThronosEVM(str(tmp_path))
+        ok, addr, _ = evm.deploy_contract("6007" "6001" "55" "00", "THRdeployer")
+        assert ok
+        assert evm.get_storage(addr, 1) == 7
+        evm.contracts[addr]["bytecode"] = "6000" "6001" "55" "00"
+        assert evm.call_contract(addr, "THRcaller", b"")[0]
+        assert evm.storage.load_all(addr) == {}
+
+    def test_journal_reads_lazily(self, tmp_path):
+        backend = EVMStorage(str(tmp_path))
+        backend.commit("C", {5: 9})
+        journal = StorageJournal(backend, "C")
+        reads = backend.stats()["slot_reads"]
+        assert journal.get(5, 0) == 9 and journal.get(5, 0) == 9
+        assert journal.get(6, 0) == 0
+        assert backend.stats()["slot_reads"] - reads == 2
+        journal[5] = 1
+        journal.discard()
+        assert backend.load_slot("C", 5) == 9
+
+
+class TestMigration:
+    def test_legacy_json_imported_once(self, tmp_path):
+        legacy = {
+            "CONTRACT_a": {
+                "address": "CONTRACT_a",
+                "bytecode": INCREMENT,
+                "deployer": "THRx",
+                "storage": {"0": 41, "2": 5},
+                "balance": 1.5,
+                "created_at": "2025-01-01 00:00:00 UTC",
+            }
+        }
+        (tmp_path / "evm_contracts.json").write_text(json.dumps(legacy))
+        evm = ThronosEVM(str(tmp_path))
+        assert evm.get_storage("CONTRACT_a", 0) == 41
+        assert evm.call_contract("CONTRACT_a", "THRcaller", b"")[0]
+        assert evm.get_storage("CONTRACT_a", 0) == 42
+
+        # a second start does not re-import over newer state
+        assert ThronosEVM(str(tmp_path)).get_storage("CONTRACT_a", 0) == 42
+
+
+class TestDryRun:
+    def test_snapshot_is_pinned(self, tmp_path):
+        backend = EVMStorage(str(tmp_path))
+        backend.commit("C", {1: 1})
+        with backend.snapshot() as snapshot:
+            backend.commit("C", {1: 2, 3: 3})
+            assert snapshot.load_slot("C", 1) == 1
+            assert snapshot.load_slot("C", 3) == 0
+        assert backend.load_slot("C", 1) == 2
+
+    def test_estimate_is_minimal_gas(self, tmp_path):
+        evm = ThronosEVM(str(tmp_path))
+        addr = _deploy(evm, INCREMENT)
+        result = evm.estimate_call_gas(addr, "THRcaller", b"")
+        assert result["success"] and result["estimated_gas"] == result["gas_used"]
+        assert evm.dry_run(addr, gas_limit=result["estimated_gas"])["success"]
+        short = evm.dry_run(addr, gas_limit=result["estimated_gas"] - 1)
+        assert not short["success"] and short["out_of_gas"]
+        # estimation wrote nothing
+        assert evm.get_storage(addr, 0) == 0
+
+    def test_estimate_deploy_and_failure(self, tmp_path):
+        evm = ThronosEVM(str(tmp_path))
+        deploy = evm.estimate_call_gas(bytecode="6007" "6001" "55" "00")
+        assert deploy["estimated_gas"] == 3 + 3 + 5000
+        failing = evm.estimate_call_gas(bytecode=REVERT_REASON)
+        assert failing["estimated_gas"] is None
+        assert failing["revert_reason"] == "nope"
+        capped = evm.estimate_call_gas(bytecode="6007" "6001" "55" "00", gas_cap=100)
+        assert capped["estimated_gas"] is None and capped["out_of_gas"]
+
+    def test_revert_reason_decoding(self, tmp_path):
+        evm = ThronosEVM(str(tmp_path))
+        addr = _deploy(evm, REVERT_REASON)
+        result = evm.dry_run(addr)
+        assert result["success"] is False and result["error"] is None
+        assert result["revert_reason"] == "nope"
+        assert decode_revert_reason(b"\x08\xc3\x79\xa0") is None
+        assert decode_revert_reason(bytes(100)) is None
+
+    def test_dry_run_skips_write_lock(self, tmp_path):
+        evm = ThronosEVM(str(tmp_path))
+        addr = _deploy(evm, READ)
+        results = []
+        with evm._write_lock:
+            worker = threading.Thread(target=lambda: results.append(evm.static_call(addr, "THRc", b"")))
+            worker.start()
+            worker.join(timeout=5)
+        assert results and results[0][0] is True
+
+
+class TestMulticall:
+    def test_results_in_order_on_one_snapshot(self, tmp_path):
+        evm = ThronosEVM(str(tmp_path))
+        addrs = []
+        for value in range(1, 6):
+            ok, addr, _ = evm.deploy_contract(f"60{value:02x}" "6000" "55" "00", f"THR{value}")
+            assert ok
+            evm.contracts[addr]["bytecode"] = READ
+            addrs.append(addr)
+        calls = [(addr, b"", 100000) for addr in addrs] * 8
+        results = evm.multicall(calls, caller="THRc")
+        assert [int(r["return_data"], 16) for r in results] == [1, 2, 3, 4, 5] * 8
+        assert all(r["success"] for r in results)
+        single = evm.static_call(addrs[2], "THRc", b"")
+        assert results[2]["gas_used"] == single[2]
+
+    def test_failures_are_per_call(self, tmp_path):
+        evm = ThronosEVM(str(tmp_path))
+        good = _deploy(evm, READ)
+        bad = _deploy(evm, REVERT_REASON)
+        results = evm.multicall([(good, b"", 100000), (bad, b"", 100000), (good, b"", 5)])
+        assert [r["success"] for r in results] == [True, False, False]
+        assert results[1]["revert_reason"] == "nope"
+        assert results[2]["out_of_gas"]
+        assert evm.multicall([]) == []
@@ -0,0 +1,174 @@
+"""
+Tests for the pooled ledger DB connections (ledger_db.py).
+
+Covers:
+  1. One connection per thread and path, pragmas applied once
+  2. Nested ``with`` blocks commit only at the outermost level; a nested
+     block that raises rolls back to its savepoint
+  3. transaction() batches writes and rolls back as a unit
+  4. Uncommitted leftovers are rolled back on the next checkout
+  5. Counters for connections opened and statement time
+  6. after_commit() callbacks run after the outermost commit, never on rollback
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger_db import LedgerDB
+
+
+@pytest.fixture
+def db_path():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "ledger.sqlite3")
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE balances (address TEXT PRIMARY KEY, balance REAL)")
+        yield path
+
+
+def _rows(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT address, balance FROM balances").fetchall())
+
+
+class TestPooling:
+    def test_reuses_connection_per_thread(self, db_path):
+        db = LedgerDB()
+        first = db.connection(db_path)
+        assert db.connection(db_path) is first
+        assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert first.execute("PRAGMA busy_timeout").fetchone()[0] == 30000
+
+        seen = []
+        worker = threading.Thread(target=lambda: seen.append(db.connection(db_path)))
+        worker.start()
+        worker.join()
+        assert seen[0] is not first
+        assert db.stats()["connections_opened"] == 2
+
+    def test_rows_are_addressable_by_name(self, db_path):
+        db = LedgerDB()
+        with db.connection(db_path) as conn:
+            conn.execute("INSERT INTO balances VALUES ('A', 1.5)")
+            row = conn.execute("SELECT balance FROM balances WHERE address = 'A'").fetchone()
+        assert row["balance"] == 1.5
+
+
+class TestTransactions:
+    def test_with_block_commits(self, db_path):
+        db = LedgerDB()
+        with db.connection(db_path) as conn:
+            conn.execute("INSERT INTO balances VALUES ('A', 1)")
+        assert _rows(db_path) == {"A": 1}
+
+    def test_transaction_batches_nested_blocks(self, db_path):
+        db = LedgerDB()
+        with db.transaction(db_path):
+            for i in range(3):
+                with db.connection(db_path) as conn:
+                    conn.execute("INSERT INTO balances VALUES (?, ?)", (f"A{i}", i))
+            assert _rows(db_path) == {}
+        assert _rows(db_path) == {"A0": 0, "A1": 1, "A2": 2}
+
+    def test_transaction_rolls_back_as_unit(self, db_path):
+        db = LedgerDB()
+        with pytest.raises(RuntimeError):
+            with db.transaction(db_path):
+                with db.connection(db_path) as conn:
+                    conn.execute("INSERT INTO balances VALUES ('A', 1)")
+                raise RuntimeError("boom")
+        assert _rows(db_path) == {}
+        with db.connection(db_path) as conn:
+            conn.execute("INSERT INTO balances VALUES ('B', 2)")
+        assert _rows(db_path) == {"B": 2}
+
+    def test_failed_nested_block_rolls_back_its_writes(self, db_path):
+        db = LedgerDB()
+        with db.transaction(db_path):
+            with db.connection(db_path) as conn:
+                conn.execute("INSERT INTO balances VALUES ('A', 1)")
+            try:
+                with db.connection(db_path) as conn:
+                    conn.execute("INSERT INTO balances VALUES ('B', 2)")
+                    conn.execute("UPDATE balances SET balance = 5 WHERE address = 'A'")
+                    raise RuntimeError("debit failed")
+            except RuntimeError:
+                pass
+            with db.connection(db_path) as conn:
+                conn.execute("INSERT INTO balances VALUES ('C', 3)")
+        assert _rows(db_path) == {"A": 1, "C": 3}
+
+    def test_nested_block_before_any_write_stays_in_outer_tx(self, db_path):
+        db = LedgerDB()
+        with pytest.raises(RuntimeError):
+            with db.transaction(db_path):
+                with db.connection(db_path) as conn:
+                    conn.execute("INSERT INTO balances VALUES ('A', 1)")
+                raise RuntimeError("boom")
+        assert _rows(db_path) == {}
+        assert not db.connection(db_path).in_transaction
+
+    def test_stale_uncommitted_work_is_rolled_back(self, db_path):
+        db = LedgerDB()
+        db.connection(db_path).execute("INSERT INTO balances VALUES ('LEAK', 1)")
+        conn = db.connection(db_path)
+        assert not conn.in_transaction
+        assert db.stats()["stale_rollbacks"] == 1
+        with conn:
+            conn.execute("INSERT INTO balances VALUES ('OK', 1)")
+        assert _rows(db_path) == {"OK": 1}
+
+
+class TestAfterCommit:
+    def test_runs_now_outside_a_block(self, db_path):
+        db = LedgerDB()
+        calls = []
+        db.connection(db_path).after_commit(lambda: calls.append(1))
+        assert calls == [1]
+
+    def test_deferred_until_outermost_commit(self, db_path):
+        db = LedgerDB()
+        seen = []
+        with db.transaction(db_path):
+            with db.connection(db_path) as conn:
+                conn.execute("INSERT INTO balances VALUES ('A', 1)")
+                conn.after_commit(lambda: seen.append(_rows(db_path)))
+            assert seen == []
+        assert seen == [{"A": 1}]
+
+    def test_dropped_on_rollback(self, db_path):
+        db = LedgerDB()
+        calls = []
+        with pytest.raises(RuntimeError):
+            with db.transaction(db_path) as conn:
+                conn.after_commit(lambda: calls.append(1))
+                raise RuntimeError("boom")
+        with db.transaction(db_path):
+            pass
+        assert calls == []
+
+
+class TestStats:
+    def test_statement_counters(self, db_path):
+        db = LedgerDB()
+        conn = db.connection(db_path)
+        before = db.stats()["statements"]
+        with conn:
+            conn.executemany("INSERT INTO balances VALUES (?, ?)", [("A", 1), ("B", 2)])
+            conn.execute("SELECT * FROM balances").fetchall()
+        stats = db.stats()
+        assert stats["statements"] == before + 2
+        assert stats["statement_seconds"] >= 0
+
+    def test_close_thread(self, db_path):
+        db = LedgerDB()
+        first = db.connection(db_path)
+        db.close_thread()
+        assert db.connection(db_path) is not first
@@ -0,0 +1,130 @@
+"""Delta-only ledger persistence: dirty-row UPSERTs and debounced JSON mirrors."""
+
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import server
+
+
+class FakeMirror:
+    def __init__(self):
+        self.scheduled = 0
+
+    def schedule(self):
+        self.scheduled += 1
+
+
+@pytest.fixture
+def ledger_db(tmp_path, monkeypatch):
+    db_file = tmp_path / "ledger.sqlite3"
+    ledger_file = tmp_path / "ledger.json"
+    monkeypatch.setattr(server, "LEDGER_DB_FILE", str(db_file))
+    monkeypatch.setattr(server, "LEDGER_FILE", str(ledger_file))
+    monkeypatch.setattr(server, "USE_SQLITE_LEDGER", True)
+    mirror = FakeMirror()
+    monkeypatch.setitem(server._LEDGER_MIRRORS, "thr", mirror)
+    server._init_ledger_db()
+    with sqlite3.connect(db_file) as conn:
+        conn.executemany(
+            "INSERT INTO balances (ledger_type, address, balance, updated_at) VALUES ('thr', ?, ?, 0)",
+            [(f"THR{i:040d}", float(i)) for i in range(200)],
+        )
+    return db_file, ledger_file, mirror
+
+
+def _touched_rows(db_file):
+    with sqlite3.connect(db_file) as conn:
+        return {
+            row[0]: row[1]
+            for row in conn.execute("SELECT address, balance FROM balances WHERE ledger_type = 'thr' AND updated_at != 0")
+        }
+
+
+def test_load_returns_tracked_ledger(ledger_db):
+    ledger = server.load_json(server.LEDGER_FILE, {})
+    assert isinstance(ledger, server.TrackedLedger)
+    assert len(ledger) == 200
+    assert not ledger.dirty
+
+
+def test_save_writes_only_dirty_rows(ledger_db):
+    db_file, ledger_file, mirror = ledger_db
+    ledger = server.load_json(server.LEDGER_FILE, {})
+    ledger["THR" + "0" * 39 + "5"] = 55.0
+    ledger["THR_NEW"] = round(ledger.get("THR_NEW", 0.0) + 1.5, 6)
+    server.save_json(server.LEDGER_FILE, ledger)
+
+    assert _touched_rows(db_file) == {"THR" + "0" * 39 + "5": 55.0, "THR_NEW": 1.5}
+    assert not ledger.dirty
+    assert mirror.scheduled == 1
+    assert not ledger_file.exists()
+
+
+def test_resave_without_changes_writes_nothing(ledger_db):
+    db_file, _, _ = ledger_db
+    ledger = server.load_json(server.LEDGER_FILE, {})
+    server.save_json(server.LEDGER_FILE, ledger)
+    assert _touched_rows(db_file) == {}
+
+
+def test_concurrent_saves_keep_disjoint_updates(ledger_db):
+    db_file, _, _ = ledger_db
+    first = server.load_json(server.LEDGER_FILE, {})
+    second = server.load_json(server.LEDGER_FILE, {})
+    first["THR_A"] = 1.0
+    second["THR_B"] = 2.0
+    server.save_json(server.LEDGER_FILE, first)
+    server.save_json(server.LEDGER_FILE, second)
+    assert _touched_rows(db_file) == {"THR_A": 1.0, "THR_B": 2.0}
+
+
+def test_plain_dict_still_writes_every_row(ledger_db):
+    db_file, _, _ = ledger_db
+    ledger = dict(server.load_json(server.LEDGER_FILE, {}))
+    server.save_json(server.LEDGER_FILE, ledger)
+    assert len(_touched_rows(db_file)) == 200
+
+
+def test_balance_version_moves_only_after_commit(ledger_db):
+    address = "THR" + "0" * 39 + "7"
+    before = server._wallet_balance_version(address)
+    with server.ledger_tx():
+        ledger = server.load_json(server.LEDGER_FILE, {})
+        ledger[address] = 77.0
+        server.save_json(server.LEDGER_FILE, ledger)
+        assert server._wallet_balance_version(address) == before
+    assert server._wallet_balance_version(address) != before
+
+
+def test_tracked_ledger_update_and_setdefault_mark_dirty():
+    ledger = server.TrackedLedger("thr", {"A": 1.0})
+    ledger.update({"B": 2.0}, C=3.0)
+    ledger.setdefault("A", 9.0)
+    ledger.setdefault("D", 4.0)
+    assert ledger.dirty == {"B", "C", "D"}
+
+
+def test_debounced_snapshotter_coalesces_bursts():
+    writes = []
+    done = threading.Event()
+
+    def _write():
+        writes.append(time.time())
+        done.set()
+
+    snap = server._DebouncedSnapshotter("test", 0.05, _write)
+    for _ in range(50):
+        snap.schedule()
+    assert done.wait(2)
+    time.sleep(0.1)
+    assert len(writes) == 1
+    snap.schedule()
+    snap.flush()
+    assert len(writes) == 2
@@ -0,0 +1,153 @@
+"""
+Tests for shared mining job templates (mining_jobs.py).
+
+Covers:
+  1. One template (one job id) is shared until the tip or target changes
+  2. Per-miner extranonces are stable and distinct; nonce_base follows them
+  3. Superseded templates resolve for the grace period, then expire
+  4. wait(): returns at once on a changed tip, wakes on invalidate(),
+     times out with the same job, and accepts a job id as ``since``
+  5. wake() re-checks the ``until`` predicate without a new template
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mining_jobs import JobBoard
+
+
+class Tip:
+    """Stands in for the last-block snapshot and retarget state."""
+
+    def __init__(self):
+        self.prev_hash = "00" * 32
+        self.height = 10
+        self.target = 1 << 236
+        self.builds = 0
+
+    def advance(self, target=None):
+        self.height += 1
+        self.prev_hash = f"{self.height:064x}"
+        if target is not None:
+            self.target = target
+
+    def build(self):
+        self.builds += 1
+        return {"prev_hash": self.prev_hash, "height": self.height + 1, "target": self.target}
+
+
+def _board(tip, **kwargs):
+    kwargs.setdefault("recheck", 60)
+    return JobBoard(tip.build, **kwargs)
+
+
+class TestTemplates:
+    def test_shared_until_tip_changes(self):
+        tip = Tip()
+        board = _board(tip)
+        jobs = [board.job_for(f"thrM{i}") for i in range(50)]
+        assert len({job["job_id"] for job in jobs}) == 1
+        assert tip.builds == 1
+        tip.advance()
+        board.invalidate()
+        job = board.job_for("thrM0")
+        assert job["job_id"] != jobs[0]["job_id"]
+        assert job["seq"] == 2 and job["height"] == 12
+
+    def test_rebuild_with_same_key_keeps_job_id(self):
+        tip = Tip()
+        board = _board(tip, recheck=0)
+        first = board.current()
+        assert board.current()["job_id"] == first["job_id"]
+        assert tip.builds == 2
+        tip.target >>= 1
+        assert board.current()["job_id"] != first["job_id"]
+
+    def test_extranonce(self):
+        board = _board(Tip())
+        a, b = board.job_for("thrA"), board.job_for("thrB")
+        assert a["extranonce"] != b["extranonce"]
+        assert len(a["extranonce"]) == 8
+        assert board.job_for("thrA")["extranonce"] == a["extranonce"]
+        assert a["nonce_base"] == int(a["extranonce"], 16) << 32
+        assert board.extranonce(None) != board.extranonce(None)
+
+    def test_extranonces_are_bounded(self):
+        board = _board(Tip(), max_miners=2)
+        first = board.extranonce("thrA")
+        board.extranonce("thrB")
+        board.extranonce("thrC")
+        assert board.stats()["miners"] == 2
+        assert board.extranonce("thrA") != first
+
+    def test_superseded_job_grace(self):
+        tip = Tip()
+        board = _board(tip, grace=0.05)
+        old = board.current()["job_id"]
+        tip.advance()
+        board.invalidate()
+        new = board.current()["job_id"]
+        assert board.get(old)["prev_hash"] == "00" * 32
+        time.sleep(0.06)
+        assert board.get(old) is None
+        assert board.get(new) is not None
+
+
+class TestWait:
+    def test_returns_immediately_when_tip_differs(self):
+        board = _board(Tip())
+        started = time.time()
+        assert board.wait("ff" * 32, timeout=5)["prev_hash"] == "00" * 32
+        assert board.wait(None, timeout=5)
+        assert time.time() - started < 1
+
+    def test_wakes_on_new_tip(self):
+        tip = Tip()
+        board = _board(tip)
+        since = board.current()["prev_hash"]
+        result = {}
+
+        def waiter():
+            result["job"] = board.wait(since, timeout=5)
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        time.sleep(0.05)
+        assert thread.is_alive()
+        tip.advance()
+        board.invalidate()
+        thread.join(2)
+        assert not thread.is_alive()
+        assert result["job"]["prev_hash"] == tip.prev_hash
+
+    def test_timeout_and_job_id_since(self):
+        tip = Tip()
+        board = _board(tip)
+        job = board.current()
+        started = time.time()
+        assert board.wait(job["job_id"], timeout=0.05) is job
+        assert board.wait(job["prev_hash"], timeout=0.05) is job
+        assert time.time() - started >= 0.1
+        tip.advance()
+        board.invalidate()
+        assert board.wait(job["job_id"], timeout=5)["seq"] == 2
+
+    def test_recheck_notices_changes_without_invalidate(self):
+        tip = Tip()
+        board = _board(tip, recheck=0.02)
+        since = board.current()["prev_hash"]
+        threading.Timer(0.05, tip.advance).start()
+        assert board.wait(since, timeout=2)["prev_hash"] != since
+
+    def test_wake_rechecks_until(self):
+        board = _board(Tip())
+        since = board.current()["job_id"]
+        flag = []
+        threading.Timer(0.05, lambda: (flag.append(1), board.wake())).start()
+        started = time.time()
+        assert board.wait(since, timeout=5, until=lambda: bool(flag))["job_id"] == since
+        assert time.time() - started < 2
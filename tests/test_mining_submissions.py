@@ -0,0 +1,99 @@
+"""
+Tests for mining submission tracking (mining_submissions.py).
+
+Covers:
+  1. Submissions get an id and resolve once, with the outcome details
+  2. The same work is answered with the original record; rejected work
+     may be submitted again
+  3. wait() returns on resolution or after the timeout
+  4. Per-miner update cursors and the on_resolve hook
+  5. Resolved records expire after ttl; the record count is bounded
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mining_submissions import ACCEPTED, DUPLICATE, QUEUED, REJECTED, STALE, SubmissionTracker
+
+
+class TestLifecycle:
+    def test_open_and_resolve(self):
+        tracker = SubmissionTracker()
+        record, is_new = tracker.open("thrA", work_key="w1", job_id="job_1")
+        assert is_new and record["status"] == QUEUED and record["job_id"] == "job_1"
+        assert "work_key" not in record
+        sid = record["submission_id"]
+        resolved = tracker.resolve(sid, ACCEPTED, height=42)
+        assert resolved["status"] == ACCEPTED and resolved["height"] == 42
+        assert tracker.resolve(sid, STALE) is None
+        assert tracker.get(sid)["status"] == ACCEPTED
+        assert tracker.get("sub_unknown") is None
+
+    def test_duplicate_work(self):
+        tracker = SubmissionTracker()
+        first, _ = tracker.open("thrA", work_key="w1")
+        again, is_new = tracker.open("thrA", work_key="w1")
+        assert not is_new and again["submission_id"] == first["submission_id"]
+        assert tracker.stats()["counts"][DUPLICATE] == 1
+        other, is_new = tracker.open("thrA", work_key="w2")
+        assert is_new and other["submission_id"] != first["submission_id"]
+
+    def test_rejected_work_can_be_retried(self):
+        tracker = SubmissionTracker(ttl=0)
+        first, _ = tracker.open("thrA", work_key="w1")
+        tracker.resolve(first["submission_id"], REJECTED, reason="queue_full")
+        retry, is_new = tracker.open("thrA", work_key="w1")
+        assert is_new and retry["submission_id"] != first["submission_id"]
+        time.sleep(0.01)
+        tracker.open("thrB", work_key="w9")
+        again, is_new = tracker.open("thrA", work_key="w1")
+        assert not is_new and again["submission_id"] == retry["submission_id"]
+
+
+class TestWaiting:
+    def test_wait_returns_on_resolve(self):
+        tracker = SubmissionTracker()
+        sid = tracker.open("thrA")[0]["submission_id"]
+        threading.Timer(0.05, tracker.resolve, args=(sid, STALE), kwargs={"reason": "prev_mismatch"}).start()
+        started = time.time()
+        record = tracker.wait(sid, timeout=5)
+        assert record["status"] == STALE and record["reason"] == "prev_mismatch"
+        assert time.time() - started < 2
+
+    def test_wait_timeout_and_unknown(self):
+        tracker = SubmissionTracker()
+        sid = tracker.open("thrA")[0]["submission_id"]
+        assert tracker.wait(sid, timeout=0.02)["status"] == QUEUED
+        assert tracker.wait("sub_unknown", timeout=0.02) is None
+
+    def test_updates_and_hook(self):
+        seen = []
+        tracker = SubmissionTracker(on_resolve=seen.append)
+        cursor = tracker.cursor()
+        a1 = tracker.open("thrA")[0]["submission_id"]
+        b1 = tracker.open("thrB")[0]["submission_id"]
+        a2 = tracker.open("thrA")[0]["submission_id"]
+        tracker.resolve(a2, STALE)
+        tracker.resolve(b1, ACCEPTED, height=1)
+        tracker.resolve(a1, ACCEPTED, height=2)
+        updates, cursor = tracker.updates("thrA", cursor)
+        assert [r["submission_id"] for r in updates] == [a2, a1]
+        assert tracker.updates("thrA", cursor) == ([], cursor)
+        assert [r["submission_id"] for r in seen] == [a2, b1, a1]
+
+
+class TestRetention:
+    def test_expiry_and_limit(self):
+        tracker = SubmissionTracker(ttl=0.02, limit=3)
+        done = tracker.open("thrA", work_key="w0")[0]["submission_id"]
+        tracker.resolve(done, ACCEPTED)
+        time.sleep(0.03)
+        sids = [tracker.open("thrA", work_key=f"w{i}")[0]["submission_id"] for i in range(1, 5)]
+        assert tracker.get(done) is None
+        assert tracker.get(sids[0]) is None
+        assert tracker.stats()["tracked"] == 3
+        assert tracker.open("thrA", work_key="w1")[1] is True
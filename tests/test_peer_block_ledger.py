@@ -0,0 +1,163 @@
+"""Peer blocks through BLOCK_INTAKE and _accept_peer_blocks: what reaches the ledger."""
+
+import hashlib
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import server
+from chain_store import ChainStore
+from chain_sync import Checkpoint
+from compact_block import CompactBlock
+
+MINER = "THR" + "m" * 40
+ATTACKER = "THR" + "a" * 40
+EASY_TARGET = 1 << 255
+
+
+def _mine(height, prev_hash, reward=None, target=EASY_TARGET):
+    if reward is None:
+        reward = server.calculate_reward(height)
+    block = {"thr_address": MINER, "prev_hash": prev_hash, "height": height, "reward": reward,
+             "target": target, "type": "block", "timestamp": "2026-10-16 12:00:00 UTC"}
+    nonce = 0
+    while True:
+        digest = hashlib.sha256(f"{prev_hash}{MINER}{nonce}".encode()).hexdigest()
+        if int(digest, 16) <= target:
+            return dict(block, nonce=nonce, block_hash=digest)
+        nonce += 1
+
+
+def _mint_tx(tx_id="TX-mint"):
+    return {"tx_id": tx_id, "type": "transfer", "from": "THR" + "x" * 40, "to": ATTACKER,
+            "amount": 1000000.0, "fee_burned": 0.0, "status": "pending"}
+
+
+@pytest.fixture
+def node(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "USE_SQLITE_LEDGER", True)
+    monkeypatch.setattr(server, "LEDGER_DB_FILE", str(tmp_path / "ledger.sqlite3"))
+    monkeypatch.setattr(server, "LEDGER_FILE", str(tmp_path / "ledger.json"))
+    monkeypatch.setattr(server, "MEMPOOL_FILE", str(tmp_path / "mempool.json"))
+    monkeypatch.setattr(server, "CHAIN_FILE", str(tmp_path / "phantom_tx_chain.json"))
+    monkeypatch.setattr(server, "CHAIN_STORE", ChainStore(str(tmp_path / "chain_store")))
+    monkeypatch.setattr(server, "WALLET_HISTORY_INDEX", None)
+    monkeypatch.setattr(server, "EXPLORER_VIEW", None)
+    monkeypatch.setattr(server, "update_last_block", lambda entry, is_block=True: None)
+    monkeypatch.setitem(server._LEDGER_MIRRORS, "thr", type("NoMirror", (), {"schedule": lambda self: None})())
+    monkeypatch.setattr(server, "get_mining_target", lambda: EASY_TARGET)
+    server._init_ledger_db()
+    return tmp_path
+
+
+def _balance(address):
+    return float(server.load_json(server.LEDGER_FILE, {}).get(address, 0.0))
+
+
+def test_peer_block_credits_reward_but_not_tx_receivers(node):
+    block = _mine(1, "0" * 64, reward=2.5)
+    server._accept_peer_blocks([(block, [_mint_tx()])])
+    assert _balance(MINER) == 2.5
+    assert _balance(ATTACKER) == 0.0
+    assert server.chain_length() == 1  # the unverified tx stays off the chain
+
+
+def test_locally_debited_tx_is_confirmed_and_credited(node):
+    receiver = "THR" + "r" * 40
+    local = dict(_mint_tx("TX-local"), to=receiver, amount=3.0, fee_burned=0.5)
+    server.save_mempool([local])
+    tampered = dict(local, amount=1000000.0)
+    block = _mine(1, "0" * 64)
+    server._accept_peer_blocks([(block, [tampered])])
+    assert _balance(receiver) == 3.0  # the local copy, not the peer's
+    assert _balance(server.BURN_ADDRESS) == 0.5
+    chained = [e for e in server.CHAIN_STORE.load_all() if e.get("tx_id") == "TX-local"]
+    assert len(chained) == 1 and chained[0]["status"] == "confirmed" and chained[0]["height"] == 1
+    assert server.load_mempool() == []
+
+
+def test_relayed_tx_is_marked_and_not_credited(node):
+    client = server.app.test_client()
+    assert client.post("/api/v1/receive_tx", json=_mint_tx("TX-relayed")).status_code == 200
+    assert server.load_mempool()[0]["relayed"] is True
+    server._accept_peer_blocks([(_mine(1, "0" * 64), [_mint_tx("TX-relayed")])])
+    assert _balance(ATTACKER) == 0.0
+    assert server.chain_length() == 1
+    assert server.load_mempool() == []
+
+
+def test_failed_chain_append_rolls_back_reward(node, monkeypatch):
+    def broken_append(entries):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(server, "append_chain_entries", broken_append)
+    with pytest.raises(OSError):
+        server._accept_peer_blocks([(_mine(1, "0" * 64), [])])
+    assert _balance(MINER) == 0.0
+
+
+def test_compact_block_with_prefilled_transfer_mints_nothing(node):
+    # one tx relayed into the mempool (never debited here), one only in the block
+    relayed = dict(_mint_tx("TX-relayed"), relayed=True)
+    server.save_mempool([relayed])
+    block = _mine(1, "0" * 64)
+    message = CompactBlock(block, [relayed, _mint_tx()]).message(prefill=[1])
+    resp = server.app.test_client().post("/api/v1/receive_compact_block", json=message)
+    assert resp.status_code == 201, resp.get_json()
+    assert _balance(MINER) == server.calculate_reward(1)
+    assert _balance(ATTACKER) == 0.0
+    assert server.load_mempool() == []
+
+
+def test_self_declared_reward_is_rejected(node):
+    block = _mine(1, "0" * 64, reward=server.calculate_reward(1) * 1000)
+    client = server.app.test_client()
+    resp = client.post("/api/v1/receive_block", json=block)
+    assert resp.status_code == 400 and resp.get_json()["reason"] == "bad_reward"
+    resp = client.post("/api/v1/receive_compact_block", json=CompactBlock(block, []).message())
+    assert resp.status_code == 400 and resp.get_json()["reason"] == "bad_reward"
+    assert _balance(MINER) == 0.0 and server.chain_length() == 0
+
+
+def test_target_is_the_nodes_not_the_blocks(node, monkeypatch):
+    monkeypatch.setattr(server, "get_mining_target", lambda: EASY_TARGET >> 4)
+    resp = server.app.test_client().post("/api/v1/receive_block", json=_mine(1, "0" * 64))
+    assert resp.status_code == 400 and resp.get_json()["reason"] == "target_too_easy"
+    resp = server.app.test_client().post("/api/v1/receive_block", json=_mine(1, "0" * 64, target=EASY_TARGET >> 4))
+    assert resp.status_code == 201
+    assert _balance(MINER) == server.calculate_reward(1)
+
+
+def test_retarget_windows_ahead_may_be_easier(node, monkeypatch):
+    monkeypatch.setattr(server, "get_mining_target", lambda: 1 << 200)
+    monkeypatch.setattr(server, "HEIGHT_OFFSET", 0)
+    assert server._peer_block_target_limit(server.RETARGET_INTERVAL - 1) == 1 << 200
+    assert server._peer_block_target_limit(server.RETARGET_INTERVAL) == 1 << 202
+    assert server._peer_block_target_limit(server.RETARGET_INTERVAL * 200) == server.INITIAL_TARGET
+
+
+def test_synced_batch_gets_the_same_checks(node):
+    first = _mine(1, "0" * 64)
+    greedy = _mine(2, first["block_hash"], reward=500.0)
+    with pytest.raises(server.HeaderValidationError, match="height 2: bad_reward"):
+        server._apply_synced_batch([(first, []), (greedy, [])])
+    assert server.chain_length() == 0
+    server._apply_synced_batch([(first, []), (_mine(2, first["block_hash"]), [])])
+    assert server.chain_length() == 2
+
+
+def test_synced_history_keeps_stored_rewards(node, monkeypatch):
+    monkeypatch.setattr(server.BLOCK_INTAKE, "checkpoint", Checkpoint(2))
+    first = _mine(1, "0" * 64, reward=1.0)
+    second = _mine(2, first["block_hash"], reward=1.0)
+    server._apply_synced_batch([(first, []), (second, [])])
+    assert _balance(MINER) == 2.0
+    third = _mine(3, second["block_hash"], reward=1.0)
+    with pytest.raises(server.HeaderValidationError, match="height 3: bad_reward"):
+        server._apply_synced_batch([(third, [])])
+    # relayed blocks always follow the schedule
+    resp = server.app.test_client().post("/api/v1/receive_block", json=third)
+    assert resp.status_code == 400 and resp.get_json()["reason"] == "bad_reward"
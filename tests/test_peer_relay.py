@@ -0,0 +1,187 @@
+"""
+Tests for the concurrent peer relay (peer_relay.py).
+
+Covers:
+  1. Blocks and txs reach every peer through the injected transport
+  2. A queued block is superseded by a newer one before it is sent
+  3. One slow peer does not delay the others
+  4. Circuit breaker opens after repeated failures and half-opens after
+     backoff with a single in-flight probe
+  5. The peer set is cached until the peer file changes; a removed peer's
+     link is closed, once its queue drains if it was busy
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from peer_relay import BLOCK_PATH, CLOSED, HALF_OPEN, OPEN, TX_PATH, CircuitBreaker, PeerRelay
+
+
+class FakeTransport:
+    """Records sends; peers listed in ``down`` raise, ``delays`` sleep first."""
+
+    def __init__(self, down=(), delays=None):
+        self.down = set(down)
+        self.delays = delays or {}
+        self.sent = []
+        self.gate = None
+        self._lock = threading.Lock()
+
+    def __call__(self, session, url, payload, timeout):
+        peer = url.rsplit("/api/", 1)[0]
+        if self.gate is not None:
+            self.gate.wait(5)
+        time.sleep(self.delays.get(peer, 0))
+        if peer in self.down:
+            raise ConnectionError(peer)
+        with self._lock:
+            self.sent.append((peer, url[len(peer):], payload))
+        return 200
+
+
+def _relay(peers, transport, **kwargs):
+    return PeerRelay(lambda: list(peers), transport=transport, session_factory=lambda: None, **kwargs)
+
+
+class TestFanOut:
+    def test_reaches_every_peer(self):
+        transport = FakeTransport()
+        relay = _relay(["http://a", "http://b/"], transport)
+        assert relay.broadcast_block({"height": 1, "block_hash": "h1"}) == 2
+        relay.broadcast_tx({"tx_id": "T1"})
+        assert relay.flush(5)
+        assert sorted((p, path) for p, path, _ in transport.sent) == [
+            ("http://a", BLOCK_PATH), ("http://a", TX_PATH),
+            ("http://b", BLOCK_PATH), ("http://b", TX_PATH),
+        ]
+        relay.close()
+
+    def test_newer_block_supersedes_queued_block(self):
+        transport = FakeTransport()
+        transport.gate = threading.Event()
+        relay = _relay(["http://a"], transport)
+        relay.broadcast_block({"height": 1})
+        time.sleep(0.05)
+        relay.broadcast_block({"height": 2})
+        relay.broadcast_block({"height": 3})
+        relay.broadcast_block({"height": 2})
+        transport.gate.set()
+        assert relay.flush(5)
+        assert [payload["height"] for _, _, payload in transport.sent] == [1, 3]
+        assert relay.stats()["peers"][0]["superseded"] == 1
+        relay.close()
+
+    def test_slow_peer_does_not_block_others(self):
+        transport = FakeTransport(delays={"http://slow": 0.5})
+        relay = _relay(["http://slow", "http://a", "http://b"], transport, max_workers=4)
+        started = time.time()
+        relay.broadcast_block({"height": 1})
+        deadline = time.time() + 2
+        while len(transport.sent) < 2 and time.time() < deadline:
+            time.sleep(0.005)
+        assert {p for p, _, _ in transport.sent} == {"http://a", "http://b"}
+        assert time.time() - started < 0.4
+        assert relay.flush(5)
+        relay.close()
+
+    def test_tx_queue_is_bounded(self):
+        transport = FakeTransport()
+        transport.gate = threading.Event()
+        relay = _relay(["http://a"], transport, tx_queue_limit=3)
+        relay.broadcast_tx({"tx_id": "T0"})
+        time.sleep(0.05)
+        for i in range(1, 6):
+            relay.broadcast_tx({"tx_id": f"T{i}"})
+        transport.gate.set()
+        assert relay.flush(5)
+        assert [payload["tx_id"] for _, _, payload in transport.sent] == ["T0", "T3", "T4", "T5"]
+        assert relay.stats()["peers"][0]["tx_dropped"] == 2
+        relay.close()
+
+
+class TestCircuitBreaker:
+    def test_breaker_states(self):
+        breaker = CircuitBreaker(failure_threshold=2, base_backoff=10, max_backoff=15)
+        breaker.record_failure(0)
+        assert breaker.state == CLOSED
+        breaker.record_failure(0)
+        assert breaker.state == OPEN and not breaker.allow(5)
+        assert breaker.allow(10)
+        breaker.record_failure(10)
+        assert breaker.state == OPEN and breaker.open_until == 25
+        assert breaker.allow(25)
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_half_open_allows_one_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, base_backoff=10)
+        breaker.record_failure(0)
+        assert breaker.allow(10)
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow(10) and not breaker.allow(11)
+        breaker.record_failure(11)
+        assert breaker.state == OPEN and not breaker.allow(12)
+        assert breaker.allow(31) and not breaker.allow(31)
+        breaker.record_success()
+        assert breaker.allow(31) and breaker.allow(31)
+
+    def test_dead_peer_is_skipped(self):
+        transport = FakeTransport(down={"http://dead"})
+        relay = _relay(["http://dead", "http://a"], transport, failure_threshold=2, base_backoff=60)
+        for height in range(5):
+            relay.broadcast_block({"height": height})
+            relay.flush(5)
+        stats = {s["url"]: s for s in relay.stats()["peers"]}
+        assert stats["http://dead"]["state"] == OPEN
+        assert stats["http://dead"]["failed"] == 2
+        assert stats["http://dead"]["skipped"] == 3
+        assert stats["http://a"]["sent"] == 5
+        assert stats["http://a"]["health"] > stats["http://dead"]["health"]
+        relay.close()
+
+
+class TestPeerSet:
+    def test_cached_until_file_changes(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "peers.json")
+            loads = []
+
+            def load():
+                loads.append(1)
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(["http://a", "http://a", ""], f)
+            relay = PeerRelay(load, peers_path=path, transport=FakeTransport(), session_factory=lambda: None)
+            assert relay.peers() == ["http://a"]
+            assert relay.peers() == ["http://a"]
+            assert len(loads) == 1
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(["http://a", "http://bb"], f)
+            assert relay.peers() == ["http://a", "http://bb"]
+            relay.invalidate()
+            relay.peers()
+            assert len(loads) == 3
+
+    def test_removed_peer_closes_after_drain(self):
+        transport = FakeTransport()
+        transport.gate = threading.Event()
+        peers = ["http://a", "http://b"]
+        relay = _relay(peers, transport)
+        relay.broadcast_block({"height": 1})
+        time.sleep(0.05)
+        peers.remove("http://b")
+        relay.invalidate()
+        assert relay.peers() == ["http://a"]
+        assert len(relay.stats()["peers"]) == 2
+        transport.gate.set()
+        assert relay.flush(5)
+        assert [s["url"] for s in relay.stats()["peers"]] == ["http://a"]
+        relay.close()
@@ -0,0 +1,84 @@
+"""
+Tests for the midstate CPU miner engine (miner_kit/pow_miner_cpu.py).
+
+Covers:
+  1. Midstate scans produce the server's legacy and sha256d header hashes
+  2. scan finds the same first nonce as a naive search and honours stop
+  3. MiningEngine splits the range over processes and reports per-worker H/s
+"""
+
+import hashlib
+import multiprocessing as mp
+import os
+import struct
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "miner_kit"))
+
+from pow_miner_cpu import HEADER, LEGACY, MiningEngine, header_prefix, legacy_prefix, pow_hash, scan
+
+PREV_HASH = "00000000" + "ab" * 28
+ADDRESS = "THR" + "1" * 37
+EASY = 1 << 252  # ~1 in 16 hashes
+
+
+def _server_legacy(nonce):
+    return hashlib.sha256((PREV_HASH + ADDRESS).encode() + str(nonce).encode()).hexdigest()
+
+
+def _server_header(merkle_root, ntime, nbits, nonce):
+    header = struct.pack("<I", 1)
+    header += bytes.fromhex(PREV_HASH)[::-1]
+    header += bytes.fromhex(merkle_root)[::-1]
+    header += struct.pack("<I", ntime)
+    header += struct.pack("<I", nbits)
+    header += struct.pack("<I", nonce)
+    return hashlib.sha256(hashlib.sha256(header).digest()).digest()[::-1].hex()
+
+
+class TestScan:
+    def test_legacy_matches_server(self):
+        prefix = legacy_prefix(PREV_HASH, ADDRESS)
+        nonce, digest = scan(LEGACY, prefix, EASY, 1000, 2000)
+        assert digest == _server_legacy(nonce) == pow_hash(LEGACY, prefix, nonce)
+        assert int(digest, 16) <= EASY
+        naive = next(n for n in range(1000, 2000) if int(_server_legacy(n), 16) <= EASY)
+        assert nonce == naive
+
+    def test_header_matches_server(self):
+        prefix = header_prefix(1, PREV_HASH, "cd" * 32, 1700000000, 0x1d00ffff)
+        assert len(prefix) == 76
+        nonce, digest = scan(HEADER, prefix, EASY, 0, 1000)
+        assert digest == _server_header("cd" * 32, 1700000000, 0x1d00ffff, nonce)
+        assert digest == pow_hash(HEADER, prefix, nonce)
+
+    def test_exhausted_and_stopped(self):
+        prefix = legacy_prefix(PREV_HASH, ADDRESS)
+        counted = []
+        assert scan(LEGACY, prefix, 0, 0, 5000, progress=counted.append) is None
+        assert sum(counted) == 5000
+        stop = mp.Event()
+        stop.set()
+        assert scan(LEGACY, prefix, 1 << 256, 0, 10, stop_event=stop) is None
+
+
+class TestEngine:
+    def test_workers_find_a_solution(self):
+        engine = MiningEngine(workers=2)
+        prefix = legacy_prefix(PREV_HASH, ADDRESS)
+        nonce, digest = engine.run(LEGACY, prefix, 1 << 244, start=1 << 32, span=1 << 20)
+        assert (1 << 32) <= nonce < (1 << 32) + (1 << 20)
+        assert digest == _server_legacy(nonce) and int(digest, 16) <= 1 << 244
+        assert len(engine.rates) == 2
+
+    def test_benchmark_style_run_reports_rates(self):
+        engine = MiningEngine(workers=2)
+        prefix = header_prefix(1, PREV_HASH, "cd" * 32, 1700000000, 0x1d00ffff)
+        assert engine.run(HEADER, prefix, 0, max_seconds=0.5) is None
+        assert all(rate > 0 for rate in engine.rates)
+
+    def test_should_stop(self):
+        engine = MiningEngine(workers=2)
+        prefix = legacy_prefix(PREV_HASH, ADDRESS)
+        assert engine.run(LEGACY, prefix, 0, should_stop=lambda: True) is None
@@ -0,0 +1,141 @@
+"""
+Tests for token-bucket rate limiting (rate_limit.py).
+
+Covers:
+  1. per_window budgets: ``limit`` back-to-back hits, then refill over time
+  2. Denial with ban_seconds bans the key until the ban runs out
+  3. Idle keys expire after ttl; the key count is capped by max_keys;
+     neither path evicts a key that is still banned
+  4. top() ranks keys by denied hits; stats() sums across stripes
+  5. Concurrent hits from many threads never over-admit
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import RateLimiter
+
+
+class TestBuckets:
+    def test_burst_then_refill(self):
+        limiter = RateLimiter.per_window("t", 60, 60)
+        now = 1000.0
+        assert all(limiter.hit("k", now=now) for _ in range(60))
+        assert limiter.hit("k", now=now) is False
+        assert limiter.hit("k", now=now + 0.5) is False
+        assert limiter.hit("k", now=now + 1.0) is True
+        assert limiter.hit("other", now=now) is True
+
+    def test_cost_and_disabled(self):
+        limiter = RateLimiter("t", rate=1, burst=5)
+        assert limiter.hit("k", cost=5, now=0) is True
+        assert limiter.hit("k", cost=1, now=0) is False
+        disabled = RateLimiter.per_window("off", 0, 60)
+        assert not disabled.enabled
+        assert all(disabled.hit("k", now=0) for _ in range(1000))
+
+    def test_ban(self):
+        limiter = RateLimiter.per_window("t", 2, 60, ban_seconds=300)
+        assert limiter.hit("k", now=0) and limiter.hit("k", now=0)
+        assert limiter.hit("k", now=0) is False
+        assert limiter.is_banned("k", now=1)
+        # the bucket refills, but the ban holds
+        assert limiter.hit("k", now=120) is False
+        assert limiter.is_banned("k", now=299)
+        assert not limiter.is_banned("k", now=301)
+        assert limiter.hit("k", now=301) is True
+        limiter.ban("fresh", now=0)
+        assert limiter.is_banned("fresh", now=10)
+
+
+class TestMemory:
+    def test_idle_keys_expire(self):
+        limiter = RateLimiter("t", rate=1, burst=1, ttl=10, stripes=1)
+        for i in range(5):
+            limiter.hit(f"k{i}", now=0)
+        assert limiter.stats()["keys"] == 5
+        for i in range(3):
+            limiter.hit(f"n{i}", now=100)
+        assert limiter.stats()["keys"] == 3
+        assert limiter.stats()["evicted"] == 5
+
+    def test_ttl_covers_ban(self):
+        limiter = RateLimiter("t", rate=1, burst=1, ttl=1, ban_seconds=60, stripes=1)
+        limiter.hit("k", now=0)
+        limiter.hit("k", now=0)
+        limiter.hit("x", now=30)
+        assert limiter.is_banned("k", now=31)
+
+    def test_max_keys_lru(self):
+        limiter = RateLimiter("t", rate=1, burst=10, max_keys=4, stripes=1)
+        for key in ("a", "b", "c", "d"):
+            limiter.hit(key, now=0)
+        limiter.hit("a", now=1)
+        limiter.hit("e", now=1)
+        stats = limiter.stats()
+        assert stats["keys"] == 4 and stats["evicted"] == 1
+        assert limiter.hit("a", cost=10, now=1) is False  # "a" kept its spent bucket
+        assert limiter.hit("b", cost=10, now=1) is True  # "b" was evicted, starts full
+
+    def test_lru_cap_keeps_banned_keys(self):
+        limiter = RateLimiter("t", rate=1, burst=1, ban_seconds=60, max_keys=3, stripes=1)
+        limiter.hit("bad", now=0)
+        limiter.hit("bad", now=0)
+        assert limiter.is_banned("bad", now=0)
+        # flood with fresh keys: "bad" is the LRU head every time
+        for i in range(10):
+            limiter.hit(f"k{i}", now=1)
+        assert limiter.is_banned("bad", now=2)
+        assert limiter.hit("bad", now=2) is False
+        assert limiter.stats()["keys"] == 3
+
+    def test_custom_ban_outlasts_ttl(self):
+        limiter = RateLimiter("t", rate=1, burst=1, ttl=5, stripes=1)
+        limiter.ban("bad", seconds=600, now=0)
+        limiter.hit("x", now=100)
+        limiter.hit("y", now=100)
+        assert limiter.is_banned("bad", now=100)
+
+    def test_all_banned_stripe_does_not_spin(self):
+        limiter = RateLimiter("t", rate=1, burst=1, max_keys=2, stripes=1)
+        for key in ("a", "b"):
+            limiter.ban(key, seconds=60, now=0)
+        limiter.hit("c", now=1)
+        assert limiter.is_banned("a", now=1) and limiter.is_banned("b", now=1)
+        assert limiter.stats()["keys"] == 3
+
+
+class TestMetrics:
+    def test_top_offenders(self):
+        limiter = RateLimiter.per_window("t", 1, 60)
+        for key, extra in (("quiet", 0), ("loud", 5), ("medium", 2)):
+            for _ in range(1 + extra):
+                limiter.hit(key, now=0)
+        top = limiter.top(2, now=0)
+        assert [row["key"] for row in top] == ["loud", "medium"]
+        assert top[0]["denied"] == 5 and top[0]["allowed"] == 1
+        stats = limiter.stats()
+        assert stats["allowed"] == 3 and stats["denied"] == 7 and stats["keys"] == 3
+
+
+class TestConcurrency:
+    def test_threads_do_not_over_admit(self):
+        limiter = RateLimiter("t", rate=1e-9, burst=500)
+        allowed = []
+        lock = threading.Lock()
+
+        def worker():
+            count = sum(1 for _ in range(200) if limiter.hit("shared"))
+            with lock:
+                allowed.append(count)
+
+        threads = [threading.Thread(target=worker) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sum(allowed) == 500
+        assert limiter.stats()["denied"] == 16 * 200 - 500
@@ -0,0 +1,126 @@
+"""
+Tests for the replica sync-state tracker (replica_sync_state.py).
+
+Covers:
+  1. Empty / non-empty CHAIN_FILE detection without parsing the chain
+  2. pending mirrors the legacy _replica_sync_pending rules
+  3. Files are re-read only when (mtime, size) changes
+  4. Progress is measured against the observed / polled leader tip
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import replica_sync_state
+from replica_sync_state import ReplicaSyncState
+
+
+@pytest.fixture
+def paths():
+    with tempfile.TemporaryDirectory() as d:
+        yield os.path.join(d, "last_block.json"), os.path.join(d, "phantom_tx_chain.json")
+
+
+def _write(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        if isinstance(data, str):
+            f.write(data)
+        else:
+            json.dump(data, f, indent=2)
+
+
+class TestAnswers:
+    @pytest.mark.parametrize("content,expected", [
+        ("[]", False),
+        ("  [ \n ]", False),
+        ("[\n  {\"block_hash\": \"aa\"}\n]", True),
+        ("{}", False),
+        ("", False),
+    ])
+    def test_chain_ready_peeks_file(self, paths, content, expected):
+        last_block, chain = paths
+        _write(chain, content)
+        assert ReplicaSyncState(last_block, chain, stat_interval=0).chain_ready is expected
+
+    def test_missing_files_are_pending(self, paths):
+        state = ReplicaSyncState(*paths, stat_interval=0)
+        assert state.pending
+        assert state.local_height is None
+
+    @pytest.mark.parametrize("last_block,chain,pending", [
+        ({"block_hash": "ab"}, "[]", False),
+        ({"height": 0}, "[]", False),
+        ({"height": -1}, "[]", True),
+        ({"height": -1}, "[{\"tx_id\": \"T\"}]", False),
+    ])
+    def test_pending_matches_legacy_rules(self, paths, last_block, chain, pending):
+        _write(paths[0], last_block)
+        _write(paths[1], chain)
+        assert ReplicaSyncState(*paths, stat_interval=0).pending is pending
+
+
+class TestRefresh:
+    def test_reparses_only_on_change(self, paths, monkeypatch):
+        _write(paths[0], {"height": 3})
+        _write(paths[1], "[]")
+        state = ReplicaSyncState(*paths, stat_interval=0)
+        peeks = []
+        original = replica_sync_state._chain_file_non_empty
+        monkeypatch.setattr(replica_sync_state, "_chain_file_non_empty", lambda p: peeks.append(p) or original(p))
+        for _ in range(5):
+            assert not state.chain_ready
+        assert len(peeks) == 1
+
+        _write(paths[1], "[{\"tx_id\": \"T1\"}]")
+        state.invalidate()
+        assert state.chain_ready
+        assert len(peeks) == 2
+
+    def test_stat_interval_throttles(self, paths):
+        _write(paths[0], {"height": 1})
+        state = ReplicaSyncState(*paths, stat_interval=3600)
+        assert state.local_height == 1
+        _write(paths[0], {"height": 2, "block_hash": "longer-file"})
+        assert state.local_height == 1
+        state.invalidate()
+        assert state.local_height == 2
+
+
+class TestProgress:
+    def test_unknown_tip_reports_none(self, paths):
+        progress = ReplicaSyncState(*paths, stat_interval=0).progress()
+        assert progress["status"] == "syncing"
+        assert progress["progress"] is None
+
+    def test_observed_tip(self, paths):
+        _write(paths[0], {"height": 25})
+        state = ReplicaSyncState(*paths, stat_interval=0)
+        state.observe_remote_height(100)
+        state.observe_remote_height(40)
+        progress = state.progress()
+        assert progress["target_height"] == 100
+        assert progress["progress"] == 25.0
+        assert progress["status"] == "synced"
+
+    def test_polls_remote_tip_in_background(self, paths):
+        polled = threading.Event()
+
+        def _tip():
+            polled.set()
+            return 200
+
+        state = ReplicaSyncState(*paths, stat_interval=0, remote_tip_fn=_tip)
+        state.progress()
+        assert polled.wait(2)
+        for _ in range(100):
+            if state.progress()["target_height"] == 200:
+                break
+            threading.Event().wait(0.01)
+        assert state.progress()["progress"] == 0.0
@@ -9,7 +9,7 @@ Covers:
   5. Admin approval lifecycle (pending → approved → executed)
   6. Idempotency: duplicate submission prevented
   7. Treasury balance check (insufficient balance)
-  8. Chain verification after write
+  8. Chain verification after write; host storage hooks
   9. Invalid wallet format rejected
   10. Payout audit trail (all required fields)
   11. Dry-run mode (no writes)
@@ -34,6 +34,8 @@ from sigbalbot_milestone_airdrop import (
     CHAIN_NETWORK_ID,
     validate_thr_address,
     _idempotency_key,
+    load_json,
+    save_json,
 )
 
 
@@ -431,6 +433,31 @@ def test_chain_tx_has_full_audit_trail(airdrop_env):
         assert "snapshot_at" in ws
 
 
+def test_chain_writes_go_through_host_hooks(airdrop_env):
+    host_chain = []
+
+    def host_load(path, default=None):
+        if path == airdrop_env["chain_file"]:
+            return [dict(tx) for tx in host_chain]
+        return load_json(path, default)
+
+    def host_save(path, data):
+        if path == airdrop_env["chain_file"]:
+            host_chain[:] = data
+        else:
+            save_json(path, data)
+
+    airdrop = SigBalBotMilestoneAirdrop(load_json=host_load, save_json=host_save, append_chain=host_chain.extend)
+    airdrop.total_wins = WINS_PER_MILESTONE - 1
+    batch_id = airdrop.record_win("sig-100", "BTC/USDT")["batch_id"]
+    airdrop.approve_allocation(batch_id)
+
+    assert airdrop.execute_approved_allocation(batch_id)["confirmed"] == 3
+    assert [tx["status"] for tx in host_chain] == ["confirmed"] * 3
+    with open(airdrop_env["chain_file"]) as f:
+        assert json.load(f) == []
+
+
 def test_chain_verification_failure_marks_failed(airdrop_env):
     airdrop = SigBalBotMilestoneAirdrop()
     airdrop.total_wins = WINS_PER_MILESTONE - 1
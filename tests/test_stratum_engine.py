@@ -0,0 +1,284 @@
+"""
+Tests for the asyncio stratum engine (stratum_engine.py).
+
+Covers:
+  1. Notify encoding round-trips to the header the node rebuilds from a
+     /submit_block payload
+  2. subscribe/authorize: unique extranonce1, THR worker names, errors
+     for unsubscribed and unauthorized submits
+  3. Share validation: accepted, duplicate, low difficulty, stale job;
+     a job whose duplicate set is full is re-issued
+  4. Block candidates go to the node; its answer decides the share result
+  5. Tip changes push a clean notify to every connection
+  6. Vardiff raises difficulty on fast shares (clamped) and eases when idle
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stratum_engine import (
+    DIFF1_TARGET,
+    ERR_DUPLICATE,
+    ERR_LOW_DIFFICULTY,
+    ERR_NOT_SUBSCRIBED,
+    ERR_STALE,
+    ERR_UNAUTHORIZED,
+    StratumJob,
+    StratumServer,
+    Vardiff,
+    difficulty_to_target,
+    swap32,
+)
+
+ADDRESS = "THR" + "ab" * 20
+EASY = 1e-9  # share target ~2**254: about one nonce in four passes
+
+
+def _sha256d(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def _template(height, target="0x0"):
+    return {"job_id": f"job_{height}", "height": height, "prev_hash": f"{height:064x}", "target": target,
+            "nbits": "0x1d00ffff"}
+
+
+class FakeNode:
+    def __init__(self, template, status=200):
+        self.templates = queue.Queue()
+        self.current = template
+        self.status = status
+        self.submitted = []
+
+    def push(self, template):
+        self.templates.put(template)
+
+    def fetch(self, since):
+        if since is not None:
+            try:
+                self.current = self.templates.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        return self.current
+
+    def submit(self, payload):
+        self.submitted.append(payload)
+        return self.status, {"status": "accepted"} if self.status == 200 else {"error": "stale"}
+
+
+class Miner:
+    """A minimal stratum client that solves shares like cgminer would."""
+
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.ids = 0
+        self.notify = None
+        self.difficulty = None
+        self.extranonce1 = None
+
+    @classmethod
+    async def connect(cls, server, worker=ADDRESS + ".rig1"):
+        miner = cls(*await asyncio.open_connection("127.0.0.1", server.port))
+        result = await miner.call("mining.subscribe", ["test/1.0"])
+        miner.extranonce1 = result["result"][1]
+        if worker:
+            assert (await miner.call("mining.authorize", [worker, "x"]))["result"] is True
+            await miner.wait_notify()
+        return miner
+
+    async def read(self):
+        message = json.loads(await asyncio.wait_for(self.reader.readline(), 5))
+        if message.get("method") == "mining.notify":
+            self.notify = message["params"]
+        elif message.get("method") == "mining.set_difficulty":
+            self.difficulty = message["params"][0]
+        return message
+
+    async def call(self, method, params):
+        self.ids += 1
+        self.writer.write(json.dumps({"id": self.ids, "method": method, "params": params}).encode() + b"\n")
+        while True:
+            message = await self.read()
+            if message.get("id") == self.ids:
+                return message
+
+    async def wait_notify(self, job_id=None):
+        while self.notify is None or (job_id is not None and self.notify[0] == job_id):
+            await self.read()
+        return self.notify
+
+    def header(self, extranonce2, nonce):
+        job_id, prevhash, coinb1, coinb2, branches, version, nbits, ntime, _ = self.notify
+        root = _sha256d(bytes.fromhex(coinb1 + self.extranonce1 + extranonce2 + coinb2))
+        for branch in branches:
+            root = _sha256d(root + bytes.fromhex(branch))
+        return (struct.pack("<I", int(version, 16)) + swap32(bytes.fromhex(prevhash)) + root
+                + struct.pack("<I", int(ntime, 16)) + struct.pack("<I", int(nbits, 16)) + struct.pack("<I", nonce))
+
+    def solve(self, target, extranonce2="00000000", above=False):
+        for nonce in range(1 << 20):
+            value = int.from_bytes(_sha256d(self.header(extranonce2, nonce)), "little")
+            if (value > target) if above else (value <= target):
+                return nonce
+        raise AssertionError("no nonce found")
+
+    async def submit(self, nonce, extranonce2="00000000", job_id=None):
+        return await self.call("mining.submit", [ADDRESS, job_id or self.notify[0], extranonce2, self.notify[7],
+                                                 f"{nonce:08x}"])
+
+
+def _run(node, body, **kwargs):
+    async def main():
+        kwargs.setdefault("start_difficulty", EASY)
+        server = StratumServer(node, host="127.0.0.1", port=0, **kwargs)
+        await server.start()
+        try:
+            await body(server)
+        finally:
+            await server.close()
+
+    asyncio.run(main())
+
+
+class TestEncoding:
+    def test_notify_matches_node_header(self):
+        job = StratumJob("1", _template(7))
+        params = job.notify_params(True)
+        assert swap32(bytes.fromhex(params[1]))[::-1].hex() == job.prev_hash
+        header, root = job.header("0a0b0c0d", "00000001", job.ntime, 42)
+        payload = job.submission(ADDRESS, root, job.ntime, 42, _sha256d(header)[::-1].hex())
+        # the node's reconstruction in _process_mining_submission
+        rebuilt = (struct.pack("<I", payload["version"]) + bytes.fromhex(payload["prev_hash"])[::-1]
+                   + bytes.fromhex(payload["merkle_root"])[::-1] + struct.pack("<I", payload["time"])
+                   + struct.pack("<I", payload["nbits"]) + struct.pack("<I", payload["nonce"]))
+        assert rebuilt == header
+        assert _sha256d(rebuilt)[::-1].hex() == payload["pow_hash"]
+        assert payload["height"] == 7
+
+    def test_difficulty_to_target(self):
+        assert difficulty_to_target(1) == DIFF1_TARGET
+        assert difficulty_to_target(2) == DIFF1_TARGET // 2
+        assert difficulty_to_target(1e-20) == (1 << 256) - 1
+
+
+class TestSession:
+    def test_subscribe_and_authorize(self):
+        async def body(server):
+            a = await Miner.connect(server)
+            b = await Miner.connect(server, worker=None)
+            assert a.extranonce1 != b.extranonce1 and len(a.extranonce1) == 8
+            assert a.difficulty == EASY and a.notify[8] is True
+            bad = await b.call("mining.authorize", ["not-an-address", "x"])
+            assert bad["error"][0] == ERR_UNAUTHORIZED
+            unauth = await b.call("mining.submit", [ADDRESS, a.notify[0], "00000000", a.notify[7], "00000000"])
+            assert unauth["error"][0] == ERR_UNAUTHORIZED
+            c = Miner(*await asyncio.open_connection("127.0.0.1", server.port))
+            early = await c.call("mining.submit", [ADDRESS, a.notify[0], "00000000", a.notify[7], "00000000"])
+            assert early["error"][0] == ERR_NOT_SUBSCRIBED
+            assert server.stats()["authorized"] == 1
+
+        _run(FakeNode(_template(1)), body)
+
+
+class TestShares:
+    def test_accept_duplicate_low_difficulty(self):
+        async def body(server):
+            miner = await Miner.connect(server)
+            target = difficulty_to_target(EASY)
+            nonce = miner.solve(target)
+            assert (await miner.submit(nonce))["result"] is True
+            assert (await miner.submit(nonce))["error"][0] == ERR_DUPLICATE
+            other = miner.solve(target, extranonce2="00000001")
+            assert (await miner.submit(other, extranonce2="00000001"))["result"] is True
+            conn = next(iter(server.connections))
+            conn.vardiff.difficulty = 1.0
+            conn.previous_difficulty = None
+            hard = miner.solve(difficulty_to_target(1.0), extranonce2="00000002", above=True)
+            assert (await miner.submit(hard, extranonce2="00000002"))["error"][0] == ERR_LOW_DIFFICULTY
+            stats = server.stats()
+            assert stats["duplicate"] == 1 and stats["low_difficulty"] == 1 and stats["shares"] >= 1
+
+        _run(FakeNode(_template(1)), body)
+
+    def test_stale_after_tip_change(self):
+        node = FakeNode(_template(1))
+
+        async def body(server):
+            miners = [await Miner.connect(server) for _ in range(20)]
+            old = miners[0].notify[0]
+            node.push(_template(2))
+            for miner in miners:
+                params = await miner.wait_notify(old)
+                assert params[8] is True and params[0] != old
+            result = await miners[0].submit(0, job_id=old)
+            assert result["error"][0] == ERR_STALE
+            assert server.stats()["stale"] == 1
+
+        _run(node, body)
+
+
+    def test_full_job_is_reissued(self):
+        async def body(server):
+            miner = await Miner.connect(server)
+            target = difficulty_to_target(EASY)
+            first = miner.notify[0]
+            for n in range(2):
+                extranonce2 = f"{n:08x}"
+                nonce = miner.solve(target, extranonce2=extranonce2)
+                assert (await miner.submit(nonce, extranonce2=extranonce2))["result"] is True
+            params = await miner.wait_notify(first)
+            assert params[0] != first and params[8] is False
+            assert len(server._shares[first]) == 2 and server._shares[params[0]] == set()
+            result = await miner.submit(0, extranonce2="00000009", job_id=first)
+            assert result["error"][0] == ERR_STALE
+            nonce = miner.solve(target)
+            assert (await miner.submit(nonce))["result"] is True
+
+        _run(FakeNode(_template(1)), body, max_job_shares=2)
+
+
+class TestBlocks:
+    def test_block_goes_to_node(self):
+        node = FakeNode(_template(5, target=hex(1 << 255)))
+
+        async def body(server):
+            miner = await Miner.connect(server)
+            nonce = miner.solve(1 << 255)
+            assert (await miner.submit(nonce))["result"] is True
+            payload = node.submitted[0]
+            assert payload["thr_address"] == ADDRESS and payload["nonce"] == nonce
+            assert payload["prev_hash"] == f"{5:064x}" and int(payload["pow_hash"], 16) <= 1 << 255
+            assert server.stats()["blocks"] == 1
+            node.status = 409
+            second = miner.solve(1 << 255, extranonce2="00000001")
+            assert (await miner.submit(second, extranonce2="00000001"))["error"][0] == ERR_STALE
+            assert server.stats()["blocks_rejected"] == 1
+
+        _run(node, body)
+
+
+class TestVardiff:
+    def test_fast_shares_raise_difficulty(self):
+        vd = Vardiff(1.0, 0.01, 1000.0, share_time=10, retarget_time=30, window=4)
+        now = vd._last_retarget
+        changes = [vd.record(now + i * 0.1) for i in range(4)]
+        assert changes[:3] == [None, None, None]
+        assert changes[3] == 4.0  # clamped to 4x
+
+    def test_idle_eases_difficulty(self):
+        vd = Vardiff(8.0, 0.01, 1000.0, share_time=10, retarget_time=30)
+        now = vd._last_retarget
+        assert vd.idle(now + 5) is None
+        assert vd.idle(now + 35) == 8.0 * 10 / 35
+        assert vd.idle(now + 35 + 600) == 8.0 * 10 / 35 * 0.25  # clamped to 1/4
+
+    def test_minimum_clamp(self):
+        vd = Vardiff(0.02, 0.01, 1000.0, share_time=10, retarget_time=30)
+        assert vd.idle(vd._last_retarget + 1000) == 0.01
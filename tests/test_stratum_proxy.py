@@ -0,0 +1,268 @@
+"""
+Tests for the asyncio stratum proxy (miner_kit/stratum_proxy.py).
+
+Covers:
+  1. One upstream job is fanned out to every client; a tip change sends a
+     clean notify with the share difficulty
+  2. Shares are validated locally; only block candidates go upstream, and
+     the upstream payload rebuilds to the same header on the node
+  3. Candidates are batched: once a tip is solved the rest are answered
+     stale without an upstream round-trip
+  4. Local stats: clients, shares/s, stale rate, served over HTTP
+  5. HttpUpstream against a local mock node (needs ``requests``)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "miner_kit"))
+
+import stratum_proxy
+from stratum_proxy import ERR_STALE, HttpUpstream, StratumProxy, swap32
+
+ADDRESS = "THR" + "cd" * 20
+
+
+def _sha256d(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def _template(height, target=1 << 250):
+    return {"job_id": f"job_{height}", "height": height, "prev_hash": f"{height:064x}", "target": hex(target),
+            "nbits": "0x1d00ffff"}
+
+
+class MockUpstream:
+    def __init__(self, template, status=200):
+        self.templates = queue.Queue()
+        self.current = template
+        self.status = status
+        self.fetches = 0
+        self.submitted = []
+
+    def push(self, template):
+        self.templates.put(template)
+
+    def fetch(self, since):
+        self.fetches += 1
+        if since is not None:
+            try:
+                self.current = self.templates.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        return self.current
+
+    def submit(self, payload):
+        self.submitted.append(payload)
+        return self.status, {"status": "accepted"} if self.status == 200 else {"error": "stale_block"}
+
+
+class Miner:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.ids = 0
+        self.notify = None
+        self.difficulty = None
+
+    @classmethod
+    async def connect(cls, proxy):
+        miner = cls(*await asyncio.open_connection("127.0.0.1", proxy.port))
+        miner.extranonce1 = (await miner.call("mining.subscribe", []))["result"][1]
+        assert (await miner.call("mining.authorize", [ADDRESS + ".rig", "x"]))["result"] is True
+        await miner.wait_notify()
+        return miner
+
+    async def read(self):
+        message = json.loads(await asyncio.wait_for(self.reader.readline(), 5))
+        if message.get("method") == "mining.notify":
+            self.notify = message["params"]
+        elif message.get("method") == "mining.set_difficulty":
+            self.difficulty = message["params"][0]
+        return message
+
+    async def call(self, method, params):
+        self.ids += 1
+        self.writer.write(json.dumps({"id": self.ids, "method": method, "params": params}).encode() + b"\n")
+        while True:
+            message = await self.read()
+            if message.get("id") == self.ids:
+                return message
+
+    async def wait_notify(self, other_than=None):
+        while self.notify is None or self.notify[0] == other_than:
+            await self.read()
+        return self.notify
+
+    def hash(self, extranonce2, nonce):
+        job_id, prevhash, coinb1, coinb2, _, version, nbits, ntime, _ = self.notify
+        root = _sha256d(bytes.fromhex(coinb1 + self.extranonce1 + extranonce2 + coinb2))
+        header = (struct.pack("<I", int(version, 16)) + swap32(bytes.fromhex(prevhash)) + root
+                  + struct.pack("<I", int(ntime, 16)) + struct.pack("<I", int(nbits, 16)) + struct.pack("<I", nonce))
+        return int.from_bytes(_sha256d(header), "little")
+
+    def solve(self, low, high, extranonce2="00000000"):
+        """A nonce whose hash lies in (low, high]."""
+        return next(n for n in range(1 << 20) if low < self.hash(extranonce2, n) <= high)
+
+    def submit(self, nonce, extranonce2="00000000"):
+        return self.call("mining.submit", [ADDRESS, self.notify[0], extranonce2, self.notify[7], f"{nonce:08x}"])
+
+
+def _run(upstream, body, **kwargs):
+    async def main():
+        proxy = StratumProxy(upstream, host="127.0.0.1", port=0, stats_port=0, **kwargs)
+        await proxy.start()
+        try:
+            await body(proxy)
+        finally:
+            await proxy.close()
+
+    asyncio.run(main())
+
+
+class TestFanOut:
+    def test_one_job_to_all_clients(self):
+        upstream = MockUpstream(_template(1))
+
+        async def body(proxy):
+            miners = [await Miner.connect(proxy) for _ in range(25)]
+            assert len({m.extranonce1 for m in miners}) == 25
+            assert {m.notify[0] for m in miners} == {"job_1"}
+            assert miners[0].difficulty == pytest.approx(stratum_proxy.DIFF1_TARGET / (16 << 250))
+            upstream.push(_template(2))
+            for miner in miners:
+                params = await miner.wait_notify("job_1")
+                assert params[0] == "job_2" and params[8] is True
+            assert swap32(bytes.fromhex(miners[0].notify[1]))[::-1].hex() == f"{2:064x}"
+            assert proxy.snapshot()["clients"] == 25
+
+        _run(upstream, body)
+
+
+class TestShares:
+    def test_shares_and_blocks(self):
+        upstream = MockUpstream(_template(1, target=1 << 248))
+
+        async def body(proxy):
+            miner = await Miner.connect(proxy)
+            share = miner.solve(1 << 248, 16 << 248)
+            assert (await miner.submit(share))["result"] is True
+            assert upstream.submitted == []
+            assert (await miner.submit(share))["error"][0] == 22
+            low = miner.solve(16 << 248, 1 << 256, extranonce2="00000001")
+            assert (await miner.submit(low, extranonce2="00000001"))["error"][0] == 23
+
+            block = miner.solve(-1, 1 << 248, extranonce2="00000002")
+            assert (await miner.submit(block, extranonce2="00000002"))["result"] is True
+            payload = upstream.submitted[0]
+            assert payload["thr_address"] == ADDRESS and payload["job_id"] == "job_1"
+            rebuilt = (struct.pack("<I", payload["version"]) + bytes.fromhex(payload["prev_hash"])[::-1]
+                       + bytes.fromhex(payload["merkle_root"])[::-1] + struct.pack("<I", payload["time"])
+                       + struct.pack("<I", payload["nbits"]) + struct.pack("<I", payload["nonce"]))
+            assert _sha256d(rebuilt)[::-1].hex() == payload["pow_hash"]
+            stats = proxy.snapshot()
+            assert stats["accepted"] == 2 and stats["blocks"] == 1 and stats["duplicate"] == 1
+            assert stats["upstream_submits"] == 1 and stats["upstream_latency_ms"] is not None
+
+        _run(upstream, body)
+
+    def test_batch_answers_rest_of_solved_tip_stale(self):
+        upstream = MockUpstream(_template(1, target=1 << 253))
+
+        async def body(proxy):
+            miners = [await Miner.connect(proxy) for _ in range(4)]
+            nonces = [m.solve(-1, 1 << 253) for m in miners]
+            results = await asyncio.gather(*(m.submit(n) for m, n in zip(miners, nonces)))
+            assert sum(1 for r in results if r["result"] is True) == 1
+            assert all(r["error"][0] == ERR_STALE for r in results if r["result"] is not True)
+            assert len(upstream.submitted) == 1
+            stats = proxy.snapshot()
+            assert stats["upstream_deduped"] == 3 and stats["stale_rate"] == 0.75
+
+        _run(upstream, body, batch_window=0.2)
+
+    def test_stale_job_and_upstream_stale(self):
+        upstream = MockUpstream(_template(1, target=1 << 253), status=409)
+
+        async def body(proxy):
+            miner = await Miner.connect(proxy)
+            nonce = miner.solve(-1, 1 << 253)
+            assert (await miner.submit(nonce))["error"][0] == ERR_STALE
+            upstream.push(_template(2))
+            old = miner.notify
+            await miner.wait_notify("job_1")
+            stale = await miner.call("mining.submit", [ADDRESS, old[0], "00000001", old[7], "00000000"])
+            assert stale["error"][0] == ERR_STALE
+            assert proxy.snapshot()["stale"] == 2
+
+        _run(upstream, body)
+
+
+class TestStats:
+    def test_stats_endpoint(self):
+        async def body(proxy):
+            miner = await Miner.connect(proxy)
+            reader, writer = await asyncio.open_connection("127.0.0.1", proxy.stats_port)
+            writer.write(b"GET / HTTP/1.1\r\nHost: x\r\n\r\n")
+            response = await asyncio.wait_for(reader.read(), 5)
+            stats = json.loads(response.split(b"\r\n\r\n", 1)[1])
+            assert stats["clients"] == 1 and stats["job_id"] == "job_1"
+            miner.writer.close()
+
+        _run(MockUpstream(_template(1)), body)
+
+
+class MockNode(BaseHTTPRequestHandler):
+    calls = []
+
+    def _reply(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        MockNode.calls.append((url.path, parse_qs(url.query)))
+        if url.path == "/api/mining/work":
+            self._reply(200, {"ok": True, **_template(3)})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        MockNode.calls.append((self.path, json.loads(self.rfile.read(length))))
+        self._reply(200, {"status": "accepted"})
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpUpstream:
+    def test_falls_back_to_polling_and_submits(self):
+        pytest.importorskip("requests")
+        server = ThreadingHTTPServer(("127.0.0.1", 0), MockNode)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            upstream = HttpUpstream(f"http://127.0.0.1:{server.server_port}", address=ADDRESS)
+            assert upstream.fetch(None)["job_id"] == "job_3"
+            assert upstream.streaming is False
+            assert upstream.submit({"nonce": 1}) == (200, {"status": "accepted"})
+            paths = [path for path, _ in MockNode.calls]
+            assert paths == ["/api/mining/work/stream", "/api/mining/work", "/api/mining/submit"]
+            assert MockNode.calls[1][1]["address"] == [ADDRESS]
+        finally:
+            server.shutdown()
@@ -0,0 +1,126 @@
+"""
+Tests for the unified token balance index (token_balance_index.py).
+
+Covers:
+  1. A wallet's native, custom-token and legacy-symbol balances in one query
+  2. sync_* diffs against the table and reports changed addresses
+  3. reconcile() picks up file edits and deletions made outside sync_*
+  4. touched_addresses() collects the wallets a block changes
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger_db import LedgerDB
+from token_balance_index import TokenBalanceIndex, touched_addresses
+
+
+@pytest.fixture
+def index():
+    with tempfile.TemporaryDirectory() as d:
+        db_path = os.path.join(d, "ledger.sqlite3")
+        ledger_dir = os.path.join(d, "custom_ledgers")
+        os.makedirs(ledger_dir)
+        db = LedgerDB()
+        with db.connection(db_path) as conn:
+            conn.execute(
+                "CREATE TABLE balances (ledger_type TEXT NOT NULL, address TEXT NOT NULL, address_norm TEXT, "
+                "balance REAL NOT NULL DEFAULT 0, updated_at INTEGER NOT NULL, PRIMARY KEY (ledger_type, address))"
+            )
+            conn.execute("INSERT INTO balances VALUES ('thr', 'thrAlice', 'THRALICE', 10, 0)")
+            conn.execute("INSERT INTO balances VALUES ('wbtc', 'THRALICE', 'THRALICE', 0.5, 0)")
+        idx = TokenBalanceIndex(
+            lambda: db.connection(db_path),
+            ledger_dir,
+            os.path.join(d, "token_balances.json"),
+            reconcile_interval=0,
+        )
+        yield idx
+        db.close_thread()
+
+
+def _write(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+class TestPortfolio:
+    def test_native_custom_and_symbol_balances(self, index):
+        index.sync_token("TOK1", {"thrAlice": 3, "thrBob": 1})
+        index.sync_symbols({"USDT": {"thralice": 7}, "JAM": {}})
+        assert index.portfolio("thrAlice") == {
+            "ledger:thr": 10.0,
+            "ledger:wbtc": 0.5,
+            "TOK1": 3.0,
+            "symbol:USDT": 7.0,
+        }
+        assert index.legacy_symbols() == ["USDT", "JAM"]
+
+    def test_exact_address_wins(self, index):
+        index.sync_token("TOK1", {"THRALICE": 1, "thrAlice": 2})
+        assert index.portfolio("thrAlice")["TOK1"] == 2.0
+        assert index.portfolio("THRALICE")["TOK1"] == 1.0
+
+    def test_unknown_wallet(self, index):
+        assert index.portfolio("thrNobody") == {}
+        assert index.portfolio("") == {}
+
+
+class TestSync:
+    def test_reports_only_changed_addresses(self, index):
+        assert index.sync_token("TOK1", {"A": 1, "B": 2}) == {"A", "B"}
+        assert index.sync_token("TOK1", {"A": 1, "B": 3}) == {"B"}
+        assert index.sync_token("TOK1", {"A": 1}) == {"B"}
+        assert index.portfolio("B") == {}
+
+    def test_dropped_symbol_is_removed(self, index):
+        index.sync_symbols({"USDT": {"A": 1}})
+        assert index.sync_symbols({}) == {"A"}
+        assert index.portfolio("A") == {}
+        assert index.legacy_symbols() == []
+
+
+class TestReconcile:
+    def test_picks_up_external_edits(self, index):
+        path = os.path.join(index.ledger_dir, "TOK2.json")
+        _write(path, {"A": 5})
+        assert index.reconcile(force=True) == {"A"}
+        assert index.portfolio("A") == {"TOK2": 5.0}
+
+        _write(path, {"A": 5, "C": 1.5})
+        assert index.reconcile(force=True) == {"C"}
+        assert index.reconcile(force=True) == set()
+
+        os.remove(path)
+        assert index.reconcile(force=True) == {"A", "C"}
+        assert index.portfolio("C") == {}
+
+    def test_legacy_file(self, index):
+        _write(index.legacy_file, {"USDT": {"A": 2}})
+        assert index.legacy_symbols() == ["USDT"]
+        assert index.portfolio("a") == {"symbol:USDT": 2.0}
+        os.remove(index.legacy_file)
+        assert index.reconcile(force=True) == {"A"}
+
+    def test_interval_throttles(self, index):
+        index.reconcile_interval = 3600
+        index.reconcile(force=True)
+        _write(os.path.join(index.ledger_dir, "TOK3.json"), {"A": 1})
+        assert index.reconcile() == set()
+        assert index.reconcile(force=True) == {"A"}
+
+
+def test_touched_addresses():
+    entries = [
+        {"from": "A", "to": "B", "amount": 1},
+        {"reward": 1, "thr_address": "M", "miner_address": "M"},
+        {"sender": "S", "recipient": ""},
+        "not-a-dict",
+    ]
+    assert touched_addresses(entries) == {"A", "B", "M", "S"}
@@ -0,0 +1,157 @@
+"""
+Tests for the indexed append-only tx log journal (tx_log_store.py).
+
+Covers:
+  1. Upsert merges by tx_id and matches the legacy load/scan/sort/rewrite
+  2. Newest-first paging without loading the whole log
+  3. Reopen and torn-tail recovery
+  4. Compaction drops superseded lines only
+  5. One-shot migration from the legacy JSON list + JSON mirror
+  6. replace_all / add_missing semantics used by save_tx_log and seeding
+  7. read_since resumes from a position() marker until the next rewrite
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tx_log_store import TxLogJournal
+
+
+def _legacy_persist(ledger, norm):
+    """Reference: the pre-journal persist_normalized_tx list algorithm."""
+    for idx, existing in enumerate(ledger):
+        if existing.get("tx_id") == norm.get("tx_id"):
+            merged = existing.copy()
+            merged.update(norm)
+            ledger[idx] = merged
+            break
+    else:
+        ledger.append(norm)
+    ledger.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+
+
+def _tx(tx_id, ts, **extra):
+    return {"tx_id": tx_id, "timestamp": f"2026-01-01 00:00:{ts:02d} UTC", "kind": "thr_transfer", **extra}
+
+
+@pytest.fixture
+def path():
+    with tempfile.TemporaryDirectory() as d:
+        yield os.path.join(d, "tx_ledger.journal.jsonl")
+
+
+class TestUpsert:
+    def test_status_update_is_in_place(self, path):
+        journal = TxLogJournal(path)
+        journal.upsert(_tx("T1", 1, status="pending", amount=5))
+        merged = journal.upsert({"tx_id": "T1", "status": "confirmed"})
+        assert merged["status"] == "confirmed"
+        assert merged["amount"] == 5
+        assert len(journal) == 1
+        assert journal.get("T1") == merged
+
+    def test_matches_legacy_ordering(self, path):
+        rng = random.Random(7)
+        journal = TxLogJournal(path, compact_min_dead_bytes=4096)
+        legacy = []
+        for i in range(1500):
+            norm = _tx(f"T{rng.randint(0, 200)}", rng.randint(0, 59), status=rng.choice(["pending", "confirmed"]), n=i)
+            _legacy_persist(legacy, dict(norm))
+            journal.upsert(norm)
+        records = journal.load_all()
+        assert [r["timestamp"] for r in records] == [r["timestamp"] for r in legacy]
+        assert sorted(records, key=lambda r: r["tx_id"]) == sorted(legacy, key=lambda r: r["tx_id"])
+
+    def test_records_without_tx_id_are_kept(self, path):
+        journal = TxLogJournal(path)
+        journal.upsert({"timestamp": "1", "note": "a"})
+        journal.upsert({"timestamp": "2", "note": "b"})
+        assert [r["note"] for r in TxLogJournal(path).load_all()] == ["b", "a"]
+
+
+class TestPaging:
+    def test_pages_are_newest_first_slices(self, path):
+        journal = TxLogJournal(path)
+        journal.upsert_many(_tx(f"T{i}", i) for i in range(50))
+        everything = journal.load_all()
+        assert everything[0]["tx_id"] == "T49"
+        assert list(journal.iter_page(0, 10)) == everything[:10]
+        assert list(journal.iter_page(45, 10)) == everything[45:]
+        assert list(journal.iter_page(60, 10)) == []
+
+
+class TestRecovery:
+    def test_reopen_and_torn_tail(self, path):
+        journal = TxLogJournal(path)
+        journal.upsert_many([_tx("A", 1), _tx("B", 2)])
+        with open(path, "ab") as f:
+            f.write(b'["C",{"tx_id":"C"')
+        reopened = TxLogJournal(path)
+        assert [r["tx_id"] for r in reopened.load_all()] == ["B", "A"]
+        reopened.upsert(_tx("C", 3))
+        assert [r["tx_id"] for r in TxLogJournal(path).load_all()] == ["C", "B", "A"]
+
+    def test_compaction_keeps_live_records(self, path):
+        journal = TxLogJournal(path, compact_min_dead_bytes=1 << 30)
+        for i in range(100):
+            journal.upsert(_tx("HOT", 5, n=i))
+        journal.upsert(_tx("COLD", 1))
+        before = os.path.getsize(path)
+        expected = journal.load_all()
+        journal.compact()
+        assert os.path.getsize(path) < before / 10
+        assert TxLogJournal(path).load_all() == expected
+
+
+class TestMigrationAndBulk:
+    def test_one_shot_migration_and_mirror(self, path):
+        legacy_file = os.path.join(os.path.dirname(path), "tx_ledger.json")
+        legacy = [_tx("B", 2), _tx("A", 1), _tx("B", 0, stale=True)]
+        with open(legacy_file, "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+        journal = TxLogJournal(path)
+        assert journal.migrate_from_json(legacy_file) == 2
+        assert journal.migrate_from_json(legacy_file) == 0
+        assert journal.load_all() == legacy[:2]
+
+        mirror = os.path.join(os.path.dirname(path), "mirror.json")
+        journal.write_json_snapshot(mirror)
+        with open(mirror, "r", encoding="utf-8") as f:
+            assert json.load(f) == legacy[:2]
+
+    def test_replace_all_and_add_missing(self, path):
+        journal = TxLogJournal(path)
+        journal.upsert_many([_tx("A", 1), _tx("B", 2)])
+        journal.replace_all([_tx("C", 3)])
+        assert [r["tx_id"] for r in journal.load_all()] == ["C"]
+        assert journal.add_missing([_tx("C", 9), _tx("D", 4), _tx("D", 5)]) == 1
+        assert journal.get("C")["timestamp"].endswith("03 UTC")
+        assert "D" in journal and "Z" not in journal
+
+
+class TestReadSince:
+    def test_resumes_from_position(self, path):
+        journal = TxLogJournal(path)
+        journal.upsert(_tx("A", 1))
+        mark = journal.position()
+        journal.upsert(_tx("B", 2))
+        journal.upsert({"tx_id": "A", "status": "confirmed"})
+        lines = journal.read_since(mark)
+        assert [key for key, _ in lines] == ["B", "A"]
+        assert lines[1][1]["status"] == "confirmed"
+        assert journal.read_since(journal.position()) == []
+        assert [key for key, _ in journal.read_since((0, 0), stop=mark)] == ["A"]
+
+    def test_rewrite_invalidates_position(self, path):
+        journal = TxLogJournal(path)
+        journal.upsert_many([_tx("A", 1), _tx("B", 2)])
+        mark = journal.position()
+        journal.replace_all([_tx("C", 3), _tx("D", 4), _tx("E", 5)])
+        assert journal.read_since(mark) is None
@@ -0,0 +1,190 @@
+"""
+Tests for the per-address wallet history index (wallet_history_index.py).
+
+Covers:
+  1. Chain entries win over tx_log records with the same tx_id
+  2. Incremental catch-up from a ChainStore and a TxLogJournal
+  3. tx_log upserts replace the previous version of a record
+  4. Rewrites of either source trigger a re-import
+  5. Keyset pages walk the history in timestamp order without gaps
+  6. Category / date filters and per-category totals
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_store import ChainStore
+from ledger_db import LedgerDB
+from tx_log_store import TxLogJournal
+from wallet_history_index import (
+    JournalSource,
+    JsonListSource,
+    StoreChainSource,
+    WalletHistoryIndex,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+def _project(tx):
+    """Minimal stand-in for server._wallet_history_projection."""
+    if tx.get("reward") is not None:
+        miner = tx["thr_address"]
+        item = {"kind": "mining_reward", "amount": tx["reward"], "timestamp": tx.get("timestamp")}
+        return [{
+            "address": miner, "item_key": f"reward:{tx['block_hash']}:{miner}", "category": "mining",
+            "direction": "received", "amount": tx["reward"], "ts": float(tx.get("ts", 0)),
+            "ts_text": tx.get("timestamp"), "item": item,
+        }]
+    rows = []
+    for party in {tx.get("from"), tx.get("to")} - {None}:
+        rows.append({
+            "address": party, "item_key": None, "category": tx.get("type", "thr"),
+            "direction": "received" if party == tx.get("to") else "sent",
+            "amount": tx.get("amount", 0), "ts": float(tx.get("ts", 0)), "ts_text": tx.get("timestamp"),
+        })
+    return rows
+
+
+def _tx(tx_id, ts, frm="thrA", to="thrB", **extra):
+    return {"tx_id": tx_id, "from": frm, "to": to, "amount": 1.0, "ts": ts, "timestamp": f"2026-01-{ts:02d}", **extra}
+
+
+@pytest.fixture
+def env():
+    with tempfile.TemporaryDirectory() as d:
+        db = LedgerDB()
+        store = ChainStore(os.path.join(d, "chain"), fsync=False)
+        journal = TxLogJournal(os.path.join(d, "tx_log.jsonl"))
+        index = WalletHistoryIndex(lambda: db.connection(os.path.join(d, "ledger.sqlite3")), _project)
+
+        def sync(rebuild=True):
+            return index.sync(StoreChainSource(store), JournalSource(journal), rebuild=rebuild)
+
+        yield index, store, journal, sync
+        db.close_thread()
+
+
+def _ids(index, address, **kwargs):
+    pairs, _ = index.page(address, limit=100, **kwargs)
+    return [tx.get("tx_id") or row["item"]["kind"] for tx, row in pairs]
+
+
+class TestMaintenance:
+    def test_chain_wins_over_tx_log(self, env):
+        index, store, journal, sync = env
+        journal.upsert(_tx("T1", 1, amount=9.0, status="pending"))
+        store.append_many([_tx("T1", 1)])
+        sync()
+        pairs, _ = index.page("THRA")
+        assert len(pairs) == 1
+        assert pairs[0][0]["amount"] == 1.0
+        assert pairs[0][1]["direction"] == "sent"
+
+    def test_incremental_catch_up(self, env):
+        index, store, journal, sync = env
+        store.append_many([_tx("T1", 1)])
+        sync()
+        store.append_many([_tx("T2", 2), {"reward": 8.0, "thr_address": "thrA", "block_hash": "h1", "ts": 3}])
+        journal.upsert(_tx("T3", 4, to="thrC"))
+        assert sync(rebuild=False)
+        assert _ids(index, "thra") == ["T3", "mining_reward", "T2", "T1"]
+        assert _ids(index, "THRC") == ["T3"]
+
+    def test_tx_log_upsert_replaces_previous_version(self, env):
+        index, store, journal, sync = env
+        journal.upsert(_tx("T1", 1, to="thrB"))
+        sync()
+        journal.upsert({"tx_id": "T1", "to": "thrC"})
+        sync(rebuild=False)
+        assert _ids(index, "thrB") == []
+        assert _ids(index, "thrC") == ["T1"]
+
+    def test_rewrites_reimport(self, env):
+        index, store, journal, sync = env
+        store.append_many([_tx("T1", 1)])
+        journal.upsert(_tx("T2", 2))
+        sync()
+        store.rewrite([_tx("T9", 9)])
+        assert not sync(rebuild=False)
+        sync()
+        assert _ids(index, "thrA") == ["T9", "T2"]
+        journal.replace_all([_tx("T5", 5)])
+        sync()
+        assert _ids(index, "thrA") == ["T9", "T5"]
+
+    def test_json_sources(self):
+        with tempfile.TemporaryDirectory() as d:
+            chain_file = os.path.join(d, "chain.json")
+            with open(chain_file, "w", encoding="utf-8") as f:
+                json.dump([_tx("T1", 1), _tx("T1", 2)], f)
+
+            def _load():
+                with open(chain_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+
+            db = LedgerDB()
+            index = WalletHistoryIndex(lambda: db.connection(os.path.join(d, "ledger.sqlite3")), _project)
+            tx_log = JsonListSource(os.path.join(d, "missing.json"), list)
+            index.sync(JsonListSource(chain_file, _load), tx_log)
+            pairs, _ = index.page("thrB")
+            assert [tx["ts"] for tx, _ in pairs] == [1]
+            db.close_thread()
+
+
+class TestReads:
+    def test_keyset_pages(self, env):
+        index, store, journal, sync = env
+        store.append_many([_tx(f"T{i}", i % 7) for i in range(40)])
+        sync()
+        expected = _ids(index, "thrA")
+        walked, after = [], None
+        while True:
+            pairs, after = index.page("thrA", limit=6, after=after)
+            walked += [tx["tx_id"] for tx, _ in pairs]
+            if after is None:
+                break
+        assert walked == expected
+        assert len(walked) == 40
+        ts = [int(t[1:]) % 7 for t in walked]
+        assert ts == sorted(ts, reverse=True)
+
+    def test_offset_pages_match_keyset(self, env):
+        index, store, journal, sync = env
+        store.append_many([_tx(f"T{i}", i) for i in range(10)])
+        sync()
+        first, after = index.page("thrA", limit=4)
+        second, _ = index.page("thrA", limit=4, after=after)
+        by_offset, _ = index.page("thrA", limit=4, offset=4)
+        assert second == by_offset
+
+    def test_filters_and_totals(self, env):
+        index, store, journal, sync = env
+        store.append_many([
+            _tx("T1", 1, type="music_tip", amount=2.0),
+            _tx("T2", 2, frm="thrB", to="thrA", amount=3.0),
+            _tx("T3", 3, amount=4.0),
+        ])
+        sync()
+        assert _ids(index, "thrA", category="MUSIC_TIP") == ["T1"]
+        assert _ids(index, "thrA", ts_from="2026-01-02", ts_to="2026-01-02") == ["T2"]
+        totals = {(c, d): (n, amt) for c, d, n, amt in index.totals("thrA")}
+        assert totals == {("music_tip", "sent"): (1, 2.0), ("thr", "received"): (1, 3.0), ("thr", "sent"): (1, 4.0)}
+
+    def test_entries_for_aliases(self, env):
+        index, store, journal, sync = env
+        store.append_many([_tx("T1", 1), _tx("T2", 2, frm="thrX", to="thrY"),
+                           {"reward": 8.0, "thr_address": "thrA", "block_hash": "h", "ts": 3}])
+        sync()
+        assert [e["tx_id"] for e in index.entries_for({"THRA", "thry"})] == ["T1", "T2"]
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(1700000000.25, 42)) == (1700000000.25, 42)
+    assert decode_cursor("garbage") is None
@@ -0,0 +1,296 @@
+"""
+ThronosChain Token Balance Index — one-query wallet portfolios
+
+``get_wallet_balances`` used to read each native ledger separately and then
+load *every* custom token's ledger file (``custom_ledgers/<token_id>.json``)
+plus ``token_balances.json`` just to pick out one wallet's entries, so a
+portfolio request cost tokens x holders.  This index mirrors those files
+into a ``token_balances`` table in the ledger DB:
+
+  token_balances(token_id, address, address_norm, balance, updated_at)
+
+``token_id`` is the custom token id for custom ledgers and ``symbol:<SYM>``
+for entries of the legacy per-symbol ``token_balances.json``.  A wallet's
+whole portfolio (native ``balances`` rows included) is then one query over
+the ``address_norm`` indexes.
+
+The JSON files stay authoritative: writers call ``sync_token`` /
+``sync_symbols`` after saving, which diff against the table and return the
+addresses whose balances changed (for cache invalidation).  ``reconcile``
+re-imports files whose ``(mtime, size)`` no longer match what was indexed,
+so edits made outside those writers are picked up within
+``reconcile_interval`` seconds.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+SYMBOL_PREFIX = "symbol:"
+NATIVE_PREFIX = "ledger:"
+NATIVE_LEDGER_TYPES = ("thr", "wbtc", "l2e")
+LEGACY_SOURCE = "__token_balances__"
+
+
+def _norm(address) -> str:
+    return str(address or "").strip().upper()
+
+
+def _stat_key(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _read_json(path: str, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _as_balance(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBalanceIndex:
+    """SQLite mirror of custom-token and legacy per-symbol balance files."""
+
+    def __init__(
+        self,
+        connect: Callable,
+        ledger_dir: str,
+        legacy_file: str,
+        reconcile_interval: float = 60.0,
+    ):
+        self._connect = connect
+        self.ledger_dir = ledger_dir
+        self.legacy_file = legacy_file
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.RLock()
+        self._schema_ready = False
+        self._reconciled_at = float("-inf")
+        self._symbols: Optional[list] = None
+
+    # ─── schema ─────────────────────────────────────────────────────────
+
+    def ensure_schema(self, conn) -> None:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS token_balances (
+                token_id TEXT NOT NULL,
+                address TEXT NOT NULL,
+                address_norm TEXT NOT NULL,
+                balance REAL NOT NULL DEFAULT 0,
+                updated_at INTEGER NOT NULL,
+                PRIMARY KEY (token_id, address)
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_token_balances_norm ON token_balances(address_norm, token_id)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS token_balance_sources (
+                source TEXT PRIMARY KEY,
+                mtime_ns INTEGER,
+                size INTEGER
+            )
+            """
+        )
+
+    def _ready(self, conn) -> None:
+        if not self._schema_ready:
+            self.ensure_schema(conn)
+            self._schema_ready = True
+
+    # ─── writes ─────────────────────────────────────────────────────────
+
+    def _sync_rows(self, conn, token_id: str, ledger: dict) -> Set[str]:
+        wanted: Dict[str, float] = {}
+        for address, value in (ledger or {}).items():
+            balance = _as_balance(value)
+            if address and balance is not None:
+                wanted[str(address)] = balance
+        current = {
+            row[0]: row[1]
+            for row in conn.execute("SELECT address, balance FROM token_balances WHERE token_id = ?", (token_id,))
+        }
+        now_ts = int(time.time())
+        upserts = [
+            (token_id, address, _norm(address), balance, now_ts)
+            for address, balance in wanted.items()
+            if current.get(address) != balance
+        ]
+        removed = [address for address in current if address not in wanted]
+        if upserts:
+            conn.executemany(
+                """
+                INSERT INTO token_balances (token_id, address, address_norm, balance, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(token_id, address)
+                DO UPDATE SET balance = excluded.balance, updated_at = excluded.updated_at
+                """,
+                upserts,
+            )
+        if removed:
+            conn.executemany(
+                "DELETE FROM token_balances WHERE token_id = ? AND address = ?",
+                [(token_id, address) for address in removed],
+            )
+        return {row[1] for row in upserts} | set(removed)
+
+    def _record_source(self, conn, source: str, path: str) -> None:
+        key = _stat_key(path)
+        if key is None:
+            conn.execute("DELETE FROM token_balance_sources WHERE source = ?", (source,))
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO token_balance_sources (source, mtime_ns, size) VALUES (?, ?, ?)",
+            (source, key[0], key[1]),
+        )
+
+    def _ledger_path(self, token_id: str) -> str:
+        return os.path.join(self.ledger_dir, f"{token_id}.json")
+
+    def sync_token(self, token_id: str, ledger: dict) -> Set[str]:
+        """Mirror one custom token ledger; returns addresses whose balance changed."""
+        if not token_id:
+            return set()
+        with self._lock, self._connect() as conn:
+            self._ready(conn)
+            changed = self._sync_rows(conn, str(token_id), ledger)
+            self._record_source(conn, str(token_id), self._ledger_path(str(token_id)))
+            return changed
+
+    def sync_symbols(self, balances: dict) -> Set[str]:
+        """Mirror the legacy ``{symbol: {address: balance}}`` file."""
+        with self._lock, self._connect() as conn:
+            self._ready(conn)
+            changed = self._sync_symbols(conn, balances if isinstance(balances, dict) else {})
+            self._record_source(conn, LEGACY_SOURCE, self.legacy_file)
+            return changed
+
+    def _sync_symbols(self, conn, balances: dict) -> Set[str]:
+        changed: Set[str] = set()
+        known = {
+            row[0]
+            for row in conn.execute("SELECT DISTINCT token_id FROM token_balances WHERE token_id LIKE ?", (SYMBOL_PREFIX + "%",))
+        }
+        for symbol, ledger in balances.items():
+            token_id = SYMBOL_PREFIX + str(symbol)
+            known.discard(token_id)
+            changed |= self._sync_rows(conn, token_id, ledger if isinstance(ledger, dict) else {})
+        for token_id in known:
+            changed |= self._sync_rows(conn, token_id, {})
+        self._symbols = [str(symbol) for symbol in balances]
+        return changed
+
+    def legacy_symbols(self) -> list:
+        """Symbols of the legacy per-symbol file (reported even when not held)."""
+        with self._lock:
+            if self._symbols is None:
+                self.reconcile()
+            if self._symbols is None:
+                with self._connect() as conn:
+                    self._ready(conn)
+                    self._symbols = sorted(
+                        row[0][len(SYMBOL_PREFIX):]
+                        for row in conn.execute(
+                            "SELECT DISTINCT token_id FROM token_balances WHERE token_id LIKE ?", (SYMBOL_PREFIX + "%",)
+                        )
+                    )
+            return list(self._symbols)
+
+    def reconcile(self, force: bool = False) -> Set[str]:
+        """Re-import balance files changed outside ``sync_*``; returns changed addresses."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._reconciled_at < self.reconcile_interval:
+                return set()
+            self._reconciled_at = now
+            with self._connect() as conn:
+                self._ready(conn)
+                indexed = {
+                    row[0]: (row[1], row[2])
+                    for row in conn.execute("SELECT source, mtime_ns, size FROM token_balance_sources")
+                }
+                changed: Set[str] = set()
+                on_disk = {}
+                try:
+                    names = os.listdir(self.ledger_dir)
+                except OSError:
+                    names = []
+                for name in names:
+                    if name.endswith(".json"):
+                        on_disk[name[:-5]] = _stat_key(os.path.join(self.ledger_dir, name))
+                for token_id, key in on_disk.items():
+                    if key is not None and indexed.get(token_id) != key:
+                        ledger = _read_json(self._ledger_path(token_id), {})
+                        changed |= self._sync_rows(conn, token_id, ledger if isinstance(ledger, dict) else {})
+                        self._record_source(conn, token_id, self._ledger_path(token_id))
+                for source in indexed:
+                    if source != LEGACY_SOURCE and source not in on_disk:
+                        changed |= self._sync_rows(conn, source, {})
+                        conn.execute("DELETE FROM token_balance_sources WHERE source = ?", (source,))
+                legacy_key = _stat_key(self.legacy_file)
+                if indexed.get(LEGACY_SOURCE) != legacy_key and (legacy_key is not None or LEGACY_SOURCE in indexed):
+                    balances = _read_json(self.legacy_file, {}) if legacy_key is not None else {}
+                    changed |= self._sync_symbols(conn, balances if isinstance(balances, dict) else {})
+                    self._record_source(conn, LEGACY_SOURCE, self.legacy_file)
+            if changed:
+                logger.info("token_balance_index: reconciled %d changed balances", len(changed))
+            return changed
+
+    # ─── reads ──────────────────────────────────────────────────────────
+
+    def portfolio(self, address: str) -> Dict[str, float]:
+        """
+        Every balance held by ``address`` in one query: ``ledger:<type>``
+        for native ledgers, custom token ids and ``symbol:<SYM>`` entries.
+        An exact address row wins over a case-insensitive match.
+        """
+        if not address:
+            return {}
+        self.reconcile()
+        norm = _norm(address)
+        placeholders = ",".join("?" for _ in NATIVE_LEDGER_TYPES)
+        with self._connect() as conn:
+            self._ready(conn)
+            rows = conn.execute(
+                f"""
+                SELECT ? || ledger_type AS token_id, address, balance FROM balances
+                WHERE ledger_type IN ({placeholders}) AND address_norm = ?
+                UNION ALL
+                SELECT token_id, address, balance FROM token_balances WHERE address_norm = ?
+                """,
+                (NATIVE_PREFIX, *NATIVE_LEDGER_TYPES, norm, norm),
+            ).fetchall()
+        out: Dict[str, float] = {}
+        for token_id, row_address, balance in rows:
+            if row_address == address or token_id not in out:
+                out[token_id] = float(balance)
+        return out
+
+
+def touched_addresses(entries: Iterable) -> Set[str]:
+    """Wallet addresses referenced by chain entries (senders, recipients, miners)."""
+    out: Set[str] = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        for field in ("from", "to", "thr_address", "sender", "recipient", "miner_address"):
+            value = entry.get(field)
+            if isinstance(value, str) and value:
+                out.add(value)
+    return out
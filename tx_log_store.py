@@ -0,0 +1,328 @@
+"""
+ThronosChain TX Log Journal — indexed, append-only store for tx_ledger.json
+
+The normalized tx log (``TX_LOG_FILE``) used to be loaded, linearly scanned
+for a matching tx_id, fully re-sorted by timestamp and rewritten for every
+mining reward and transfer.  This journal keeps the same records in an
+append-only JSON-lines file:
+
+  - every upsert appends one line ``[key, record]``; the newest line for a
+    key wins, so status updates are in-place upserts, not list rewrites
+  - ``key -> (offset, length)`` gives O(1) lookup by tx_id
+  - a timestamp-ordered key index replaces the full sort; records with equal
+    timestamps keep insertion order
+  - superseded lines are dropped by compaction once they outweigh live data
+
+Records without a tx_id are kept (the legacy list never deduped them) under
+a synthetic key that never leaves this module.
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import zlib
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+COMPACT_MIN_DEAD_BYTES = 1 << 20
+POSITION_CHECK_BYTES = 256
+_ANON_PREFIX = "\x00anon:"
+
+
+def _ts_key(record) -> str:
+    ts = record.get("timestamp", "") if isinstance(record, dict) else ""
+    return "" if ts is None else str(ts)
+
+
+def _encode_line(key: str, record) -> bytes:
+    return (json.dumps([key, record], ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class TxLogJournal:
+    """Append-only tx log with a tx_id index and timestamp ordering."""
+
+    def __init__(self, path: str, compact_min_dead_bytes: int = COMPACT_MIN_DEAD_BYTES):
+        self.path = path
+        self.compact_min_dead_bytes = compact_min_dead_bytes
+        self._lock = threading.RLock()
+        self._open()
+
+    # ─── open / recovery ───────────────────────────────────────────────
+
+    def _reset(self) -> None:
+        self._locs: dict = {}      # key -> (offset, length, order_key)
+        self._order: List[tuple] = []  # sorted (timestamp, -seq, key)
+        self._seq = 0
+        self._anon = 0
+        self._size = 0
+        self._live_bytes = 0
+
+    def _open(self) -> None:
+        self._reset()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        pos = 0
+        for raw in data.splitlines(keepends=True):
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                key, record = json.loads(raw)
+            except (ValueError, TypeError):
+                break
+            self._index(key, record, pos, len(raw))
+            pos += len(raw)
+        if pos < len(data):
+            logger.warning("tx_log_store: truncating torn tail of %s at offset %d", self.path, pos)
+            with open(self.path, "r+b") as f:
+                f.truncate(pos)
+        self._size = pos
+
+    def _index(self, key: str, record, off: int, length: int) -> None:
+        prev = self._locs.get(key)
+        if prev is not None:
+            _, prev_len, order_key = prev
+            self._live_bytes -= prev_len
+            if order_key[0] != _ts_key(record):
+                self._order.pop(bisect.bisect_left(self._order, order_key))
+                order_key = (_ts_key(record), order_key[1], key)
+                bisect.insort(self._order, order_key)
+        else:
+            if key.startswith(_ANON_PREFIX):
+                self._anon = max(self._anon, int(key[len(_ANON_PREFIX):]) + 1)
+            self._seq += 1
+            order_key = (_ts_key(record), -self._seq, key)
+            bisect.insort(self._order, order_key)
+        self._locs[key] = (off, length, order_key)
+        self._live_bytes += length
+
+    # ─── reads ──────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._locs)
+
+    def __contains__(self, tx_id) -> bool:
+        return bool(tx_id) and str(tx_id) in self._locs
+
+    def _read(self, f, key: str):
+        off, length, _ = self._locs[key]
+        f.seek(off)
+        return json.loads(f.read(length))[1]
+
+    def get(self, tx_id: str) -> Optional[dict]:
+        with self._lock:
+            if tx_id not in self:
+                return None
+            with open(self.path, "rb") as f:
+                return self._read(f, str(tx_id))
+
+    def iter_page(self, offset: int = 0, limit: Optional[int] = None) -> Iterator[dict]:
+        """Yield records newest-first (legacy list order), skipping ``offset`` records."""
+        with self._lock:
+            total = len(self._order)
+            start = total - 1 - max(int(offset), 0)
+            stop = -1 if limit is None else max(start - int(limit), -1)
+            keys = [self._order[i][2] for i in range(start, stop, -1)]
+            if not keys:
+                return
+            if limit is None or len(keys) * 4 > total:
+                with open(self.path, "rb") as f:
+                    data = f.read(self._size)
+                records = []
+                for key in keys:
+                    off, length, _ = self._locs[key]
+                    records.append(json.loads(data[off:off + length])[1])
+            else:
+                with open(self.path, "rb") as f:
+                    records = [self._read(f, key) for key in keys]
+        yield from records
+
+    def load_all(self) -> list:
+        return list(self.iter_page(0))
+
+    def _tail_crc(self, end: int) -> int:
+        if end <= 0:
+            return 0
+        start = max(0, end - POSITION_CHECK_BYTES)
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return zlib.crc32(f.read(end - start))
+
+    def position(self) -> tuple:
+        """Resume marker for ``read_since``: ``(size, crc32 of the bytes before it)``."""
+        with self._lock:
+            return (self._size, self._tail_crc(self._size))
+
+    def read_since(self, position, stop=None) -> Optional[List[tuple]]:
+        """
+        ``(key, record)`` lines written after ``position`` and up to ``stop``
+        (both from ``position()``), oldest first.  A later line for the same
+        key supersedes an earlier one.  Returns None when the journal was
+        rewritten (``replace_all`` / compaction) since ``position``.
+        """
+        with self._lock:
+            off, crc = int(position[0]), int(position[1])
+            end = self._size if stop is None else int(stop[0])
+            if off > end or end > self._size or self._tail_crc(off) != crc:
+                return None
+            if off == end:
+                return []
+            with open(self.path, "rb") as f:
+                f.seek(off)
+                data = f.read(end - off)
+        out = []
+        for raw in data.splitlines():
+            try:
+                key, record = json.loads(raw)
+            except (ValueError, TypeError):
+                return None
+            out.append((key, record))
+        return out
+
+    # ─── writes ─────────────────────────────────────────────────────────
+
+    def _key_for(self, record) -> str:
+        tx_id = record.get("tx_id") if isinstance(record, dict) else None
+        if tx_id:
+            return str(tx_id)
+        key = f"{_ANON_PREFIX}{self._anon}"
+        self._anon += 1
+        return key
+
+    def _append(self, items) -> None:
+        lines = [(key, record, _encode_line(key, record)) for key, record in items]
+        if not lines:
+            return
+        with open(self.path, "ab") as f:
+            f.write(b"".join(raw for _, _, raw in lines))
+        off = self._size
+        for key, record, raw in lines:
+            self._index(key, record, off, len(raw))
+            off += len(raw)
+        self._size = off
+        self._maybe_compact()
+
+    def upsert(self, record: dict, merge: bool = True) -> dict:
+        """Insert ``record`` or update the existing record with the same tx_id."""
+        return self.upsert_many([record], merge=merge)[0]
+
+    def upsert_many(self, records, merge: bool = True) -> List[dict]:
+        with self._lock:
+            items = []
+            pending: dict = {}
+            out = []
+            with open(self.path, "rb") if self._locs else _NullFile() as f:
+                for record in records:
+                    key = self._key_for(record)
+                    if merge and key in pending:
+                        merged = dict(pending[key])
+                        merged.update(record)
+                        record = merged
+                    elif merge and key in self._locs:
+                        merged = self._read(f, key)
+                        merged.update(record)
+                        record = merged
+                    pending[key] = record
+                    items.append((key, record))
+                    out.append(record)
+            self._append(items)
+            return out
+
+    def add_missing(self, records) -> int:
+        """Append records whose tx_id is not yet in the journal; returns count added."""
+        with self._lock:
+            seen = set()
+            fresh = []
+            for record in records:
+                tx_id = record.get("tx_id") if isinstance(record, dict) else None
+                if tx_id and (str(tx_id) in self._locs or tx_id in seen):
+                    continue
+                if tx_id:
+                    seen.add(tx_id)
+                fresh.append(record)
+            self._append((self._key_for(r), r) for r in fresh)
+            return len(fresh)
+
+    def replace_all(self, records: list) -> None:
+        """Replace the log with ``records`` (legacy newest-first list order)."""
+        with self._lock:
+            self._rewrite([(self._key_for(r), r) for r in records])
+
+    def _rewrite(self, items) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                for key, record in items:
+                    f.write(_encode_line(key, record))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._open()
+
+    def _maybe_compact(self) -> None:
+        dead = self._size - self._live_bytes
+        if dead < self.compact_min_dead_bytes or dead < self._live_bytes:
+            return
+        self.compact()
+
+    def compact(self) -> None:
+        """Drop superseded lines, keeping live records in insertion order."""
+        with self._lock:
+            with open(self.path, "rb") as f:
+                data = f.read(self._size)
+            by_seq = sorted(self._locs.items(), key=lambda kv: -kv[1][2][1])
+            items = []
+            for key, (off, length, _) in by_seq:
+                items.append(json.loads(data[off:off + length]))
+            before = self._size
+            self._rewrite(items)
+            logger.info("tx_log_store: compacted %s (%d -> %d bytes)", self.path, before, self._size)
+
+    # ─── migration / mirror ─────────────────────────────────────────────
+
+    def migrate_from_json(self, path: str) -> int:
+        """Import a legacy newest-first JSON list once, when the journal is empty."""
+        with self._lock:
+            if self._locs or os.path.exists(self.path) and os.path.getsize(self.path):
+                return 0
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    records = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                records = []
+            if not isinstance(records, list):
+                return 0
+            records = [r for r in records if isinstance(r, dict)]
+            # Legacy list: later duplicates of a tx_id were never reachable.
+            self.add_missing(records)
+            logger.info("tx_log_store: migrated %d records from %s", len(self._locs), path)
+            return len(self._locs)
+
+    def write_json_snapshot(self, path: str) -> None:
+        """Write the legacy newest-first JSON list for file-based readers."""
+        records = self.load_all()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+class _NullFile:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
@@ -0,0 +1,430 @@
+"""
+ThronosChain Wallet History Index — per-address history with keyset pages
+
+``_collect_wallet_history_transactions`` used to load the whole chain and
+tx log, merge and dedupe them, and test every entry against the requested
+address on each history request.  This index keeps one row per
+(address, history item) in the ledger DB instead:
+
+  wallet_history_sources(source_key, origin, log_key, ordinal, payload)
+      one row per deduped chain / tx_log entry (chain entries win over
+      tx_log records with the same tx_id, first occurrence wins otherwise)
+  wallet_history(address_norm, item_key, source_key, ts, ts_text, ordinal,
+                 category, category_key, direction, amount, item)
+      one row per party of an entry, with the category and direction for
+      that party computed once at index time
+
+Rows are ordered by ``(ts DESC, ordinal ASC)`` — the legacy timestamp sort
+with merge order breaking ties — so a page is an index range scan and
+``after`` cursors (``encode_cursor``) make page N cost O(page size).
+
+The index follows its sources rather than being written directly:
+
+  - a ``ChainStore`` is followed by ``(generation, length)``: new entries are
+    applied on the next ``sync``, a store rewrite rebuilds the index
+  - a ``TxLogJournal`` is followed by its ``position()``: lines written since
+    are applied (an upsert replaces the previous version of its record), a
+    journal rewrite re-imports the tx_log side
+  - plain JSON files are re-imported when their ``(mtime, size)`` changes
+
+``project(entry)`` (supplied by the server) turns one chain / tx_log entry
+into its per-address rows, so the categorisation rules live in one place.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TX_LOG_ORDINAL_BASE = 1 << 40
+_META_KEY = "sources"
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _norm(address) -> str:
+    return str(address or "").strip().upper()
+
+
+def encode_cursor(ts: float, ordinal: int) -> str:
+    """Opaque ``after`` cursor for the row sorted at ``(ts, ordinal)``."""
+    return f"{float(ts)!r}:{int(ordinal)}"
+
+
+def decode_cursor(cursor) -> Optional[Tuple[float, int]]:
+    try:
+        ts, ordinal = str(cursor).rsplit(":", 1)
+        return float(ts), int(ordinal)
+    except (TypeError, ValueError):
+        return None
+
+
+# ─── sources ────────────────────────────────────────────────────────────────
+
+
+class StoreChainSource:
+    """Chain entries from a ``ChainStore``, resumable by sequence number."""
+
+    def __init__(self, store):
+        self.store = store
+        self._token = ["store", store.generation, len(store)]
+
+    def token(self) -> list:
+        return self._token
+
+    def since(self, token) -> Optional[list]:
+        if not token or token[0] != "store" or token[1] != self._token[1] or token[2] > self._token[2]:
+            return None
+        return self._range(token[2])
+
+    def all(self) -> list:
+        return self._range(0)
+
+    def _range(self, start: int) -> list:
+        return list(enumerate(self.store.iter_range(start, self._token[2]), start))
+
+
+class JournalSource:
+    """tx_log records from a ``TxLogJournal``, resumable by journal position."""
+
+    def __init__(self, journal):
+        self.journal = journal
+        position = journal.position()
+        self._token = ["journal", position[0], position[1]]
+
+    def token(self) -> list:
+        return self._token
+
+    def since(self, token) -> Optional[list]:
+        if not token or token[0] != "journal":
+            return None
+        return self.journal.read_since((token[1], token[2]), stop=(self._token[1], self._token[2]))
+
+    def all(self) -> list:
+        return self.journal.read_since((0, 0), stop=(self._token[1], self._token[2])) or []
+
+
+class JsonListSource:
+    """Entries of a JSON list file; any change means a full re-import."""
+
+    def __init__(self, path: str, load: Callable[[], list]):
+        self.path = path
+        self._load = load
+        try:
+            st = os.stat(path)
+            self._token = ["file", st.st_mtime_ns, st.st_size]
+        except OSError:
+            self._token = ["file", None, None]
+
+    def token(self) -> list:
+        return self._token
+
+    def since(self, token) -> Optional[list]:
+        return [] if token == self._token else None
+
+    def all(self) -> list:
+        entries = self._load()
+        return list(enumerate(entries if isinstance(entries, list) else []))
+
+
+# ─── index ──────────────────────────────────────────────────────────────────
+
+
+class WalletHistoryIndex:
+    """Per-address wallet history rows mirrored from the chain and tx log."""
+
+    def __init__(self, connect: Callable, project: Callable[[dict], list]):
+        self._connect = connect
+        self._project = project
+        self._lock = threading.RLock()
+        self._schema_ready = False
+
+    # ─── schema ─────────────────────────────────────────────────────────
+
+    def ensure_schema(self, conn) -> None:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS wallet_history_sources (
+                source_key TEXT PRIMARY KEY,
+                origin TEXT NOT NULL,
+                log_key TEXT,
+                ordinal INTEGER NOT NULL,
+                payload TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_wh_sources_log_key ON wallet_history_sources(log_key)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS wallet_history (
+                address_norm TEXT NOT NULL,
+                item_key TEXT NOT NULL,
+                source_key TEXT NOT NULL,
+                ts REAL NOT NULL,
+                ts_text TEXT,
+                ordinal INTEGER NOT NULL,
+                category TEXT,
+                category_key TEXT,
+                direction TEXT,
+                amount REAL NOT NULL DEFAULT 0,
+                item TEXT,
+                PRIMARY KEY (address_norm, item_key)
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_wh_page ON wallet_history(address_norm, ts DESC, ordinal)")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_wh_category_page "
+            "ON wallet_history(address_norm, category_key, ts DESC, ordinal)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_wh_source ON wallet_history(source_key)")
+        conn.execute("CREATE TABLE IF NOT EXISTS wallet_history_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _ready(self, conn) -> None:
+        if not self._schema_ready:
+            self.ensure_schema(conn)
+            self._schema_ready = True
+
+    def _tokens(self, conn) -> dict:
+        row = conn.execute("SELECT value FROM wallet_history_meta WHERE key = ?", (_META_KEY,)).fetchone()
+        if row is None:
+            return {}
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return {}
+
+    # ─── maintenance ────────────────────────────────────────────────────
+
+    def sync(self, chain, tx_log, rebuild: bool = True) -> bool:
+        """
+        Bring the index up to date with ``chain`` / ``tx_log`` sources.
+
+        With ``rebuild=False`` (the block-commit and tx_log-upsert hooks) only
+        incremental catch-up is done; anything needing a re-import is left
+        for the next reader.  Returns True when the index is current.
+        """
+        with self._lock, self._connect() as conn:
+            self._ready(conn)
+            tokens = self._tokens(conn)
+            chain_token, log_token = chain.token(), tx_log.token()
+            if tokens.get("chain") == chain_token and tokens.get("tx_log") == log_token:
+                return True
+            chain_delta = chain.since(tokens.get("chain")) if tokens else None
+            log_delta = tx_log.since(tokens.get("tx_log")) if chain_delta is not None else None
+            if chain_delta is None:
+                if not rebuild:
+                    return False
+                conn.execute("DELETE FROM wallet_history")
+                conn.execute("DELETE FROM wallet_history_sources")
+                self._apply_chain(conn, chain.all())
+                self._apply_log(conn, tx_log.all())
+                logger.info("wallet_history_index: rebuilt from chain and tx_log")
+            elif log_delta is None:
+                if not rebuild:
+                    return False
+                self._apply_chain(conn, chain_delta)
+                conn.execute(
+                    "DELETE FROM wallet_history WHERE source_key IN "
+                    "(SELECT source_key FROM wallet_history_sources WHERE origin = 'tx_log')"
+                )
+                conn.execute("DELETE FROM wallet_history_sources WHERE origin = 'tx_log'")
+                self._apply_log(conn, tx_log.all())
+                logger.info("wallet_history_index: re-imported tx_log")
+            else:
+                self._apply_chain(conn, chain_delta)
+                self._apply_log(conn, log_delta)
+            conn.execute(
+                "INSERT OR REPLACE INTO wallet_history_meta (key, value) VALUES (?, ?)",
+                (_META_KEY, _dumps({"chain": chain_token, "tx_log": log_token})),
+            )
+            return True
+
+    def _origin(self, conn, source_key: str) -> Optional[str]:
+        row = conn.execute("SELECT origin FROM wallet_history_sources WHERE source_key = ?", (source_key,)).fetchone()
+        return row[0] if row else None
+
+    def _drop_source(self, conn, source_key: str) -> None:
+        conn.execute("DELETE FROM wallet_history WHERE source_key = ?", (source_key,))
+        conn.execute("DELETE FROM wallet_history_sources WHERE source_key = ?", (source_key,))
+
+    def _insert(self, conn, source_key: str, origin: str, log_key, ordinal: int, entry: dict) -> None:
+        conn.execute(
+            "INSERT INTO wallet_history_sources (source_key, origin, log_key, ordinal, payload) VALUES (?, ?, ?, ?, ?)",
+            (source_key, origin, log_key, ordinal, _dumps(entry)),
+        )
+        rows = []
+        for row in self._project(entry):
+            norm = _norm(row.get("address"))
+            if not norm:
+                continue
+            category = row.get("category")
+            item = row.get("item")
+            rows.append((
+                norm,
+                row.get("item_key") or source_key,
+                source_key,
+                float(row.get("ts") or 0.0),
+                row.get("ts_text"),
+                ordinal,
+                category,
+                str(category or "").lower(),
+                row.get("direction"),
+                float(row.get("amount") or 0.0),
+                None if item is None else _dumps(item),
+            ))
+        if rows:
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO wallet_history
+                    (address_norm, item_key, source_key, ts, ts_text, ordinal,
+                     category, category_key, direction, amount, item)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+
+    def _apply_chain(self, conn, entries: Iterable) -> None:
+        for seq, entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            tid = entry.get("tx_id") or entry.get("id")
+            source_key = str(tid) if tid else f"chain:{seq}"
+            origin = self._origin(conn, source_key)
+            if origin == "chain":
+                continue
+            if origin is not None:
+                self._drop_source(conn, source_key)
+            self._insert(conn, source_key, "chain", None, int(seq), entry)
+
+    def _apply_log(self, conn, records: Iterable) -> None:
+        row = conn.execute("SELECT MAX(ordinal) FROM wallet_history_sources WHERE origin = 'tx_log'").fetchone()
+        ordinal = max(int(row[0] or 0), TX_LOG_ORDINAL_BASE)
+        for log_key, record in records:
+            log_key = str(log_key)
+            prev = conn.execute(
+                "SELECT source_key, ordinal FROM wallet_history_sources WHERE origin = 'tx_log' AND log_key = ?",
+                (log_key,),
+            ).fetchone()
+            if prev is not None:
+                self._drop_source(conn, prev[0])
+            if not isinstance(record, dict):
+                continue
+            tid = record.get("tx_id") or record.get("id")
+            source_key = str(tid) if tid else f"tx_log:{log_key}"
+            if self._origin(conn, source_key) is not None:
+                continue
+            if prev is not None:
+                slot = int(prev[1])
+            else:
+                ordinal += 1
+                slot = ordinal
+            self._insert(conn, source_key, "tx_log", log_key, slot, record)
+
+    # ─── reads ──────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _filters(address: str, category: str = "", ts_from: str = "", ts_to: str = "") -> Tuple[str, list]:
+        where = ["h.address_norm = ?"]
+        params: list = [_norm(address)]
+        if category:
+            where.append("h.category_key = ?")
+            params.append(category.lower())
+        if ts_from:
+            where.append("h.ts_text >= ?")
+            params.append(ts_from)
+        if ts_to:
+            where.append("h.ts_text <= ?")
+            params.append(ts_to)
+        return " AND ".join(where), params
+
+    def page(
+        self,
+        address: str,
+        category: str = "",
+        limit: int = 50,
+        after: Optional[str] = None,
+        offset: int = 0,
+        ts_from: str = "",
+        ts_to: str = "",
+    ) -> Tuple[List[tuple], Optional[str]]:
+        """
+        One page of ``address``'s history, newest first, as
+        ``(entry, row)`` pairs plus the ``after`` cursor of the next page
+        (None on the last page).  ``after`` takes precedence over ``offset``.
+        """
+        where, params = self._filters(address, category, ts_from, ts_to)
+        position = decode_cursor(after) if after else None
+        if position is not None:
+            where += " AND (h.ts < ? OR (h.ts = ? AND h.ordinal > ?))"
+            params += [position[0], position[0], position[1]]
+            offset = 0
+        with self._connect() as conn:
+            self._ready(conn)
+            rows = conn.execute(
+                f"""
+                SELECT s.payload, h.item, h.category, h.direction, h.ts, h.ordinal
+                FROM wallet_history h JOIN wallet_history_sources s ON s.source_key = h.source_key
+                WHERE {where}
+                ORDER BY h.ts DESC, h.ordinal ASC
+                LIMIT ? OFFSET ?
+                """,
+                (*params, int(limit) + 1, max(int(offset), 0)),
+            ).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        out = []
+        for payload, item, category_value, direction, _ts, _ordinal in rows:
+            out.append((
+                json.loads(payload),
+                {
+                    "item": None if item is None else json.loads(item),
+                    "category": category_value,
+                    "direction": direction,
+                },
+            ))
+        next_cursor = encode_cursor(rows[-1][4], rows[-1][5]) if more and rows else None
+        return out, next_cursor
+
+    def totals(self, address: str, category: str = "", ts_from: str = "", ts_to: str = "") -> List[tuple]:
+        """``(category, direction, count, amount)`` groups over ``address``'s history."""
+        where, params = self._filters(address, category, ts_from, ts_to)
+        with self._connect() as conn:
+            self._ready(conn)
+            return [
+                tuple(row)
+                for row in conn.execute(
+                    f"""
+                    SELECT h.category, h.direction, COUNT(*), SUM(h.amount)
+                    FROM wallet_history h WHERE {where}
+                    GROUP BY h.category, h.direction
+                    """,
+                    params,
+                )
+            ]
+
+    def entries_for(self, addresses: Iterable[str]) -> List[dict]:
+        """Deduped source entries with a non-derived row for any of ``addresses``, in merge order."""
+        norms = sorted({_norm(a) for a in addresses if _norm(a)})
+        if not norms:
+            return []
+        placeholders = ",".join("?" for _ in norms)
+        with self._connect() as conn:
+            self._ready(conn)
+            rows = conn.execute(
+                f"""
+                SELECT s.payload FROM wallet_history_sources s
+                WHERE s.source_key IN (
+                    SELECT h.source_key FROM wallet_history h
+                    WHERE h.address_norm IN ({placeholders}) AND h.item IS NULL
+                )
+                ORDER BY s.ordinal
+                """,
+                norms,
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]